@@ -1,28 +1,53 @@
 """
 AI Assistant Package
 Core AI functionality for ASVAB Learning Assistant
+
+Exports are imported on first access (PEP 562), so importing the package
+or one of its light modules does not pull in httpx, the settings or the
+retrieval stack.
 """
 
-from .groq_client import GroqClient, GroqAPIError, RateLimitError
-from .context_manager import ContextManager, Message, Session
-from .mode_handler import (
-    ModeHandler,
-    LearningMode,
-    ComplexityLevel,
-    ProjectType
-)
+import importlib
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .groq_client import GroqClient, GroqAPIError, RateLimitError
+    from .context_manager import ContextManager, Message, Session
+    from .mode_handler import (
+        ModeHandler,
+        LearningMode,
+        ComplexityLevel,
+        ProjectType
+    )
 
 __version__ = "1.0.0"
 
-__all__ = [
-    "GroqClient",
-    "GroqAPIError",
-    "RateLimitError",
-    "ContextManager",
-    "Message",
-    "Session",
-    "ModeHandler",
-    "LearningMode",
-    "ComplexityLevel",
-    "ProjectType",
-]
\ No newline at end of file
+# Exported name -> module defining it
+_EXPORTS = {
+    "GroqClient": ".groq_client",
+    "GroqAPIError": ".groq_client",
+    "RateLimitError": ".groq_client",
+    "ContextManager": ".context_manager",
+    "Message": ".context_manager",
+    "Session": ".context_manager",
+    "ModeHandler": ".mode_handler",
+    "LearningMode": ".mode_handler",
+    "ComplexityLevel": ".mode_handler",
+    "ProjectType": ".mode_handler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Cache it, later lookups no longer reach __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,278 @@
+"""
+API Dependencies
+Shared per-process instances injected into the route handlers
+"""
+
+from typing import Optional, TYPE_CHECKING
+import asyncio
+import logging
+import threading
+
+from ..config.settings import settings
+from ..groq_client import GroqClient
+from ..context_manager import ContextManager
+from ..session_store import create_session_store
+from ..mode_handler import ModeHandler
+from ..document_analysis import DocumentAnalyzer
+from ..retrieval import HybridRetriever
+from ..job_queue import JobQueue
+from ..prefetch import SuggestionPrefetcher
+from ..model_router import ModelRouter
+from ..response_cache import create_response_cache
+
+if TYPE_CHECKING:
+    # NumPy-backed, imported when the indexes are first built
+    from ..embedding_index import EmbeddingStore
+    from ..bm25_index import BM25Store
+
+logger = logging.getLogger(__name__)
+
+# One instance per worker process, so every request shares the same connection pool
+_groq_client: Optional[GroqClient] = None
+_context_manager: Optional[ContextManager] = None
+_mode_handler: Optional[ModeHandler] = None
+_document_analyzer: Optional[DocumentAnalyzer] = None
+_embedding_store: Optional["EmbeddingStore"] = None
+_keyword_store: Optional["BM25Store"] = None
+_retriever: Optional[HybridRetriever] = None
+_job_queue: Optional[JobQueue] = None
+
+# The warm-up builds the heavy instances in a thread while requests may ask for them
+_build_lock = threading.RLock()
+
+
+def get_groq_client() -> GroqClient:
+    """Get the shared Groq client"""
+    global _groq_client
+    if _groq_client is None:
+        with _build_lock:
+            if _groq_client is None:
+                _groq_client = GroqClient(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
+    return _groq_client
+
+
+def get_context_manager() -> ContextManager:
+    """Get the shared context manager"""
+    global _context_manager
+    if _context_manager is None:
+        _context_manager = ContextManager(
+            create_session_store(
+                backend=settings.CONTEXT_STORE_BACKEND,
+                path=settings.CONTEXT_STORE_PATH,
+                batch_size=settings.CONTEXT_STORE_BATCH_SIZE,
+                flush_interval=settings.CONTEXT_STORE_FLUSH_INTERVAL,
+                max_bytes=settings.CONTEXT_STORE_MAX_BYTES,
+                idle_ttl=settings.CONTEXT_STORE_IDLE_TTL,
+                spill_path=settings.CONTEXT_STORE_SPILL_PATH
+            )
+        )
+    return _context_manager
+
+
+def get_mode_handler() -> ModeHandler:
+    """Get the shared mode handler"""
+    global _mode_handler
+    if _mode_handler is None:
+        with _build_lock:
+            if _mode_handler is not None:
+                return _mode_handler
+
+            retriever = get_retriever() if settings.RETRIEVAL_ENABLED else None
+            groq_client = get_groq_client()
+
+            # Prefetches must run on idle capacity, which needs the rate limiter
+            prefetcher = None
+            if settings.PREFETCH_ENABLED and groq_client.rate_limiter is not None:
+                prefetcher = SuggestionPrefetcher(
+                    modes=settings.PREFETCH_MODES,
+                    top_n=settings.PREFETCH_TOP_N,
+                    ttl=settings.PREFETCH_TTL,
+                    max_sessions=settings.PREFETCH_MAX_SESSIONS
+                )
+
+            router = None
+            if settings.ROUTER_ENABLED:
+                # The configured default model leads the large tier unless it is listed as small
+                large_models = settings.ROUTER_LARGE_MODELS
+                if settings.GROQ_MODEL not in settings.ROUTER_SMALL_MODELS:
+                    large_models = [settings.GROQ_MODEL] + [
+                        m for m in large_models if m != settings.GROQ_MODEL
+                    ]
+                router = ModelRouter(
+                    groq_client.get_available_models(),
+                    small_models=settings.ROUTER_SMALL_MODELS,
+                    large_models=large_models,
+                    alpha=settings.ROUTER_EWMA_ALPHA,
+                    latency_slo=settings.ROUTER_LATENCY_SLO,
+                    error_threshold=settings.ROUTER_ERROR_THRESHOLD,
+                    probe_after=settings.ROUTER_PROBE_AFTER,
+                    max_attempts=settings.ROUTER_MAX_ATTEMPTS,
+                    attempt_timeout=settings.ROUTER_ATTEMPT_TIMEOUT
+                )
+
+            semantic_cache = None
+            if settings.SEMANTIC_CACHE_ENABLED:
+                # NumPy-backed, so only imported when enabled
+                from ..semantic_cache import SemanticCache
+                semantic_cache = SemanticCache(
+                    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                    max_extra_words=settings.SEMANTIC_CACHE_MAX_EXTRA_WORDS,
+                    ttl=settings.SEMANTIC_CACHE_TTL,
+                    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                    max_query_chars=settings.SEMANTIC_CACHE_MAX_QUERY_CHARS,
+                    audit_rate=settings.SEMANTIC_CACHE_AUDIT_RATE,
+                    audit_threshold=settings.SEMANTIC_CACHE_AUDIT_THRESHOLD
+                )
+
+            _mode_handler = ModeHandler(
+                tokenizer=groq_client.tokenizer,
+                retriever=retriever,
+                retrieval_top_k=settings.RETRIEVAL_TOP_K,
+                retrieval_max_tokens=settings.RETRIEVAL_MAX_TOKENS,
+                answer_index=retriever.keyword if retriever and settings.RETRIEVAL_INDEX_ANSWERS else None,
+                prefetcher=prefetcher,
+                router=router,
+                semantic_cache=semantic_cache
+            )
+    return _mode_handler
+
+
+def get_embedding_store() -> "EmbeddingStore":
+    """Get the shared embedding indexes for document retrieval"""
+    global _embedding_store
+    if _embedding_store is None:
+        with _build_lock:
+            if _embedding_store is None:
+                from ..embedding_index import EmbeddingStore, HashingVectorizer
+
+                _embedding_store = EmbeddingStore(
+                    settings.RETRIEVAL_INDEX_DIR,
+                    HashingVectorizer(settings.RETRIEVAL_DIM),
+                    ivf_threshold=settings.RETRIEVAL_IVF_THRESHOLD,
+                    nprobe=settings.RETRIEVAL_NPROBE
+                )
+    return _embedding_store
+
+
+def get_keyword_store() -> "BM25Store":
+    """Get the shared BM25 indexes for document retrieval"""
+    global _keyword_store
+    if _keyword_store is None:
+        with _build_lock:
+            if _keyword_store is None:
+                from ..bm25_index import BM25Store
+
+                _keyword_store = BM25Store(
+                    settings.RETRIEVAL_INDEX_DIR,
+                    snapshot_every=settings.RETRIEVAL_BM25_SNAPSHOT_EVERY
+                )
+    return _keyword_store
+
+
+def get_retriever() -> HybridRetriever:
+    """Get the shared retriever, BM25 first stage fused with embedding search"""
+    global _retriever
+    if _retriever is None:
+        with _build_lock:
+            if _retriever is None:
+                _retriever = HybridRetriever(
+                    keyword=get_keyword_store() if settings.RETRIEVAL_BM25_ENABLED else None,
+                    semantic=get_embedding_store() if settings.RETRIEVAL_EMBEDDINGS_ENABLED else None,
+                    candidates=settings.RETRIEVAL_CANDIDATES
+                )
+    return _retriever
+
+
+def get_document_analyzer() -> DocumentAnalyzer:
+    """Get the shared document analyzer"""
+    global _document_analyzer
+    if _document_analyzer is None:
+        _document_analyzer = DocumentAnalyzer(
+            get_groq_client(),
+            result_store=create_response_cache(
+                backend=settings.DOCUMENT_RESULTS_BACKEND,
+                path=settings.DOCUMENT_RESULTS_PATH,
+                ttl=settings.DOCUMENT_RESULTS_TTL,
+                max_bytes=settings.DOCUMENT_RESULTS_MAX_BYTES
+            ),
+            chunk_tokens=settings.DOCUMENT_CHUNK_TOKENS,
+            max_concurrency=settings.DOCUMENT_MAX_CONCURRENCY
+        )
+    return _document_analyzer
+
+
+def get_job_queue() -> JobQueue:
+    """Get the shared background job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            settings.JOB_QUEUE_PATH,
+            result_store=create_response_cache(
+                backend=settings.JOB_RESULTS_BACKEND,
+                path=settings.JOB_RESULTS_PATH,
+                ttl=settings.JOB_RESULTS_TTL,
+                max_bytes=settings.JOB_RESULTS_MAX_BYTES
+            ),
+            concurrency=settings.JOB_CONCURRENCY,
+            reserved=settings.JOB_RESERVED_INTERACTIVE,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            retry_backoff=settings.JOB_RETRY_BACKOFF,
+            job_ttl=settings.JOB_RESULTS_TTL,
+            lease=settings.JOB_LEASE
+        )
+    return _job_queue
+
+
+async def warm_up_dependencies() -> None:
+    """
+    Create the shared instances and open the Groq connection pool.
+
+    Started in the background by the app lifespan, so the server answers
+    before the tokenizer and retrieval indexes are loaded. Those load in a
+    thread; a request that needs one meanwhile waits for the same instance
+    instead of building its own.
+    """
+    try:
+        get_context_manager()
+        groq_client = await asyncio.to_thread(get_groq_client)
+        await asyncio.gather(asyncio.to_thread(get_mode_handler), groq_client.warm_up())
+        logger.info("Dependencies warmed up")
+    except Exception:
+        logger.exception("Warm-up failed, instances will be created on first use")
+
+
+async def cleanup_dependencies() -> None:
+    """Close the shared instances"""
+    global _groq_client, _context_manager, _mode_handler, _document_analyzer
+    global _embedding_store, _keyword_store, _retriever, _job_queue
+
+    # Stop the workers first, their jobs use everything below
+    if _job_queue is not None:
+        await _job_queue.close()
+        _job_queue.result_store.close()
+        _job_queue = None
+
+    if _embedding_store is not None:
+        _embedding_store.close()
+        _embedding_store = None
+
+    if _keyword_store is not None:
+        # Writes the snapshot, so the next start maps it instead of reindexing
+        _keyword_store.close()
+        _keyword_store = None
+
+    _retriever = None
+
+    if _document_analyzer is not None:
+        _document_analyzer.result_store.close()
+        _document_analyzer = None
+
+    if _groq_client is not None:
+        await _groq_client.close()
+        _groq_client = None
+
+    if _context_manager is not None:
+        await _context_manager.close()
+        _context_manager = None
+
+    _mode_handler = None
@@ -8,12 +8,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 
 from ..config.settings import settings
-from ..api.routes import chat, sessions, health
-from ..api.dependencies import cleanup_dependencies
+from ..api.routes import chat, sessions, health, documents, jobs, metrics
+from ..api.dependencies import cleanup_dependencies, warm_up_dependencies, get_job_queue
+from ..api.responses import CodecJSONResponse
+from metrics import HTTP_REQUEST_SECONDS
 
 # Configure logging
 logging.basicConfig(
@@ -34,10 +37,24 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {settings.app_env}")
     logger.info(f"Groq Model: {settings.groq_default_model}")
 
+    # Load the tokenizer and indexes and open the Groq connection pool in the
+    # background: the server takes requests (and health checks) right away
+    warm_up = asyncio.create_task(warm_up_dependencies())
+
+    # Resume queued background jobs
+    job_queue = get_job_queue()
+    job_queue.register("chat", chat.run_chat_job)
+    job_queue.register("chat_batch", chat.run_batch_job)
+    job_queue.register("document_analysis", documents.run_analysis_job)
+    job_queue.register("document_index", documents.run_index_job)
+    await job_queue.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down application...")
+    if not warm_up.done():
+        warm_up.cancel()
     await cleanup_dependencies()
     logger.info("Cleanup complete")
 
@@ -49,6 +66,7 @@ app = FastAPI(
     description="AI-powered learning assistant for ABUAD University students",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=CodecJSONResponse,
     lifespan=lifespan
 )
 
@@ -66,7 +84,7 @@ app.add_middleware(
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log all requests and responses"""
-    start_time = time.time()
+    start_time = time.monotonic()
 
     # Log request
     logger.info(f"Request: {request.method} {request.url.path}")
@@ -75,7 +93,16 @@ async def log_requests(request: Request, call_next):
     response = await call_next(request)
 
     # Calculate duration
-    duration = time.time() - start_time
+    duration = time.monotonic() - start_time
+
+    # Label by route template, not the raw path, to keep the series count bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        duration,
+        request.method,
+        getattr(route, "path", "unmatched"),
+        str(response.status_code)
+    )
 
     # Log response
     logger.info(
@@ -129,6 +156,9 @@ async def general_exception_handler(request: Request, exc: Exception):
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
 app.include_router(sessions.router, prefix="/api/v1")
+app.include_router(documents.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
 
 
 # Root endpoint
@@ -149,7 +179,11 @@ async def root():
             "modes": "/api/v1/modes",
             "chat": "/api/v1/chat",
             "streaming_chat": "/api/v1/chat/stream",
-            "sessions": "/api/v1/sessions/{session_id}"
+            "batch_chat": "/api/v1/chat/batch",
+            "sessions": "/api/v1/sessions/{session_id}",
+            "documents": "/api/v1/documents/analyze",
+            "jobs": "/api/v1/jobs/{job_id}",
+            "metrics": "/api/v1/metrics"
         }
     }
 
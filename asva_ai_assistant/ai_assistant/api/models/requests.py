@@ -0,0 +1,96 @@
+"""
+API Request Models
+Pydantic models for API requests
+"""
+
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class ChatParameters(BaseModel):
+    """Mode and generation parameters of a chat request"""
+
+    complexity_level: Optional[str] = Field(
+        default=None,
+        description="Complexity level for Explainer mode"
+    )
+    project_type: Optional[str] = Field(
+        default=None,
+        description="Project type for Inventor mode"
+    )
+    model: Optional[str] = Field(default=None, description="Model identifier")
+    max_tokens: int = Field(default=2048, ge=1, le=32768, description="Maximum response tokens")
+
+
+class ChatRequest(BaseModel):
+    """Request model for chat endpoint"""
+
+    session_id: str = Field(min_length=1, description="Session identifier")
+    message: str = Field(min_length=1, description="User's question or topic")
+    mode: str = Field(default="default", description="Learning mode")
+    parameters: Optional[ChatParameters] = Field(
+        default=None,
+        description="Mode and generation parameters"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "session_id": "550e8400-e29b-41d4-a716-446655440000",
+                "message": "Explain quantum entanglement",
+                "mode": "explainer",
+                "parameters": {"complexity_level": "intermediate", "max_tokens": 1024}
+            }
+        }
+
+
+class StreamChatRequest(ChatRequest):
+    """Request model for streaming chat endpoint"""
+
+
+class BatchChatItem(BaseModel):
+    """Single query in a batch chat request"""
+
+    id: Optional[str] = Field(
+        default=None,
+        description="Client identifier echoed in the result"
+    )
+    message: str = Field(min_length=1, description="User's question or topic")
+    mode: str = Field(default="default", description="Learning mode")
+    complexity_level: Optional[str] = Field(
+        default=None,
+        description="Complexity level for Explainer mode"
+    )
+    project_type: Optional[str] = Field(
+        default=None,
+        description="Project type for Inventor mode"
+    )
+    model: Optional[str] = Field(default=None, description="Model identifier")
+    max_tokens: int = Field(default=2048, ge=1, le=32768, description="Maximum response tokens")
+    collection: Optional[str] = Field(
+        default=None,
+        description="Document collection to retrieve passages from"
+    )
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint"""
+
+    items: List[BatchChatItem] = Field(min_length=1, description="Independent queries")
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Queries in flight at once (capped by the server)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "t1", "message": "Explain entropy", "mode": "explainer",
+                     "complexity_level": "beginner"},
+                    {"id": "t2", "message": "How do vaccines work?", "mode": "socratic"}
+                ],
+                "max_concurrency": 4
+            }
+        }
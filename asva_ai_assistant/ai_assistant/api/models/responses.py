@@ -25,6 +25,30 @@ class ResponseMetadata(BaseModel):
         default=None,
         description="Project type for Inventor mode"
     )
+    trimmed_turns: int = Field(
+        default=0,
+        description="Conversation turns dropped to fit the context window"
+    )
+    trimmed_tokens: int = Field(
+        default=0,
+        description="Tokens of conversation history dropped to fit the context window"
+    )
+    cached: bool = Field(
+        default=False,
+        description="Whether the response was served from the response cache"
+    )
+    cached_tokens: int = Field(
+        default=0,
+        description="Prompt tokens served from the upstream prompt cache"
+    )
+    prefetched: bool = Field(
+        default=False,
+        description="Whether the response was prefetched for a suggested follow-up"
+    )
+    semantic_hit: bool = Field(
+        default=False,
+        description="Whether the response was the cached answer to a similar earlier question"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -110,6 +134,53 @@ class ErrorResponse(BaseModel):
         }
 
 
+class BatchChatResult(BaseModel):
+    """Single NDJSON line of a batch chat response"""
+
+    index: int = Field(description="Position of the item in the request")
+    id: Optional[str] = Field(default=None, description="Client identifier of the item")
+    status: str = Field(description="ok or error")
+    response: Optional[str] = Field(default=None, description="AI generated response")
+    mode: Optional[str] = Field(default=None, description="Learning mode used")
+    metadata: Optional[ResponseMetadata] = Field(default=None, description="Response metadata")
+    suggestions: List[str] = Field(
+        default_factory=list,
+        description="Suggested follow-up actions"
+    )
+    sources: List[str] = Field(
+        default_factory=list,
+        description="Referenced sources (if any)"
+    )
+    error: Optional[ErrorDetail] = Field(default=None, description="Error for failed items")
+
+
+class JobResponse(BaseModel):
+    """Status of a background job"""
+
+    job_id: str = Field(description="Job identifier")
+    kind: str = Field(description="Job type, e.g. chat or document_analysis")
+    status: str = Field(description="queued, running, succeeded, failed or cancelled")
+    progress: float = Field(default=0.0, description="Fraction of the work done")
+    message: Optional[str] = Field(default=None, description="Progress message")
+    attempts: int = Field(default=0, description="Attempts made so far")
+    error: Optional[str] = Field(default=None, description="Last error")
+    result: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Job result, once succeeded and until it expires"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f2b8c1e9d4a4b6f8e7c5a2d1b0e9f8a",
+                "kind": "document_analysis",
+                "status": "running",
+                "progress": 0.45,
+                "attempts": 1
+            }
+        }
+
+
 class SessionInfo(BaseModel):
     """Session information"""
 
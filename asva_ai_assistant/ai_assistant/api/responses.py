@@ -0,0 +1,28 @@
+"""
+API Responses
+JSON response class backed by the fast JSON codec
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .. import json_codec
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with json_codec (orjson when installed).
+
+    It is the app's default response class. A route can also return one
+    directly to skip FastAPI's response-model validation and
+    jsonable_encoder pass, for content built from trusted internal data:
+    pydantic models go through their own compiled serializer, everything
+    else through the codec.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return json_codec.dumps(content)
@@ -3,18 +3,34 @@ Chat Routes
 Endpoints for AI chat interactions
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
-from typing import AsyncIterator
+from typing import AsyncIterator, Any, Dict, Optional
+import asyncio
 import time
 import logging
 
-from ...api.models.requests import ChatRequest, StreamChatRequest
-from ...api.models.responses import ChatResponse, StreamChunk, ResponseMetadata
+from ...api.models.requests import ChatRequest, StreamChatRequest, BatchChatItem, BatchChatRequest
+from ...api.models.responses import (
+    ChatResponse, StreamChunk, ResponseMetadata, BatchChatResult, ErrorDetail, JobResponse
+)
+from ...api.responses import CodecJSONResponse
+from ...config.settings import settings
+from ...sse import token_frame, coalesce_deltas, until_disconnected
+from ...retrieval import format_passages
+from ...prompt_cache import cached_prompt_tokens
+# Top-level like in the client and mode handler, so all share one timer context,
+# one registry and the exception classes the client raises
+from metrics import (
+    StageTimer, activate, STREAM_TOKENS_PER_SECOND, STREAMS_IN_FLIGHT, STREAM_DISCONNECTS, STREAM_TOKENS_SAVED
+)
+from exceptions import RateLimitError
+from ...job_queue import Job, JobQueue, PRIORITY_INTERACTIVE, PRIORITY_BATCH
 from api.dependencies import (
     get_groq_client,
     get_context_manager,
-    get_mode_handler
+    get_mode_handler,
+    get_job_queue
 )
 from ....ai_assistant import GroqClient, ContextManager, ModeHandler, LearningMode
 from ....ai_assistant.mode_handler import ComplexityLevel, ProjectType
@@ -23,55 +39,99 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 logger = logging.getLogger(__name__)
 
 
-@router.post("", response_model=ChatResponse)
-async def chat(
-        request: ChatRequest,
-        groq_client: GroqClient = Depends(get_groq_client),
-        context_manager: ContextManager = Depends(get_context_manager),
-        mode_handler: ModeHandler = Depends(get_mode_handler)
-):
+def _previous_turns(conversation: list, message: str) -> list:
+    """Get the history before the current turn, which is already saved to the session"""
+    if conversation and conversation[-1] == {"role": "user", "content": message}:
+        return conversation[:-1]
+    return conversation
+
+
+def _request_model(request: ChatRequest, mode_handler: ModeHandler) -> Optional[str]:
     """
-    Send a message and get an AI response.
+    Get the model a request asks for.
 
-    This endpoint processes user messages in the specified learning mode
-    and returns a complete response with suggestions and metadata.
+    Without a router the client default serves requests that name no
+    model, so it is named here to size the context window for it.
     """
-    start_time = time.time()
+    model = request.parameters.model if request.parameters else None
+    if model is None and mode_handler.router is None:
+        return settings.GROQ_MODEL
+    return model
 
-    try:
+
+async def _respond(
+        request: ChatRequest,
+        groq_client: GroqClient,
+        context_manager: ContextManager,
+        mode_handler: ModeHandler,
+        add_user_message: bool = True
+) -> ChatResponse:
+    """Answer a chat request and record both turns in the session"""
+    timer = StageTimer(mode=request.mode)
+    with activate(timer):
+        try:
+            response = await _answer(
+                request, groq_client, context_manager, mode_handler, add_user_message, timer
+            )
+        except Exception:
+            timer.finish("error")
+            raise
+    timer.finish("ok")
+    return response
+
+
+async def _answer(
+        request: ChatRequest,
+        groq_client: GroqClient,
+        context_manager: ContextManager,
+        mode_handler: ModeHandler,
+        add_user_message: bool,
+        timer: StageTimer
+) -> ChatResponse:
+    start_time = time.monotonic()
+
+    with timer.stage("context_load"):
         # Add user message to context
-        await context_manager.add_message(
-            session_id=request.session_id,
-            role="user",
-            content=request.message
-        )
+        if add_user_message:
+            await context_manager.add_message(
+                session_id=request.session_id,
+                role="user",
+                content=request.message
+            )
 
         # Get conversation history
-        conversation = await context_manager.get_conversation(
-            session_id=request.session_id
-        )
-
-        # Parse mode and parameters
-        mode = LearningMode(request.mode)
-        complexity_level = None
-        project_type = None
-
-        if request.parameters:
-            if request.parameters.complexity_level:
-                complexity_level = ComplexityLevel(request.parameters.complexity_level)
-            if request.parameters.project_type:
-                project_type = ProjectType(request.parameters.project_type)
-
-        # Process query with mode handler
-        result = await mode_handler.process_query(
-            query=request.message,
-            mode=mode,
-            conversation_history=conversation,
-            complexity_level=complexity_level,
-            project_type=project_type,
-            groq_client=groq_client
+        conversation = _previous_turns(
+            await context_manager.get_conversation(session_id=request.session_id),
+            request.message
         )
 
+    # Parse mode and parameters
+    mode = LearningMode(request.mode)
+    complexity_level = None
+    project_type = None
+
+    if request.parameters:
+        if request.parameters.complexity_level:
+            complexity_level = ComplexityLevel(request.parameters.complexity_level)
+        if request.parameters.project_type:
+            project_type = ProjectType(request.parameters.project_type)
+
+    # Process query with mode handler
+    result = await mode_handler.process_query(
+        query=request.message,
+        mode=mode,
+        conversation_history=conversation,
+        complexity_level=complexity_level,
+        project_type=project_type,
+        groq_client=groq_client,
+        model=_request_model(request, mode_handler),
+        max_tokens=request.parameters.max_tokens if request.parameters else 2048,
+        session_id=request.session_id,
+        collection=request.session_id
+    )
+
+    timer.model = result["metadata"]["model"]
+    with timer.stage("persistence"):
         # Add assistant response to context
         await context_manager.add_message(
             session_id=request.session_id,
@@ -79,40 +139,63 @@ async def chat(
             content=result["response"],
             metadata=result["metadata"]
         )
+        await mode_handler.index_answer(request.session_id, result["response"])
 
         # Update session mode history
-        session = context_manager.get_session(request.session_id)
-        if session and mode.value not in session.mode_history:
-            session.mode_history.append(mode.value)
-
-        # Calculate processing time
-        processing_time = int((time.time() - start_time) * 1000)
-
-        # Build response
-        metadata = ResponseMetadata(
-            tokens_used=result["metadata"]["tokens_used"],
-            model=result["metadata"]["model"],
-            processing_time_ms=processing_time,
-            complexity_level=result["metadata"].get("complexity_level"),
-            project_type=result["metadata"].get("project_type")
-        )
+        context_manager.record_mode(request.session_id, mode.value)
+
+    # Calculate processing time
+    processing_time = int((time.monotonic() - start_time) * 1000)
+
+    # Build response; the result comes from our own mode handler, so skip validation
+    metadata = ResponseMetadata.model_construct(
+        tokens_used=result["metadata"]["tokens_used"],
+        model=result["metadata"]["model"],
+        processing_time_ms=processing_time,
+        complexity_level=result["metadata"].get("complexity_level"),
+        project_type=result["metadata"].get("project_type"),
+        trimmed_turns=result["metadata"].get("trimmed_turns", 0),
+        trimmed_tokens=result["metadata"].get("trimmed_tokens", 0),
+        cached=result["metadata"].get("cached", False),
+        cached_tokens=result["metadata"].get("cached_tokens", 0),
+        prefetched=result["metadata"].get("prefetched", False),
+        semantic_hit=result["metadata"].get("semantic_hit", False)
+    )
+
+    response = ChatResponse.model_construct(
+        session_id=request.session_id,
+        response=result["response"],
+        mode=result["mode"],
+        metadata=metadata,
+        suggestions=result["suggestions"],
+        sources=result["sources"]
+    )
+
+    logger.info(
+        f"Chat request processed: session={request.session_id}, "
+        f"mode={mode.value}, tokens={metadata.tokens_used}, "
+        f"cached={metadata.cached}, semantic_hit={metadata.semantic_hit}, time={processing_time}ms"
+    )
+
+    return response
 
-        response = ChatResponse(
-            session_id=request.session_id,
-            response=result["response"],
-            mode=result["mode"],
-            metadata=metadata,
-            suggestions=result["suggestions"],
-            sources=[]
-        )
 
-        logger.info(
-            f"Chat request processed: session={request.session_id}, "
-            f"mode={mode.value}, tokens={metadata.tokens_used}, "
-            f"time={processing_time}ms"
-        )
+@router.post("", response_model=ChatResponse)
+async def chat(
+        request: ChatRequest,
+        groq_client: GroqClient = Depends(get_groq_client),
+        context_manager: ContextManager = Depends(get_context_manager),
+        mode_handler: ModeHandler = Depends(get_mode_handler)
+):
+    """
+    Send a message and get an AI response.
 
-        return response
+    This endpoint processes user messages in the specified learning mode
+    and returns a complete response with suggestions and metadata.
+    """
+    try:
+        # Returning the response directly skips FastAPI re-validating the model
+        return CodecJSONResponse(await _respond(request, groq_client, context_manager, mode_handler))
 
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}", exc_info=True)
@@ -129,6 +212,7 @@ async def chat(
 @router.post("/stream")
 async def stream_chat(
         request: StreamChatRequest,
+        http_request: Request,
         groq_client: GroqClient = Depends(get_groq_client),
         context_manager: ContextManager = Depends(get_context_manager),
         mode_handler: ModeHandler = Depends(get_mode_handler)
@@ -137,22 +221,58 @@ async def stream_chat(
     Send a message and receive a streaming AI response.
 
     This endpoint returns Server-Sent Events (SSE) for real-time streaming.
+    If the client disconnects mid-answer, the upstream generation is
+    cancelled and the part already sent is saved, marked as truncated.
     """
 
-    async def generate() -> AsyncIterator[str]:
-        """Generate streaming response"""
-        try:
-            # Add user message to context
+    async def replay(result: Dict[str, Any], conversation: list, query_kwargs: Dict[str, Any],
+                     timer: StageTimer) -> AsyncIterator[str]:
+        """Send an answer that is already complete (prefetched or a semantic hit) as one token"""
+        start_chunk = StreamChunk(type="start", session_id=request.session_id)
+        yield f"data: {start_chunk.model_dump_json()}\n\n"
+        yield token_frame(result["response"])
+        with timer.stage("persistence"):
             await context_manager.add_message(
                 session_id=request.session_id,
-                role="user",
-                content=request.message
+                role="assistant",
+                content=result["response"],
+                metadata=result["metadata"]
             )
-
-            # Get conversation history
-            conversation = await context_manager.get_conversation(
-                session_id=request.session_id
+            await mode_handler.index_answer(request.session_id, result["response"])
+            context_manager.record_mode(request.session_id, query_kwargs["mode"].value)
+        timer.model = result["metadata"]["model"]
+        timer.finish("ok")
+        if mode_handler.prefetcher is not None:
+            mode_handler.prefetcher.schedule(
+                mode_handler, request.session_id, conversation, request.message,
+                result["response"], result["suggestions"], **query_kwargs
             )
+        end_chunk = StreamChunk(
+            type="end",
+            metadata={**result["metadata"], "mode": result["mode"],
+                      "suggestions": result["suggestions"],
+                      "sources": result["sources"]}
+        )
+        yield f"data: {end_chunk.model_dump_json()}\n\n"
+
+    async def relay(timer: StageTimer) -> AsyncIterator[str]:
+        """Generate streaming response"""
+        parts = []
+        relaying = False
+        try:
+            with timer.stage("context_load"):
+                # Add user message to context
+                await context_manager.add_message(
+                    session_id=request.session_id,
+                    role="user",
+                    content=request.message
+                )
+
+                # Get conversation history
+                conversation = _previous_turns(
+                    await context_manager.get_conversation(session_id=request.session_id),
+                    request.message
+                )
 
             # Parse mode and get system prompt
             mode = LearningMode(request.mode)
@@ -165,14 +285,68 @@ async def stream_chat(
                 if request.parameters.project_type:
                     project_type = ProjectType(request.parameters.project_type)
 
-            system_prompt = mode_handler.get_system_prompt(
-                mode, complexity_level, project_type
-            )
+            model = _request_model(request, mode_handler)
+            max_tokens = request.parameters.max_tokens if request.parameters else 2048
+            query_kwargs = {
+                "mode": mode,
+                "complexity_level": complexity_level,
+                "project_type": project_type,
+                "groq_client": groq_client,
+                "model": model,
+                "max_tokens": max_tokens,
+                "collection": request.session_id
+            }
 
-            # Prepare messages
-            messages = [{"role": "system", "content": system_prompt}]
-            messages.extend(conversation)
-            messages.append({"role": "user", "content": request.message})
+            # A clicked suggestion may already be answered
+            prefetcher = mode_handler.prefetcher
+            if prefetcher is not None:
+                prefetched = await prefetcher.take(
+                    request.session_id, mode.value, request.message, conversation
+                )
+                if prefetched is not None:
+                    async for frame in replay(prefetched, conversation, query_kwargs, timer):
+                        yield frame
+                    return
+
+            with timer.stage("retrieval"):
+                passages = await mode_handler.retrieve(request.message, request.session_id)
+
+            # Or a paraphrase of an earlier first question
+            scope = mode_handler.semantic_scope(
+                request.message, conversation, passages, mode, complexity_level, project_type, model
+            )
+            semantic_hit = mode_handler.semantic_cache.lookup(scope, request.message) if scope else None
+            if semantic_hit is not None and not semantic_hit.audit:
+                async for frame in replay(semantic_hit.result, conversation, query_kwargs, timer):
+                    yield frame
+                return
+
+            with timer.stage("prompt_build"):
+                prompt = mode_handler.get_prompt(mode, complexity_level, project_type)
+                context = format_passages(passages) if passages else None
+                builder = mode_handler.get_context_builder(groq_client)
+                candidates = mode_handler.route_models(
+                    mode, complexity_level, prompt, conversation, request.message,
+                    context, model, max_tokens
+                )
+            windows = {}
+
+            def build_messages(candidate) -> list:
+                """Prepare messages within the model's context window, passages at the tail"""
+                size = builder.get_context_window(candidate)
+                if size not in windows:
+                    with timer.stage("prompt_build"):
+                        windows[size] = builder.build(
+                            prompt.text,
+                            conversation,
+                            request.message,
+                            model=candidate,
+                            max_tokens=max_tokens,
+                            session_id=request.session_id,
+                            context=context,
+                            prompt_id=prompt.prompt_id
+                        )
+                return windows[size]["messages"]
 
             # Send start event
             start_chunk = StreamChunk(
@@ -182,61 +356,180 @@ async def stream_chat(
             yield f"data: {start_chunk.model_dump_json()}\n\n"
 
             # Stream response
-            full_response = ""
+            relaying = True
             total_tokens = 0
-
-            async for chunk in groq_client.generate_streaming(
-                    messages=messages,
-                    model=request.parameters.model if request.parameters else "mixtral-8x7b-32768",
-                    temperature=mode_handler._get_temperature_for_mode(mode),
-                    max_tokens=request.parameters.max_tokens if request.parameters else 2048
-            ):
-                if "choices" in chunk and len(chunk["choices"]) > 0:
-                    delta = chunk["choices"][0].get("delta", {})
-                    content = delta.get("content", "")
-
-                    if content:
-                        full_response += content
-                        token_chunk = StreamChunk(
-                            type="token",
-                            content=content
-                        )
-                        yield f"data: {token_chunk.model_dump_json()}\n\n"
-
-                # Track token usage
-                if "usage" in chunk:
-                    total_tokens = chunk["usage"].get("total_tokens", 0)
-
-            # Add response to context
-            await context_manager.add_message(
-                session_id=request.session_id,
-                role="assistant",
-                content=full_response
+            usage = {}
+            used = {}
+            first_token_at = None
+            requested_at = time.monotonic()
+            temperature = mode_handler._get_temperature_for_mode(mode)
+
+            if settings.SSE_FAST_RELAY:
+                # Relay pre-serialized frames, no per-token JSON parsing or models
+                async for content in coalesce_deltas(
+                        mode_handler.stream_with_failover(
+                            candidates,
+                            lambda candidate: groq_client.generate_streaming_text(
+                                messages=build_messages(candidate),
+                                model=candidate or settings.GROQ_MODEL,
+                                temperature=temperature,
+                                max_tokens=max_tokens,
+                                usage=usage
+                            ),
+                            used
+                        ),
+                        max_chars=settings.SSE_COALESCE_CHARS,
+                        max_delay=settings.SSE_COALESCE_DELAY
+                ):
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                    parts.append(content)
+                    yield token_frame(content)
+
+                total_tokens = usage.get("total_tokens", 0)
+
+            else:
+                async for chunk in mode_handler.stream_with_failover(
+                        candidates,
+                        lambda candidate: groq_client.generate_streaming(
+                            messages=build_messages(candidate),
+                            model=candidate or settings.GROQ_MODEL,
+                            temperature=temperature,
+                            max_tokens=max_tokens
+                        ),
+                        used
+                ):
+                    if "choices" in chunk and len(chunk["choices"]) > 0:
+                        delta = chunk["choices"][0].get("delta", {})
+                        content = delta.get("content", "")
+
+                        if content:
+                            if first_token_at is None:
+                                first_token_at = time.monotonic()
+                            parts.append(content)
+                            token_chunk = StreamChunk(
+                                type="token",
+                                content=content
+                            )
+                            yield f"data: {token_chunk.model_dump_json()}\n\n"
+
+                    # Track token usage
+                    if "usage" in chunk:
+                        usage = chunk["usage"]
+                        total_tokens = usage.get("total_tokens", 0)
+
+            relaying = False
+            finished_at = time.monotonic()
+            window = windows[builder.get_context_window(used.get("model"))]
+            served_by = used.get("model") or settings.GROQ_MODEL
+            full_response = "".join(parts)
+            cached_tokens = cached_prompt_tokens(usage)
+            ttft = first_token_at - requested_at if first_token_at is not None else None
+            mode_handler.prompt_cache_stats.record(
+                mode.value,
+                window["prefix_reused"],
+                usage.get("prompt_tokens", 0),
+                cached_tokens,
+                ttft=ttft
             )
 
+            completion_tokens = usage.get("completion_tokens") or groq_client.count_tokens(full_response)
+            timer.model = served_by
+            if ttft is not None:
+                timer.add("ttft", ttft)
+                timer.add("generation", finished_at - first_token_at)
+                if finished_at > first_token_at:
+                    STREAM_TOKENS_PER_SECOND.observe(
+                        completion_tokens / (finished_at - first_token_at), mode.value, served_by
+                    )
+
+            with timer.stage("persistence"):
+                # Add response to context
+                await context_manager.add_message(
+                    session_id=request.session_id,
+                    role="assistant",
+                    content=full_response
+                )
+                await mode_handler.index_answer(request.session_id, full_response)
+                context_manager.record_mode(request.session_id, mode.value)
+            timer.finish("ok")
+
             # Send end event with metadata
             suggestions = mode_handler._generate_suggestions(
                 mode, request.message, full_response
             )
-
-            end_chunk = StreamChunk(
-                type="end",
-                metadata={
-                    "tokens_used": total_tokens,
+            if prefetcher is not None:
+                prefetcher.schedule(
+                    mode_handler, request.session_id, conversation, request.message,
+                    full_response, suggestions, **query_kwargs
+                )
+
+            metadata = {
+                "tokens_used": total_tokens,
+                "completion_tokens": completion_tokens,
+                "model": served_by,
+                "mode": mode.value,
+                "suggestions": suggestions,
+                "trimmed_turns": window["trimmed_turns"],
+                "trimmed_tokens": window["trimmed_tokens"],
+                "sources": [p.label for p in passages],
+                "cached_tokens": cached_tokens,
+                "prefix_hash": window["prefix_hash"]
+            }
+            if scope is not None:
+                mode_handler.semantic_cache.store(scope, request.message, {
+                    "response": full_response,
                     "mode": mode.value,
-                    "suggestions": suggestions
-                }
-            )
+                    "suggestions": suggestions,
+                    "sources": [],
+                    "metadata": {
+                        key: metadata[key] for key in
+                        ("tokens_used", "model", "trimmed_turns", "trimmed_tokens", "cached_tokens", "prefix_hash")
+                    }
+                }, audited=semantic_hit)
+
+            end_chunk = StreamChunk(type="end", metadata=metadata)
             yield f"data: {end_chunk.model_dump_json()}\n\n"
 
+        except (asyncio.CancelledError, GeneratorExit):
+            STREAM_DISCONNECTS.inc(1, request.mode)
+            if relaying:
+                # Keep what the student saw; the rest was never generated
+                partial = "".join(parts)
+                STREAM_TOKENS_SAVED.inc(
+                    max(max_tokens - groq_client.count_tokens(partial), 0), request.mode
+                )
+                if partial:
+                    await context_manager.add_message(
+                        session_id=request.session_id,
+                        role="assistant",
+                        content=partial,
+                        metadata={"truncated": True}
+                    )
+                logger.info(f"Client left stream for session {request.session_id} after {len(partial)} chars")
+            raise
+
         except Exception as e:
             logger.error(f"Error in streaming: {str(e)}", exc_info=True)
+            timer.finish("error")
             error_chunk = StreamChunk(
                 type="error",
                 content=str(e)
             )
             yield f"data: {error_chunk.model_dump_json()}\n\n"
 
+    async def generate() -> AsyncIterator[str]:
+        timer = StageTimer(mode=request.mode)
+        STREAMS_IN_FLIGHT.inc(1, request.mode)
+        try:
+            with activate(timer):
+                async for frame in until_disconnected(relay(timer), http_request.receive):
+                    yield frame
+        finally:
+            STREAMS_IN_FLIGHT.dec(1, request.mode)
+            # No-op unless the client went away mid-stream
+            timer.finish("cancelled")
+
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
@@ -245,4 +538,208 @@ async def stream_chat(
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no"
         }
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/routing")
+async def routing_stats(mode_handler: ModeHandler = Depends(get_mode_handler)):
+    """Requests routed to each model with its latency and error rate averages"""
+    if mode_handler.router is None:
+        return {}
+    return mode_handler.router.stats()
+
+
+@router.get("/upstream")
+async def upstream_stats(groq_client: GroqClient = Depends(get_groq_client)):
+    """Hedged request counts and circuit breaker state per model"""
+    return groq_client.get_upstream_stats()
+
+
+@router.get("/prefetch")
+async def prefetch_stats(mode_handler: ModeHandler = Depends(get_mode_handler)):
+    """Suggestion prefetch hit rate and wasted tokens per mode"""
+    if mode_handler.prefetcher is None:
+        return {}
+    return mode_handler.prefetcher.stats()
+
+
+@router.get("/semantic-cache")
+async def semantic_cache_stats(mode_handler: ModeHandler = Depends(get_mode_handler)):
+    """Semantic cache hit rate and audited false hit rate per mode, with recent false hits"""
+    if mode_handler.semantic_cache is None:
+        return {}
+    return mode_handler.semantic_cache.stats()
+
+
+@router.get("/prompt-cache")
+async def prompt_cache_stats(mode_handler: ModeHandler = Depends(get_mode_handler)):
+    """Prefix reuse, upstream cached tokens and time to first token per mode"""
+    return mode_handler.prompt_cache_stats.stats()
+
+
+def _batch_query(item: BatchChatItem) -> Dict[str, Any]:
+    """Convert a batch item into process_query arguments"""
+    return {
+        "query": item.message,
+        "mode": LearningMode(item.mode),
+        "complexity_level": ComplexityLevel(item.complexity_level) if item.complexity_level else None,
+        "project_type": ProjectType(item.project_type) if item.project_type else None,
+        "model": item.model,
+        "max_tokens": item.max_tokens,
+        "collection": item.collection
+    }
+
+
+def _batch_error(index: int, item: BatchChatItem, code: str, error: Exception) -> BatchChatResult:
+    return BatchChatResult(
+        index=index,
+        id=item.id,
+        status="error",
+        error=ErrorDetail(code=code, message=str(error))
+    )
+
+
+async def _run_batch(
+        request: BatchChatRequest,
+        groq_client: GroqClient,
+        mode_handler: ModeHandler,
+        max_concurrency: int
+) -> AsyncIterator[BatchChatResult]:
+    """Run the items of a batch, yielding results in completion order"""
+    start_time = time.time()
+    positions = []
+    queries = []
+    failed = 0
+
+    for index, item in enumerate(request.items):
+        try:
+            queries.append(_batch_query(item))
+            positions.append(index)
+        except ValueError as e:
+            failed += 1
+            yield _batch_error(index, item, "INVALID_REQUEST", e)
+
+    async for outcome in mode_handler.process_batch(
+            queries, groq_client=groq_client, max_concurrency=max_concurrency
+    ):
+        index = positions[outcome["index"]]
+        item = request.items[index]
+
+        if "error" in outcome:
+            failed += 1
+            error = outcome["error"]
+            code = "RATE_LIMITED" if isinstance(error, RateLimitError) else "PROCESSING_ERROR"
+            yield _batch_error(index, item, code, error)
+            continue
+
+        result = outcome["result"]
+        yield BatchChatResult(
+            index=index,
+            id=item.id,
+            status="ok",
+            response=result["response"],
+            mode=result["mode"],
+            metadata=ResponseMetadata(**result["metadata"]),
+            suggestions=result["suggestions"],
+            sources=result["sources"]
+        )
+
+    logger.info(
+        f"Batch chat processed: items={len(request.items)}, failed={failed}, "
+        f"concurrency={max_concurrency}, time={int((time.time() - start_time) * 1000)}ms"
+    )
+
+
+def _check_batch(request: BatchChatRequest) -> int:
+    """Validate the batch size and get its concurrency"""
+    if len(request.items) > settings.CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail={
+                "code": "BATCH_TOO_LARGE",
+                "message": f"Batches are limited to {settings.CHAT_BATCH_MAX_ITEMS} items",
+                "details": {"items": len(request.items)}
+            }
+        )
+
+    return min(
+        request.max_concurrency or settings.CHAT_BATCH_CONCURRENCY,
+        settings.CHAT_BATCH_MAX_CONCURRENCY
+    )
+
+
+@router.post("/batch")
+async def batch_chat(
+        request: BatchChatRequest,
+        groq_client: GroqClient = Depends(get_groq_client),
+        mode_handler: ModeHandler = Depends(get_mode_handler)
+):
+    """
+    Run many independent queries in one request.
+
+    Items run concurrently through the shared Groq client without session
+    history. Results stream back as NDJSON, one line per item in completion
+    order; a failed item produces an error line instead of failing the batch.
+    """
+    max_concurrency = _check_batch(request)
+
+    async def generate() -> AsyncIterator[str]:
+        async for result in _run_batch(request, groq_client, mode_handler, max_concurrency):
+            yield result.model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs", status_code=202, response_model=JobResponse)
+async def submit_chat_job(
+        request: ChatRequest,
+        queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Queue a chat request and return its job ID immediately.
+
+    Chat jobs run ahead of batch work. Poll /api/v1/jobs/{job_id} for the
+    ChatResponse.
+    """
+    job_id = await queue.submit("chat", request.model_dump(), priority=PRIORITY_INTERACTIVE)
+    return JobResponse(**await queue.status(job_id))
+
+
+@router.post("/batch/jobs", status_code=202, response_model=JobResponse)
+async def submit_batch_job(
+        request: BatchChatRequest,
+        queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Queue a batch chat request and return its job ID immediately.
+
+    The job result holds one BatchChatResult per item, in request order.
+    """
+    _check_batch(request)
+    job_id = await queue.submit("chat_batch", request.model_dump(), priority=PRIORITY_BATCH)
+    return JobResponse(**await queue.status(job_id))
+
+
+async def run_chat_job(job: Job) -> Dict[str, Any]:
+    """Job handler for queued chat requests"""
+    response = await _respond(
+        ChatRequest(**job.payload),
+        get_groq_client(),
+        get_context_manager(),
+        get_mode_handler(),
+        # A retry must not record the student's message twice
+        add_user_message=job.attempts == 1
+    )
+    return response.model_dump()
+
+
+async def run_batch_job(job: Job) -> Dict[str, Any]:
+    """Job handler for queued batch chat requests"""
+    request = BatchChatRequest(**job.payload)
+    results = []
+    async for result in _run_batch(request, get_groq_client(), get_mode_handler(), _check_batch(request)):
+        results.append(result.model_dump(exclude_none=True))
+        job.progress(len(results) / len(request.items))
+
+    results.sort(key=lambda result: result["index"])
+    return {"items": results}
@@ -0,0 +1,263 @@
+"""
+Document Routes
+Endpoints for analyzing and indexing uploaded course documents
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile
+from typing import Optional, Dict, Any
+import asyncio
+import time
+import logging
+
+from ...api.models.responses import DocumentAnalysisResponse, ResponseMetadata, JobResponse
+from ...config.settings import settings
+# Top-level like in document_analysis and job_queue, so the errors raised and
+# caught on either side are the same classes
+from exceptions import DocumentError, JobError
+from ...job_queue import Job, JobQueue, PRIORITY_NORMAL, PRIORITY_BATCH
+from ...document_analysis import ACTIONS, DocumentAnalyzer, chunk_pages, iter_pages
+from ...retrieval import HybridRetriever
+from api.dependencies import get_document_analyzer, get_retriever, get_job_queue
+
+router = APIRouter(prefix="/documents", tags=["Documents"])
+logger = logging.getLogger(__name__)
+
+
+def _check_action(action: str) -> None:
+    if action not in ACTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "INVALID_ACTION",
+                "message": f"Unknown action '{action}'",
+                "details": {"actions": list(ACTIONS)}
+            }
+        )
+
+
+def _analysis_response(
+        result: Dict[str, Any],
+        session_id: str,
+        document_id: str,
+        action: str,
+        model: Optional[str],
+        processing_time: int
+) -> DocumentAnalysisResponse:
+    logger.info(
+        f"Document analyzed: document={document_id}, action={action}, "
+        f"chunks={result['chunks']}, calls={result['calls']}, "
+        f"reused={result['reused']}, time={processing_time}ms"
+    )
+
+    return DocumentAnalysisResponse(
+        session_id=session_id,
+        document_id=document_id,
+        action=action,
+        result=result["result"],
+        metadata=ResponseMetadata(
+            tokens_used=result["tokens_used"],
+            model=model or settings.GROQ_MODEL,
+            processing_time_ms=processing_time,
+            cached=result["calls"] == 0
+        )
+    )
+
+
+@router.post("/analyze", response_model=DocumentAnalysisResponse)
+async def analyze_document(
+        file: UploadFile = File(description="PDF or text document"),
+        document_id: str = Form(description="Document ID, e.g. drive_doc_12345"),
+        session_id: str = Form(description="Session identifier"),
+        action: str = Form("summarize", description="summarize, explain or quiz"),
+        model: Optional[str] = Form(None, description="Model identifier"),
+        analyzer: DocumentAnalyzer = Depends(get_document_analyzer)
+):
+    """
+    Summarize, explain or build a quiz from a document.
+
+    Long documents are split into chunks that are analyzed separately and
+    then combined. Results are stored per chunk, so analyzing the same
+    document again returns almost immediately.
+    """
+    start_time = time.time()
+    _check_action(action)
+
+    try:
+        # The upload is spooled to disk by Starlette and read page by page
+        result = await analyzer.analyze(file.file, action=action, model=model)
+
+    except DocumentError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "code": "DOCUMENT_ERROR",
+                "message": str(e),
+                "details": {"document_id": document_id}
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error analyzing document: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "code": "PROCESSING_ERROR",
+                "message": "Failed to analyze document",
+                "details": {"error": str(e)}
+            }
+        )
+    finally:
+        await file.close()
+
+    processing_time = int((time.time() - start_time) * 1000)
+    return _analysis_response(result, session_id, document_id, action, model, processing_time)
+
+
+@router.post("/analyze/jobs", status_code=202, response_model=JobResponse)
+async def submit_analysis_job(
+        file: UploadFile = File(description="PDF or text document"),
+        document_id: str = Form(description="Document ID, e.g. drive_doc_12345"),
+        session_id: str = Form(description="Session identifier"),
+        action: str = Form("summarize", description="summarize, explain or quiz"),
+        model: Optional[str] = Form(None, description="Model identifier"),
+        queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Queue a document analysis and return its job ID immediately.
+
+    Poll /api/v1/jobs/{job_id} for progress and the DocumentAnalysisResponse.
+    """
+    _check_action(action)
+    try:
+        data = await file.read()
+    finally:
+        await file.close()
+
+    job_id = await queue.submit(
+        "document_analysis",
+        {"document_id": document_id, "session_id": session_id, "action": action, "model": model},
+        priority=PRIORITY_NORMAL,
+        attachment=data
+    )
+    return JobResponse(**await queue.status(job_id))
+
+
+@router.post("/index")
+async def index_document(
+        file: UploadFile = File(description="PDF or text document"),
+        document_id: str = Form(description="Document ID, e.g. drive_doc_12345"),
+        collection: str = Form(description="Collection to add the document to (user or college)"),
+        store: HybridRetriever = Depends(get_retriever)
+):
+    """
+    Add a document to a retrieval collection.
+
+    Re-indexing a document replaces its previous chunks. Chat requests
+    retrieve passages from the collection named after their session.
+    """
+    source = file.filename or document_id
+
+    def index() -> int:
+        chunks = chunk_pages(iter_pages(file.file), max_tokens=settings.RETRIEVAL_CHUNK_TOKENS)
+        return store.add_document(collection, document_id, source, [c.text for c in chunks])
+
+    try:
+        chunks = await asyncio.to_thread(index)
+    except DocumentError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "code": "DOCUMENT_ERROR",
+                "message": str(e),
+                "details": {"document_id": document_id}
+            }
+        )
+    finally:
+        await file.close()
+
+    logger.info(f"Document indexed: document={document_id}, collection={collection}, chunks={chunks}")
+    return {"document_id": document_id, "collection": collection, "chunks": chunks}
+
+
+@router.post("/index/jobs", status_code=202, response_model=JobResponse)
+async def submit_index_job(
+        file: UploadFile = File(description="PDF or text document"),
+        document_id: str = Form(description="Document ID, e.g. drive_doc_12345"),
+        collection: str = Form(description="Collection to add the document to (user or college)"),
+        queue: JobQueue = Depends(get_job_queue)
+):
+    """Queue a document for indexing and return its job ID immediately"""
+    try:
+        data = await file.read()
+    finally:
+        await file.close()
+
+    job_id = await queue.submit(
+        "document_index",
+        {"document_id": document_id, "collection": collection, "source": file.filename or document_id},
+        priority=PRIORITY_BATCH,
+        attachment=data
+    )
+    return JobResponse(**await queue.status(job_id))
+
+
+async def run_analysis_job(job: Job) -> Dict[str, Any]:
+    """Job handler for queued document analyses"""
+    start_time = time.time()
+    payload = job.payload
+    try:
+        result = await get_document_analyzer().analyze(
+            job.attachment, action=payload["action"], model=payload["model"], progress=job.progress
+        )
+    except DocumentError as e:
+        # An unreadable document fails the same way on every attempt
+        raise JobError(str(e)) from e
+
+    processing_time = int((time.time() - start_time) * 1000)
+    response = _analysis_response(
+        result, payload["session_id"], payload["document_id"], payload["action"],
+        payload["model"], processing_time
+    )
+    return response.model_dump()
+
+
+async def run_index_job(job: Job) -> Dict[str, Any]:
+    """Job handler for queued document indexing"""
+    payload = job.payload
+    store = get_retriever()
+
+    def index() -> int:
+        chunks = chunk_pages(iter_pages(job.attachment), max_tokens=settings.RETRIEVAL_CHUNK_TOKENS)
+        return store.add_document(
+            payload["collection"], payload["document_id"], payload["source"], [c.text for c in chunks]
+        )
+
+    try:
+        chunks = await asyncio.to_thread(index)
+    except DocumentError as e:
+        raise JobError(str(e)) from e
+
+    logger.info(
+        f"Document indexed: document={payload['document_id']}, "
+        f"collection={payload['collection']}, chunks={chunks}"
+    )
+    return {"document_id": payload["document_id"], "collection": payload["collection"], "chunks": chunks}
+
+
+@router.delete("/{document_id}")
+async def delete_document(
+        document_id: str,
+        collection: str,
+        store: HybridRetriever = Depends(get_retriever)
+):
+    """Remove a trashed document from a retrieval collection"""
+    removed = await asyncio.to_thread(store.delete_document, collection, document_id)
+    if not removed:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "code": "DOCUMENT_NOT_FOUND",
+                "message": f"Document '{document_id}' is not indexed in '{collection}'",
+                "details": {}
+            }
+        )
+    return {"document_id": document_id, "collection": collection, "chunks": removed}
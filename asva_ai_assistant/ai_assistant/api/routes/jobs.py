@@ -0,0 +1,81 @@
+"""
+Job Routes
+Endpoints for the status, progress and results of background jobs
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+import logging
+
+from ...api.models.responses import JobResponse, SuccessResponse
+from ...job_queue import JobQueue, JobStatus
+from api.dependencies import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+logger = logging.getLogger(__name__)
+
+
+def _not_found(job_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail={
+            "code": "JOB_NOT_FOUND",
+            "message": f"Job '{job_id}' not found or expired",
+            "details": {}
+        }
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Get the status and progress of a background job.
+
+    Succeeded jobs include their result until it expires from the result store.
+    """
+    status = await queue.status(job_id)
+    if status is None:
+        raise _not_found(job_id)
+
+    result = None
+    if status["status"] == JobStatus.SUCCEEDED.value:
+        result = await queue.result(job_id)
+
+    return JobResponse(**status, result=result)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """Get the result of a succeeded job"""
+    status = await queue.status(job_id)
+    if status is None:
+        raise _not_found(job_id)
+
+    if status["status"] != JobStatus.SUCCEEDED.value:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "code": "JOB_NOT_FINISHED",
+                "message": f"Job '{job_id}' is {status['status']}",
+                "details": {"progress": status["progress"], "error": status["error"]}
+            }
+        )
+
+    result = await queue.result(job_id)
+    if result is None:
+        raise _not_found(job_id)
+    return result
+
+
+@router.delete("/{job_id}", response_model=SuccessResponse)
+async def cancel_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """Cancel a job that has not started yet"""
+    if not await queue.cancel(job_id):
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "code": "JOB_NOT_CANCELLABLE",
+                "message": f"Job '{job_id}' is not queued",
+                "details": {}
+            }
+        )
+    return SuccessResponse(success=True, message=f"Job {job_id} cancelled")
@@ -0,0 +1,20 @@
+"""
+Metrics Routes
+Prometheus scrape endpoint for request stage latencies and stream gauges
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+# The registry the client and mode handler record to
+from metrics import registry
+
+router = APIRouter(tags=["Metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage histograms, tokens per second and streams in flight in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
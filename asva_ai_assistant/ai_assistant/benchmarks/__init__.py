@@ -0,0 +1,6 @@
+"""
+Benchmarks
+Performance scripts for the assistant core, run from the ai_assistant directory:
+
+    python -m benchmarks.<name>
+"""
@@ -0,0 +1,92 @@
+"""
+Batch chat benchmark
+Throughput of ModeHandler.process_batch at increasing concurrency against the fake Groq server
+
+Usage:
+    python -m benchmarks.bench_batch [--items 200] [--concurrency 1 4 8 16] [--rpm 600]
+
+Each item is an independent explainer query. The budget window is scaled down
+from one minute so a run takes seconds; with --rpm set, higher concurrency
+stops helping once the rate limit is the bottleneck.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, Any
+
+import httpx
+
+from groq_client import GroqClient
+from mode_handler import ModeHandler, LearningMode, ComplexityLevel
+from rate_limiter import RateLimiter
+from benchmarks.fake_groq import FakeGroqServer
+
+TOPICS = ["entropy", "photosynthesis", "recursion", "supply and demand", "plate tectonics"]
+
+
+async def run(items: int, concurrency: int, rpm: int, window: float, latency: float) -> Dict[str, Any]:
+    server = FakeGroqServer(
+        requests_per_window=rpm, tokens_per_window=rpm * 1000, window=window, latency=latency
+    )
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    client = GroqClient(
+        "key",
+        base_url="http://fake",
+        coalesce=False,
+        rate_limiter=RateLimiter(
+            requests_per_minute=rpm,
+            tokens_per_minute=rpm * 1000,
+            max_concurrency=64,
+            max_wait=60.0,
+            period=window
+        ),
+        http_client=http_client
+    )
+    handler = ModeHandler(tokenizer=client.tokenizer)
+    queries = [
+        {
+            "query": f"Explain {TOPICS[i % len(TOPICS)]} ({i})",
+            "mode": LearningMode.EXPLAINER,
+            "complexity_level": ComplexityLevel.BEGINNER,
+            "model": "llama-3.1-8b-instant",
+            "max_tokens": 50
+        }
+        for i in range(items)
+    ]
+
+    ok = failed = 0
+    start = time.monotonic()
+    async for outcome in handler.process_batch(queries, groq_client=client, max_concurrency=concurrency):
+        if "error" in outcome:
+            failed += 1
+        else:
+            ok += 1
+    elapsed = time.monotonic() - start
+    await http_client.aclose()
+
+    return {"ok": ok, "failed": failed, "upstream_429": server.rejected, "wall_s": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--rpm", type=int, default=600, help="Requests per window")
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream seconds per completion")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    for concurrency in args.concurrency:
+        result = asyncio.run(run(args.items, concurrency, args.rpm, args.window, args.latency))
+        print(
+            f"concurrency={concurrency:<3} ok={result['ok']:<4} failed={result['failed']:<3} "
+            f"upstream_429={result['upstream_429']:<3} wall={result['wall_s']:5.2f}s "
+            f"throughput={result['ok'] / result['wall_s']:6.1f} items/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
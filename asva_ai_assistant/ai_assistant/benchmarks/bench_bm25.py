@@ -0,0 +1,98 @@
+"""
+BM25 index benchmark
+Query latency, snapshot size and reopen time at 100k, 1M and 10M postings
+
+Usage:
+    python -m benchmarks.bench_bm25 [--postings 100000 1000000 10000000] [--terms 50]
+
+Chunks are synthetic texts with Zipf-distributed words from a 50k vocabulary;
+queries mix frequent and rare words. Latency is measured after a snapshot
+(memory-mapped postings) and again with every posting in the delta blocks.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from bm25_index import BM25Index
+
+VOCABULARY = 50_000
+
+
+def corpus(rng: np.random.Generator, postings: int, words: int) -> List[str]:
+    chunks = []
+    total = 0
+    while total < postings:
+        ids = np.minimum(rng.zipf(1.2, words), VOCABULARY)
+        chunks.append(" ".join(f"w{i}" for i in ids))
+        total += len(set(ids.tolist()))
+    return chunks
+
+
+def latency(index: BM25Index, queries: List[str], k: int) -> Dict[str, float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000
+    }
+
+
+def bench(postings: int, words: int, queries: int, k: int) -> None:
+    rng = np.random.default_rng(0)
+    chunks = corpus(rng, postings, words)
+    sample = [
+        " ".join(f"w{i}" for i in np.minimum(rng.zipf(1.5, 6), VOCABULARY))
+        for _ in range(queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "keywords.bm25")
+        index = BM25Index(path, snapshot_every=0)
+        start = time.perf_counter()
+        for offset in range(0, len(chunks), 1000):
+            index.add(f"doc-{offset}", "bench", chunks[offset:offset + 1000])
+        build = time.perf_counter() - start
+        delta = latency(index, sample, k)
+
+        start = time.perf_counter()
+        index.snapshot()
+        snapshot = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = BM25Index(path)
+        reopen = time.perf_counter() - start
+        mapped = latency(index, sample, k)
+        size = os.path.getsize(path)
+
+    print(
+        f"{index.postings:>11,} postings {len(chunks):>8,} chunks  "
+        f"add {len(chunks) / build:>7,.0f} chunks/s  "
+        f"snapshot {snapshot:5.2f}s {size / 2 ** 20:6.1f}MB reopen {reopen * 1000:6.0f}ms  "
+        f"delta p50={delta['p50_ms']:6.2f}ms p99={delta['p99_ms']:6.2f}ms  "
+        f"mapped p50={mapped['p50_ms']:6.2f}ms p99={mapped['p99_ms']:6.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--postings", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--terms", type=int, default=50, help="Words per chunk")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for postings in args.postings:
+        bench(postings, args.terms, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Session store benchmark
+Append throughput and get_conversation latency for the memory and SQLite backends
+
+Usage:
+    python -m benchmarks.bench_context_store [--sessions 10000] [--turns 10]
+
+The SQLite database is created in a temporary directory and removed afterwards.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Any
+
+from context_manager import ContextManager
+from session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
+
+
+async def run(store: SessionStore, sessions: int, turns: int, reads: int) -> Dict[str, Any]:
+    manager = ContextManager(store)
+    ids = [f"session-{i}" for i in range(sessions)]
+
+    start = time.perf_counter()
+    for turn in range(turns):
+        for session_id in ids:
+            role = "user" if turn % 2 == 0 else "assistant"
+            await manager.add_message(session_id, role, f"message {turn} " * 20)
+    await store.flush()
+    append_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(reads):
+        session_id = random.choice(ids)
+        start = time.perf_counter()
+        await manager.get_conversation(session_id)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    await manager.close()
+    return {
+        "appends_per_s": sessions * turns / append_time,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+async def bench(sessions: int, turns: int, reads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = (
+            ("memory", InMemorySessionStore()),
+            ("sqlite", SQLiteSessionStore(os.path.join(tmp, "sessions.db"))),
+        )
+        for label, store in backends:
+            result = await run(store, sessions, turns, reads)
+            print(
+                f"{label:<7} {result['appends_per_s']:>10,.0f} appends/s  "
+                f"get_conversation p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.turns} messages")
+    asyncio.run(bench(args.sessions, args.turns, args.reads))
+
+
+if __name__ == "__main__":
+    main()
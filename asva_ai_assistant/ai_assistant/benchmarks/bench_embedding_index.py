@@ -0,0 +1,99 @@
+"""
+Embedding index benchmark
+Top-k query latency of exact and IVF search at 10k, 100k and 1M chunks
+
+Usage:
+    python -m benchmarks.bench_embedding_index [--sizes 10000 100000 1000000] [--dim 256]
+
+Vectors are synthetic clustered unit vectors written through EmbeddingIndex.add;
+recall@k of the IVF search is measured against exact search.
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex, HashingVectorizer
+
+BATCH = 50_000
+
+
+def clustered(rng: np.random.Generator, n: int, centers: np.ndarray) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors = vectors + 0.5 * rng.normal(size=vectors.shape)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def latency(index: EmbeddingIndex, queries: np.ndarray, k: int) -> Dict[str, float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000
+    }
+
+
+def bench(size: int, dim: int, queries: int, k: int, nprobe: int) -> None:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(2000, dim))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EmbeddingIndex(tmp, dim=dim, ivf_threshold=size * 10, nprobe=nprobe)
+        start = time.perf_counter()
+        for offset in range(0, size, BATCH):
+            n = min(BATCH, size - offset)
+            index.add(f"doc-{offset}", "bench", [""] * n, clustered(rng, n, centers))
+        build = time.perf_counter() - start
+
+        sample = clustered(rng, queries, centers)
+        exact = latency(index, sample, k)
+        truth = [{row for row, _ in index.search(q, k)} for q in sample]
+
+        start = time.perf_counter()
+        index._train_ivf()
+        train = time.perf_counter() - start
+        ivf = latency(index, sample, k)
+        recall = np.mean([
+            len(truth[i] & {row for row, _ in index.search(q, k)}) / k
+            for i, q in enumerate(sample)
+        ])
+        index.close()
+
+    print(
+        f"{size:>9,} chunks  add {size / build:>9,.0f}/s  "
+        f"exact p50={exact['p50_ms']:7.2f}ms p99={exact['p99_ms']:7.2f}ms  "
+        f"ivf p50={ivf['p50_ms']:6.2f}ms p99={ivf['p99_ms']:6.2f}ms "
+        f"recall@{k}={recall:.2f} (train {train:.1f}s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, default=16)
+    args = parser.parse_args()
+
+    vectorizer = HashingVectorizer(args.dim)
+    text = "Newton's second law relates the net force on a body to its acceleration. " * 4
+    start = time.perf_counter()
+    for _ in range(2000):
+        vectorizer.transform(text)
+    print(f"vectorizer: {2000 / (time.perf_counter() - start):,.0f} chunks/s")
+
+    for size in args.sizes:
+        bench(size, args.dim, args.queries, args.k, args.nprobe)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Hedging benchmark
+Tail latency and upstream load with and without hedged requests and the circuit breaker
+
+Usage:
+    python -m benchmarks.bench_hedging [--requests 400] [--concurrency 8] [--stream]
+
+Each profile configures the fake Groq server: "steady" has a fixed
+latency, "tail" and "heavy_tail" delay 5% and 15% of requests by a second,
+and "outage" fails 90% of requests with a 5xx. Every profile runs once
+plain and once with the hedger and circuit breaker, against a fresh server
+with the same seed. "extra" is the share of upstream requests beyond one
+per call, i.e. what hedging costs; in the outage profile the breaker
+shows up as fewer upstream calls. In "heavy_tail" more requests are slow
+than the quantile leaves out, so the hedge delay itself is slow and
+hedging barely helps: the budget keeps it from doubling the load instead.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, Any
+
+import httpx
+
+from exceptions import GroqAPIError
+from groq_client import GroqClient
+from hedging import Hedger, CircuitBreaker
+from rate_limiter import RateLimiter
+from benchmarks.fake_groq import FakeGroqServer
+
+PROFILES = {
+    "steady": {},
+    "tail": {"tail_rate": 0.05, "tail_latency": 1.0},
+    "heavy_tail": {"tail_rate": 0.15, "tail_latency": 1.0},
+    "outage": {"error_rate": 0.9},
+}
+
+
+async def run(profile: str, hedged: bool, requests: int, concurrency: int, stream: bool) -> Dict[str, Any]:
+    server = FakeGroqServer(
+        requests_per_window=10 ** 9,
+        tokens_per_window=10 ** 12,
+        latency=0.05,
+        completion_tokens=(20, 60),
+        seed=1,
+        **PROFILES[profile]
+    )
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    client = GroqClient(
+        "key",
+        base_url="http://fake",
+        coalesce=False,
+        max_retries=1,
+        rate_limiter=RateLimiter(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9, max_concurrency=64),
+        http_client=http_client,
+        hedger=Hedger(budget=0.05) if hedged else None,
+        circuit_breaker=CircuitBreaker(cooldown=1.0) if hedged else None
+    )
+    if not hedged:
+        client.hedger = None
+        client.circuit_breaker = None
+
+    latencies = []
+    failures = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i: int):
+        messages = [{"role": "user", "content": f"question {i}"}]
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                if stream:
+                    first = None
+                    async for _ in client.generate_streaming_text(messages, model="m", max_tokens=60):
+                        if first is None:
+                            first = time.monotonic() - start
+                    latencies.append(first)
+                else:
+                    await client.generate_completion(messages, model="m", max_tokens=60)
+                    latencies.append(time.monotonic() - start)
+            except GroqAPIError:
+                failures.append(time.monotonic() - start)
+
+    start = time.monotonic()
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    wall = time.monotonic() - start
+    await http_client.aclose()
+
+    latencies.sort()
+
+    def pick(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+    upstream = server.received
+    stats = client.get_upstream_stats()
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "upstream": upstream,
+        "extra": upstream / requests - 1,
+        "hedge_wins": stats["hedging"]["hedge_wins"] if stats["hedging"] else 0,
+        "failed": len(failures),
+        "fail_ms": sum(failures) / len(failures) * 1000 if failures else 0.0,
+        "wall": wall
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream", action="store_true", help="Time the first token of streamed requests")
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    for profile in args.profile or PROFILES:
+        for hedged in (False, True):
+            r = asyncio.run(run(profile, hedged, args.requests, args.concurrency, args.stream))
+            print(
+                f"{profile:<11} {'hedged' if hedged else 'plain':<7} "
+                f"p50={r['p50']:6.0f}ms p95={r['p95']:6.0f}ms p99={r['p99']:6.0f}ms "
+                f"upstream={r['upstream']:4d} extra={r['extra']:+6.1%} wins={r['hedge_wins']:3d} "
+                f"failed={r['failed']:3d} ({r['fail_ms']:4.0f}ms) wall={r['wall']:5.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
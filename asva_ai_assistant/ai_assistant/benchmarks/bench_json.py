@@ -0,0 +1,115 @@
+"""
+JSON benchmark
+Serialization cost of a 40-turn conversation with each JSON backend versus the httpx and FastAPI defaults
+
+Usage:
+    python -m benchmarks.bench_json [--turns 40] [--number 2000]
+
+"request" encodes the chat completion payload for the conversation the
+way GroqClient sends it; "default" is httpx's `json=`, the others pass
+json_codec bytes as `content=`. "completion" decodes the upstream reply.
+"history" renders the conversation with per-message timestamps and
+metadata as an API response: "default" is FastAPI's jsonable_encoder
+followed by JSONResponse, the others are CodecJSONResponse given a
+trusted dict. "chat" renders a ChatResponse: "default" validates it
+against the response model first, as FastAPI does for a returned model,
+while "trusted" builds it with model_construct and uses pydantic's
+serializer, which is what the chat route now does.
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import json_codec
+from api.models.responses import ChatResponse, ResponseMetadata
+
+URL = "https://api.groq.com/openai/v1/chat/completions"
+SENTENCE = "A résumé of Newton's second law: F = ma, so doubling the net force doubles the acceleration. "
+
+
+def conversation(turns: int) -> Dict[str, Any]:
+    start = datetime(2024, 1, 15, 10, 30)
+    messages = []
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({
+            "role": role,
+            "content": SENTENCE * (2 if role == "user" else 8),
+            "timestamp": start + timedelta(seconds=30 * i),
+            "metadata": None if role == "user" else {"tokens_used": 412, "model": "llama-3.3-70b-versatile"}
+        })
+    return {"session_id": "550e8400-e29b-41d4-a716-446655440000", "messages": messages}
+
+
+def cases(turns: int) -> Dict[str, Dict[str, Callable[[], Any]]]:
+    history = conversation(turns)
+    payload = {
+        "model": "llama-3.3-70b-versatile",
+        "messages": [{"role": m["role"], "content": m["content"]} for m in history["messages"]],
+        "temperature": 0.7,
+        "max_tokens": 1024,
+        "top_p": 1.0,
+        "stream": False
+    }
+    completion = json.dumps({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 1700000000,
+        "model": payload["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": SENTENCE * 8},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 3000, "completion_tokens": 200, "total_tokens": 3200}
+    }).encode()
+    chat = {
+        "session_id": history["session_id"],
+        "response": SENTENCE * 8,
+        "mode": "explainer",
+        "metadata": {"tokens_used": 3200, "model": payload["model"], "processing_time_ms": 450},
+        "suggestions": ["Ask for a simpler explanation", "Request more advanced details"],
+        "sources": []
+    }
+    trusted_chat = ChatResponse.model_construct(
+        **{**chat, "metadata": ResponseMetadata.model_construct(**chat["metadata"])}
+    )
+    response = httpx.Response(200, content=completion)
+
+    result = {
+        "request": {"default": lambda: httpx.Request("POST", URL, json=payload)},
+        "completion": {"default": lambda: response.json()},
+        "history": {"default": lambda: JSONResponse(jsonable_encoder(history))},
+        "chat": {
+            "default": lambda: JSONResponse(jsonable_encoder(ChatResponse.model_validate(chat))),
+            "trusted": lambda: trusted_chat.__pydantic_serializer__.to_json(trusted_chat)
+        }
+    }
+    for name, (dumps, loads) in json_codec.BACKENDS.items():
+        result["request"][name] = lambda dumps=dumps: httpx.Request("POST", URL, content=dumps(payload))
+        result["completion"][name] = lambda loads=loads: loads(response.content)
+        result["history"][name] = lambda dumps=dumps: dumps(history)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"backend in use: {json_codec.backend}")
+    for case, variants in cases(args.turns).items():
+        baseline = None
+        for name, fn in variants.items():
+            seconds = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+            baseline = baseline or seconds
+            print(f"{case:<11} {name:<8} {seconds * 1e6:8.1f} us  x{baseline / seconds:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
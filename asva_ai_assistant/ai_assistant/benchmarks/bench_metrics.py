@@ -0,0 +1,97 @@
+"""
+Metrics benchmark
+Per-request cost of stage timing and the cost of rendering /metrics
+
+Usage:
+    python -m benchmarks.bench_metrics [--rounds 100000] [--requests 5000]
+
+"observe" is one histogram observation; "request" times the seven stages
+of a streamed chat request and observes them with their labels. "query"
+compares ModeHandler.process_query against an instant stub client with and
+without an active StageTimer, so the overhead is shown next to the
+per-request work it is added to.
+"""
+
+import argparse
+import asyncio
+import time
+
+from metrics import MetricsRegistry, StageTimer, activate, record_stage
+from mode_handler import ModeHandler, LearningMode
+
+STAGES = ("context_load", "retrieval", "prompt_build", "rate_limit_queue", "ttft", "generation", "persistence")
+MODES = ("default", "explainer", "socratic", "inventor")
+MODELS = ("llama-3.3-70b-versatile", "llama3-70b-8192", "llama3-8b-8192", "gemma2-9b-it")
+
+
+class StubClient:
+    tokenizer = None
+
+    def get_available_models(self):
+        return [{"id": m, "context_window": 8192} for m in MODELS]
+
+    async def generate_completion(self, messages, **kwargs):
+        record_stage("upstream", 0.0)
+        return {
+            "choices": [{"message": {"content": "answer"}}],
+            "usage": {"total_tokens": 10},
+            "model": kwargs.get("model", MODELS[0])
+        }
+
+
+def per_op(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(i)
+    return (time.perf_counter() - start) / rounds * 1e9
+
+
+async def queries(requests: int, timed: bool, histogram) -> float:
+    handler = ModeHandler()
+    client = StubClient()
+    history = [{"role": "user", "content": "earlier question"}, {"role": "assistant", "content": "answer"}]
+    start = time.perf_counter()
+    for i in range(requests):
+        timer = StageTimer(MODES[i % 4], histogram=histogram) if timed else None
+        with activate(timer):
+            await handler.process_query(
+                f"question {i}", LearningMode.DEFAULT, history, groq_client=client, model=MODELS[i % 4]
+            )
+        if timer is not None:
+            timer.finish()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "", ("stage", "mode", "model", "status"))
+
+    observe = per_op(lambda i: histogram.observe(0.042, "upstream", MODES[i % 4], MODELS[i % 4], "ok"), args.rounds)
+    print(f"observe:  {observe:8.0f} ns")
+
+    def request(i):
+        timer = StageTimer(MODES[i % 4], MODELS[i % 4], histogram=histogram)
+        for stage in STAGES:
+            with timer.stage(stage):
+                pass
+        timer.finish("ok")
+
+    print(f"request:  {per_op(request, args.rounds // 10) / 1000:8.2f} us for {len(STAGES)} stages")
+
+    start = time.perf_counter()
+    text = registry.render()
+    series = sum(1 for line in text.splitlines() if line.startswith("stage_seconds_count"))
+    print(f"render:   {(time.perf_counter() - start) * 1000:8.2f} ms for {series} series, {len(text) / 1024:.0f} KiB")
+
+    plain = asyncio.run(queries(args.requests, False, histogram))
+    timed = asyncio.run(queries(args.requests, True, histogram))
+    print(f"query:    {plain:8.1f} us plain, {timed:.1f} us timed ({(timed - plain) / plain:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Model router benchmark
+Replays a chat trace with a fixed model and with adaptive routing, comparing p50/p95 latency and cost
+
+Usage:
+    python -m benchmarks.bench_model_router [--requests 1000] [--trace trace.jsonl] [--save-trace trace.jsonl]
+
+The trace is generated from a seed (or loaded from a JSONL file written by
+--save-trace), so runs are repeatable. Upstream models are simulated from
+per-model time to first token, decode speed and price profiles; during the
+--degrade-start..--degrade-end part of the trace the default model slows
+down and fails a share of requests. Latencies are slept at --time-scale and
+reported in simulated seconds.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Dict, Any, List, Optional
+
+from exceptions import GroqAPIError
+from mode_handler import ModeHandler, LearningMode, ComplexityLevel
+from model_router import ModelRouter
+from tokenizer import TokenCounter
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# id: (context window, time to first token s, output tokens/s, $ per 1M input, $ per 1M output)
+PROFILES = {
+    "llama-3.3-70b-versatile": (32768, 0.35, 275, 0.59, 0.79),
+    "llama3-70b-8192": (8192, 0.30, 330, 0.59, 0.79),
+    "llama3-8b-8192": (8192, 0.15, 1250, 0.05, 0.08),
+    "gemma2-9b-it": (8192, 0.20, 800, 0.20, 0.20),
+}
+SMALL = ["llama3-8b-8192", "gemma2-9b-it"]
+LARGE = ["llama-3.3-70b-versatile", "llama3-70b-8192"]
+
+MODES = [
+    (LearningMode.DEFAULT, None, 0.35),
+    (LearningMode.EXPLAINER, ComplexityLevel.BEGINNER, 0.20),
+    (LearningMode.EXPLAINER, ComplexityLevel.ADVANCE, 0.15),
+    (LearningMode.SOCRATIC, None, 0.15),
+    (LearningMode.INVENTOR, None, 0.15),
+]
+TURN = "word " * 200
+
+
+def make_trace(requests: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    trace = []
+    for _ in range(requests):
+        mode, complexity, _ = rng.choices(MODES, weights=[w for *_, w in MODES])[0]
+        trace.append({
+            "mode": mode.value,
+            "complexity_level": complexity.value if complexity else None,
+            # Mostly short chats, a tail of long ones that only fit the 32k window
+            "turns": min(int(rng.lognormvariate(1.5, 1.0)), 120),
+            "completion_tokens": int(rng.uniform(80, 600)),
+            "jitter": rng.lognormvariate(0, 0.25),
+            "fails": rng.random()
+        })
+    return trace
+
+
+class SimulatedClient:
+    """Stand-in for GroqClient answering from the model profiles"""
+
+    def __init__(self, time_scale: float, degraded: range):
+        self.tokenizer = TokenCounter()
+        self.time_scale = time_scale
+        self.degraded = degraded
+
+    def get_available_models(self) -> List[Dict[str, Any]]:
+        return [{"id": m, "context_window": p[0]} for m, p in PROFILES.items()]
+
+    async def generate_completion(self, messages, model: str = DEFAULT_MODEL, max_tokens: int = 2048,
+                                  request: Optional[Dict[str, Any]] = None,
+                                  attempt_timeout: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        response = self._respond(messages, model, request)
+        if attempt_timeout:
+            response = asyncio.wait_for(response, attempt_timeout)
+        return await response
+
+    async def _respond(self, messages, model: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        _, ttft, speed, _, _ = PROFILES[model]
+        item = request["item"]
+        latency = (ttft + item["completion_tokens"] / speed) * item["jitter"]
+
+        if model == DEFAULT_MODEL and request["index"] in self.degraded:
+            latency *= 4
+            if item["fails"] < 0.2:
+                await asyncio.sleep(latency * self.time_scale / 2)
+                raise GroqAPIError("API request failed: 503 Service Unavailable")
+
+        await asyncio.sleep(latency * self.time_scale)
+        prompt_tokens = self.tokenizer.count_messages(messages)
+        return {
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": item["completion_tokens"],
+                "total_tokens": prompt_tokens + item["completion_tokens"]
+            },
+            "model": model
+        }
+
+
+class _Bound:
+    """Passes the trace item to the simulated client with each call"""
+
+    def __init__(self, client: SimulatedClient, request: Dict[str, Any]):
+        self._client = client
+        self._request = request
+        self.tokenizer = client.tokenizer
+
+    def get_available_models(self):
+        return self._client.get_available_models()
+
+    async def generate_completion(self, messages, **kwargs):
+        return await self._client.generate_completion(messages, request=self._request, **kwargs)
+
+
+async def replay(trace: List[Dict[str, Any]], routed: bool, args) -> Dict[str, Any]:
+    degraded = range(int(len(trace) * args.degrade_start), int(len(trace) * args.degrade_end))
+    client = SimulatedClient(args.time_scale, degraded)
+    router = None
+    if routed:
+        router = ModelRouter(
+            client.get_available_models(), SMALL, LARGE,
+            latency_slo=args.slo * args.time_scale,
+            probe_after=args.probe_after * args.time_scale,
+            attempt_timeout=30 * args.time_scale
+        )
+    handler = ModeHandler(tokenizer=client.tokenizer, router=router)
+
+    latencies = []
+    cost = 0.0
+    failed = 0
+    models: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int, item: Dict[str, Any]) -> None:
+        nonlocal cost, failed
+        request = {"index": index, "item": item}
+        history = [
+            {"role": ("user", "assistant")[t % 2], "content": TURN} for t in range(item["turns"])
+        ]
+
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                result = await handler.process_query(
+                    "next question", LearningMode(item["mode"]), history,
+                    complexity_level=ComplexityLevel(item["complexity_level"]) if item["complexity_level"] else None,
+                    groq_client=_Bound(client, request),
+                    max_tokens=1024
+                )
+            except GroqAPIError:
+                failed += 1
+                return
+            latencies.append((time.monotonic() - start) / args.time_scale)
+
+        model = result["metadata"]["model"]
+        models[model] = models.get(model, 0) + 1
+        usage = result["metadata"]["tokens_used"] - item["completion_tokens"]
+        _, _, _, price_in, price_out = PROFILES[model]
+        cost += (usage * price_in + item["completion_tokens"] * price_out) / 1e6
+
+    await asyncio.gather(*(one(i, item) for i, item in enumerate(trace)))
+    latencies.sort()
+    return {
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "cost": cost,
+        "failed": failed,
+        "models": models
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", help="Replay a trace written by --save-trace")
+    parser.add_argument("--save-trace", help="Write the generated trace as JSONL")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--time-scale", type=float, default=0.2, help="Real seconds per simulated second")
+    parser.add_argument("--slo", type=float, default=4.0, help="Latency SLO in simulated seconds")
+    parser.add_argument("--probe-after", type=float, default=30.0)
+    parser.add_argument("--degrade-start", type=float, default=0.4)
+    parser.add_argument("--degrade-end", type=float, default=0.6)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    if args.trace:
+        with open(args.trace) as f:
+            trace = [json.loads(line) for line in f]
+    else:
+        trace = make_trace(args.requests, args.seed)
+    if args.save_trace:
+        with open(args.save_trace, "w") as f:
+            f.writelines(json.dumps(item) + "\n" for item in trace)
+
+    results = {}
+    for name, routed in (("fixed", False), ("routed", True)):
+        r = results[name] = asyncio.run(replay(trace, routed, args))
+        shares = ", ".join(f"{m} {n / len(trace):.0%}" for m, n in sorted(r["models"].items()))
+        print(
+            f"{name:>6}: p50={r['p50']:5.2f}s p95={r['p95']:5.2f}s "
+            f"cost=${r['cost']:.4f} failed={r['failed']}  [{shares}]"
+        )
+
+    fixed, routed = results["fixed"], results["routed"]
+    print(
+        f" shift: p50 {routed['p50'] / fixed['p50'] - 1:+.0%}, p95 {routed['p95'] / fixed['p95'] - 1:+.0%}, "
+        f"cost {routed['cost'] / fixed['cost'] - 1:+.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Rate limiter benchmark
+Simulated burst against the fake Groq server, with and without the proactive limiter
+
+Usage:
+    python -m benchmarks.bench_rate_limiter [--callers 120] [--window 5]
+
+The budget window is scaled down from one minute so a run takes seconds.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+
+from groq_client import GroqClient
+from exceptions import RateLimitError, GroqAPIError
+from rate_limiter import RateLimiter
+from benchmarks.fake_groq import FakeGroqServer
+
+
+async def run(callers: int, window: float, limited: bool, deadline: float) -> Dict[str, Any]:
+    server = FakeGroqServer(requests_per_window=30, tokens_per_window=6000, window=window)
+    limiter: Optional[RateLimiter] = None
+    if limited:
+        limiter = RateLimiter(
+            requests_per_minute=30,
+            tokens_per_minute=6000,
+            max_concurrency=8,
+            max_wait=deadline,
+            period=window
+        )
+
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    client = GroqClient(
+        "key",
+        base_url="http://fake",
+        rate_limiter=limiter,
+        coalesce=False,
+        max_retries=3,
+        http_client=http_client
+    )
+    # The constructor falls back to the settings limiter when none is given
+    client.rate_limiter = limiter
+
+    latencies = []
+    outcome = {"ok": 0, "fail_fast": 0, "errors": 0}
+
+    async def caller(i: int):
+        start = time.monotonic()
+        try:
+            await client.generate_completion(
+                [{"role": "user", "content": f"question {i} " * 20}],
+                max_tokens=50,
+                deadline=start + deadline
+            )
+            outcome["ok"] += 1
+            latencies.append(time.monotonic() - start)
+        except RateLimitError:
+            outcome["fail_fast"] += 1
+        except GroqAPIError:
+            outcome["errors"] += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*[caller(i) for i in range(callers)])
+    elapsed = time.monotonic() - started
+    await http_client.aclose()
+
+    latencies.sort()
+    return {
+        **outcome,
+        "upstream_429": server.rejected,
+        "wall_s": elapsed,
+        "p50_s": statistics.median(latencies) if latencies else 0.0,
+        "p95_s": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--callers", type=int, default=120)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--deadline", type=float, default=8.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    for limited in (False, True):
+        result = asyncio.run(run(args.callers, args.window, limited, args.deadline))
+        label = "limiter" if limited else "reactive"
+        print(
+            f"{label:<9} ok={result['ok']:<4} fail_fast={result['fail_fast']:<4} "
+            f"errors={result['errors']:<4} upstream_429={result['upstream_429']:<5} "
+            f"p50={result['p50_s']:.2f}s p95={result['p95_s']:.2f}s wall={result['wall_s']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
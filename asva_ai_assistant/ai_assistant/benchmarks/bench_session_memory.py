@@ -0,0 +1,102 @@
+"""
+Session memory benchmark
+Resident memory per 1k sessions for plain message dicts versus the compact Message
+
+Usage:
+    python -m benchmarks.bench_session_memory [--sessions 1000] [--turns 20]
+
+Memory is measured with tracemalloc. The last run shows that a memory
+budget keeps the store bounded no matter how many sessions are created.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Callable
+
+from context_manager import ContextManager
+from session import Message
+from session_store import InMemorySessionStore
+
+MODES = ("default", "socratic", "explainer", "inventor")
+
+
+def metadata(turn: int) -> dict:
+    # Fresh strings per message, as they arrive from request parsing and JSON
+    return {
+        "tokens_used": 180 + turn,
+        "model": "".join(["mixtral-8x7b", "-32768"]),
+        "mode": "".join([MODES[turn % 4], ""]),
+        "complexity_level": None,
+        "project_type": None,
+        "trimmed_turns": 0,
+        "trimmed_tokens": 0,
+        "cached": False
+    }
+
+
+def dict_message(role: str, content: str, turn: int) -> dict:
+    return {
+        "role": "".join([role, ""]),
+        "content": content,
+        "timestamp": time.time(),
+        "metadata": metadata(turn)
+    }
+
+
+def compact_message(role: str, content: str, turn: int) -> Message:
+    return Message("".join([role, ""]), content, metadata=metadata(turn))
+
+
+def measure(factory: Callable, sessions: int, turns: int) -> int:
+    """Bytes allocated for the messages, excluding message text"""
+    content = "The answer builds on the previous step. " * 5
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = {
+        f"session-{i}": [
+            factory("user" if turn % 2 == 0 else "assistant", content, turn)
+            for turn in range(turns)
+        ]
+        for i in range(sessions)
+    }
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del store
+    return used
+
+
+async def bounded(sessions: int, turns: int, max_bytes: int) -> dict:
+    store = InMemorySessionStore(max_bytes=max_bytes)
+    manager = ContextManager(store)
+    for i in range(sessions):
+        for turn in range(turns):
+            await manager.add_message(f"session-{i}", "user", f"message {i} {turn} " * 10)
+    return store.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    per_k = 1000 / args.sessions
+    legacy = measure(dict_message, args.sessions, args.turns) * per_k
+    compact = measure(compact_message, args.sessions, args.turns) * per_k
+
+    print(f"{args.turns} messages per session")
+    print(f"dict messages:    {legacy / 2**20:8.2f} MiB per 1k sessions")
+    print(f"compact messages: {compact / 2**20:8.2f} MiB per 1k sessions "
+          f"({100 * (1 - compact / legacy):.0f}% less)")
+
+    stats = asyncio.run(bounded(args.sessions * 10, args.turns, 4 * 2**20))
+    print(
+        f"budget 4 MiB, {args.sessions * 10} sessions: {stats['sessions']} resident, "
+        f"{stats['bytes'] / 2**20:.2f} MiB, {stats['evictions']} evicted"
+    )
+
+
+if __name__ == "__main__":
+    main()
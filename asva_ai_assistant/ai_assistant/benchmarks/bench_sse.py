@@ -0,0 +1,117 @@
+"""
+SSE relay benchmark
+Tokens/sec per core for the Pydantic relay path versus the fast relay path
+
+Usage:
+    python -m benchmarks.bench_sse [--tokens 50000]
+
+Both paths consume the same upstream SSE bytes, delivered in 4 KiB reads,
+and produce the frames sent to the browser plus the full transcript.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List
+
+from api.models.responses import StreamChunk
+from sse import iter_sse_data, extract_delta_content, extract_usage, token_frame, coalesce_deltas
+
+WORDS = ["The", " electron", " spin", " is", " entangled", ",", " so", " measuring", " one", " fixes"]
+
+
+def upstream_bytes(tokens: int) -> bytes:
+    lines = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "llama-3.3-70b-versatile",
+            "choices": [{"index": 0, "delta": {"content": WORDS[i % len(WORDS)]},
+                         "logprobs": None, "finish_reason": None}]
+        }
+        lines.append(f"data: {json.dumps(chunk)}\n\n")
+    lines.append('data: {"choices":[],"x_groq":{"usage":{"total_tokens": %d}}}\n\n' % tokens)
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode()
+
+
+async def reads(raw: bytes, size: int = 4096) -> AsyncIterator[bytes]:
+    for start in range(0, len(raw), size):
+        yield raw[start:start + size]
+
+
+async def lines(raw: bytes) -> AsyncIterator[str]:
+    """Roughly what httpx's aiter_lines does on top of the same reads"""
+    pending = ""
+    async for block in reads(raw):
+        pending += block.decode()
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line
+
+
+async def pydantic_path(raw: bytes) -> List[str]:
+    frames = []
+    full_response = ""
+    async for line in lines(raw):
+        if line.startswith("data: "):
+            data = line[6:]
+            if data.strip() == "[DONE]":
+                break
+            import json as json_module
+            chunk = json_module.loads(data)
+            if chunk.get("choices"):
+                content = chunk["choices"][0].get("delta", {}).get("content", "")
+                if content:
+                    full_response += content
+                    frames.append(f"data: {StreamChunk(type='token', content=content).model_dump_json()}\n\n")
+    return frames
+
+
+async def fast_path(raw: bytes, coalesce: bool) -> List[str]:
+    frames = []
+    parts = []
+
+    async def deltas():
+        async for data in iter_sse_data(reads(raw)):
+            text = data.decode("utf-8")
+            content = extract_delta_content(text)
+            if content:
+                yield content
+            else:
+                extract_usage(text)
+
+    source = coalesce_deltas(deltas()) if coalesce else deltas()
+    async for content in source:
+        parts.append(content)
+        frames.append(token_frame(content))
+    "".join(parts)
+    return frames
+
+
+def measure(name: str, coro_factory, tokens: int, rounds: int = 3) -> None:
+    best = float("inf")
+    frames = []
+    for _ in range(rounds):
+        start = time.process_time()
+        frames = asyncio.run(coro_factory())
+        best = min(best, time.process_time() - start)
+    print(f"{name:<22} {tokens / best:>12,.0f} tokens/s/core  frames={len(frames)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=50000)
+    args = parser.parse_args()
+
+    raw = upstream_bytes(args.tokens)
+    measure("pydantic relay", lambda: pydantic_path(raw), args.tokens)
+    measure("fast relay", lambda: fast_path(raw, coalesce=False), args.tokens)
+    measure("fast relay + coalesce", lambda: fast_path(raw, coalesce=True), args.tokens)
+
+
+if __name__ == "__main__":
+    main()
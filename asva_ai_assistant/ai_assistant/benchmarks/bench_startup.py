@@ -0,0 +1,148 @@
+"""
+Startup benchmark
+Import time of the assistant modules and time until the API answers its first health check
+
+Usage:
+    python -m benchmarks.bench_startup [--modules groq_client mode_handler ...] [--runs 5]
+                                       [--app api.main:app] [--skip-server]
+
+Import times come from `python -X importtime` in a fresh interpreter per
+run (median of --runs); next to each module the heaviest imports it pulls
+in are listed. The server check starts uvicorn on a free port and polls
+/api/v1/health until it returns 200, timing from process start. GROQ_*
+variables are taken from the environment, so run it with the same
+environment as the real service.
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["config.settings", "groq_client", "context_manager", "mode_handler", "api.main"]
+
+# "import time: self [us] | cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, depth, cumulative microseconds)"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((match.group(4), len(match.group(3)) // 2, int(match.group(2))))
+    return rows
+
+
+def import_once(module: str) -> Tuple[Optional[List[Tuple[str, int, int]]], float, str]:
+    """Import a module in a fresh interpreter, returning its import rows, wall time and error"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        return None, wall, result.stderr.strip().splitlines()[-1]
+    return parse_importtime(result.stderr), wall, ""
+
+
+def measure_imports(module: str, runs: int, top: int) -> Dict:
+    totals, walls, heaviest = [], [], {}
+    for _ in range(runs):
+        rows, wall, error = import_once(module)
+        if rows is None:
+            return {"error": error}
+        walls.append(wall)
+        totals.append(next((us for name, depth, us in rows if name == module and depth == 0), 0))
+        # Direct and second-level imports of the module; deeper ones are inside these
+        for name, depth, us in rows:
+            if name != module and depth <= 1:
+                heaviest.setdefault(name, []).append(us)
+    ranked = sorted(((statistics.median(v), k) for k, v in heaviest.items()), reverse=True)[:top]
+    return {
+        "import_ms": statistics.median(totals) / 1000,
+        "process_ms": statistics.median(walls) * 1000,
+        "heaviest": [(name, us / 1000) for us, name in ranked]
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(app: str, timeout: float) -> Dict:
+    """Start the API and time its first 200 from /api/v1/health"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    first_response = None
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - start < timeout:
+                if process.poll() is not None:
+                    return {"error": (process.stderr.read().strip().splitlines() or ["exited"])[-1]}
+                try:
+                    response = client.get(f"http://127.0.0.1:{port}/api/v1/health")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if first_response is None:
+                    first_response = time.perf_counter() - start
+                if response.status_code == 200:
+                    return {
+                        "first_response_ms": first_response * 1000,
+                        "healthy_ms": (time.perf_counter() - start) * 1000
+                    }
+                time.sleep(0.01)
+        return {"error": f"not healthy after {timeout}s"}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports listed per module")
+    parser.add_argument("--app", default="api.main:app")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--skip-server", action="store_true")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        r = measure_imports(module, args.runs, args.top)
+        if "error" in r:
+            print(f"{module:<16} import failed: {r['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in r["heaviest"])
+        print(f"{module:<16} import={r['import_ms']:7.1f} ms process={r['process_ms']:7.1f} ms  [{heaviest}]")
+
+    if not args.skip_server:
+        r = time_to_healthy(args.app, args.timeout)
+        if "error" in r:
+            print(f"{args.app:<16} server failed: {r['error']}")
+        else:
+            print(
+                f"{args.app:<16} first response={r['first_response_ms']:7.1f} ms "
+                f"healthy={r['healthy_ms']:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+System prompt benchmark
+Per-request cost of assembling the system prompt, temperature and suggestions
+
+Usage:
+    python -m benchmarks.bench_system_prompt [--rounds 200000]
+
+"rebuilt" replays the former per-request assembly (string concatenation
+and fresh guidance dicts); "table" is the precomputed ModeHandler lookup.
+"""
+
+import argparse
+import time
+
+from mode_handler import (
+    ModeHandler,
+    LearningMode,
+    ComplexityLevel,
+    ProjectType,
+    MODE_PROMPTS,
+    COMPLEXITY_GUIDANCE,
+    PROJECT_TYPE_GUIDANCE,
+    MODE_TEMPERATURES,
+    MODE_SUGGESTIONS,
+)
+
+REQUESTS = [
+    (LearningMode.EXPLAINER, ComplexityLevel.BEGINNER, None),
+    (LearningMode.INVENTOR, None, ProjectType.AI_ML),
+    (LearningMode.SOCRATIC, None, None),
+    (LearningMode.DEFAULT, None, None),
+]
+
+
+def rebuilt(mode, complexity_level, project_type):
+    """Former per-request assembly"""
+    base_prompt = dict(MODE_PROMPTS).get(mode, MODE_PROMPTS[LearningMode.DEFAULT])
+    if mode == LearningMode.EXPLAINER and complexity_level:
+        base_prompt += f"\n\nCurrent complexity level: {complexity_level.value}"
+        base_prompt += dict(COMPLEXITY_GUIDANCE).get(complexity_level, "")
+    if mode == LearningMode.INVENTOR and project_type:
+        base_prompt += f"\n\nProject type focus: {project_type.value}"
+        base_prompt += dict(PROJECT_TYPE_GUIDANCE).get(project_type, "")
+    temperature = dict(MODE_TEMPERATURES).get(mode, 0.7)
+    suggestions = list(dict(MODE_SUGGESTIONS)[mode])[:3]
+    return base_prompt, temperature, suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200000)
+    args = parser.parse_args()
+
+    handler = ModeHandler()
+
+    def table(mode, complexity_level, project_type):
+        return (
+            handler.get_system_prompt(mode, complexity_level, project_type),
+            handler._get_temperature_for_mode(mode),
+            handler._generate_suggestions(mode, "", "")
+        )
+
+    for label, assemble in (("rebuilt", rebuilt), ("table", table)):
+        start = time.perf_counter()
+        for i in range(args.rounds):
+            assemble(*REQUESTS[i & 3])
+        elapsed = time.perf_counter() - start
+        print(f"{label:<8} {elapsed / args.rounds * 1e9:8.0f} ns/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Token counting benchmark
+Compares the len(text) // 4 heuristic with TokenCounter on throughput and accuracy
+
+Usage:
+    python -m benchmarks.bench_tokenizer [--tokenizer path/to/tokenizer.json]
+
+Accuracy is measured against the tokenizer file when one is given; otherwise
+only throughput and the disagreement between both estimates are reported.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from tokenizer import TokenCounter, count_regex, load_engine
+
+SAMPLES: Dict[str, str] = {
+    "english": (
+        "Quantum entanglement is a phenomenon where two particles remain connected "
+        "so that the state of one instantly influences the state of the other, "
+        "no matter how far apart they are. Einstein called it spooky action at a distance. "
+    ),
+    "code": (
+        "async def fetch(session_id: str) -> Dict[str, Any]:\n"
+        "    rows = await db.execute(\"SELECT * FROM messages WHERE id = ?\", (session_id,))\n"
+        "    return {r['role']: r['content'] for r in rows if r.get('content')}\n"
+    ),
+    "yoruba": (
+        "Ẹ káàárọ̀, ẹ̀kọ́ òní jẹ́ nípa ìmọ̀ sáyẹ́ǹsì kọ̀ǹpútà àti bí a ṣe ń kọ́ ètò. "
+    ),
+    "french": (
+        "L'intrication quantique est un phénomène dans lequel deux particules "
+        "restent liées, quelle que soit la distance qui les sépare. "
+    ),
+    "chinese": "量子纠缠是一种物理现象，两个粒子无论相距多远都会相互影响。",
+}
+
+
+def heuristic(text: str) -> int:
+    return len(text) // 4
+
+
+def throughput(counter: Callable[[str], int], texts: List[str], rounds: int) -> float:
+    """Texts counted per second"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            counter(text)
+    return rounds * len(texts) / (time.perf_counter() - start)
+
+
+def history_bench(tokenizer: TokenCounter, turns: int = 40, rounds: int = 200) -> Dict[str, float]:
+    """Per-request cost of re-counting a growing conversation"""
+    text = SAMPLES["english"] * 4
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i} {text}"}
+        for i in range(turns)
+    ]
+
+    tokenizer.clear_cache()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        tokenizer.clear_cache()
+        tokenizer.count_messages(history)
+    cold = (time.perf_counter() - start) / rounds
+
+    tokenizer.count_messages(history)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        tokenizer.count_messages(history)
+    warm = (time.perf_counter() - start) / rounds
+
+    return {"cold_ms": cold * 1000, "warm_ms": warm * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokenizer", help="Path to a HuggingFace tokenizer.json")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    reference = load_engine(args.tokenizer) if args.tokenizer else None
+    if reference is count_regex:
+        reference = None
+
+    texts = list(SAMPLES.values())
+    print(f"{'sample':<10} {'heuristic':>10} {'regex':>8} {'reference':>10}")
+    for name, text in SAMPLES.items():
+        ref = reference(text) if reference else "-"
+        print(f"{name:<10} {heuristic(text):>10} {count_regex(text):>8} {ref:>10}")
+
+    if reference:
+        for label, counter in (("heuristic", heuristic), ("regex", count_regex)):
+            errors = [abs(counter(t) - reference(t)) / max(reference(t), 1) for t in texts]
+            print(f"{label} mean abs error: {100 * sum(errors) / len(errors):.1f}%")
+
+    print()
+    print(f"heuristic: {throughput(heuristic, texts, args.rounds):,.0f} texts/s")
+    print(f"regex:     {throughput(count_regex, texts, args.rounds):,.0f} texts/s")
+    if reference:
+        print(f"reference: {throughput(reference, texts, args.rounds):,.0f} texts/s")
+
+    result = history_bench(TokenCounter())
+    print()
+    print(
+        f"40-turn history: cold {result['cold_ms']:.3f} ms, "
+        f"cached {result['warm_ms']:.3f} ms per request"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Transport benchmark
+p50/p99 latency of HTTP/1.1 versus HTTP/2 against a local stub server
+
+Usage:
+    python -m benchmarks.bench_transport [--requests 2000] [--concurrency 100]
+
+Needs the optional `hypercorn` and `h2` packages. The stub is the fake Groq
+server with rate limiting disabled, served in a subprocess over cleartext
+HTTP/2 (prior knowledge), with both clients limited to the same pool size.
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from transport import create_http_client, http2_available
+
+PAYLOAD = {
+    "model": "llama-3.3-70b-versatile",
+    "messages": [{"role": "user", "content": "Explain recursion briefly."}],
+    "max_tokens": 50
+}
+
+
+async def serve(port: int) -> None:
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+
+    from benchmarks.fake_groq import FakeGroqServer
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+    app = FakeGroqServer(
+        requests_per_window=10 ** 9,
+        tokens_per_window=10 ** 12,
+        latency=0.02
+    )
+    await hypercorn_serve(app, config)
+
+
+async def wait_until_up(url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.post(url, json=PAYLOAD)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("Stub server did not start")
+
+
+async def measure(
+    url: str,
+    http2: bool,
+    requests: int,
+    concurrency: int,
+    max_connections: int
+) -> Dict[str, float]:
+    if http2:
+        # Cleartext HTTP/2 needs prior knowledge; TLS endpoints negotiate it via ALPN
+        client = httpx.AsyncClient(
+            http1=False,
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=httpx.Timeout(30.0, pool=60.0)
+        )
+    else:
+        client = create_http_client(
+            http2=False,
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            pool_timeout=60.0
+        )
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(url, json=PAYLOAD)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "rps": requests / elapsed
+    }
+
+
+async def run(args) -> None:
+    url = f"http://127.0.0.1:{args.port}/chat/completions"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_transport", "--serve", str(args.port)]
+    )
+    try:
+        await wait_until_up(url)
+        for http2 in (False, True):
+            result = await measure(
+                url, http2, args.requests, args.concurrency, args.max_connections
+            )
+            label = "HTTP/2" if http2 else "HTTP/1.1"
+            print(
+                f"{label:<9} p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                f"throughput={result['rps']:.0f} req/s"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--max-connections", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args.serve))
+        return
+
+    try:
+        import hypercorn  # noqa: F401
+    except ImportError:
+        sys.exit("hypercorn is required: pip install hypercorn")
+    if not http2_available():
+        sys.exit("h2 is required for HTTP/2: pip install h2")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Fake Groq server
+OpenAI-compatible ASGI app emulating `/chat/completions` latency, streaming, rate limits and failures
+
+Used in-process through `httpx.ASGITransport`, so benchmarks need no network,
+or served on a port to stand in for the Groq API under load tests:
+
+    python -m benchmarks.fake_groq [--port 9000] [--ttft 0.2] [--inter-token-delay 0.005] ...
+
+then start the API with GROQ_BASE_URL=http://127.0.0.1:9000 and drive it
+with `python -m benchmarks.loadgen`.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Deque, Tuple, Union, Optional, List
+
+MODELS = ["llama-3.3-70b-versatile", "llama3-70b-8192", "llama3-8b-8192", "gemma2-9b-it"]
+
+
+class FakeGroqServer:
+    """
+    ASGI app emulating the Groq chat completions API.
+
+    Requests with `"stream": true` get Server-Sent Events, one chunk per
+    token, with usage in the final chunk under `x_groq` like Groq sends it;
+    other requests get a single JSON completion once every token has been
+    "generated". Request and token budgets per window produce 429s with
+    Retry-After and x-ratelimit headers. On top of that, periodic 429 bursts
+    and random 5xx errors can be switched on.
+
+    Attributes:
+        requests_per_window: Requests allowed per window
+        tokens_per_window: Tokens allowed per window
+        window: Budget window in seconds
+        latency: Seconds before the first token (time to first token)
+        completion_tokens: Tokens per completion, or a (low, high) range
+            drawn uniformly per request, capped by the request's max_tokens
+        inter_token_delay: Seconds between generated tokens
+        error_rate: Share of requests failing with a random 5xx
+        burst_every: Seconds between 429 bursts (0 to disable)
+        burst_duration: Seconds each burst rejects every request
+        tail_rate: Share of requests that are slow
+        tail_latency: Extra seconds before the first token of a slow request
+        seed: Seed for token counts and errors, for repeatable runs
+    """
+
+    def __init__(
+        self,
+        requests_per_window: int = 30,
+        tokens_per_window: int = 12000,
+        window: float = 60.0,
+        latency: float = 0.05,
+        completion_tokens: Union[int, Tuple[int, int]] = 50,
+        inter_token_delay: float = 0.0,
+        error_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_duration: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.inter_token_delay = inter_token_delay
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self._rng = random.Random(seed)
+        self._usage: Deque[Tuple[float, int]] = deque()
+        self._started = time.monotonic()
+
+        self.received = 0
+        self.served = 0
+        self.streamed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _budget(self, now: float) -> Tuple[int, int, float]:
+        while self._usage and self._usage[0][0] <= now - self.window:
+            self._usage.popleft()
+        used_tokens = sum(tokens for _, tokens in self._usage)
+        reset = self._usage[0][0] + self.window - now if self._usage else 0.0
+        return (
+            self.requests_per_window - len(self._usage),
+            self.tokens_per_window - used_tokens,
+            reset
+        )
+
+    def _burst_remaining(self, now: float) -> float:
+        """Seconds left in the current 429 burst, 0 outside bursts"""
+        if not self.burst_every or not self.burst_duration:
+            return 0.0
+        phase = (now - self._started) % self.burst_every
+        return max(self.burst_duration - phase, 0.0)
+
+    def _draw_tokens(self, max_tokens: Optional[int]) -> int:
+        tokens = self.completion_tokens
+        if isinstance(tokens, (tuple, list)):
+            tokens = self._rng.randint(*tokens)
+        return min(tokens, max_tokens) if max_tokens else tokens
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        if scope["method"] == "GET" and scope["path"].endswith("/models"):
+            models = {"object": "list", "data": [{"id": m, "object": "model"} for m in MODELS]}
+            await self._send(send, 200, [(b"content-type", b"application/json")], models)
+            return
+
+        payload = json.loads(body or b"{}")
+        self.received += 1
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 4 for m in payload.get("messages", []))
+        completion_tokens = self._draw_tokens(payload.get("max_tokens"))
+        total_tokens = prompt_tokens + completion_tokens
+
+        now = time.monotonic()
+        remaining_requests, remaining_tokens, reset = self._budget(now)
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"x-ratelimit-remaining-requests", str(max(remaining_requests - 1, 0)).encode()),
+            (b"x-ratelimit-remaining-tokens", str(max(remaining_tokens - total_tokens, 0)).encode()),
+            (b"x-ratelimit-reset-tokens", f"{reset:.2f}s".encode()),
+        ]
+
+        burst = self._burst_remaining(now)
+        if burst or remaining_requests < 1 or remaining_tokens < total_tokens:
+            self.rejected += 1
+            retry_after = burst or reset
+            headers.append((b"retry-after", str(max(1, round(retry_after))).encode()))
+            response = {"error": {"message": "Rate limit reached", "type": "rate_limit"}}
+            await self._send(send, 429, headers, response)
+            return
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.failed += 1
+            status = self._rng.choice((500, 502, 503))
+            response = {"error": {"message": "Upstream unavailable", "type": "server_error"}}
+            await self._send(send, status, headers[:1], response)
+            return
+
+        self._usage.append((now, total_tokens))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens
+        }
+        model = payload.get("model", "fake")
+        latency = self.latency
+        if self.tail_rate and self._rng.random() < self.tail_rate:
+            latency += self.tail_latency
+
+        if payload.get("stream"):
+            await self._stream(send, model, completion_tokens, usage, latency)
+            return
+
+        await asyncio.sleep(latency + completion_tokens * self.inter_token_delay)
+        self.served += 1
+
+        response = {
+            "id": f"chatcmpl-{self.served}",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok " * completion_tokens},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+        await self._send(send, 200, headers, response)
+
+    async def _stream(self, send, model: str, completion_tokens: int, usage: dict, latency: float) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]
+        })
+        self.streamed += 1
+        chunk_id = f"chatcmpl-s{self.streamed}"
+
+        def frame(delta: dict, finish_reason: Optional[str] = None, **extra) -> bytes:
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra
+            }
+            return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+        await asyncio.sleep(latency)
+        for i in range(completion_tokens):
+            if i and self.inter_token_delay:
+                await asyncio.sleep(self.inter_token_delay)
+            delta = {"role": "assistant", "content": "ok "} if i == 0 else {"content": "ok "}
+            await send({"type": "http.response.body", "body": frame(delta), "more_body": True})
+
+        final = frame({}, "stop", x_groq={"usage": usage}) + b"data: [DONE]\n\n"
+        await send({"type": "http.response.body", "body": final})
+        self.served += 1
+
+    @staticmethod
+    async def _send(send, status, headers, payload):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+def parse_tokens(value: str) -> Union[int, Tuple[int, int]]:
+    """Parse "50" or a "20-400" range"""
+    if "-" in value:
+        low, high = value.split("-", 1)
+        return int(low), int(high)
+    return int(value)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--rpm", type=int, default=10 ** 6, help="Requests per window")
+    parser.add_argument("--tpm", type=int, default=10 ** 9, help="Tokens per window")
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--inter-token-delay", type=float, default=0.005)
+    parser.add_argument("--tokens", type=parse_tokens, default=(50, 400), help='Count or range, e.g. "50-400"')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-duration", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Share of slow requests")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="Extra seconds for slow requests")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = FakeGroqServer(
+        requests_per_window=args.rpm,
+        tokens_per_window=args.tpm,
+        window=args.window,
+        latency=args.ttft,
+        completion_tokens=args.tokens,
+        inter_token_delay=args.inter_token_delay,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_duration=args.burst_duration,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
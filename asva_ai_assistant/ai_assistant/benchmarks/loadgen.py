@@ -0,0 +1,242 @@
+"""
+Load generator
+Drives /api/v1/chat and /api/v1/chat/stream at a target rate and reports latency, TTFT, tokens/s and errors as JSON
+
+Usage:
+    python -m benchmarks.loadgen [--url http://127.0.0.1:8000] [--rps 20] [--concurrency 64]
+                                 [--duration 30] [--stream-ratio 0.5] [--output report.json]
+
+Arrivals are open loop: requests are scheduled at --rps (evenly spaced, or
+Poisson with --poisson) whether or not earlier ones finished, and at most
+--concurrency are in flight. Latency is measured from the scheduled start,
+so a saturated server shows up as growing latency rather than as a lower
+send rate. Point the API at the fake Groq server (benchmarks.fake_groq)
+to load it without spending tokens.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+MESSAGES = [
+    "Explain recursion with a simple example",
+    "What is the difference between mitosis and meiosis?",
+    "How does a hash table handle collisions?",
+    "Help me plan a weather station project with a Raspberry Pi",
+    "Why does entropy always increase in an isolated system?",
+]
+MODES = ["default", "explainer", "socratic", "inventor"]
+
+
+def percentiles(values: List[float], scale: float = 1000.0) -> Optional[Dict[str, float]]:
+    """p50/p95/p99, mean and max of a sample, scaled (seconds to ms by default)"""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))] * scale
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": sum(values) / len(values) * scale,
+        "max": values[-1] * scale
+    }
+
+
+async def chat_once(client: httpx.AsyncClient, body: Dict[str, Any], scheduled: float) -> Dict[str, Any]:
+    """Send one /chat request"""
+    result = {"endpoint": "chat", "ok": False, "status": None}
+    try:
+        response = await client.post("/api/v1/chat", json=body)
+        result["status"] = response.status_code
+        result["latency"] = time.monotonic() - scheduled
+        if response.status_code == 200:
+            result["ok"] = True
+            result["tokens"] = response.json().get("metadata", {}).get("tokens_used", 0)
+    except httpx.HTTPError as e:
+        result["status"] = type(e).__name__
+        result["latency"] = time.monotonic() - scheduled
+    return result
+
+
+async def stream_once(client: httpx.AsyncClient, body: Dict[str, Any], scheduled: float) -> Dict[str, Any]:
+    """Send one /chat/stream request and time its first token"""
+    result = {"endpoint": "stream", "ok": False, "status": None}
+    first_token_at = None
+    frames = 0
+    try:
+        async with client.stream("POST", "/api/v1/chat/stream", json=body) as response:
+            result["status"] = response.status_code
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                kind = event.get("type")
+                if kind == "token":
+                    frames += 1
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                elif kind == "end":
+                    metadata = event.get("metadata") or {}
+                    result["ok"] = True
+                    result["tokens"] = metadata.get("tokens_used", 0)
+                    # tokens_used includes the prompt; answers replayed from a
+                    # cache carry no completion count, so fall back to frames
+                    result["completion_tokens"] = metadata.get("completion_tokens") or frames
+                elif kind == "error":
+                    result["status"] = "stream_error"
+    except httpx.HTTPError as e:
+        result["status"] = type(e).__name__
+
+    finished_at = time.monotonic()
+    result["latency"] = finished_at - scheduled
+    if first_token_at is not None:
+        result["ttft"] = first_token_at - scheduled
+        result["frames"] = frames
+        if result.get("completion_tokens") and finished_at > first_token_at:
+            result["tokens_per_sec"] = result["completion_tokens"] / (finished_at - first_token_at)
+    return result
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate request results per endpoint"""
+    report = {}
+    for endpoint in ("chat", "stream"):
+        rows = [r for r in results if r["endpoint"] == endpoint]
+        if not rows:
+            continue
+        ok = [r for r in rows if r["ok"]]
+        errors: Dict[str, int] = {}
+        for r in rows:
+            if not r["ok"]:
+                errors[str(r["status"])] = errors.get(str(r["status"]), 0) + 1
+        report[endpoint] = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "error_rate": 1 - len(ok) / len(rows),
+            "errors": errors,
+            "latency_ms": percentiles([r["latency"] for r in ok]),
+            "ttft_ms": percentiles([r["ttft"] for r in ok if "ttft" in r]),
+            "tokens_per_sec": percentiles([r["tokens_per_sec"] for r in ok if "tokens_per_sec" in r], 1.0)
+        }
+    return report
+
+
+async def run(
+        url: str,
+        rps: float,
+        concurrency: int,
+        duration: float,
+        stream_ratio: float = 0.5,
+        sessions: int = 100,
+        max_tokens: Optional[int] = None,
+        poisson: bool = False,
+        seed: int = 0,
+        timeout: float = 120.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict[str, Any]:
+    """
+    Generate load against a running API.
+
+    Args:
+        url: Base URL of the API
+        rps: Target request rate
+        concurrency: Maximum requests in flight
+        duration: Seconds to keep sending
+        stream_ratio: Share of requests sent to /chat/stream
+        sessions: Distinct session IDs to spread requests over
+        max_tokens: Response token limit sent with every request
+        poisson: Exponential inter-arrival times instead of even spacing
+        seed: Seed for arrivals, endpoints and messages
+        timeout: Per-request timeout in seconds
+        transport: Optional transport, e.g. httpx.ASGITransport for an in-process app
+
+    Returns:
+        Report with the configuration, achieved rate and per-endpoint stats
+    """
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async with httpx.AsyncClient(
+            base_url=url,
+            transport=transport,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    ) as client:
+
+        async def one(index: int, scheduled: float, stream: bool) -> None:
+            body = {
+                "session_id": f"loadgen-{index % sessions}",
+                "message": MESSAGES[index % len(MESSAGES)],
+                "mode": MODES[index % len(MODES)]
+            }
+            if max_tokens:
+                body["parameters"] = {"max_tokens": max_tokens}
+            async with semaphore:
+                send = stream_once if stream else chat_once
+                results.append(await send(client, body, scheduled))
+
+        tasks = []
+        start = time.monotonic()
+        scheduled = start
+        index = 0
+        while scheduled < start + duration:
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(index, scheduled, rng.random() < stream_ratio)))
+            index += 1
+            scheduled += rng.expovariate(rps) if poisson else 1.0 / rps
+
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+
+    return {
+        "config": {
+            "url": url, "rps": rps, "concurrency": concurrency, "duration": duration,
+            "stream_ratio": stream_ratio, "poisson": poisson, "seed": seed
+        },
+        "requests": len(results),
+        "achieved_rps": len(results) / elapsed if elapsed else 0.0,
+        "wall_s": elapsed,
+        "endpoints": summarize(results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--stream-ratio", type=float, default=0.5)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--poisson", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(
+        args.url, args.rps, args.concurrency, args.duration, args.stream_ratio,
+        args.sessions, args.max_tokens, args.poisson, args.seed, args.timeout
+    ))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
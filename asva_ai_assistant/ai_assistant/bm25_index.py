@@ -0,0 +1,477 @@
+"""
+BM25 Index
+Incremental keyword index with compact postings and memory-mapped snapshots
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+from array import array
+from collections import Counter
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+
+from retrieval import Passage, collection_dirname
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+_MAGIC = b"BM25IDX2"
+# Chunks, postings, term dictionary bytes, last chunk row covered
+_HEADER = struct.Struct("<QQQQ")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in is it its of on or "
+    "that the this to was were what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index for one collection.
+
+    Chunks are committed to SQLite next to the snapshot on every update,
+    so nothing is lost on a crash and several processes can write to one
+    collection. Postings are two parallel `array('I')` blocks per term
+    (chunk positions and term frequencies). The snapshot file holds the
+    postings, chunk lengths and chunk rows and is memory-mapped on open,
+    so startup only parses the term dictionary; chunks committed after it
+    was written are replayed from SQLite into small in-memory delta
+    blocks. Chunk text stays in SQLite and is read for the results only.
+
+    Commits by other processes are picked up before each search. A
+    snapshot is written under SQLite's write lock after catching up, so it
+    covers every committed chunk. Deleted chunks are masked at query time
+    and dropped when the snapshot is written.
+
+    Attributes:
+        path: Snapshot file
+        k1: Term frequency saturation
+        b: Length normalization
+        snapshot_every: Updates between automatic snapshots (0 to disable)
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75, snapshot_every: int = 200):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(
+            f"{os.path.splitext(path)[0]}.db", check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+            CREATE INDEX IF NOT EXISTS idx_chunks_deleted ON chunks (row) WHERE deleted = 1;
+            CREATE TABLE IF NOT EXISTS snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                generation INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO snapshot (id, generation) VALUES (0, 0);
+            """
+        )
+        self._conn.commit()
+
+        self._mm: Optional[mmap.mmap] = None
+        self._updates = 0
+        self._load()
+
+    @property
+    def postings(self) -> int:
+        """Number of postings, including those of deleted chunks"""
+        return len(self._base_ids) + sum(len(ids) for ids, _ in self._delta.values())
+
+    def _reserve(self, needed: int) -> None:
+        if needed <= len(self._lengths):
+            return
+        capacity = max(needed, 2 * len(self._lengths))
+        rows = np.zeros(capacity, dtype=np.int64)
+        rows[:self.count] = self._rows[:self.count]
+        lengths = np.zeros(capacity, dtype=np.uint32)
+        lengths[:self.count] = self._lengths[:self.count]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.count] = self._alive[:self.count]
+        self._rows, self._lengths, self._alive = rows, lengths, alive
+
+    def add(self, document_id: str, source: str, texts: List[str]) -> None:
+        """Index the chunks of a document"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO chunks (document_id, chunk_index, source, text) VALUES (?, ?, ?, ?)",
+                    [(document_id, i, source, text) for i, text in enumerate(texts)]
+                )
+            self._sync()
+            self._updated()
+
+    def delete(self, document_id: str) -> int:
+        """
+        Remove the chunks of a document.
+
+        Returns:
+            Number of chunks removed
+        """
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute(
+                    "UPDATE chunks SET deleted = 1 WHERE document_id = ? AND deleted = 0", (document_id,)
+                ).rowcount
+            if removed:
+                self._sync()
+                self._updated()
+            return removed
+
+    def _updated(self) -> None:
+        self._updates += 1
+        if self.snapshot_every and self._updates >= self.snapshot_every:
+            self._snapshot()
+
+    def _refresh(self) -> None:
+        """Sync if another connection committed since the last sync"""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._sync()
+
+    def _sync(self) -> None:
+        """Index the chunks committed since the last sync and mask deleted ones"""
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        generation = self._conn.execute("SELECT generation FROM snapshot").fetchone()[0]
+        if generation != self._generation:
+            # Another process wrote a snapshot and purged deleted chunks
+            self._load()
+            return
+
+        changed = False
+        new = self._conn.execute(
+            "SELECT row, text, deleted FROM chunks WHERE row > ? ORDER BY row", (self._last_row,)
+        ).fetchall()
+        if new:
+            self._reserve(self.count + len(new))
+            for row, text, deleted in new:
+                doc = self.count
+                self.count += 1
+                self._rows[doc] = row
+                if deleted:
+                    continue
+                terms = tokenize(text)
+                self._lengths[doc] = len(terms)
+                self._alive[doc] = True
+                self.live += 1
+                self.total_length += len(terms)
+
+                for term, tf in Counter(terms).items():
+                    block = self._delta.get(term)
+                    if block is None:
+                        block = self._delta[term] = (array("I"), array("I"))
+                    block[0].append(doc)
+                    block[1].append(tf)
+            self._last_row = new[-1][0]
+            changed = True
+
+        deleted = np.array(
+            [row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE deleted = 1")],
+            dtype=np.int64
+        )
+        if len(deleted):
+            rows = self._rows[:self.count]
+            docs = np.searchsorted(rows, deleted)
+            found = docs < self.count
+            docs = docs[found]
+            docs = docs[(rows[docs] == deleted[found]) & self._alive[docs]]
+            if len(docs):
+                self._alive[docs] = False
+                self.live -= len(docs)
+                self.total_length -= int(self._lengths[docs].sum())
+                changed = True
+
+        if changed:
+            self._norm = None
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        ids = []
+        tfs = []
+        base = self._base_terms.get(term)
+        if base is not None:
+            start, count = base
+            ids.append(self._base_ids[start:start + count])
+            tfs.append(self._base_tfs[start:start + count])
+        delta = self._delta.get(term)
+        if delta is not None:
+            ids.append(np.frombuffer(delta[0], dtype=np.uint32).copy())
+            tfs.append(np.frombuffer(delta[1], dtype=np.uint32).copy())
+        if not ids:
+            return self._base_ids[:0], self._base_tfs[:0]
+        if len(ids) == 1:
+            return ids[0], tfs[0]
+        return np.concatenate(ids), np.concatenate(tfs)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Score chunks against a query.
+
+        Returns:
+            (chunk id, BM25 score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+
+        with self._lock:
+            self._refresh()
+            if not self.live:
+                return []
+            n = self.count
+            if self._norm is None:
+                avgdl = self.total_length / self.live or 1.0
+                self._norm = (
+                    self.k1 * (1 - self.b + self.b * self._lengths[:n] / avgdl)
+                ).astype(np.float32)
+
+            all_ids = []
+            all_weights = []
+            for term in terms:
+                ids, tfs = self._postings(term)
+                if not len(ids):
+                    continue
+                df = len(ids)
+                idf = np.log1p((self.live - df + 0.5) / (df + 0.5))
+                tf = tfs.astype(np.float32)
+                all_ids.append(ids)
+                all_weights.append(idf * tf * (self.k1 + 1) / (tf + self._norm[ids]))
+
+            if not all_ids:
+                return []
+
+            ids = np.concatenate(all_ids)
+            scores = np.bincount(ids, weights=np.concatenate(all_weights), minlength=n)
+            scores[~self._alive[:n]] = 0.0
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(doc), float(scores[doc])) for doc in top]
+
+    def passages(self, hits: List[Tuple[int, float]]) -> List[Passage]:
+        """Load the chunk text for search results"""
+        if not hits:
+            return []
+        with self._lock:
+            scores = {int(self._rows[doc]): score for doc, score in hits}
+            placeholders = ",".join("?" * len(scores))
+            rows = self._conn.execute(
+                f"SELECT row, document_id, chunk_index, source, text FROM chunks "
+                f"WHERE row IN ({placeholders})",
+                list(scores)
+            ).fetchall()
+        by_row = {row[0]: row[1:] for row in rows}
+        return [Passage(*by_row[row], score) for row, score in scores.items() if row in by_row]
+
+    def snapshot(self) -> None:
+        """Write the index to its snapshot file, dropping deleted chunks"""
+        with self._lock:
+            self._snapshot()
+
+    def _snapshot(self) -> None:
+        with self._conn:
+            # No process can commit chunks until this one is done, so after
+            # syncing the snapshot covers every chunk in the database
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._sync()
+
+            n = self.count
+            live = np.flatnonzero(self._alive[:n])
+            remap = np.full(n, -1, dtype=np.int64)
+            remap[live] = np.arange(len(live))
+
+            terms: Dict[str, Tuple[int, int]] = {}
+            id_blocks = []
+            tf_blocks = []
+            offset = 0
+            for term in set(self._base_terms) | set(self._delta):
+                ids, tfs = self._postings(term)
+                new_ids = remap[ids]
+                keep = new_ids >= 0
+                count = int(np.count_nonzero(keep))
+                if not count:
+                    continue
+                terms[term] = (offset, count)
+                id_blocks.append(new_ids[keep].astype(np.uint32))
+                tf_blocks.append(tfs[keep])
+                offset += count
+
+            ids = np.concatenate(id_blocks) if id_blocks else np.zeros(0, dtype=np.uint32)
+            tfs = np.concatenate(tf_blocks) if tf_blocks else np.zeros(0, dtype=np.uint32)
+            meta = json.dumps(terms, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(_MAGIC)
+                f.write(_HEADER.pack(len(live), len(ids), len(meta), self._last_row))
+                f.write(self._rows[live].astype("<i8").tobytes())
+                f.write(self._lengths[live].astype("<u4").tobytes())
+                f.write(ids.astype("<u4").tobytes())
+                f.write(tfs.astype("<u4").tobytes())
+                f.write(meta)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+            self._conn.execute("DELETE FROM chunks WHERE deleted = 1")
+            self._conn.execute("UPDATE snapshot SET generation = generation + 1")
+
+        self._updates = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Memory-map the snapshot file and replay the chunks committed after it"""
+        # Read before opening the file: a newer snapshot that lands in
+        # between is caught by the next sync
+        self._generation = self._conn.execute("SELECT generation FROM snapshot").fetchone()[0]
+        old = self._mm
+        self._mm = None
+        self._base_ids = self._base_tfs = np.zeros(0, dtype=np.uint32)
+        self._base_terms: Dict[str, Tuple[int, int]] = {}
+        n_docs = last_row = 0
+        rows = np.zeros(0, dtype=np.int64)
+        lengths = np.zeros(0, dtype=np.uint32)
+
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mm[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"Not a BM25 snapshot: {self.path}")
+
+            n_docs, n_postings, meta_len, last_row = _HEADER.unpack_from(self._mm, len(_MAGIC))
+            offset = len(_MAGIC) + _HEADER.size
+            rows = np.frombuffer(self._mm, dtype="<i8", count=n_docs, offset=offset)
+            offset += 8 * n_docs
+            lengths = np.frombuffer(self._mm, dtype="<u4", count=n_docs, offset=offset)
+            offset += 4 * n_docs
+            self._base_ids = np.frombuffer(self._mm, dtype="<u4", count=n_postings, offset=offset)
+            offset += 4 * n_postings
+            self._base_tfs = np.frombuffer(self._mm, dtype="<u4", count=n_postings, offset=offset)
+            offset += 4 * n_postings
+            meta = json.loads(self._mm[offset:offset + meta_len])
+            self._base_terms = {term: tuple(span) for term, span in meta.items()}
+
+        self._delta: Dict[str, Tuple[array, array]] = {}
+        capacity = max(1024, n_docs)
+        self._rows = np.zeros(capacity, dtype=np.int64)
+        self._rows[:n_docs] = rows
+        self._lengths = np.zeros(capacity, dtype=np.uint32)
+        self._lengths[:n_docs] = lengths
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:n_docs] = True
+        self.count = self.live = n_docs
+        self.total_length = int(lengths.sum())
+        self._last_row = last_row
+        self._norm: Optional[np.ndarray] = None
+
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                # Still referenced by an in-flight search, released by GC
+                pass
+        self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._updates:
+                self._snapshot()
+            self._conn.close()
+
+
+class BM25Store:
+    """
+    Keyword indexes for every collection under a root directory.
+
+    Attributes:
+        root: Directory holding one snapshot and chunk database per collection directory
+    """
+
+    def __init__(self, root: str, snapshot_every: int = 200):
+        self.root = root
+        self.snapshot_every = snapshot_every
+        self._indexes: Dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, collection: str) -> str:
+        return os.path.join(self.root, collection_dirname(collection), "keywords.bm25")
+
+    def get_index(self, collection: str, create: bool = True) -> Optional[BM25Index]:
+        """Open a collection's index"""
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is None:
+                path = self._path(collection)
+                if not create and not os.path.isdir(os.path.dirname(path)):
+                    return None
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                index = self._indexes[collection] = BM25Index(
+                    path, snapshot_every=self.snapshot_every
+                )
+            return index
+
+    def add_document(self, collection: str, document_id: str, source: str, texts: List[str]) -> int:
+        """
+        Index the chunks of a document, replacing any previous version.
+
+        Returns:
+            Number of chunks indexed
+        """
+        index = self.get_index(collection)
+        index.delete(document_id)
+        index.add(document_id, source, texts)
+        return len(texts)
+
+    def delete_document(self, collection: str, document_id: str) -> int:
+        """Remove a document from a collection"""
+        index = self.get_index(collection, create=False)
+        return index.delete(document_id) if index else 0
+
+    def search(self, collection: str, query: str, k: int = 10) -> List[Passage]:
+        """Find the chunks of a collection that best match a query"""
+        index = self.get_index(collection, create=False)
+        if index is None:
+            return []
+        return index.passages(index.search(query, k))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get chunk and posting counts per open collection"""
+        return {
+            name: {"chunks": index.live, "postings": index.postings}
+            for name, index in self._indexes.items()
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
@@ -0,0 +1,110 @@
+"""
+Settings Schema
+Every setting with its type and default, validated by pydantic-settings
+"""
+
+from pydantic_settings import BaseSettings
+from pathlib import Path
+from typing import Optional, List
+
+
+class Settings(BaseSettings):
+    GROQ_API_KEY: str
+    GROQ_MODEL: str
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    GROQ_TOKENIZER_PATH: Optional[str] = None
+    GROQ_HTTP2: bool = True
+    GROQ_MAX_CONNECTIONS: int = 100
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GROQ_KEEPALIVE_EXPIRY: float = 30.0
+    GROQ_CONNECT_TIMEOUT: float = 5.0
+    GROQ_POOL_TIMEOUT: float = 5.0
+    GROQ_COALESCE_REQUESTS: bool = True
+    GROQ_RATE_LIMIT_ENABLED: bool = True
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 12000
+    GROQ_MAX_CONCURRENCY: int = 16
+    GROQ_IDLE_RESERVE: float = 0.5
+    GROQ_HEDGE_ENABLED: bool = False
+    GROQ_HEDGE_BUDGET: float = 0.05
+    GROQ_HEDGE_QUANTILE: float = 0.95
+    GROQ_HEDGE_MIN_DELAY: float = 0.1
+    GROQ_CIRCUIT_BREAKER_ENABLED: bool = True
+    GROQ_CIRCUIT_FAILURE_THRESHOLD: float = 0.5
+    GROQ_CIRCUIT_SLOW_CALL: float = 15.0
+    GROQ_CIRCUIT_MIN_REQUESTS: int = 10
+    GROQ_CIRCUIT_COOLDOWN: float = 30.0
+    ROUTER_ENABLED: bool = True
+    ROUTER_SMALL_MODELS: List[str] = ["llama3-8b-8192", "gemma2-9b-it"]
+    ROUTER_LARGE_MODELS: List[str] = ["llama-3.3-70b-versatile", "llama3-70b-8192"]
+    ROUTER_EWMA_ALPHA: float = 0.2
+    ROUTER_LATENCY_SLO: float = 4.0
+    ROUTER_ERROR_THRESHOLD: float = 0.3
+    ROUTER_PROBE_AFTER: float = 30.0
+    ROUTER_MAX_ATTEMPTS: int = 2
+    ROUTER_ATTEMPT_TIMEOUT: float = 20.0
+    SSE_FAST_RELAY: bool = True
+    SSE_COALESCE_CHARS: int = 32
+    SSE_COALESCE_DELAY: float = 0.015
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_PATH: str = "response_cache.db"
+    RESPONSE_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CONTEXT_STORE_BACKEND: str = "memory"
+    CONTEXT_STORE_PATH: str = "sessions.db"
+    CONTEXT_STORE_BATCH_SIZE: int = 256
+    CONTEXT_STORE_FLUSH_INTERVAL: float = 0.5
+    CONTEXT_STORE_MAX_BYTES: int = 256 * 1024 * 1024
+    CONTEXT_STORE_IDLE_TTL: float = 0
+    CONTEXT_STORE_SPILL_PATH: Optional[str] = None
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_MODES: List[str] = ["explainer", "default"]
+    PREFETCH_TOP_N: int = 2
+    PREFETCH_TTL: float = 120.0
+    PREFETCH_MAX_SESSIONS: int = 1024
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9
+    SEMANTIC_CACHE_MAX_EXTRA_WORDS: int = 1
+    SEMANTIC_CACHE_TTL: float = 3600.0
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1024
+    SEMANTIC_CACHE_MAX_QUERY_CHARS: int = 200
+    SEMANTIC_CACHE_AUDIT_RATE: float = 0.02
+    SEMANTIC_CACHE_AUDIT_THRESHOLD: float = 0.5
+    CHAT_BATCH_MAX_ITEMS: int = 500
+    CHAT_BATCH_CONCURRENCY: int = 4
+    CHAT_BATCH_MAX_CONCURRENCY: int = 16
+    JOB_QUEUE_PATH: str = "jobs.db"
+    JOB_CONCURRENCY: int = 4
+    JOB_RESERVED_INTERACTIVE: int = 1
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: float = 2.0
+    JOB_LEASE: float = 60.0
+    JOB_RESULTS_BACKEND: str = "sqlite"
+    JOB_RESULTS_PATH: str = "job_results.db"
+    JOB_RESULTS_TTL: int = 24 * 3600
+    JOB_RESULTS_MAX_BYTES: int = 256 * 1024 * 1024
+    DOCUMENT_CHUNK_TOKENS: int = 3000
+    DOCUMENT_MAX_CONCURRENCY: int = 4
+    DOCUMENT_RESULTS_BACKEND: str = "sqlite"
+    DOCUMENT_RESULTS_PATH: str = "document_results.db"
+    DOCUMENT_RESULTS_TTL: int = 30 * 24 * 3600
+    DOCUMENT_RESULTS_MAX_BYTES: int = 256 * 1024 * 1024
+    RETRIEVAL_ENABLED: bool = True
+    RETRIEVAL_INDEX_DIR: str = "indexes"
+    RETRIEVAL_DIM: int = 256
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_MAX_TOKENS: int = 1500
+    RETRIEVAL_CHUNK_TOKENS: int = 300
+    RETRIEVAL_IVF_THRESHOLD: int = 100_000
+    RETRIEVAL_NPROBE: int = 16
+    RETRIEVAL_EMBEDDINGS_ENABLED: bool = True
+    RETRIEVAL_BM25_ENABLED: bool = True
+    RETRIEVAL_BM25_SNAPSHOT_EVERY: int = 200
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_INDEX_ANSWERS: bool = True
+
+    class Config:
+        env_file = Path(__file__).resolve().parent.parent.parent / ".env"
+        case_sensitive = True
+
@@ -1,14 +1,56 @@
-from pydantic_settings import BaseSettings
-from pathlib import Path
+"""
+Settings
+Application settings, loaded from the environment and .env on first use
+"""
 
+import threading
+from typing import Any, TYPE_CHECKING
 
-class Settings(BaseSettings):
-    GROQ_API_KEY: str
-    GROQ_MODEL: str
+if TYPE_CHECKING:
+    from .schema import Settings
 
-    class Config:
-        env_file = Path(__file__).resolve().parent.parent.parent / ".env"
-        case_sensitive = True
+_lock = threading.Lock()
+_settings = None
 
 
-settings = Settings()
+def get_settings() -> "Settings":
+    """
+    Get the settings, loading them on first call.
+
+    Loading imports pydantic-settings and reads the environment and .env,
+    so importing a module that uses `settings` costs neither, and a missing
+    variable only fails once a setting is actually read.
+    """
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                from .schema import Settings
+                _settings = Settings()
+    return _settings
+
+
+class LazySettings:
+    """Stand-in for the Settings instance that loads it on first attribute access"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings()) if _settings is not None else "<settings (not loaded)>"
+
+
+settings = LazySettings()
+
+
+def __getattr__(name: str) -> Any:
+    # `from config.settings import Settings` keeps working without an eager import
+    if name == "Settings":
+        from .schema import Settings
+        return Settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
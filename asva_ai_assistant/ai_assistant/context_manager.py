@@ -0,0 +1,99 @@
+"""
+Context Manager
+Session tracking and conversation history on top of a pluggable session store
+"""
+
+from typing import Optional, List, Dict, Any
+import logging
+
+from session import Message, Session
+from session_store import SessionStore, InMemorySessionStore
+
+logger = logging.getLogger(__name__)
+
+
+class ContextManager:
+    """
+    Manages conversation sessions and history.
+
+    Attributes:
+        store: Session storage backend
+        max_history: Messages returned by get_conversation by default
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None, max_history: int = 50):
+        self.store = store or InMemorySessionStore()
+        self.max_history = max_history
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Message:
+        """
+        Append a message to a session, creating the session if needed.
+
+        Args:
+            session_id: Session identifier
+            role: Message author
+            content: Message text
+            metadata: Extra information (tokens_used is added to the session total)
+
+        Returns:
+            The stored message
+        """
+        message = Message(role, content, metadata=metadata)
+
+        session = self.store.get_session(session_id)
+        if session is None:
+            session = Session(session_id, created_at=message.timestamp)
+
+        session.last_active = message.timestamp
+        session.message_count += 1
+        session.total_tokens += message.tokens_used()
+
+        await self.store.append_message(session, message)
+        return message
+
+    async def get_conversation(
+        self,
+        session_id: str,
+        max_messages: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Get the most recent messages of a session in chat completion format.
+
+        Args:
+            session_id: Session identifier
+            max_messages: Number of messages to load (defaults to max_history)
+
+        Returns:
+            Messages, oldest first
+        """
+        messages = await self.store.get_messages(session_id, max_messages or self.max_history)
+        return [m.to_dict() for m in messages]
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """Get session metadata, or None if the session does not exist"""
+        return self.store.get_session(session_id)
+
+    def record_mode(self, session_id: str, mode: str) -> None:
+        """Add a learning mode to the session's mode history"""
+        session = self.store.get_session(session_id)
+        if session and session.add_mode(mode):
+            self.store.mark_dirty(session)
+
+    async def clear_session(self, session_id: str) -> bool:
+        """
+        Delete a session and its messages.
+
+        Returns:
+            True if the session existed
+        """
+        return await self.store.delete_session(session_id)
+
+    async def close(self) -> None:
+        """Flush pending writes and close the store"""
+        await self.store.close()
@@ -0,0 +1,274 @@
+"""
+Context Window Builder
+Fits conversation history into the context window of the selected model
+"""
+
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+import hashlib
+import logging
+
+from tokenizer import TokenCounter, MESSAGE_OVERHEAD_TOKENS
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+
+class ContextWindowBuilder:
+    """
+    Chooses the most recent conversation turns that fit a model's context window.
+
+    Turns that do not fit are replaced by a rolling extractive summary which is
+    cached per session, so each request only summarizes newly dropped turns.
+
+    Messages are laid out so consecutive requests of a session share the
+    longest possible byte-identical prefix for upstream prompt caching:
+    system prompt, frozen summary, kept history, then volatile context and
+    the query at the tail. The summary boundary only moves when the kept
+    history no longer fits, and then drops `compaction_headroom` of the
+    budget extra so the following turns reuse the same prefix.
+
+    Attributes:
+        context_windows: Context window size per model id
+        safety_margin: Tokens kept free to absorb counting errors
+        summary_max_tokens: Upper bound for the rolling summary
+        compaction_headroom: Fraction of the history budget freed on compaction
+        tokenizer: Token counter shared with the Groq client
+    """
+
+    def __init__(
+        self,
+        models: List[Dict[str, Any]],
+        safety_margin: int = 256,
+        summary_max_tokens: int = 512,
+        summary_line_chars: int = 200,
+        max_cached_sessions: int = 1024,
+        compaction_headroom: float = 0.25,
+        tokenizer: Optional[TokenCounter] = None
+    ):
+        self.context_windows = {m["id"]: m["context_window"] for m in models}
+        self.default_context_window = min(self.context_windows.values(), default=8192)
+        self.safety_margin = safety_margin
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_line_chars = summary_line_chars
+        self.max_cached_sessions = max_cached_sessions
+        self.compaction_headroom = compaction_headroom
+        self.tokenizer = tokenizer or TokenCounter()
+        # session_id -> (dropped turn count, fingerprint of last dropped turn, summary lines)
+        self._summaries: "OrderedDict[str, Tuple[int, str, List[str]]]" = OrderedDict()
+        # session_id -> hash of the last prefix sent
+        self._prefixes: "OrderedDict[str, str]" = OrderedDict()
+
+    def get_context_window(self, model: Optional[str] = None) -> int:
+        """Get the context window for a model, falling back to the smallest known one"""
+        return self.context_windows.get(model, self.default_context_window)
+
+    def count_message_tokens(self, message: Dict[str, str]) -> int:
+        """Count tokens of a single chat message including format overhead"""
+        return self.tokenizer.count_message(message)
+
+    def build(
+        self,
+        system_prompt: str,
+        conversation_history: List[Dict[str, str]],
+        query: str,
+        model: Optional[str] = None,
+        max_tokens: int = 2048,
+        session_id: Optional[str] = None,
+        context: Optional[str] = None,
+        prompt_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the message list for a request.
+
+        Args:
+            system_prompt: Static system prompt for the selected mode
+            conversation_history: Previous messages, oldest first
+            query: Current user message
+            model: Model identifier used to look up the context window
+            max_tokens: Tokens reserved for the model output
+            session_id: Session used to cache the rolling summary and prefix hash
+            context: Per-request context such as retrieved passages, placed
+                after the history so it never shifts the cached prefix
+            prompt_id: Precomputed hash of system_prompt
+
+        Returns:
+            Dict with the messages to send, trimming statistics and the
+            prefix hash (`prefix_reused` if it matches the session's last one)
+        """
+        system_message = {"role": "system", "content": system_prompt}
+        query_message = {"role": "user", "content": query}
+        tail = [query_message]
+        if context:
+            tail.insert(0, {"role": "system", "content": context})
+
+        budget = (
+            self.get_context_window(model)
+            - max_tokens
+            - self.safety_margin
+            - self.count_message_tokens(system_message)
+            - sum(self.count_message_tokens(m) for m in tail)
+        )
+
+        history_tokens = [self.count_message_tokens(m) for m in conversation_history]
+        first_kept = self._frozen_boundary(session_id, conversation_history)
+
+        if first_kept == 0 and sum(history_tokens) <= budget:
+            messages = [system_message, *conversation_history, *tail]
+            return self._result(messages, 0, 0, session_id, system_prompt, prompt_id, "")
+
+        # Keep room for the summary that replaces the dropped turns
+        available = budget - self.summary_max_tokens - MESSAGE_OVERHEAD_TOKENS
+
+        if first_kept == 0 or sum(history_tokens[first_kept:]) > available:
+            # Compact: leave headroom so the next turns keep this boundary
+            target = available - int(max(available, 0) * self.compaction_headroom)
+            kept_tokens = 0
+            first_kept = len(conversation_history)
+
+            for index in range(len(conversation_history) - 1, -1, -1):
+                if kept_tokens + history_tokens[index] > target:
+                    break
+                kept_tokens += history_tokens[index]
+                first_kept = index
+
+        dropped = conversation_history[:first_kept]
+        trimmed_tokens = sum(history_tokens[:first_kept])
+
+        messages = [system_message]
+        summary = self._get_summary(session_id, dropped)
+        if summary:
+            messages.append({"role": "system", "content": summary})
+        messages.extend(conversation_history[first_kept:])
+        messages.extend(tail)
+
+        logger.debug(
+            f"Context trimmed: session={session_id}, turns={len(dropped)}, "
+            f"tokens={trimmed_tokens}"
+        )
+
+        return self._result(
+            messages, len(dropped), trimmed_tokens, session_id, system_prompt, prompt_id, summary
+        )
+
+    def _frozen_boundary(self, session_id: Optional[str], history: List[Dict[str, str]]) -> int:
+        """Get the session's current summary boundary if the history still extends it"""
+        cached = self._summaries.get(session_id) if session_id else None
+        if not cached:
+            return 0
+        count, fingerprint, _ = cached
+        if count > len(history) or self._fingerprint(history[count - 1]) != fingerprint:
+            return 0
+        return count
+
+    def _result(
+        self,
+        messages: List[Dict[str, str]],
+        trimmed_turns: int,
+        trimmed_tokens: int,
+        session_id: Optional[str],
+        system_prompt: str,
+        prompt_id: Optional[str],
+        summary: str
+    ) -> Dict[str, Any]:
+        prefix = hashlib.sha256((prompt_id or system_prompt).encode("utf-8"))
+        prefix.update(b"\x00" + summary.encode("utf-8"))
+        prefix_hash = prefix.hexdigest()[:16]
+
+        prefix_reused = False
+        if session_id:
+            prefix_reused = self._prefixes.get(session_id) == prefix_hash
+            self._prefixes[session_id] = prefix_hash
+            self._prefixes.move_to_end(session_id)
+            while len(self._prefixes) > self.max_cached_sessions:
+                self._prefixes.popitem(last=False)
+
+        return {
+            "messages": messages,
+            "trimmed_turns": trimmed_turns,
+            "trimmed_tokens": trimmed_tokens,
+            "prompt_tokens": self.tokenizer.count_messages(messages),
+            "prefix_hash": prefix_hash,
+            "prefix_reused": prefix_reused
+        }
+
+    def _get_summary(self, session_id: Optional[str], dropped: List[Dict[str, str]]) -> str:
+        """Get the rolling summary for the dropped turns, reusing the cached part"""
+        if not dropped:
+            return ""
+
+        fingerprint = self._fingerprint(dropped[-1])
+        lines: List[str] = []
+        start = 0
+
+        cached = self._summaries.get(session_id) if session_id else None
+        if cached:
+            cached_count, cached_fingerprint, cached_lines = cached
+            if cached_count == len(dropped) and cached_fingerprint == fingerprint:
+                self._summaries.move_to_end(session_id)
+                return self._render(cached_lines)
+            if cached_count < len(dropped) and cached_fingerprint == self._fingerprint(
+                dropped[cached_count - 1]
+            ):
+                lines = list(cached_lines)
+                start = cached_count
+
+        for message in dropped[start:]:
+            line = self._summarize_message(message)
+            if line:
+                lines.append(line)
+
+        lines = self._fit_lines(lines)
+
+        if session_id:
+            self._summaries[session_id] = (len(dropped), fingerprint, lines)
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_cached_sessions:
+                self._summaries.popitem(last=False)
+
+        return self._render(lines)
+
+    def _summarize_message(self, message: Dict[str, str]) -> str:
+        """Reduce a message to its first sentence"""
+        content = " ".join((message.get("content") or "").split())
+        if not content:
+            return ""
+
+        for separator in (". ", "? ", "! "):
+            position = content.find(separator)
+            if 0 < position < self.summary_line_chars:
+                content = content[:position + 1]
+                break
+
+        if len(content) > self.summary_line_chars:
+            content = content[:self.summary_line_chars].rstrip() + "..."
+
+        return f"- {message.get('role', 'user')}: {content}"
+
+    def _fit_lines(self, lines: List[str]) -> List[str]:
+        """Drop the oldest summary lines until the summary fits its budget"""
+        total = self.tokenizer.count(SUMMARY_HEADER) + sum(
+            self.tokenizer.count(line) + 1 for line in lines
+        )
+        start = 0
+        while total > self.summary_max_tokens and start < len(lines):
+            total -= self.tokenizer.count(lines[start]) + 1
+            start += 1
+        return lines[start:]
+
+    @staticmethod
+    def _render(lines: List[str]) -> str:
+        if not lines:
+            return ""
+        return SUMMARY_HEADER + "\n" + "\n".join(lines)
+
+    @staticmethod
+    def _fingerprint(message: Dict[str, str]) -> str:
+        content = f"{message.get('role', '')}\x00{message.get('content', '')}"
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def clear_session(self, session_id: str) -> None:
+        """Forget the cached summary and prefix hash of a session"""
+        self._summaries.pop(session_id, None)
+        self._prefixes.pop(session_id, None)
@@ -0,0 +1,384 @@
+"""
+Document Analysis
+Streaming text extraction, token-aware chunking and map-reduce analysis of documents
+"""
+
+import asyncio
+import codecs
+import hashlib
+import io
+import logging
+import re
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable, Iterator, NamedTuple, Union, BinaryIO, Callable
+
+from exceptions import DocumentError
+from response_cache import ResponseCache
+from tokenizer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+DocumentSource = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
+
+# Bump when the prompts change, so persisted chunk results are not reused
+PROMPT_VERSION = 1
+
+_READ_SIZE = 64 * 1024
+_PAGE_BREAK = "\f"
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+ACTIONS: Dict[str, Dict[str, str]] = {
+    "summarize": {
+        "map": (
+            "You summarize one section of a student's course material. "
+            "Write a concise summary of the section's key points, definitions and results. "
+            "Do not mention that it is a section or refer to other parts of the document."
+        ),
+        "reduce": (
+            "You combine summaries of consecutive sections of one document into a single "
+            "coherent summary. Keep the original order, merge repeated points and keep "
+            "every key definition and result."
+        ),
+    },
+    "explain": {
+        "map": (
+            "You are an expert educator. Explain the main concepts in this section of a "
+            "student's course material in clear, simple terms with a short example for each."
+        ),
+        "reduce": (
+            "You combine explanations of consecutive sections of one document into a single "
+            "study guide. Keep the original order, remove repetition and keep the examples."
+        ),
+    },
+    "quiz": {
+        "map": (
+            "Write three quiz questions with short answers that test understanding of this "
+            "section of a student's course material. Use the format 'Q: ...' / 'A: ...'."
+        ),
+        "reduce": (
+            "You combine quiz questions written for consecutive sections of one document "
+            "into a single quiz. Remove duplicates, keep the best questions covering the "
+            "whole document and keep the 'Q: ...' / 'A: ...' format."
+        ),
+    },
+}
+
+
+class Chunk(NamedTuple):
+    """
+    A token-bounded piece of a document.
+
+    Attributes:
+        index: Position in the document
+        text: Chunk text
+        tokens: Token count of the text
+        first_page: Page the chunk starts on (1-based)
+        last_page: Page the chunk ends on
+    """
+    index: int
+    text: str
+    tokens: int
+    first_page: int
+    last_page: int
+
+
+def _decode_pages(blocks: Iterable[bytes]) -> Iterator[str]:
+    """Decode UTF-8 blocks incrementally and split on form feeds"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    for block in blocks:
+        buffer += decoder.decode(block)
+        *pages, buffer = buffer.split(_PAGE_BREAK)
+        yield from pages
+    buffer += decoder.decode(b"", final=True)
+    yield buffer
+
+
+def _read_blocks(stream: BinaryIO) -> Iterator[bytes]:
+    while True:
+        block = stream.read(_READ_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def _iter_pdf_pages(stream: BinaryIO) -> Iterator[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise DocumentError("PDF support requires the pypdf package")
+
+    try:
+        reader = PdfReader(stream)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+    except DocumentError:
+        raise
+    except Exception as e:
+        raise DocumentError(f"Could not read PDF: {str(e)}")
+
+
+def _iter_stream_pages(stream: BinaryIO) -> Iterator[str]:
+    start = stream.tell()
+    is_pdf = stream.read(5) == b"%PDF-"
+    stream.seek(start)
+
+    if is_pdf:
+        yield from _iter_pdf_pages(stream)
+    else:
+        yield from _decode_pages(_read_blocks(stream))
+
+
+def iter_pages(source: DocumentSource) -> Iterator[str]:
+    """
+    Extract text from a document one page at a time.
+
+    PDFs are read page by page with pypdf; anything else is decoded as
+    UTF-8 text with form feeds as page breaks. Only the current page is
+    held in memory.
+
+    Args:
+        source: File path, raw bytes or a binary file object
+
+    Raises:
+        DocumentError: If the document cannot be read
+    """
+    if isinstance(source, (str, Path)):
+        try:
+            stream = open(source, "rb")
+        except OSError as e:
+            raise DocumentError(f"Could not open document: {str(e)}")
+        with stream:
+            yield from _iter_stream_pages(stream)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield from _iter_stream_pages(io.BytesIO(source))
+    else:
+        yield from _iter_stream_pages(source)
+
+
+def _split_oversized(text: str, tokenizer: TokenCounter, max_tokens: int) -> Iterator[str]:
+    """Split text with no sentence boundaries into word runs of at most max_tokens"""
+    words = text.split()
+    piece: List[str] = []
+    tokens = 0
+    for word in words:
+        count = tokenizer.count(word) + 1
+        if piece and tokens + count > max_tokens:
+            yield " ".join(piece)
+            piece = []
+            tokens = 0
+        piece.append(word)
+        tokens += count
+    if piece:
+        yield " ".join(piece)
+
+
+def _iter_units(page: str, tokenizer: TokenCounter, max_tokens: int) -> Iterator[str]:
+    """Yield paragraphs, falling back to sentences and words for oversized ones"""
+    for paragraph in _PARAGRAPH.split(page):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if tokenizer.count(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE.split(paragraph):
+            if tokenizer.count(sentence) <= max_tokens:
+                yield sentence
+            else:
+                yield from _split_oversized(sentence, tokenizer, max_tokens)
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    tokenizer: Optional[TokenCounter] = None,
+    max_tokens: int = 3000
+) -> Iterator[Chunk]:
+    """
+    Group page text into chunks of at most `max_tokens` tokens.
+
+    Chunks break between paragraphs where possible, then between
+    sentences, and only split words apart for text with neither.
+    """
+    tokenizer = tokenizer or TokenCounter()
+    parts: List[str] = []
+    tokens = 0
+    first_page = last_page = 1
+    index = 0
+
+    for page_number, page in enumerate(pages, start=1):
+        for unit in _iter_units(page, tokenizer, max_tokens):
+            # Paragraph separator costs about one token
+            count = tokenizer.count(unit) + 1
+            if parts and tokens + count > max_tokens:
+                yield Chunk(index, "\n\n".join(parts), tokens, first_page, last_page)
+                index += 1
+                parts = []
+                tokens = 0
+            if not parts:
+                first_page = page_number
+            parts.append(unit)
+            tokens += count
+            last_page = page_number
+
+    if parts:
+        yield Chunk(index, "\n\n".join(parts), tokens, first_page, last_page)
+
+
+async def _passthrough(text: str) -> str:
+    return text
+
+
+def _result_key(action: str, model: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"doc:v{PROMPT_VERSION}:{action}:{model}:{digest}"
+
+
+class DocumentAnalyzer:
+    """
+    Runs analysis actions over documents as a map-reduce.
+
+    Each chunk is analyzed separately (map) with at most `max_concurrency`
+    Groq calls in flight, then the partial results are combined (reduce),
+    in several rounds if they do not fit one prompt. Map and reduce results
+    are stored in `result_store` keyed on the action, model and input text,
+    so re-running an action on an unchanged document makes no API calls and
+    an edited document only re-analyzes the chunks that changed.
+
+    Attributes:
+        groq_client: GroqClient used for completions
+        result_store: Cache for intermediate and final results
+        chunk_tokens: Maximum tokens per chunk
+        max_concurrency: Maximum concurrent Groq calls per document
+        max_tokens: Maximum tokens generated per call
+    """
+
+    def __init__(
+        self,
+        groq_client,
+        result_store: Optional[ResponseCache] = None,
+        chunk_tokens: int = 3000,
+        max_concurrency: int = 4,
+        max_tokens: int = 1024,
+        temperature: float = 0.3
+    ):
+        self.groq_client = groq_client
+        self.result_store = result_store or ResponseCache(ttl=30 * 24 * 3600)
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def chunk(self, source: DocumentSource) -> List[Chunk]:
+        """Extract and chunk a document"""
+        return list(chunk_pages(iter_pages(source), self.groq_client.tokenizer, self.chunk_tokens))
+
+    async def analyze(
+        self,
+        source: DocumentSource,
+        action: str = "summarize",
+        model: Optional[str] = None,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run an analysis action on a document.
+
+        Args:
+            source: File path, raw bytes or a binary file object
+            action: One of summarize, explain or quiz
+            model: Model identifier (client default if omitted)
+            progress: Called with the fraction of chunks analyzed so far
+
+        Returns:
+            Dict with the result and metadata (chunks, pages, calls made,
+            reused results and tokens used)
+
+        Raises:
+            DocumentError: If the action is unknown or the document is unreadable or empty
+            GroqAPIError: If a completion fails
+        """
+        prompts = ACTIONS.get(action)
+        if prompts is None:
+            raise DocumentError(f"Unknown document action: {action}")
+
+        # PDF parsing is CPU-bound, keep it off the event loop
+        chunks = await asyncio.to_thread(self.chunk, source)
+        if not chunks:
+            raise DocumentError("Document contains no extractable text")
+
+        completion_kwargs = {"model": model} if model else {}
+        model_name = model or "default"
+        stats = {"calls": 0, "reused": 0, "tokens_used": 0, "mapped": 0}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(instructions: str, text: str, stage: str) -> str:
+            key = _result_key(f"{action}:{stage}", model_name, text)
+            stored = await self.result_store.get(key)
+            if stored is not None:
+                stats["reused"] += 1
+                return stored["content"]
+
+            async with semaphore:
+                response = await self.groq_client.generate_completion(
+                    messages=[
+                        {"role": "system", "content": instructions},
+                        {"role": "user", "content": text}
+                    ],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    **completion_kwargs
+                )
+
+            content = response["choices"][0]["message"]["content"]
+            stats["calls"] += 1
+            stats["tokens_used"] += response.get("usage", {}).get("total_tokens", 0)
+            await self.result_store.set(key, {"content": content})
+            return content
+
+        async def run_map(chunk: Chunk) -> str:
+            content = await run(prompts["map"], chunk.text, "map")
+            stats["mapped"] += 1
+            if progress is not None:
+                # The reduce rounds are short next to the map, leave them the last tenth
+                progress(0.9 * stats["mapped"] / len(chunks))
+            return content
+
+        partials = await asyncio.gather(*(run_map(chunk) for chunk in chunks))
+        result = await self._reduce(list(partials), prompts["reduce"], run)
+
+        return {
+            "action": action,
+            "result": result,
+            "chunks": len(chunks),
+            "pages": chunks[-1].last_page,
+            "calls": stats["calls"],
+            "reused": stats["reused"],
+            "tokens_used": stats["tokens_used"]
+        }
+
+    async def _reduce(self, partials: List[str], instructions: str, run) -> str:
+        """Combine partial results in rounds of prompts that fit the chunk budget"""
+        tokenizer = self.groq_client.tokenizer
+        while len(partials) > 1:
+            groups: List[List[str]] = [[]]
+            tokens = 0
+            for partial in partials:
+                count = tokenizer.count(partial) + 1
+                if groups[-1] and tokens + count > self.chunk_tokens:
+                    groups.append([])
+                    tokens = 0
+                groups[-1].append(partial)
+                tokens += count
+
+            if len(groups) == len(partials):
+                # Partials too large to pair up, combine them two at a time
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+
+            partials = list(await asyncio.gather(*(
+                run(instructions, "\n\n---\n\n".join(group), "reduce")
+                if len(group) > 1 else _passthrough(group[0])
+                for group in groups
+            )))
+
+        return partials[0]
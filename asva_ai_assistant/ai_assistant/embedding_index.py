@@ -0,0 +1,542 @@
+"""
+Embedding Index
+CPU-only hashed n-gram embeddings and memory-mapped vector search per collection
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+import numpy as np
+
+from retrieval import Passage, collection_dirname
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingVectorizer:
+    """
+    Stateless text embedding from hashed word unigrams and bigrams.
+
+    Features are hashed with CRC32 into `dim` buckets with a sign bit,
+    weighted by sublinear term frequency and L2-normalized. No model or
+    vocabulary is needed, so vectors are stable across processes.
+
+    Attributes:
+        dim: Vector dimension
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def transform(self, text: str) -> np.ndarray:
+        """Embed one text as a float32 unit vector (all zeros for empty text)"""
+        words = _WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features),
+            dtype=np.uint32,
+            count=len(features)
+        )
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        counts = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        vector[:] = np.sign(counts) * np.log1p(np.abs(counts))
+
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def transform_many(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed texts as rows of a float32 matrix"""
+        rows = [self.transform(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
+
+
+class EmbeddingIndex:
+    """
+    Vector index for one collection (a user's or a college's documents).
+
+    Vectors live in a memory-mapped float32 file that grows by doubling;
+    chunk text and document ids live next to it in SQLite, and a chunk's
+    row is its position in the vector file. Rows are allocated under
+    SQLite's write lock and commits by other processes are picked up
+    before each search, so several processes can share one collection.
+    Deleted chunks are masked out of searches and dropped by `compact`,
+    which runs on its own once they make up `compact_ratio` of the rows.
+
+    Searches are exact (one matrix-vector product over all rows) until the
+    collection reaches `ivf_threshold` chunks. From then on an inverted
+    file index is trained: rows are clustered with spherical k-means and a
+    search only scores the `nprobe` clusters closest to the query.
+
+    Attributes:
+        path: Collection directory
+        dim: Vector dimension
+        ivf_threshold: Rows needed before the IVF index is used
+        nprobe: Clusters scanned per IVF search
+        compact_ratio: Share of deleted rows that triggers compaction (0 to disable)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = 256,
+        ivf_threshold: int = 100_000,
+        nprobe: int = 16,
+        compact_ratio: float = 0.25
+    ):
+        self.path = path
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+
+        self._conn = sqlite3.connect(
+            os.path.join(path, "chunks.db"), check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+            CREATE INDEX IF NOT EXISTS idx_chunks_deleted ON chunks (row) WHERE deleted = 1;
+            CREATE TABLE IF NOT EXISTS compaction (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                generation INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO compaction (id, generation) VALUES (0, 0);
+            """
+        )
+        self._conn.commit()
+
+        self._open_vectors(1024)
+        self._load()
+
+    def _open_vectors(self, capacity: int) -> None:
+        size = capacity * self.dim * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+            else:
+                capacity = f.tell() // (self.dim * 4)
+        self._capacity = capacity
+        self.vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(self._capacity * 2, needed)
+        self.vectors.flush()
+        del self.vectors
+        self._open_vectors(capacity)
+        alive = np.zeros(self._capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def _load(self) -> None:
+        """Rebuild the row state from SQLite, after opening or another process's compaction"""
+        self._generation = self._conn.execute("SELECT generation FROM compaction").fetchone()[0]
+        self.count = self.deleted = 0
+        self._alive = np.zeros(self._capacity, dtype=bool)
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_rows = 0
+        self._list_order: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self._sync()
+        self._load_ivf()
+
+    def _refresh(self) -> None:
+        """Sync if another connection committed since the last sync"""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._sync()
+
+    def _sync(self) -> None:
+        """Take in the rows committed since the last sync and mask deleted ones"""
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        generation = self._conn.execute("SELECT generation FROM compaction").fetchone()[0]
+        if generation != self._generation:
+            # Another process compacted the collection and renumbered the rows
+            self._load()
+            return
+
+        count = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        if count > self.count:
+            if count > self._capacity:
+                self._grow(count)
+            self._alive[self.count:count] = True
+            start, self.count = self.count, count
+            if self._centroids is not None:
+                self._assign_rows(start, count)
+
+        deleted = [row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE deleted = 1")]
+        self._alive[deleted] = False
+        self.deleted = len(deleted)
+
+    @property
+    def size(self) -> int:
+        """Number of live chunks"""
+        return self.count - self.deleted
+
+    def add(
+        self,
+        document_id: str,
+        source: str,
+        texts: List[str],
+        vectors: np.ndarray
+    ) -> None:
+        """
+        Append the chunks of a document.
+
+        Args:
+            document_id: Document the chunks belong to
+            source: Display name of the document
+            texts: Chunk texts, in document order
+            vectors: Unit vectors, one row per chunk
+        """
+        if not texts:
+            return
+
+        with self._lock:
+            with self._conn:
+                # No other process can claim rows until this commit, and the
+                # vectors are in the shared file before the rows are visible
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._sync()
+                start = self.count
+                end = start + len(texts)
+                if end > self._capacity:
+                    self._grow(end)
+
+                self.vectors[start:end] = vectors
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, document_id, chunk_index, source, text) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + i, document_id, i, source, text)
+                        for i, text in enumerate(texts)
+                    ]
+                )
+            self._alive[start:end] = True
+            self.count = end
+
+            if self._centroids is not None:
+                if self.count > 2 * self._trained_rows:
+                    self._train_ivf()
+                else:
+                    self._assign_rows(start, end)
+            elif self.size >= self.ivf_threshold:
+                self._train_ivf()
+
+    def delete(self, document_id: str) -> int:
+        """
+        Remove the chunks of a document.
+
+        Returns:
+            Number of chunks removed
+        """
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute(
+                    "UPDATE chunks SET deleted = 1 WHERE document_id = ? AND deleted = 0", (document_id,)
+                ).rowcount
+            if removed:
+                self._sync()
+                if self.compact_ratio and self.deleted > self.compact_ratio * self.count:
+                    self._compact()
+            return removed
+
+    def search(self, vector: np.ndarray, k: int = 4) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a unit vector.
+
+        Returns:
+            (row, cosine similarity) pairs, best first
+        """
+        if k <= 0:
+            return []
+
+        with self._lock:
+            self._refresh()
+            if self.size == 0:
+                return []
+            return self._search(vector, k)
+
+    def _search(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if self._centroids is not None:
+            rows = self._candidate_rows(vector)
+            scores = self.vectors[rows] @ vector
+        else:
+            rows = None
+            scores = self.vectors[:self.count] @ vector
+            if self.deleted:
+                scores[~self._alive[:self.count]] = -np.inf
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            if scores[i] == -np.inf:
+                break
+            row = int(rows[i]) if rows is not None else int(i)
+            results.append((row, float(scores[i])))
+        return results
+
+    def passages(self, hits: List[Tuple[int, float]]) -> List[Passage]:
+        """Load the chunk text for search results"""
+        if not hits:
+            return []
+        scores = dict(hits)
+        placeholders = ",".join("?" * len(hits))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT row, document_id, chunk_index, source, text FROM chunks "
+                f"WHERE row IN ({placeholders})",
+                list(scores)
+            ).fetchall()
+        by_row = {row[0]: row for row in rows}
+        return [
+            Passage(by_row[row][1], by_row[row][2], by_row[row][3], by_row[row][4], score)
+            for row, score in hits if row in by_row
+        ]
+
+    def _candidate_rows(self, vector: np.ndarray) -> np.ndarray:
+        if self._list_order is None:
+            assignments = self._assignments[:self.count]
+            self._list_order = np.argsort(assignments, kind="stable").astype(np.int64)
+            self._list_offsets = np.searchsorted(
+                assignments[self._list_order], np.arange(len(self._centroids) + 1)
+            )
+
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argpartition(-(self._centroids @ vector), nprobe - 1)[:nprobe]
+        rows = np.concatenate([
+            self._list_order[self._list_offsets[c]:self._list_offsets[c + 1]] for c in probes
+        ])
+        return rows[self._alive[rows]]
+
+    def _train_ivf(self, iterations: int = 8, seed: int = 0) -> None:
+        """Cluster the live rows with spherical k-means and assign every row"""
+        live = np.flatnonzero(self._alive[:self.count])
+        nlist = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+        sample = self.vectors[np.sort(rng.choice(live, min(len(live), nlist * 32), replace=False))]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+
+        self._centroids = centroids.astype(np.float32)
+        self._assignments = np.zeros(self._capacity, dtype=np.int32)
+        self._assign_rows(0, self.count)
+        self._trained_rows = self.count
+        self._save_ivf()
+        logger.info(f"Trained IVF index with {nlist} lists over {len(live)} chunks")
+
+    def _assign_rows(self, start: int, end: int, block: int = 65536) -> None:
+        if len(self._assignments) < self._capacity:
+            assignments = np.zeros(self._capacity, dtype=np.int32)
+            assignments[:len(self._assignments)] = self._assignments
+            self._assignments = assignments
+
+        for offset in range(start, end, block):
+            stop = min(offset + block, end)
+            scores = self.vectors[offset:stop] @ self._centroids.T
+            self._assignments[offset:stop] = np.argmax(scores, axis=1)
+        self._list_order = None
+
+    def _save_ivf(self) -> None:
+        np.savez(
+            self._ivf_path,
+            centroids=self._centroids,
+            assignments=self._assignments[:self.count],
+            trained_rows=self._trained_rows,
+            generation=self._generation
+        )
+
+    def _load_ivf(self) -> None:
+        if not os.path.exists(self._ivf_path):
+            return
+        data = np.load(self._ivf_path)
+        generation = int(data["generation"]) if "generation" in data.files else 0
+        if generation != self._generation:
+            # Written for rows that have since been renumbered
+            return
+        self._centroids = data["centroids"]
+        self._trained_rows = int(data["trained_rows"])
+        assignments = data["assignments"]
+        self._assignments = np.zeros(self._capacity, dtype=np.int32)
+        self._assignments[:len(assignments)] = assignments
+        if len(assignments) < self.count:
+            self._assign_rows(len(assignments), self.count)
+
+    def compact(self) -> None:
+        """Rewrite the collection without deleted chunks"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        with self._conn:
+            # No process can add rows while the vectors are moved, and the
+            # generation bump makes the others reload the renumbered rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._sync()
+            live = np.flatnonzero(self._alive[:self.count])
+            self._conn.execute("DELETE FROM chunks WHERE deleted = 1")
+            self._conn.execute("CREATE TEMP TABLE renumber (old INTEGER, new INTEGER)")
+            self._conn.executemany(
+                "INSERT INTO renumber VALUES (?, ?)",
+                ((int(old), new) for new, old in enumerate(live))
+            )
+            self._conn.execute(
+                "UPDATE chunks SET row = -1 - (SELECT new FROM renumber WHERE old = chunks.row)"
+            )
+            self._conn.execute("UPDATE chunks SET row = -1 - row")
+            self._conn.execute("DROP TABLE renumber")
+            self._conn.execute("UPDATE compaction SET generation = generation + 1")
+
+            self.vectors[:len(live)] = np.array(self.vectors[live])
+            if os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+
+        self._load()
+        if self.count >= self.ivf_threshold:
+            self._train_ivf()
+        logger.info(f"Compacted {self.path} to {self.count} chunks")
+
+    def flush(self) -> None:
+        """Write vectors and IVF assignments to disk"""
+        with self._lock:
+            self._refresh()
+            self.vectors.flush()
+            if self._centroids is not None:
+                self._save_ivf()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+class EmbeddingStore:
+    """
+    Embedding indexes for every collection under a root directory.
+
+    Collections are opened on first use and kept open. Searching a
+    collection that has never been written to returns nothing without
+    touching the disk.
+
+    Attributes:
+        root: Directory holding one subdirectory per collection
+        vectorizer: Text embedding
+    """
+
+    def __init__(
+        self,
+        root: str,
+        vectorizer: Optional[HashingVectorizer] = None,
+        ivf_threshold: int = 100_000,
+        nprobe: int = 16
+    ):
+        self.root = root
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._indexes: Dict[str, EmbeddingIndex] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, collection: str) -> str:
+        return os.path.join(self.root, collection_dirname(collection))
+
+    def get_index(self, collection: str, create: bool = True) -> Optional[EmbeddingIndex]:
+        """Open a collection's index"""
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is None:
+                path = self._path(collection)
+                if not create and not os.path.isdir(path):
+                    return None
+                index = EmbeddingIndex(
+                    path, self.vectorizer.dim, self.ivf_threshold, self.nprobe
+                )
+                self._indexes[collection] = index
+            return index
+
+    def add_document(self, collection: str, document_id: str, source: str, texts: List[str]) -> int:
+        """
+        Index the chunks of a document, replacing any previous version.
+
+        Returns:
+            Number of chunks indexed
+        """
+        index = self.get_index(collection)
+        index.delete(document_id)
+        index.add(document_id, source, texts, self.vectorizer.transform_many(texts))
+        return len(texts)
+
+    def delete_document(self, collection: str, document_id: str) -> int:
+        """Remove a document from a collection"""
+        index = self.get_index(collection, create=False)
+        return index.delete(document_id) if index else 0
+
+    def search(
+        self,
+        collection: str,
+        query: str,
+        k: int = 4,
+        min_score: float = 0.05
+    ) -> List[Passage]:
+        """Find the chunks of a collection most similar to a query"""
+        index = self.get_index(collection, create=False)
+        if index is None:
+            return []
+        hits = index.search(self.vectorizer.transform(query), k)
+        return index.passages([(row, score) for row, score in hits if score >= min_score])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get chunk counts per open collection"""
+        return {
+            name: {"chunks": index.size, "deleted": index.deleted, "ivf": index._centroids is not None}
+            for name, index in self._indexes.items()
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
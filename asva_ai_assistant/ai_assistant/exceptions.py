@@ -0,0 +1,29 @@
+"""
+Exceptions
+Errors raised by the Groq client, document analysis, background jobs and their helpers
+"""
+
+
+class GroqAPIError(Exception):
+    """Custom exception for Groq API errors"""
+    pass
+
+
+class RateLimitError(GroqAPIError):
+    """Rate limit exceeded"""
+    pass
+
+
+class CircuitOpenError(GroqAPIError):
+    """Model circuit is open, the request was not sent"""
+    pass
+
+
+class DocumentError(Exception):
+    """Document could not be read or analyzed"""
+    pass
+
+
+class JobError(Exception):
+    """Background job failed permanently and should not be retried"""
+    pass
@@ -4,24 +4,25 @@ Handles all interactions with Groq's fast inference API
 """
 
 import asyncio
+import time
 import httpx
 from typing import Optional, Dict, Any, AsyncIterator, List
 import logging
 from config.settings import settings
+from exceptions import GroqAPIError, RateLimitError, CircuitOpenError
+from tokenizer import TokenCounter, load_engine
+from response_cache import ResponseCache, create_response_cache, make_cache_key
+from singleflight import SingleFlight, StreamFanout, make_payload_key
+from rate_limiter import RateLimiter, RateLimit
+from transport import create_http_client
+from sse import iter_sse_data, extract_delta_content, extract_usage
+from metrics import record_stage
+from hedging import Hedger, CircuitBreaker
+import json_codec
 
 logger = logging.getLogger(__name__)
 
 
-class GroqAPIError(Exception):
-    """Custom exception for Groq API errors"""
-    pass
-
-
-class RateLimitError(GroqAPIError):
-    """Rate limit exceeded"""
-    pass
-
-
 class GroqClient:
     """
     Async client for Groq API with retry logic and streaming support.
@@ -31,6 +32,14 @@ class GroqClient:
         base_url: Groq API base URL
         timeout: Request timeout in seconds
         max_retries: Maximum number of retry attempts
+        tokenizer: Token counter used for budgeting and billing estimates
+        response_cache: Optional cache for non-streaming completions
+        coalesce: Share one upstream call between identical concurrent requests
+            (GROQ_COALESCE_REQUESTS if omitted)
+        rate_limiter: Proactive RPM/TPM and concurrency limiter
+        http_client: Shared pooled HTTP client (created from settings if omitted)
+        hedger: Sends backup requests for slow calls (created from settings if omitted)
+        circuit_breaker: Fails calls to unhealthy models fast (created from settings if omitted)
     """
 
     def __init__(
@@ -38,20 +47,74 @@ class GroqClient:
         api_key: str,
         base_url: str = "https://api.groq.com/openai/v1",
         timeout: int = 30,
-        max_retries: int = 3
+        max_retries: int = 3,
+        tokenizer: Optional[TokenCounter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        coalesce: Optional[bool] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        hedger: Optional[Hedger] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
     ):
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = timeout
         self.max_retries = max_retries
-        self.client = httpx.AsyncClient(
-            timeout=timeout,
-            http2=False,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
-        )
+        self.tokenizer = tokenizer or TokenCounter(load_engine(settings.GROQ_TOKENIZER_PATH))
+        self.response_cache = response_cache
+        if response_cache is None and settings.RESPONSE_CACHE_ENABLED:
+            self.response_cache = create_response_cache(
+                backend=settings.RESPONSE_CACHE_BACKEND,
+                path=settings.RESPONSE_CACHE_PATH,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+            )
+        self.coalesce = settings.GROQ_COALESCE_REQUESTS if coalesce is None else coalesce
+        self.idle_reserve = settings.GROQ_IDLE_RESERVE
+        self.rate_limiter = rate_limiter
+        if rate_limiter is None and settings.GROQ_RATE_LIMIT_ENABLED:
+            self.rate_limiter = RateLimiter(
+                requests_per_minute=settings.GROQ_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.GROQ_TOKENS_PER_MINUTE,
+                max_concurrency=settings.GROQ_MAX_CONCURRENCY,
+                max_wait=timeout
+            )
+        self.hedger = hedger
+        if hedger is None and settings.GROQ_HEDGE_ENABLED:
+            self.hedger = Hedger(
+                budget=settings.GROQ_HEDGE_BUDGET,
+                quantile=settings.GROQ_HEDGE_QUANTILE,
+                min_delay=settings.GROQ_HEDGE_MIN_DELAY
+            )
+        self.circuit_breaker = circuit_breaker
+        if circuit_breaker is None and settings.GROQ_CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breaker = CircuitBreaker(
+                failure_threshold=settings.GROQ_CIRCUIT_FAILURE_THRESHOLD,
+                slow_call=settings.GROQ_CIRCUIT_SLOW_CALL,
+                min_requests=settings.GROQ_CIRCUIT_MIN_REQUESTS,
+                cooldown=settings.GROQ_CIRCUIT_COOLDOWN
+            )
+        self._completion_flights = SingleFlight()
+        self._stream_fanout = StreamFanout()
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        self._owns_client = http_client is None
+        if http_client is None:
+            http_client = create_http_client(
+                headers=headers,
+                http2=settings.GROQ_HTTP2,
+                max_connections=settings.GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY,
+                connect_timeout=settings.GROQ_CONNECT_TIMEOUT,
+                read_timeout=timeout,
+                pool_timeout=settings.GROQ_POOL_TIMEOUT
+            )
+        else:
+            http_client.headers.update(headers)
+        self.client = http_client
 
     async def __aenter__(self):
         return self
@@ -61,16 +124,22 @@ class GroqClient:
 
     async def close(self):
         """Close the HTTP client"""
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
+        if self.response_cache:
+            self.response_cache.close()
 
     async def generate_completion(
         self,
         messages: List[Dict[str, str]],
-        model: str = settings.GROQ_MODEL,
+        model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2048,
         top_p: float = 1.0,
         stream: bool = False,
+        deadline: Optional[float] = None,
+        idle_only: bool = False,
+        attempt_timeout: Optional[float] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -78,20 +147,38 @@ class GroqClient:
 
         Args:
             messages: List of message dicts with 'role' and 'content'
-            model: Model identifier
+            model: Model identifier (GROQ_MODEL if omitted)
             temperature: Sampling temperature (0.0 to 2.0)
             max_tokens: Maximum tokens to generate
             top_p: Nucleus sampling parameter
             stream: Whether to stream the response
+            deadline: Monotonic time by which the request must be admitted
+                by the rate limiter (defaults to now + timeout)
+            idle_only: Only send the request if the rate limiter has idle
+                capacity, failing with RateLimitError instead of waiting
+            attempt_timeout: Seconds each upstream request may take once the
+                rate limiter has admitted it (unbounded if omitted)
             **kwargs: Additional parameters
 
         Returns:
-            Dict containing the completion response
+            Dict containing the completion response. Responses served from
+            the response cache carry `"cached": True`.
 
         Raises:
             GroqAPIError: If the API call fails
             RateLimitError: If rate limit is exceeded
+            CircuitOpenError: If the model's circuit is open
+            asyncio.TimeoutError: If an admitted request exceeds attempt_timeout
         """
+        model = model or settings.GROQ_MODEL
+        cache_key = None
+        if self.response_cache and not stream and not kwargs:
+            cache_key = make_cache_key(model, messages, temperature, max_tokens, top_p)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+
         payload = {
             "model": model,
             "messages": messages,
@@ -102,21 +189,92 @@ class GroqClient:
             **kwargs
         }
 
+        # Speculative calls may fail for lack of idle capacity, never make others wait on them
+        if not self.coalesce or idle_only:
+            return await self._send_completion(
+                payload, cache_key, deadline, idle_only, attempt_timeout
+            )
+
+        return await self._completion_flights.do(
+            make_payload_key(payload),
+            lambda: self._send_completion(payload, cache_key, deadline, idle_only, attempt_timeout)
+        )
+
+    async def _send_completion(
+        self,
+        payload: Dict[str, Any],
+        cache_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+        idle_only: bool = False,
+        attempt_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Send a completion request, hedged when a hedger is configured"""
+        if not self.hedger or idle_only:
+            return await self._request_completion(
+                payload, cache_key, deadline, idle_only, attempt_timeout
+            )
+
+        # Backups only use idle capacity, so hedging never queues regular requests
+        return await self.hedger.run(
+            payload["model"],
+            lambda backup: self._request_completion(
+                payload, cache_key, deadline, backup and self.rate_limiter is not None,
+                attempt_timeout
+            )
+        )
+
+    async def _request_completion(
+        self,
+        payload: Dict[str, Any],
+        cache_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+        idle_only: bool = False,
+        attempt_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Send a completion request with retries and store the result in the cache"""
+        model = payload["model"]
         for attempt in range(self.max_retries):
+            self._check_circuit(model)
+            rate_limit = await self._acquire_rate_limit(payload, deadline, idle_only)
             try:
-                response = await self.client.post(
+                sent_at = time.monotonic()
+                request = self.client.post(
                     f"{self.base_url}/chat/completions",
-                    json=payload
+                    content=json_codec.dumps(payload)
                 )
+                if attempt_timeout:
+                    # Started after admission, so time queued behind the
+                    # local rate limiter never counts against the model
+                    request = asyncio.wait_for(request, attempt_timeout)
+                response = await request
+                latency = time.monotonic() - sent_at
+                if not idle_only:
+                    record_stage("upstream", latency)
+
+                if self.rate_limiter:
+                    self.rate_limiter.update_from_headers(response.headers)
+                if self.circuit_breaker and response.status_code != 429:
+                    self.circuit_breaker.record(model, latency, ok=response.status_code < 500)
 
                 if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", 5))
+                    retry_after = float(response.headers.get("Retry-After", 5))
                     logger.warning(f"Rate limit hit, retrying after {retry_after}s")
-                    await asyncio.sleep(retry_after)
+                    if self.rate_limiter:
+                        self.rate_limiter.penalize(retry_after)
+                    else:
+                        await asyncio.sleep(retry_after)
                     continue
 
                 response.raise_for_status()
-                return response.json()
+                result = json_codec.loads(response.content)
+
+                if rate_limit:
+                    rate_limit.settle(result.get("usage", {}).get("total_tokens", 0))
+
+                if cache_key:
+                    await self.response_cache.set(cache_key, result)
+
+                return result
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 429:
@@ -131,20 +289,64 @@ class GroqClient:
 
             except httpx.RequestError as e:
                 logger.error(f"Request error: {str(e)}")
+                if self.circuit_breaker:
+                    self.circuit_breaker.record(model, ok=False)
                 if attempt == self.max_retries - 1:
                     raise GroqAPIError(f"Request failed after {self.max_retries} attempts")
                 await asyncio.sleep(2 ** attempt)
 
+            except asyncio.TimeoutError:
+                raise
+
             except Exception as e:
                 logger.exception("Unexpected error in Groq API call")
                 raise GroqAPIError(f"Unexpected error: {str(e)}")
 
+            finally:
+                if rate_limit:
+                    await rate_limit.release()
+
+        raise RateLimitError("Rate limit exceeded after retries")
+
+    def _check_circuit(self, model: str) -> None:
+        """Fail fast if the circuit breaker holds requests to a model back"""
+        if self.circuit_breaker and not self.circuit_breaker.allow(model):
+            raise CircuitOpenError(f"Circuit open for model {model}")
+
+    async def _acquire_rate_limit(
+        self,
+        payload: Dict[str, Any],
+        deadline: Optional[float] = None,
+        idle_only: bool = False
+    ) -> Optional[RateLimit]:
+        """Wait for rate limiter admission for a payload, if a limiter is configured"""
+        if not self.rate_limiter:
+            if idle_only:
+                raise RateLimitError("Idle capacity is unknown without a rate limiter")
+            return None
+
+        tokens = self.count_messages_tokens(payload["messages"]) + payload.get("max_tokens", 0)
+        if idle_only:
+            rate_limit = self.rate_limiter.try_acquire_idle(tokens, self.idle_reserve)
+            if rate_limit is None:
+                raise RateLimitError("No idle rate limit capacity")
+            return rate_limit
+
+        queued_at = time.monotonic()
+        rate_limit = await self.rate_limiter.acquire(
+            tokens,
+            deadline or queued_at + self.timeout
+        )
+        record_stage("rate_limit_queue", time.monotonic() - queued_at)
+        return rate_limit
+
     async def generate_streaming(
         self,
         messages: List[Dict[str, str]],
-        model: str = settings.GROQ_MODEL,
+        model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2048,
+        deadline: Optional[float] = None,
         **kwargs
     ) -> AsyncIterator[Dict[str, Any]]:
         """
@@ -152,9 +354,11 @@ class GroqClient:
 
         Args:
             messages: List of message dicts
-            model: Model identifier
+            model: Model identifier (GROQ_MODEL if omitted)
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            deadline: Monotonic time by which the request must be admitted
+                by the rate limiter (defaults to now + timeout)
             **kwargs: Additional parameters
 
         Yields:
@@ -162,9 +366,63 @@ class GroqClient:
 
         Raises:
             GroqAPIError: If the streaming fails
+            RateLimitError: If the rate limiter cannot admit the request in time
         """
         payload = {
-            "model": model,
+            "model": model or settings.GROQ_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            **kwargs
+        }
+
+        if not self.coalesce:
+            chunks = self._stream_chunks(payload, deadline)
+        else:
+            chunks = self._stream_fanout.subscribe(
+                make_payload_key(payload),
+                lambda: self._stream_chunks(payload, deadline)
+            )
+
+        async for chunk in chunks:
+            yield chunk
+
+    async def generate_streaming_text(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        deadline: Optional[float] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream only the generated text from the Groq API.
+
+        Fast path for relaying tokens: content deltas are cut out of the raw
+        SSE bytes and only chunks carrying usage are fully parsed.
+
+        Args:
+            messages: List of message dicts
+            model: Model identifier (GROQ_MODEL if omitted)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            deadline: Monotonic time by which the request must be admitted
+                by the rate limiter (defaults to now + timeout)
+            usage: Dict updated with the token usage reported by the API
+            **kwargs: Additional parameters
+
+        Yields:
+            Content delta strings
+
+        Raises:
+            GroqAPIError: If the streaming fails
+            RateLimitError: If the rate limiter cannot admit the request in time
+        """
+        payload = {
+            "model": model or settings.GROQ_MODEL,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
@@ -172,52 +430,171 @@ class GroqClient:
             **kwargs
         }
 
+        if not self.coalesce:
+            items = self._stream_text(payload, deadline)
+        else:
+            items = self._stream_fanout.subscribe(
+                "text:" + make_payload_key(payload),
+                lambda: self._stream_text(payload, deadline)
+            )
+
+        async for item in items:
+            if item.__class__ is str:
+                yield item
+            elif usage is not None:
+                usage.update(item)
+
+    async def _stream_chunks(
+        self,
+        payload: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream parsed completion chunks for a payload"""
+        async for data in self._upstream_events(payload, deadline):
+            try:
+                yield json_codec.loads(data)
+            except json_codec.JSONDecodeError:
+                logger.warning(f"Failed to parse streaming chunk: {data!r}")
+
+    async def _stream_text(
+        self,
+        payload: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Any]:
+        """Stream content deltas as str and token usage as a dict"""
+        async for data in self._upstream_events(payload, deadline):
+            text = data.decode("utf-8")
+            content = extract_delta_content(text)
+            if content:
+                yield content
+            else:
+                usage = extract_usage(text)
+                if usage:
+                    yield usage
+
+    async def _upstream_events(
+        self,
+        payload: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream the raw SSE payloads, hedging the request if its first event is slow"""
+        if not self.hedger:
+            async for data in self._stream_events(payload, deadline):
+                yield data
+            return
+
+        async def first_event(backup: bool):
+            events = self._stream_events(payload, deadline, backup and self.rate_limiter is not None)
+            try:
+                return events, await events.__anext__()
+            except StopAsyncIteration:
+                return events, None
+
+        events, first = await self.hedger.run(
+            payload["model"], first_event, lambda opened: opened[0].aclose()
+        )
+        try:
+            if first is None:
+                return
+            yield first
+            async for data in events:
+                yield data
+        finally:
+            await events.aclose()
+
+    async def _stream_events(
+        self,
+        payload: Dict[str, Any],
+        deadline: Optional[float] = None,
+        idle_only: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Stream the raw SSE `data:` payloads for a request from the Groq API"""
+        model = payload["model"]
+        self._check_circuit(model)
+        rate_limit = await self._acquire_rate_limit(payload, deadline, idle_only)
+        recorded = False
         try:
+            sent_at = time.monotonic()
             async with self.client.stream(
                 "POST",
                 f"{self.base_url}/chat/completions",
-                json=payload
+                content=json_codec.dumps(payload)
             ) as response:
-                response.raise_for_status()
+                if self.rate_limiter:
+                    self.rate_limiter.update_from_headers(response.headers)
+                    if response.status_code == 429:
+                        self.rate_limiter.penalize(
+                            float(response.headers.get("Retry-After", 5))
+                        )
+                if self.circuit_breaker and response.status_code >= 500:
+                    self.circuit_breaker.record(model, ok=False)
+                    recorded = True
 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
+                response.raise_for_status()
 
-                        if data.strip() == "[DONE]":
-                            break
+                last = None
+                async for data in iter_sse_data(response.aiter_bytes()):
+                    if not recorded and self.circuit_breaker:
+                        self.circuit_breaker.record(model, time.monotonic() - sent_at)
+                        recorded = True
+                    last = data
+                    yield data
 
-                        try:
-                            import json
-                            chunk = json.loads(data)
-                            yield chunk
-                        except json.JSONDecodeError:
-                            logger.warning(f"Failed to parse streaming chunk: {data}")
-                            continue
+                # Usage comes with the final chunk; refund what the reservation overestimated
+                if rate_limit and last is not None:
+                    usage = extract_usage(last.decode("utf-8"))
+                    if usage:
+                        rate_limit.settle(usage.get("total_tokens", 0))
 
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                raise RateLimitError("Rate limit exceeded while streaming")
             error_detail = self._extract_error_detail(e.response)
             raise GroqAPIError(f"Streaming failed: {error_detail}")
         except Exception as e:
             logger.exception("Error in streaming generation")
+            if not recorded and self.circuit_breaker:
+                self.circuit_breaker.record(model, ok=False)
             raise GroqAPIError(f"Streaming error: {str(e)}")
+        finally:
+            if rate_limit:
+                await rate_limit.release()
 
-    async def count_tokens(self, text: str, model: str = settings.GROQ_MODEL) -> int:
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
         """
-        Estimate token count for a given text.
+        Count tokens for a given text.
 
-        Note: This is an approximation. Actual token count may vary.
+        Uses the local tokenizer configured by GROQ_TOKENIZER_PATH, or the
+        built-in pre-tokenizer estimate when no tokenizer file is available.
 
         Args:
             text: Text to count tokens for
             model: Model to use for tokenization
 
         Returns:
-            Estimated token count
+            Token count
+        """
+        return self.tokenizer.count(text)
+
+    def count_messages_tokens(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None
+    ) -> int:
+        """
+        Count prompt tokens for a list of chat messages.
+
+        Includes the per-message chat-format overhead. Counts are cached per
+        message content, so repeated calls only pay for new messages.
+
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            model: Model to use for tokenization
+
+        Returns:
+            Prompt token count
         """
-        # Rough approximation: 1 token ≈ 4 characters
-        # For more accurate counting, integrate tiktoken or similar
-        return len(text) // 4
+        return self.tokenizer.count_messages(messages)
 
     def get_available_models(self) -> List[Dict[str, Any]]:
         """
@@ -253,10 +630,55 @@ class GroqClient:
             }
         ]
 
+    async def warm_up(self) -> bool:
+        """
+        Open a pooled connection to the Groq API ahead of the first request.
+
+        Lists the models, which costs no tokens, so the TLS handshake and
+        HTTP/2 setup are done before a student is waiting.
+
+        Returns:
+            True if the API answered, False otherwise
+        """
+        try:
+            response = await self.client.get(f"{self.base_url}/models")
+            logger.info(
+                f"Groq connection warmed up: status={response.status_code}, "
+                f"http_version={response.http_version}"
+            )
+            return response.status_code < 500
+        except Exception as e:
+            logger.warning(f"Groq warm-up failed: {str(e)}")
+            return False
+
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get request coalescing counters.
+
+        Returns:
+            Leader, coalesced and in-flight counts for completions and streams
+        """
+        return {
+            "completions": self._completion_flights.stats(),
+            "streams": self._stream_fanout.stats()
+        }
+
+    def get_upstream_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters and circuit breaker state.
+
+        Returns:
+            Hedge counts and delays (None when hedging is off) and the circuit per model
+        """
+        return {
+            "hedging": self.hedger.stats() if self.hedger else None,
+            "circuits": self.circuit_breaker.stats() if self.circuit_breaker else {}
+        }
+
     def _extract_error_detail(self, response: httpx.Response) -> str:
         """Extract error details from API response"""
         try:
-            error_data = response.json()
+            error_data = json_codec.loads(response.content)
             if "error" in error_data:
                 return error_data["error"].get("message", str(error_data))
             return str(error_data)
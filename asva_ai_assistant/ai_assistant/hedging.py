@@ -0,0 +1,289 @@
+"""
+Hedged Requests
+Backup requests for slow Groq calls and per-model circuit breaking
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Callable, Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _LatencyWindow:
+    """Recent latencies of a model with a cached quantile"""
+
+    __slots__ = ("samples", "quantile", "dirty")
+
+    def __init__(self, size: int):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.quantile: Optional[float] = None
+        self.dirty = False
+
+
+class Hedger:
+    """
+    Sends a backup request when the first one is slower than usual.
+
+    The hedge delay is a high quantile (p95 by default) of the recent
+    latencies of the model, so only the slowest few percent of requests are
+    hedged. Hedges are paid for from a budget that earns `budget` credits
+    per request, which caps them at that share of the traffic; the first
+    response wins and the other request is cancelled.
+
+    Attributes:
+        budget: Maximum hedges per request, e.g. 0.05 for 5% extra requests
+        quantile: Latency quantile used as the hedge delay
+        min_delay: Lower bound for the hedge delay in seconds
+        min_samples: Latencies needed for a model before it is hedged
+        window: Latencies kept per model
+        max_credit: Hedges that can be saved up for a burst of slow requests
+    """
+
+    def __init__(
+            self,
+            budget: float = 0.05,
+            quantile: float = 0.95,
+            min_delay: float = 0.1,
+            min_samples: int = 20,
+            window: int = 200,
+            max_credit: float = 5.0
+    ):
+        self.budget = budget
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.max_credit = max_credit
+        self.credit = 0.0
+        self._latencies: Dict[str, _LatencyWindow] = {}
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+    def observe(self, model: str, latency: float) -> None:
+        """Record how long a request to a model took (or has taken so far, if it lost)"""
+        latencies = self._latencies.get(model)
+        if latencies is None:
+            latencies = self._latencies[model] = _LatencyWindow(self.window)
+        latencies.samples.append(latency)
+        latencies.dirty = True
+
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to a model, None while there is too little data"""
+        latencies = self._latencies.get(model)
+        if latencies is None or len(latencies.samples) < self.min_samples:
+            return None
+        if latencies.dirty:
+            ordered = sorted(latencies.samples)
+            latencies.quantile = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+            latencies.dirty = False
+        return max(latencies.quantile, self.min_delay)
+
+    def _try_spend(self) -> bool:
+        if self.credit >= 1.0:
+            self.credit -= 1.0
+            return True
+        self.skipped += 1
+        return False
+
+    async def run(
+            self,
+            model: str,
+            call: Callable[[bool], Awaitable[T]],
+            discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """
+        Run a request, hedging it if it is slow.
+
+        Args:
+            model: Model the request goes to
+            call: Coroutine factory for the request; called with True for the backup
+            discard: Cleanup for the result of a request that finished but lost
+
+        Returns:
+            Result of the first request to succeed
+
+        Raises:
+            The primary request's exception if every request failed
+        """
+        self.requests += 1
+        self.credit = min(self.max_credit, self.credit + self.budget)
+        delay = self.delay(model)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call(False))
+        tasks = [primary]
+        winner = None
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done() and self._try_spend():
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(call(True)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary when both finished in the same iteration
+                for task in tasks:
+                    if task in done and not task.cancelled() and task.exception() is None:
+                        winner = task
+                        break
+                if winner is not None:
+                    break
+
+            if winner is None:
+                raise primary.exception()
+            if winner is not primary:
+                self.hedge_wins += 1
+            return winner.result()
+
+        finally:
+            if winner is primary or not primary.done():
+                # A cancelled primary still tells how slow the model was
+                self.observe(model, time.monotonic() - started)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled() and task.exception() is None and discard:
+                    await discard(task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hedge counts and the current hedge delay per model"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped_for_budget": self.skipped,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "delay_ms": {
+                model: 1000 * delay
+                for model, delay in ((m, self.delay(m)) for m in self._latencies)
+                if delay is not None
+            }
+        }
+
+
+class _Circuit:
+    __slots__ = ("outcomes", "state", "opened_at", "rejected", "trips")
+
+    def __init__(self, size: int):
+        self.outcomes: Deque[bool] = deque(maxlen=size)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+
+
+class CircuitBreaker:
+    """
+    Fails requests to an unhealthy model fast instead of letting them time out.
+
+    Each model has a circuit over its last `window` calls, where an error or
+    a call slower than `slow_call` counts as a failure. Once at least
+    `min_requests` calls were seen and the failure share reaches
+    `failure_threshold`, the circuit opens and requests are rejected for
+    `cooldown` seconds. After that one probe request is let through
+    (half-open): success closes the circuit, failure opens it again. A probe
+    that never reports back is repeated after another cooldown.
+
+    Attributes:
+        failure_threshold: Failure share that opens the circuit
+        slow_call: Seconds after which a successful call counts as a failure
+        min_requests: Calls needed before the circuit can open
+        window: Calls considered per model
+        cooldown: Seconds an open circuit rejects requests before probing
+    """
+
+    def __init__(
+            self,
+            failure_threshold: float = 0.5,
+            slow_call: float = 15.0,
+            min_requests: int = 10,
+            window: int = 20,
+            cooldown: float = 30.0
+    ):
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _get_circuit(self, model: str) -> _Circuit:
+        circuit = self._circuits.get(model)
+        if circuit is None:
+            circuit = self._circuits[model] = _Circuit(self.window)
+        return circuit
+
+    def allow(self, model: str) -> bool:
+        """Check whether a request to a model may be sent now"""
+        circuit = self._circuits.get(model)
+        if circuit is None or circuit.state == "closed":
+            return True
+        now = time.monotonic()
+        if now - circuit.opened_at >= self.cooldown:
+            circuit.state = "half_open"
+            circuit.opened_at = now
+            return True
+        circuit.rejected += 1
+        return False
+
+    def record(self, model: str, latency: Optional[float] = None, ok: bool = True) -> None:
+        """
+        Record the outcome of a call to a model.
+
+        Args:
+            model: Model that was called
+            latency: Seconds until the response (or first token) arrived
+            ok: False when the call failed
+        """
+        circuit = self._get_circuit(model)
+        failed = not ok or (latency is not None and latency > self.slow_call)
+
+        if circuit.state == "half_open":
+            if failed:
+                self._open(model, circuit)
+            else:
+                circuit.state = "closed"
+                circuit.outcomes.clear()
+                logger.info(f"Circuit for {model} closed")
+            return
+
+        circuit.outcomes.append(failed)
+        if (
+            circuit.state == "closed"
+            and len(circuit.outcomes) >= self.min_requests
+            and sum(circuit.outcomes) >= self.failure_threshold * len(circuit.outcomes)
+        ):
+            self._open(model, circuit)
+
+    def _open(self, model: str, circuit: _Circuit) -> None:
+        circuit.state = "open"
+        circuit.opened_at = time.monotonic()
+        circuit.trips += 1
+        logger.warning(f"Circuit for {model} opened for {self.cooldown}s")
+
+    def state(self, model: str) -> str:
+        """Get "closed", "open" or "half_open" for a model"""
+        circuit = self._circuits.get(model)
+        return circuit.state if circuit else "closed"
+
+    def stats(self) -> Dict[str, Any]:
+        """Get circuit state, recent failure share and rejections per model"""
+        return {
+            model: {
+                "state": c.state,
+                "failure_rate": sum(c.outcomes) / len(c.outcomes) if c.outcomes else 0.0,
+                "trips": c.trips,
+                "rejected": c.rejected
+            }
+            for model, c in self._circuits.items()
+        }
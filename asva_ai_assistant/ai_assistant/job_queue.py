@@ -0,0 +1,424 @@
+"""
+Job Queue
+Persistent priority queue running long assistant tasks in the background
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+
+from exceptions import JobError
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BATCH = 10
+
+
+class JobStatus(str, Enum):
+    """ Lifecycle of a background job """
+    QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+        "queued", "running", "succeeded", "failed", "cancelled"
+    )
+
+
+_FINISHED = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+
+
+class Job:
+    """
+    A claimed job handed to its handler.
+
+    Attributes:
+        id: Job identifier
+        kind: Handler name
+        payload: JSON arguments given on submit
+        attachment: Optional binary input, e.g. an uploaded document
+        priority: Queue priority, lower runs first
+        attempts: Attempts so far, including this one
+    """
+
+    __slots__ = ("id", "kind", "payload", "attachment", "priority", "attempts", "_queue", "_reported")
+
+    def __init__(
+            self,
+            queue: "JobQueue",
+            id: str,
+            kind: str,
+            payload: Dict[str, Any],
+            attachment: Optional[bytes],
+            priority: int,
+            attempts: int
+    ):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attachment = attachment
+        self.priority = priority
+        self.attempts = attempts
+        self._queue = queue
+        self._reported = 0.0
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """Record progress between 0 and 1, written at most every progress_interval"""
+        now = time.monotonic()
+        if now - self._reported < self._queue.progress_interval and fraction < 1.0:
+            return
+        self._reported = now
+        self._queue._set_progress(self.id, min(max(fraction, 0.0), 1.0), message)
+
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """
+    Asyncio worker pool over a SQLite job table.
+
+    Several processes may share the database. A claimed job is leased to
+    its queue (`claimed_by`, `lease_until`) and the lease is renewed every
+    third of `lease` while the job runs; jobs whose lease expired, because
+    their process died, are queued again. Jobs running under a live lease
+    are left alone. Workers claim the queued job with the lowest priority
+    value, so interactive work is dispatched before batch work, and the
+    first `reserved` workers only take interactive jobs so a full batch
+    backlog never delays them. Failed attempts are retried with exponential
+    backoff unless the handler raises JobError. Results go to a TTL result
+    store; finished rows are purged after `job_ttl`.
+
+    Attributes:
+        path: Database file path
+        result_store: Store for job results
+        concurrency: Number of workers
+        reserved: Workers kept for interactive jobs
+        max_attempts: Default attempts per job
+        retry_backoff: Delay before the first retry, doubled on each attempt
+        lease: Seconds a claimed job stays owned by this queue without a heartbeat
+        worker_id: Owner recorded on the jobs this queue claims
+    """
+
+    def __init__(
+            self,
+            path: str,
+            result_store: ResponseCache,
+            concurrency: int = 4,
+            reserved: int = 1,
+            max_attempts: int = 3,
+            retry_backoff: float = 2.0,
+            max_backoff: float = 300.0,
+            poll_interval: float = 1.0,
+            progress_interval: float = 0.5,
+            job_ttl: float = 24 * 3600,
+            lease: float = 60.0
+    ):
+        self.path = path
+        self.result_store = result_store
+        self.concurrency = concurrency
+        self.reserved = min(reserved, concurrency - 1) if concurrency > 1 else 0
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.job_ttl = job_ttl
+        self.lease = lease
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._purged_at = 0.0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attachment BLOB,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                claimed_by TEXT,
+                lease_until REAL
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("claimed_by", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, run_at, seq)"
+        )
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that runs jobs of a kind"""
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Requeue jobs with expired leases and start the workers"""
+        if self._workers:
+            return
+        await asyncio.to_thread(self._recover)
+        self._workers = [
+            asyncio.create_task(self._worker(PRIORITY_INTERACTIVE if i < self.reserved else None))
+            for i in range(self.concurrency)
+        ]
+        self._heartbeat = asyncio.create_task(self._keep_leases())
+
+    async def submit(
+            self,
+            kind: str,
+            payload: Dict[str, Any],
+            priority: int = PRIORITY_NORMAL,
+            attachment: Optional[bytes] = None,
+            max_attempts: Optional[int] = None
+    ) -> str:
+        """
+        Queue a job.
+
+        Returns:
+            Job ID
+        """
+        if kind not in self._handlers:
+            raise JobError(f"Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        row = (
+            job_id, kind, json.dumps(payload), attachment, priority, JobStatus.QUEUED.value,
+            max_attempts or self.max_attempts, now, now, now
+        )
+        await asyncio.to_thread(self._execute, (
+            "INSERT INTO jobs (id, kind, payload, attachment, priority, status, max_attempts, "
+            "run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        ), row)
+        self._wakeup.set()
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the status and progress of a job"""
+        row = await asyncio.to_thread(self._fetchone, (
+            "SELECT id, kind, status, priority, progress, message, attempts, max_attempts, "
+            "error, created_at, updated_at FROM jobs WHERE id = ?"
+        ), (job_id,))
+        if row is None:
+            return None
+        keys = (
+            "job_id", "kind", "status", "priority", "progress", "message", "attempts",
+            "max_attempts", "error", "created_at", "updated_at"
+        )
+        return dict(zip(keys, row))
+
+    async def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the result of a succeeded job, None if unknown or expired"""
+        return await self.result_store.get(self._result_key(job_id))
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started.
+
+        Returns:
+            Whether the job was cancelled
+        """
+        changed = await asyncio.to_thread(self._execute, (
+            "UPDATE jobs SET status = ?, attachment = NULL, updated_at = ? "
+            "WHERE id = ? AND status = ?"
+        ), (JobStatus.CANCELLED.value, time.time(), job_id, JobStatus.QUEUED.value))
+        return changed > 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job counts per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"workers": len(self._workers), **dict(rows)}
+
+    @staticmethod
+    def _result_key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetchone(self, sql: str, params: tuple):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _recover(self) -> None:
+        """Queue again the running jobs whose owner stopped renewing the lease"""
+        now = time.time()
+        changed = self._execute(
+            "UPDATE jobs SET status = ?, claimed_by = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+            (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now)
+        )
+        if changed:
+            logger.info(f"Requeued {changed} interrupted jobs")
+
+    def _renew(self) -> None:
+        self._execute(
+            "UPDATE jobs SET lease_until = ? WHERE status = ? AND claimed_by = ?",
+            (time.time() + self.lease, JobStatus.RUNNING.value, self.worker_id)
+        )
+
+    async def _keep_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await asyncio.to_thread(self._renew)
+                await asyncio.to_thread(self._recover)
+            except Exception as e:
+                logger.error(f"Job lease renewal error: {str(e)}", exc_info=True)
+
+    def _claim(self, max_priority: Optional[int]) -> Optional[Job]:
+        """Atomically move the next runnable job to running"""
+        now = time.time()
+        limit = max_priority if max_priority is not None else 2 ** 31
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so workers in other
+            # processes sharing the database never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, attachment, priority, attempts FROM jobs "
+                    "WHERE status = ? AND priority <= ? AND run_at <= ? "
+                    "ORDER BY priority, run_at, seq LIMIT 1",
+                    (JobStatus.QUEUED.value, limit, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, claimed_by = ?, "
+                        "lease_until = ?, updated_at = ? WHERE id = ?",
+                        (JobStatus.RUNNING.value, self.worker_id, now + self.lease, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        job_id, kind, payload, attachment, priority, attempts = row
+        return Job(self, job_id, kind, json.loads(payload), attachment, priority, attempts + 1)
+
+    def _set_progress(self, job_id: str, progress: float, message: Optional[str]) -> None:
+        self._execute(
+            "UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = ? WHERE id = ?",
+            (progress, message, time.time(), job_id)
+        )
+
+    def _purge(self) -> None:
+        now = time.time()
+        if now - self._purged_at < 60:
+            return
+        self._purged_at = now
+        self._execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(_FINISHED))}) AND updated_at < ?",
+            (*_FINISHED, now - self.job_ttl)
+        )
+
+    async def _worker(self, max_priority: Optional[int]) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim, max_priority)
+                if job is None:
+                    # Clear before the second look so a submit in between is not missed
+                    self._wakeup.clear()
+                    job = await asyncio.to_thread(self._claim, max_priority)
+                if job is None:
+                    await asyncio.to_thread(self._purge)
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run(job)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: Job) -> None:
+        handler = self._handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise JobError(f"No handler registered for job kind '{job.kind}'")
+            result = await handler(job)
+            await self.result_store.set(self._result_key(job.id), result)
+
+        except asyncio.CancelledError:
+            # Shutting down, the next start runs the job again
+            await asyncio.to_thread(self._execute, (
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, claimed_by = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?"
+            ), (JobStatus.QUEUED.value, time.time(), job.id, self.worker_id))
+            raise
+
+        except Exception as e:
+            row = await asyncio.to_thread(
+                self._fetchone, "SELECT max_attempts FROM jobs WHERE id = ?", (job.id,)
+            )
+            retry = not isinstance(e, JobError) and row is not None and job.attempts < row[0]
+            now = time.time()
+            if retry:
+                delay = min(self.max_backoff, self.retry_backoff * 2 ** (job.attempts - 1))
+                delay *= random.uniform(0.8, 1.2)
+                logger.warning(
+                    f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, "
+                    f"retrying in {delay:.1f}s: {str(e)}"
+                )
+                await asyncio.to_thread(self._execute, (
+                    "UPDATE jobs SET status = ?, run_at = ?, error = ?, claimed_by = NULL, "
+                    "lease_until = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?"
+                ), (JobStatus.QUEUED.value, now + delay, str(e), now, job.id, self.worker_id))
+            else:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                await asyncio.to_thread(self._execute, (
+                    "UPDATE jobs SET status = ?, error = ?, attachment = NULL, lease_until = NULL, "
+                    "updated_at = ? WHERE id = ? AND claimed_by = ?"
+                ), (JobStatus.FAILED.value, str(e), now, job.id, self.worker_id))
+            return
+
+        await asyncio.to_thread(self._execute, (
+            "UPDATE jobs SET status = ?, progress = 1, error = NULL, attachment = NULL, lease_until = NULL, "
+            "updated_at = ? WHERE id = ? AND claimed_by = ?"
+        ), (JobStatus.SUCCEEDED.value, time.time(), job.id, self.worker_id))
+
+    async def close(self) -> None:
+        """Stop the workers; running jobs are queued again for the next start"""
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+        with self._lock:
+            self._conn.close()
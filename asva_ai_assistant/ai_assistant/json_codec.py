@@ -0,0 +1,103 @@
+"""
+JSON Codec
+JSON encoding and decoding for the Groq client and the API, using orjson when it is installed
+
+Both backends produce compact UTF-8 bytes (no spaces, non-ASCII left as
+is) and agree on ordinary payloads, but not at the edges: orjson writes
+1e16 as `1e16` where json writes `1e+16`, encodes NaN and Infinity as
+`null`, and raises TypeError for integers beyond 64 bits. Encodings that
+are hashed or persisted, such as cache keys, use `canonical_dumps`, which
+is always the standard library. Callers go through the module
+(`json_codec.dumps(...)`) rather than importing the functions, so `use()`
+takes effect everywhere.
+"""
+
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    """Encode types that neither backend handles on its own"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(
+        obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys, default=_default
+    ).encode("utf-8")
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    _orjson_loads = orjson.loads
+
+
+# Installed backends, fastest first
+BACKENDS: Dict[str, Tuple[Callable[..., bytes], Callable[[Union[bytes, str]], Any]]] = {}
+if orjson is not None:
+    BACKENDS["orjson"] = (_orjson_dumps, _orjson_loads)
+BACKENDS["json"] = (_json_dumps, _json_loads)
+
+backend = ""
+dumps: Callable[..., bytes]
+loads: Callable[[Union[bytes, str]], Any]
+
+
+def use(name: Optional[str] = None) -> str:
+    """
+    Select the JSON backend.
+
+    Args:
+        name: "orjson" or "json"; the fastest installed backend if omitted
+
+    Returns:
+        The name of the backend in use
+    """
+    global backend, dumps, loads
+    if name is None:
+        name = next(iter(BACKENDS))
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available (have {', '.join(BACKENDS)})")
+    backend = name
+    dumps, loads = BACKENDS[name]
+    return name
+
+
+use()
+
+
+def canonical_dumps(obj: Any) -> bytes:
+    """Encode with sorted keys using the standard library, whichever backend is in use"""
+    return _json_dumps(obj, sort_keys=True)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode to a str, for text protocols such as SSE frames"""
+    return dumps(obj).decode("utf-8")
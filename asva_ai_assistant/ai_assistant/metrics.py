@@ -0,0 +1,296 @@
+"""
+Metrics
+Lightweight histograms, counters and gauges rendered in the Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Tuple, Sequence, Iterator
+
+# Seconds, from a fast cache hit to a long generation
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+TOKEN_RATE_BUCKETS = (10, 25, 50, 100, 200, 400, 800, 1600, 3200)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, *labels: str) -> None:
+        self.inc(-amount, *labels)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Bucketed distribution per label set.
+
+    Each label set holds one count per bucket, a running sum and a total,
+    so an observation is a bisect and three additions.
+    """
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            labels: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record a value for a label set, given in the order of `labels`"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # bucket counts, then sum and count
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, *labels: str) -> Optional[Dict[str, float]]:
+        """Get the count and sum of a label set"""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                return None
+            return {"count": series[-1], "sum": series[-2]}
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            series_list = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in series_list:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = _format_labels(self.labels, labels, f'le="{_format_number(float(bound))}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{label_text} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered together for scraping"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labels != metric.labels:
+                raise ValueError(f"Metric {metric.name} is already registered differently")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            labels: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "asva_stage_duration_seconds",
+    "Time spent in each stage of a chat request",
+    ("stage", "mode", "model", "status")
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "asva_http_request_duration_seconds",
+    "Time until the response headers are sent",
+    ("method", "route", "status")
+)
+STREAM_TOKENS_PER_SECOND = registry.histogram(
+    "asva_stream_tokens_per_second",
+    "Completion tokens per second after the first token of a stream",
+    ("mode", "model"),
+    buckets=TOKEN_RATE_BUCKETS
+)
+STREAMS_IN_FLIGHT = registry.gauge(
+    "asva_streams_in_flight",
+    "Streaming chat responses currently open",
+    ("mode",)
+)
+STREAM_DISCONNECTS = registry.counter(
+    "asva_stream_disconnects_total",
+    "Streams cut short because the client disconnected",
+    ("mode",)
+)
+STREAM_TOKENS_SAVED = registry.counter(
+    "asva_stream_tokens_saved_total",
+    "Response tokens left ungenerated after a disconnect (max_tokens minus tokens relayed)",
+    ("mode",)
+)
+
+
+class StageTimer:
+    """
+    Collects the stage durations of one request.
+
+    Durations are kept until finish(), so every stage is labeled with the
+    mode, model and status known at the end of the request. The timer is
+    made current with `activate` so lower layers (the Groq client) can add
+    stages without it being passed down.
+
+    Attributes:
+        mode: Learning mode label
+        model: Model label, usually set once the model is known
+    """
+
+    __slots__ = ("mode", "model", "stages", "_done", "_histogram")
+
+    def __init__(self, mode: str = "", model: str = "", histogram: Histogram = STAGE_SECONDS):
+        self.mode = mode
+        self.model = model
+        self.stages: List[Tuple[str, float]] = []
+        self._done = False
+        self._histogram = histogram
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Record the duration of a stage"""
+        if not self._done:
+            self.stages.append((stage, seconds))
+
+    def stage(self, stage: str) -> "_Stage":
+        """Time the enclosed `with` block as a stage"""
+        return _Stage(self, stage)
+
+    def finish(self, status: str = "ok") -> None:
+        """Observe the collected stages, once"""
+        if self._done:
+            return
+        self._done = True
+        for stage, seconds in self.stages:
+            self._histogram.observe(seconds, stage, self.mode, self.model or "unknown", status)
+
+
+class _Stage:
+    # A plain class rather than @contextmanager, which costs a generator per stage
+    __slots__ = ("timer", "stage", "start")
+
+    def __init__(self, timer: StageTimer, stage: str):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.start = time.monotonic()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.timer.add(self.stage, time.monotonic() - self.start)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+def current_timer() -> Optional[StageTimer]:
+    """Get the timer of the request being served, if any"""
+    return _current_timer.get()
+
+
+@contextmanager
+def activate(timer: Optional[StageTimer]) -> Iterator[Optional[StageTimer]]:
+    """Make a timer current for the enclosed block"""
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        try:
+            _current_timer.reset(token)
+        except ValueError:
+            # An abandoned stream finalized from another context, which never saw the timer
+            pass
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add a stage to the current request's timer, if one is active"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(stage, seconds)
@@ -2,9 +2,24 @@
 Mode handler implements socratic, explainer and inventor learning modes
 """
 
-from typing import Optional, List, Dict, Any
+from typing import (
+    Optional, List, Dict, Any, Mapping, NamedTuple, Tuple, Sequence, AsyncIterator, Callable
+)
+from types import MappingProxyType
 from enum import Enum
+import asyncio
+import hashlib
+import itertools
 import logging
+import time
+import uuid
+
+from context_window import ContextWindowBuilder
+from exceptions import GroqAPIError
+from metrics import current_timer
+from prompt_cache import PromptCacheStats, cached_prompt_tokens
+from retrieval import Passage, select_passages, format_passages
+from tokenizer import TokenCounter
 
 logger = logging.getLogger(__name__)
 
@@ -25,23 +40,8 @@ class ProjectType(str, Enum):
     HARDWARE, GENERAL = 'hardware', 'general'
 
 
-class ModeHandler:
-    """
-    Handles different learning modes and generates appropriate prompts.
-
-    Each mode has a specific pedagogical approach:
-    - Socratic: Questions and guided discovery
-    - Inventor: Project-based practical application
-    - Explainer: Multi-level conceptual breakdown
-    """
-
-    def __init__(self):
-        self.mode_prompts = self._initialize_prompts()
-
-    def _initialize_prompts(self) -> Dict[str, str]:
-        """Initialize system prompts for each mode"""
-        return {
-            LearningMode.SOCRATIC: """You are a Socratic tutor focused on developing critical thinking through guided questioning. 
+MODE_PROMPTS: Mapping[LearningMode, str] = MappingProxyType({
+    LearningMode.SOCRATIC: """You are a Socratic tutor focused on developing critical thinking through guided questioning. 
 
 Your approach:
 1. Never give direct answers - instead, ask questions that lead to discovery
@@ -58,7 +58,7 @@ Guidelines:
 - Connect concepts to real-world scenarios
 - Encourage metacognition (thinking about thinking)""",
 
-            LearningMode.INVENTOR: """You are an innovation coach who transforms academic concepts into practical projects and prototypes.
+    LearningMode.INVENTOR: """You are an innovation coach who transforms academic concepts into practical projects and prototypes.
 
 Your approach:
 1. Take theoretical concepts and show real-world applications
@@ -76,7 +76,7 @@ Guidelines:
 - Think iteratively (MVP → full product)
 - Connect to industry practices""",
 
-            LearningMode.EXPLAINER: """You are an expert educator who makes complex topics accessible through clear, multi-level explanations.
+    LearningMode.EXPLAINER: """You are an expert educator who makes complex topics accessible through clear, multi-level explanations.
 
 Your approach:
 1. Break concepts into fundamental components
@@ -94,7 +94,7 @@ Guidelines:
 - Check for understanding with clarifying questions
 - Make connections between related concepts""",
 
-            LearningMode.DEFAULT: """You are a knowledgeable AI assistant for students at Afe Babalola University.
+    LearningMode.DEFAULT: """You are a knowledgeable AI assistant for students at Afe Babalola University.
 
 Your approach:
 1. Provide clear, accurate information
@@ -109,47 +109,10 @@ Guidelines:
 - Offer to explain further or try different modes
 - Support academic integrity
 - Be concise unless detail is requested"""
-        }
+})
 
-    def get_system_prompt(
-            self,
-            mode: LearningMode,
-            complexity_level: Optional[ComplexityLevel] = None,
-            project_type: Optional[ProjectType] = None,
-            additional_context: Optional[str] = None
-    ) -> str:
-        """
-        Get the system prompt for a specific mode with customizations.
-
-        Args:
-            mode: Learning mode to use
-            complexity_level: For Explainer mode
-            project_type: For Inventor mode
-            additional_context: Extra context to add
-
-        Returns:
-            Complete system prompt
-        """
-        base_prompt = self.mode_prompts.get(mode, self.mode_prompts[LearningMode.DEFAULT])
-
-        # Add mode-specific customizations
-        if mode == LearningMode.EXPLAINER and complexity_level:
-            base_prompt += f"\n\nCurrent complexity level: {complexity_level.value}"
-            base_prompt += self._get_complexity_guidance(complexity_level)
-
-        if mode == LearningMode.INVENTOR and project_type:
-            base_prompt += f"\n\nProject type focus: {project_type.value}"
-            base_prompt += self._get_project_type_guidance(project_type)
-
-        if additional_context:
-            base_prompt += f"\n\nAdditional context: {additional_context}"
-
-        return base_prompt
-
-    def _get_complexity_guidance(self, level: ComplexityLevel) -> str:
-        """Get guidance for specific complexity levels"""
-        guidance = {
-            ComplexityLevel.BEGINNER: """
+COMPLEXITY_GUIDANCE: Mapping[ComplexityLevel, str] = MappingProxyType({
+    ComplexityLevel.BEGINNER: """
 - Use simple language and avoid jargon
 - Provide lots of analogies and examples
 - Focus on intuition over technical details
@@ -157,45 +120,333 @@ Guidelines:
 - Repeat key concepts
 - Use everyday scenarios""",
 
-            ComplexityLevel.INTERMEDIATE: """
+    ComplexityLevel.INTERMEDIATE: """
 - Introduce some technical terminology with explanations
 - Balance intuition with technical accuracy
 - Provide more complex examples
 - Connect to broader theoretical frameworks
 - Assume basic foundational knowledge""",
 
-            ComplexityLevel.ADVANCE: """
+    ComplexityLevel.ADVANCE: """
 - Use technical terminology appropriately
 - Discuss edge cases and nuances
 - Reference academic literature
 - Explore theoretical foundations
 - Discuss current research and debates
 - Assume strong foundational knowledge"""
-        }
-        return guidance.get(level, "")
+})
 
-    def _get_project_type_guidance(self, project_type: ProjectType) -> str:
-        """Get guidance for specific project types"""
-        guidance = {
-            ProjectType.WEB: """
+PROJECT_TYPE_GUIDANCE: Mapping[ProjectType, str] = MappingProxyType({
+    ProjectType.WEB: """
 Focus on: HTML/CSS/JavaScript, frameworks (React, Vue), backend (Node.js, Python/Flask/FastAPI), databases, APIs, deployment""",
 
-            ProjectType.MOBILE: """
+    ProjectType.MOBILE: """
 Focus on: React Native, Flutter, native development (Swift/Kotlin), mobile UI/UX, app stores, cross-platform considerations""",
 
-            ProjectType.DATA: """
+    ProjectType.DATA: """
 Focus on: Python (pandas, numpy), data visualization, SQL/NoSQL, data cleaning, analysis techniques, reporting""",
 
-            ProjectType.HARDWARE: """
+    ProjectType.HARDWARE: """
 Focus on: Arduino, Raspberry Pi, sensors, circuits, embedded systems, IoT, prototyping""",
 
-            ProjectType.AI_ML: """
+    ProjectType.AI_ML: """
 Focus on: Python (TensorFlow, PyTorch, scikit-learn), data preprocessing, model training, evaluation, deployment""",
 
-            ProjectType.GENERAL: """
+    ProjectType.GENERAL: """
 Consider multiple domains and suggest the most appropriate technologies for the concept"""
-        }
-        return guidance.get(project_type, "")
+})
+
+MODE_TEMPERATURES: Mapping[LearningMode, float] = MappingProxyType({
+    LearningMode.SOCRATIC: 0.8,  # More creative for varied questions
+    LearningMode.INVENTOR: 0.9,  # Most creative for novel ideas
+    LearningMode.EXPLAINER: 0.6,  # More focused for clear explanations
+    LearningMode.DEFAULT: 0.7  # Balanced
+})
+
+MODE_SUGGESTIONS: Mapping[LearningMode, Tuple[str, ...]] = MappingProxyType({
+    LearningMode.SOCRATIC: (
+        "Reflect on the question and share your thoughts",
+        "Try to answer the question step by step",
+        "Ask for clarification if you're unsure",
+        "Request a hint if you're stuck"
+    ),
+    LearningMode.INVENTOR: (
+        "Ask for a more detailed implementation plan",
+        "Request specific code examples",
+        "Explore alternative technologies",
+        "Discuss scaling and deployment strategies",
+        "Ask about potential challenges"
+    ),
+    LearningMode.EXPLAINER: (
+        "Ask for a simpler explanation",
+        "Request more advanced details",
+        "Ask for real-world examples",
+        "Explore related concepts",
+        "Request visual aids or diagrams"
+    ),
+    LearningMode.DEFAULT: (
+        "Ask for more details",
+        "Try a different learning mode",
+        "Request examples",
+        "Explore related topics"
+    )
+})
+
+MODE_DESCRIPTIONS: Mapping[LearningMode, Mapping[str, str]] = MappingProxyType({
+    LearningMode.SOCRATIC: {
+        "name": "Socratic Mode",
+        "description": "Learn through guided questions and discovery",
+        "best_for": "Developing critical thinking and deep understanding",
+        "approach": "Questions and self-discovery instead of direct answers"
+    },
+    LearningMode.INVENTOR: {
+        "name": "Inventor Mode",
+        "description": "Transform ideas into practical projects",
+        "best_for": "Building real-world applications and prototypes",
+        "approach": "Step-by-step project planning with specific technologies"
+    },
+    LearningMode.EXPLAINER: {
+        "name": "Explainer Mode",
+        "description": "Clear explanations at multiple levels",
+        "best_for": "Understanding complex concepts thoroughly",
+        "approach": "Multi-level breakdowns with analogies and examples"
+    },
+    LearningMode.DEFAULT: {
+        "name": "Default Mode",
+        "description": "General-purpose AI assistance",
+        "best_for": "Quick answers and general help",
+        "approach": "Direct, helpful responses to your questions"
+    }
+})
+
+
+class SystemPrompt(NamedTuple):
+    """
+    Precomputed system prompt.
+
+    Attributes:
+        text: Prompt text
+        tokens: Token count of the text
+        prompt_id: Stable hash of the text, usable as a prefix-cache key
+    """
+    text: str
+    tokens: int
+    prompt_id: str
+
+
+PromptKey = Tuple[LearningMode, Optional[ComplexityLevel], Optional[ProjectType]]
+
+
+def render_system_prompt(
+        mode: LearningMode,
+        complexity_level: Optional[ComplexityLevel] = None,
+        project_type: Optional[ProjectType] = None
+) -> str:
+    """Assemble the system prompt text for a mode and its options"""
+    parts = [MODE_PROMPTS.get(mode, MODE_PROMPTS[LearningMode.DEFAULT])]
+
+    if mode == LearningMode.EXPLAINER and complexity_level:
+        parts.append(f"\n\nCurrent complexity level: {complexity_level.value}")
+        parts.append(COMPLEXITY_GUIDANCE.get(complexity_level, ""))
+
+    if mode == LearningMode.INVENTOR and project_type:
+        parts.append(f"\n\nProject type focus: {project_type.value}")
+        parts.append(PROJECT_TYPE_GUIDANCE.get(project_type, ""))
+
+    return "".join(parts)
+
+
+def build_prompt_table(tokenizer: Optional[TokenCounter] = None) -> Mapping[PromptKey, SystemPrompt]:
+    """
+    Precompute the system prompt for every (mode, complexity, project type) combination.
+
+    Options that do not apply to a mode map to the same entry, so equal
+    prompts always share one string, token count and prompt_id.
+    """
+    tokenizer = tokenizer or TokenCounter()
+    prompts: Dict[str, SystemPrompt] = {}
+    table: Dict[PromptKey, SystemPrompt] = {}
+
+    for key in itertools.product(LearningMode, (None, *ComplexityLevel), (None, *ProjectType)):
+        text = render_system_prompt(*key)
+        entry = prompts.get(text)
+        if entry is None:
+            prompt_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+            entry = prompts[text] = SystemPrompt(text, tokenizer.count(text), prompt_id)
+        table[key] = entry
+
+    return MappingProxyType(table)
+
+
+class ModeHandler:
+    """
+    Handles different learning modes and generates appropriate prompts.
+
+    Each mode has a specific pedagogical approach:
+    - Socratic: Questions and guided discovery
+    - Inventor: Project-based practical application
+    - Explainer: Multi-level conceptual breakdown
+    """
+
+    def __init__(
+            self,
+            context_builder: Optional[ContextWindowBuilder] = None,
+            tokenizer: Optional[TokenCounter] = None,
+            retriever=None,
+            retrieval_top_k: int = 4,
+            retrieval_max_tokens: int = 1500,
+            answer_index=None,
+            prefetcher=None,
+            router=None,
+            semantic_cache=None
+    ):
+        self.tokenizer = tokenizer or TokenCounter()
+        self.mode_prompts = MODE_PROMPTS
+        self.prompt_table = build_prompt_table(self.tokenizer)
+        self.context_builder = context_builder
+        self.retriever = retriever
+        self.retrieval_top_k = retrieval_top_k
+        self.retrieval_max_tokens = retrieval_max_tokens
+        self.answer_index = answer_index
+        self.prefetcher = prefetcher
+        self.router = router
+        self.semantic_cache = semantic_cache
+        self.prompt_cache_stats = PromptCacheStats()
+
+    def get_context_builder(self, groq_client) -> ContextWindowBuilder:
+        """Get the context window builder, creating it from the client's model catalogue"""
+        if self.context_builder is None:
+            self.context_builder = ContextWindowBuilder(
+                groq_client.get_available_models(),
+                tokenizer=groq_client.tokenizer
+            )
+        return self.context_builder
+
+    def get_prompt(
+            self,
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel] = None,
+            project_type: Optional[ProjectType] = None
+    ) -> SystemPrompt:
+        """Get the precomputed system prompt with its token count and prompt_id"""
+        return self.prompt_table[mode, complexity_level, project_type]
+
+    def get_system_prompt(
+            self,
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel] = None,
+            project_type: Optional[ProjectType] = None,
+            additional_context: Optional[str] = None
+    ) -> str:
+        """
+        Get the system prompt for a specific mode with customizations.
+
+        Args:
+            mode: Learning mode to use
+            complexity_level: For Explainer mode
+            project_type: For Inventor mode
+            additional_context: Extra context to add
+
+        Returns:
+            Complete system prompt
+        """
+        text = self.prompt_table[mode, complexity_level, project_type].text
+
+        if additional_context:
+            return "".join((text, "\n\nAdditional context: ", additional_context))
+
+        return text
+
+    def route_models(
+            self,
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel],
+            prompt: SystemPrompt,
+            conversation_history: List[Dict[str, str]],
+            query: str,
+            context: Optional[str] = None,
+            model: Optional[str] = None,
+            max_tokens: int = 2048
+    ) -> List[Optional[str]]:
+        """
+        Get the models to try for a query, best first.
+
+        Without a router this is just the requested model, or None for the
+        client default.
+        """
+        if self.router is None:
+            return [model]
+
+        prompt_tokens = (
+            prompt.tokens
+            + self.tokenizer.count_messages(conversation_history)
+            + self.tokenizer.count(query)
+            + (self.tokenizer.count(context) if context else 0)
+        )
+        return self.router.route(mode, complexity_level, prompt_tokens, max_tokens, model)
+
+    def semantic_scope(
+            self,
+            query: str,
+            conversation_history: List[Dict[str, str]],
+            passages: List[Passage],
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel] = None,
+            project_type: Optional[ProjectType] = None,
+            model: Optional[str] = None
+    ) -> Optional[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+        """
+        Get the semantic cache scope for a query, or None if its answer must not be shared.
+
+        Answers grounded in retrieved passages depend on the student's own
+        documents, so only questions without passages are cached.
+        """
+        if self.semantic_cache is None or passages or not self.semantic_cache.eligible(query, conversation_history):
+            return None
+        return (
+            mode.value,
+            complexity_level.value if complexity_level else None,
+            project_type.value if project_type else None,
+            model
+        )
+
+    async def retrieve(self, query: str, collection: Optional[str]) -> List[Passage]:
+        """
+        Find document passages relevant to a query.
+
+        Args:
+            query: User's question or message
+            collection: Collection holding the student's documents
+
+        Returns:
+            Best passages that fit the retrieval token budget
+        """
+        if self.retriever is None or not collection:
+            return []
+
+        try:
+            # Vector search is NumPy work, keep it off the event loop
+            passages = await asyncio.to_thread(
+                self.retriever.search, collection, query, self.retrieval_top_k
+            )
+        except Exception as e:
+            logger.warning(f"Retrieval failed for {collection}: {str(e)}")
+            return []
+
+        return select_passages(passages, self.retrieval_max_tokens, self.tokenizer)
+
+    async def index_answer(self, collection: Optional[str], answer: str) -> None:
+        """Add an assistant answer to the collection's keyword index"""
+        if self.answer_index is None or not collection or not answer:
+            return
+
+        try:
+            await asyncio.to_thread(
+                self.answer_index.add_document,
+                collection, f"answer-{uuid.uuid4().hex[:12]}", "previous answer", [answer]
+            )
+        except Exception as e:
+            logger.warning(f"Answer indexing failed for {collection}: {str(e)}")
 
     async def process_query(
             self,
@@ -204,7 +455,13 @@ Consider multiple domains and suggest the most appropriate technologies for the
             conversation_history: List[Dict[str, str]],
             complexity_level: Optional[ComplexityLevel] = None,
             project_type: Optional[ProjectType] = None,
-            groq_client=None
+            groq_client=None,
+            model: Optional[str] = None,
+            max_tokens: int = 2048,
+            session_id: Optional[str] = None,
+            collection: Optional[str] = None,
+            speculative: bool = False,
+            usage: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """
         Process a query in the specified mode.
@@ -216,56 +473,279 @@ Consider multiple domains and suggest the most appropriate technologies for the
             complexity_level: For Explainer mode
             project_type: For Inventor mode
             groq_client: GroqClient instance
+            model: Model identifier (client default if omitted)
+            max_tokens: Tokens reserved for the response
+            session_id: Session used to cache the conversation summary
+            collection: Document collection to retrieve passages from
+            speculative: Prefetch run, only sent on idle rate-limit capacity
+            usage: Filled with the estimated prompt tokens of each request as it is sent
 
         Returns:
-            Dict with response and metadata
+            Dict with response, sources and metadata
         """
-        # Get system prompt
-        system_prompt = self.get_system_prompt(mode, complexity_level, project_type)
+        query_kwargs = {
+            "mode": mode,
+            "complexity_level": complexity_level,
+            "project_type": project_type,
+            "groq_client": groq_client,
+            "model": model,
+            "max_tokens": max_tokens,
+            "collection": collection
+        }
 
-        # Prepare messages
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(conversation_history)
-        messages.append({"role": "user", "content": query})
+        if self.prefetcher is not None and session_id and not speculative:
+            prefetched = await self.prefetcher.take(
+                session_id, mode.value, query, conversation_history
+            )
+            if prefetched is not None:
+                self.prefetcher.schedule(
+                    self, session_id, conversation_history, query,
+                    prefetched["response"], prefetched["suggestions"], **query_kwargs
+                )
+                return prefetched
+
+        # Prefetches run alongside the request and must not add to its stages
+        timer = None if speculative else current_timer()
+        started = time.monotonic()
+        passages = await self.retrieve(query, collection)
+        if timer is not None:
+            timer.add("retrieval", time.monotonic() - started)
+            started = time.monotonic()
+
+        # A paraphrase of an earlier first question may already be answered
+        scope = None if speculative else self.semantic_scope(
+            query, conversation_history, passages, mode, complexity_level, project_type, model
+        )
+        semantic_hit = self.semantic_cache.lookup(scope, query) if scope else None
+        if semantic_hit is not None and not semantic_hit.audit:
+            result = semantic_hit.result
+            if self.prefetcher is not None and session_id:
+                self.prefetcher.schedule(
+                    self, session_id, conversation_history, query,
+                    result["response"], result["suggestions"], **query_kwargs
+                )
+            return result
+
+        # Static prompt first, passages at the tail, so the prefix stays cacheable
+        prompt = self.get_prompt(mode, complexity_level, project_type)
+        context = format_passages(passages) if passages else None
+        builder = self.get_context_builder(groq_client)
+        candidates = self.route_models(
+            mode, complexity_level, prompt, conversation_history, query, context, model, max_tokens
+        )
+        if speculative:
+            # Prefetches never fail over, they are dropped instead
+            candidates = candidates[:1]
 
-        # Generate response
         try:
-            response = await groq_client.generate_completion(
-                messages=messages,
-                temperature=self._get_temperature_for_mode(mode),
-                max_tokens=2048
-            )
+            window = None
+            window_size = 0
+            for attempt, candidate in enumerate(candidates):
+                # A failover only rebuilds the window for a different context size
+                if window is None or builder.get_context_window(candidate) != window_size:
+                    if attempt:
+                        started = time.monotonic()
+                    window_size = builder.get_context_window(candidate)
+                    window = builder.build(
+                        prompt.text,
+                        conversation_history,
+                        query,
+                        model=candidate,
+                        max_tokens=max_tokens,
+                        session_id=session_id,
+                        context=context,
+                        prompt_id=prompt.prompt_id
+                    )
+                    if timer is not None:
+                        timer.add("prompt_build", time.monotonic() - started)
+
+                completion_kwargs = {"model": candidate} if candidate else {}
+                if speculative:
+                    completion_kwargs["idle_only"] = True
+                elif self.router is not None:
+                    # The client starts it once the rate limiter admits the
+                    # request, so local queueing is not held against the model
+                    completion_kwargs["attempt_timeout"] = self.router.attempt_timeout
+                if usage is not None:
+                    usage["prompt_tokens"] = self.tokenizer.count_messages(window["messages"])
+
+                started = time.monotonic()
+                try:
+                    response = await groq_client.generate_completion(
+                        messages=window["messages"],
+                        temperature=self._get_temperature_for_mode(mode),
+                        max_tokens=max_tokens,
+                        **completion_kwargs
+                    )
+                except (GroqAPIError, asyncio.TimeoutError) as e:
+                    if self.router is None or speculative:
+                        raise
+                    self.router.record(candidate, ok=False)
+                    if attempt == len(candidates) - 1:
+                        raise
+                    logger.warning(
+                        f"Model {candidate} failed ({type(e).__name__}: {str(e)}), "
+                        f"failing over to {candidates[attempt + 1]}"
+                    )
+                    continue
+
+                if self.router is not None and not speculative and not response.get("cached"):
+                    self.router.record(candidate, time.monotonic() - started)
+                break
+
+            if timer is not None:
+                timer.model = response.get("model") or candidate or ""
 
             content = response["choices"][0]["message"]["content"]
+            usage = response.get("usage", {})
+            cached_tokens = cached_prompt_tokens(usage)
+            if not speculative:
+                self.prompt_cache_stats.record(
+                    mode.value,
+                    window["prefix_reused"],
+                    usage.get("prompt_tokens", 0),
+                    cached_tokens
+                )
 
             # Extract suggestions based on mode
             suggestions = self._generate_suggestions(mode, query, content)
 
-            return {
+            if self.prefetcher is not None and session_id and not speculative:
+                self.prefetcher.schedule(
+                    self, session_id, conversation_history, query,
+                    content, suggestions, **query_kwargs
+                )
+
+            result = {
                 "response": content,
                 "mode": mode.value,
                 "suggestions": suggestions,
+                "sources": [p.label for p in passages],
                 "metadata": {
-                    "tokens_used": response.get("usage", {}).get("total_tokens", 0),
-                    "model": response.get("model", "unknown"),
+                    "tokens_used": usage.get("total_tokens", 0),
+                    "model": response.get("model") or candidate or "unknown",
                     "complexity_level": complexity_level.value if complexity_level else None,
-                    "project_type": project_type.value if project_type else None
+                    "project_type": project_type.value if project_type else None,
+                    "trimmed_turns": window["trimmed_turns"],
+                    "trimmed_tokens": window["trimmed_tokens"],
+                    "cached": response.get("cached", False),
+                    "cached_tokens": cached_tokens,
+                    "prefix_hash": window["prefix_hash"]
                 }
             }
+            if scope is not None:
+                self.semantic_cache.store(scope, query, result, audited=semantic_hit)
+            return result
 
         except Exception as e:
-            logger.error(f"Error processing query in {mode} mode: {str(e)}")
+            if not speculative:
+                logger.error(f"Error processing query in {mode} mode: {str(e)}")
             raise
 
+    async def stream_with_failover(
+            self,
+            candidates: Sequence[Optional[str]],
+            open_stream: Callable[[Optional[str]], AsyncIterator[Any]],
+            used: Dict[str, Any]
+    ) -> AsyncIterator[Any]:
+        """
+        Relay the stream of the first model that starts producing output.
+
+        Failover is only possible before the first item; once output has
+        been relayed the stream stays with its model.
+
+        Args:
+            candidates: Models to try, from route_models
+            open_stream: Opens the upstream stream for a model
+            used: Receives the serving model under "model"
+
+        Yields:
+            Items of the serving model's stream
+        """
+        for attempt, candidate in enumerate(candidates):
+            stream = open_stream(candidate)
+            started = time.monotonic()
+            try:
+                if self.router is not None:
+                    first = await asyncio.wait_for(stream.__anext__(), self.router.attempt_timeout)
+                else:
+                    first = await stream.__anext__()
+            except StopAsyncIteration:
+                used["model"] = candidate
+                return
+            except (GroqAPIError, asyncio.TimeoutError) as e:
+                await stream.aclose()
+                if self.router is None:
+                    raise
+                self.router.record(candidate, ok=False)
+                if attempt == len(candidates) - 1:
+                    raise
+                logger.warning(
+                    f"Model {candidate} failed ({type(e).__name__}: {str(e)}), "
+                    f"failing over to {candidates[attempt + 1]}"
+                )
+                continue
+
+            # Time to first token is what the latency SLO is about for streams
+            if self.router is not None:
+                self.router.record(candidate, time.monotonic() - started)
+            used["model"] = candidate
+            try:
+                yield first
+                async for item in stream:
+                    yield item
+            finally:
+                await stream.aclose()
+            return
+
+    async def process_batch(
+            self,
+            items: Sequence[Dict[str, Any]],
+            groq_client=None,
+            max_concurrency: int = 4
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process independent queries concurrently.
+
+        Args:
+            items: Keyword arguments for process_query, one dict per query
+                (conversation_history defaults to empty)
+            groq_client: GroqClient instance
+            max_concurrency: Queries in flight at once
+
+        Yields:
+            {"index", "result"} or {"index", "error"} per item, in completion order
+        """
+        results: asyncio.Queue = asyncio.Queue()
+        pending = iter(enumerate(items))
+
+        async def worker() -> None:
+            # Workers share one iterator, so at most max_concurrency queries run at once
+            for index, item in pending:
+                try:
+                    result = await self.process_query(
+                        **{"conversation_history": [], **item},
+                        groq_client=groq_client
+                    )
+                    results.put_nowait({"index": index, "result": result})
+                except Exception as e:
+                    results.put_nowait({"index": index, "error": e})
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(max(1, min(max_concurrency, len(items))))
+        ]
+        try:
+            for _ in range(len(items)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
     def _get_temperature_for_mode(self, mode: LearningMode) -> float:
         """Get appropriate temperature setting for each mode"""
-        temperatures = {
-            LearningMode.SOCRATIC: 0.8,  # More creative for varied questions
-            LearningMode.INVENTOR: 0.9,  # Most creative for novel ideas
-            LearningMode.EXPLAINER: 0.6,  # More focused for clear explanations
-            LearningMode.DEFAULT: 0.7  # Balanced
-        }
-        return temperatures.get(mode, 0.7)
+        return MODE_TEMPERATURES.get(mode, 0.7)
 
     def _generate_suggestions(
             self,
@@ -279,70 +759,9 @@ Consider multiple domains and suggest the most appropriate technologies for the
         Returns:
             List of suggested follow-up actions/questions
         """
-        suggestions = []
-
-        if mode == LearningMode.SOCRATIC:
-            suggestions = [
-                "Reflect on the question and share your thoughts",
-                "Try to answer the question step by step",
-                "Ask for clarification if you're unsure",
-                "Request a hint if you're stuck"
-            ]
-
-        elif mode == LearningMode.INVENTOR:
-            suggestions = [
-                "Ask for a more detailed implementation plan",
-                "Request specific code examples",
-                "Explore alternative technologies",
-                "Discuss scaling and deployment strategies",
-                "Ask about potential challenges"
-            ]
-
-        elif mode == LearningMode.EXPLAINER:
-            suggestions = [
-                "Ask for a simpler explanation",
-                "Request more advanced details",
-                "Ask for real-world examples",
-                "Explore related concepts",
-                "Request visual aids or diagrams"
-            ]
-
-        else:  # DEFAULT
-            suggestions = [
-                "Ask for more details",
-                "Try a different learning mode",
-                "Request examples",
-                "Explore related topics"
-            ]
-
-        return suggestions[:3]  # Return top 3 suggestions
+        suggestions = MODE_SUGGESTIONS.get(mode, MODE_SUGGESTIONS[LearningMode.DEFAULT])
+        return list(suggestions[:3])  # Return top 3 suggestions
 
     def get_mode_description(self, mode: LearningMode) -> Dict[str, str]:
         """Get user-friendly description of a mode"""
-        descriptions = {
-            LearningMode.SOCRATIC: {
-                "name": "Socratic Mode",
-                "description": "Learn through guided questions and discovery",
-                "best_for": "Developing critical thinking and deep understanding",
-                "approach": "Questions and self-discovery instead of direct answers"
-            },
-            LearningMode.INVENTOR: {
-                "name": "Inventor Mode",
-                "description": "Transform ideas into practical projects",
-                "best_for": "Building real-world applications and prototypes",
-                "approach": "Step-by-step project planning with specific technologies"
-            },
-            LearningMode.EXPLAINER: {
-                "name": "Explainer Mode",
-                "description": "Clear explanations at multiple levels",
-                "best_for": "Understanding complex concepts thoroughly",
-                "approach": "Multi-level breakdowns with analogies and examples"
-            },
-            LearningMode.DEFAULT: {
-                "name": "Default Mode",
-                "description": "General-purpose AI assistance",
-                "best_for": "Quick answers and general help",
-                "approach": "Direct, helpful responses to your questions"
-            }
-        }
-        return descriptions.get(mode, descriptions[LearningMode.DEFAULT])
\ No newline at end of file
+        return dict(MODE_DESCRIPTIONS.get(mode, MODE_DESCRIPTIONS[LearningMode.DEFAULT]))
@@ -0,0 +1,207 @@
+"""
+Model Router
+Per-request model selection by learning mode, complexity, prompt size and live upstream health
+"""
+
+import logging
+import time
+from typing import Optional, List, Dict, Any, Sequence
+
+from mode_handler import LearningMode, ComplexityLevel
+
+logger = logging.getLogger(__name__)
+
+# Mode and complexity combinations that a small model answers well enough;
+# requests without a complexity level stay on the large tier
+SMALL_ROUTES = frozenset({
+    (LearningMode.DEFAULT, ComplexityLevel.BEGINNER),
+    (LearningMode.EXPLAINER, ComplexityLevel.BEGINNER),
+})
+
+
+class _ModelHealth:
+    __slots__ = ("latency", "error_rate", "requests", "errors", "routed", "updated_at")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.routed = 0
+        self.updated_at = 0.0
+
+
+class ModelRouter:
+    """
+    Picks the model for each request and the models to fail over to.
+
+    Requests are split into a small and a large tier by mode and
+    complexity (see SMALL_ROUTES); prompts that do not fit the context
+    window of any model in their tier move to the tier that can hold
+    them. Healthy models come first, the request's tier before the other
+    one and each tier ordered by an exponentially weighted moving average
+    of latency. Models whose error rate or latency breaks the SLO are
+    tried after every healthy model, of either tier, until `probe_after`
+    seconds pass without a sample, when they are given traffic again.
+
+    Attributes:
+        small_models: Cheap, fast models in preference order
+        large_models: Capable models in preference order
+        alpha: Weight of the newest sample in the moving averages
+        latency_slo: Latency in seconds above which a model is unhealthy
+        error_threshold: Error rate above which a model is unhealthy
+        probe_after: Seconds after which an unhealthy model is tried again
+        max_attempts: Models tried per request, including failovers
+        attempt_timeout: Seconds before an attempt fails over
+    """
+
+    def __init__(
+            self,
+            models: Sequence[Dict[str, Any]],
+            small_models: Sequence[str],
+            large_models: Sequence[str],
+            alpha: float = 0.2,
+            latency_slo: float = 4.0,
+            error_threshold: float = 0.3,
+            probe_after: float = 30.0,
+            max_attempts: int = 2,
+            attempt_timeout: float = 20.0
+    ):
+        if not large_models:
+            raise ValueError("At least one large model is required")
+        self.context_windows = {m["id"]: m["context_window"] for m in models}
+        # Models missing from the catalogue get the smallest known window, like ContextWindowBuilder
+        self.default_window = min(self.context_windows.values(), default=8192)
+        self.small_models = list(small_models)
+        self.large_models = list(large_models)
+        self.alpha = alpha
+        self.latency_slo = latency_slo
+        self.error_threshold = error_threshold
+        self.probe_after = probe_after
+        self.max_attempts = max(1, max_attempts)
+        self.attempt_timeout = attempt_timeout
+        self._health: Dict[str, _ModelHealth] = {}
+
+    def _get_health(self, model: str) -> _ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = _ModelHealth()
+        return health
+
+    def context_window(self, model: str) -> int:
+        return self.context_windows.get(model, self.default_window)
+
+    def tier(
+            self,
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel] = None
+    ) -> str:
+        """Get the tier, "small" or "large", for a mode and complexity"""
+        if self.small_models and (mode, complexity_level) in SMALL_ROUTES:
+            return "small"
+        return "large"
+
+    def healthy(self, model: str, now: Optional[float] = None) -> bool:
+        """Check a model against the error threshold and latency SLO"""
+        health = self._health.get(model)
+        if health is None:
+            return True
+        if (now or time.monotonic()) - health.updated_at >= self.probe_after:
+            return True
+        if health.error_rate > self.error_threshold:
+            return False
+        return health.latency is None or health.latency <= self.latency_slo
+
+    def _order(self, tiers: Sequence[List[str]], now: float) -> List[str]:
+        """Healthy models first, then by tier, fastest first, keeping the configured order for ties"""
+        def key(item):
+            rank, position, model = item
+            health = self._health.get(model)
+            latency = 0.0
+            # A stale average is probed again rather than trusted forever
+            if health and health.latency is not None and now - health.updated_at < self.probe_after:
+                latency = health.latency
+            return not self.healthy(model, now), rank, latency, position
+
+        models = [(rank, position, m) for rank, tier in enumerate(tiers) for position, m in enumerate(tier)]
+        return [model for _, _, model in sorted(models, key=key)]
+
+    def route(
+            self,
+            mode: LearningMode,
+            complexity_level: Optional[ComplexityLevel] = None,
+            prompt_tokens: int = 0,
+            max_tokens: int = 0,
+            model: Optional[str] = None
+    ) -> List[str]:
+        """
+        Choose the models to try for a request.
+
+        Args:
+            mode: Learning mode of the request
+            complexity_level: Requested explanation level
+            prompt_tokens: Untrimmed prompt size
+            max_tokens: Tokens reserved for the response
+            model: Model asked for by the caller, always tried first
+
+        Returns:
+            Up to max_attempts model identifiers, in the order to try them
+        """
+        now = time.monotonic()
+        needed = prompt_tokens + max_tokens
+        if self.tier(mode, complexity_level) == "small":
+            ordered = self._order((self.small_models, self.large_models), now)
+        else:
+            ordered = self._order((self.large_models, self.small_models), now)
+
+        fitting = [m for m in ordered if self.context_window(m) >= needed]
+        # Nothing holds the whole conversation: prefer the windows that trim least
+        rest = sorted(
+            (m for m in ordered if self.context_window(m) < needed),
+            key=lambda m: -self.context_window(m)
+        )
+
+        candidates = fitting + rest
+        if model:
+            candidates = [model] + [m for m in candidates if m != model]
+        candidates = candidates[:self.max_attempts]
+
+        self._get_health(candidates[0]).routed += 1
+        return candidates
+
+    def record(self, model: str, latency: Optional[float] = None, ok: bool = True) -> None:
+        """
+        Record the outcome of a request to a model.
+
+        Args:
+            model: Model that served or failed the request
+            latency: Seconds until the response (or first token) arrived
+            ok: False when the request failed or timed out
+        """
+        health = self._get_health(model)
+        health.requests += 1
+        health.updated_at = time.monotonic()
+        health.error_rate += self.alpha * ((0.0 if ok else 1.0) - health.error_rate)
+        if not ok:
+            health.errors += 1
+        if latency is not None:
+            if health.latency is None:
+                health.latency = latency
+            else:
+                health.latency += self.alpha * (latency - health.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get routing counts, moving averages and health per model"""
+        now = time.monotonic()
+        return {
+            model: {
+                "tier": "small" if model in self.small_models else "large",
+                "routed": h.routed,
+                "requests": h.requests,
+                "errors": h.errors,
+                "latency_ewma_ms": 1000 * h.latency if h.latency is not None else None,
+                "error_rate_ewma": h.error_rate,
+                "healthy": self.healthy(model, now)
+            }
+            for model, h in self._health.items()
+        }
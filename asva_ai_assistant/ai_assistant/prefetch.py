@@ -0,0 +1,203 @@
+"""
+Suggestion Prefetch
+Speculative answers to likely follow-up suggestions, served from a per-session cache
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Iterable
+
+from exceptions import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("scheduled", "completed", "skipped", "failed", "hits", "wasted", "wasted_tokens", "saved_tokens")
+
+
+class _Prefetch:
+    __slots__ = ("mode", "turns", "task", "result", "expires_at")
+
+    def __init__(self, mode: str, turns: int):
+        self.mode = mode
+        self.turns = turns
+        self.task: Optional[asyncio.Task] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.expires_at = 0.0
+
+
+class SuggestionPrefetcher:
+    """
+    Answers the top follow-up suggestions of a reply before they are clicked.
+
+    Prefetches only run on idle rate-limit capacity (`idle_only` calls that
+    fail instead of waiting), so they never delay regular requests. Each
+    session keeps the prefetches for its latest answer only; the next query
+    takes the matching one, if any, and discards the rest. Discarded
+    prefetches count as wasted, with their tokens: completed ones with
+    their total usage, those cancelled in flight with the estimated prompt
+    tokens already sent.
+
+    Attributes:
+        modes: Modes whose answers are prefetched for
+        top_n: Suggestions prefetched per answer
+        ttl: Seconds a prefetched answer stays valid
+        max_sessions: Sessions with pending prefetches kept
+    """
+
+    def __init__(
+            self,
+            modes: Iterable[str] = ("explainer", "default"),
+            top_n: int = 2,
+            ttl: float = 120.0,
+            max_sessions: int = 1024
+    ):
+        self.modes = frozenset(modes)
+        self.top_n = top_n
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, _Prefetch]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, mode: str, counter: str, amount: int = 1) -> None:
+        stats = self._stats.get(mode)
+        if stats is None:
+            stats = self._stats[mode] = dict.fromkeys(_COUNTERS, 0)
+        stats[counter] += amount
+
+    def schedule(
+            self,
+            handler,
+            session_id: str,
+            conversation_history: List[Dict[str, str]],
+            query: str,
+            answer: str,
+            suggestions: List[str],
+            **query_kwargs
+    ) -> None:
+        """
+        Start prefetching answers to the top suggestions of an answer.
+
+        Args:
+            handler: ModeHandler used to answer the suggestions
+            session_id: Session the answer belongs to
+            conversation_history: History before the answered query
+            query: The query just answered
+            answer: The answer just given
+            suggestions: Suggestions shown with the answer
+            **query_kwargs: Remaining process_query arguments (mode, options, model)
+        """
+        self.discard(session_id)
+        mode = query_kwargs["mode"].value
+        if mode not in self.modes:
+            return
+
+        history = [
+            *conversation_history,
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": answer}
+        ]
+        entries = {}
+        for suggestion in suggestions[:self.top_n]:
+            # The click arrives with this history before it
+            entry = _Prefetch(mode, len(history))
+            entry.task = asyncio.create_task(self._run(entry, handler, suggestion, history, query_kwargs))
+            entries[suggestion] = entry
+            self._count(mode, "scheduled")
+
+        self._sessions[session_id] = entries
+        while len(self._sessions) > self.max_sessions:
+            self.discard(next(iter(self._sessions)))
+
+    async def _run(
+            self,
+            entry: _Prefetch,
+            handler,
+            suggestion: str,
+            history: List[Dict[str, str]],
+            query_kwargs: Dict[str, Any]
+    ) -> None:
+        usage = {}
+        try:
+            entry.result = await handler.process_query(
+                query=suggestion,
+                conversation_history=history,
+                speculative=True,
+                usage=usage,
+                **query_kwargs
+            )
+            entry.expires_at = time.monotonic() + self.ttl
+            self._count(entry.mode, "completed")
+        except asyncio.CancelledError:
+            # Discarded in flight; the prompt was paid for once it was sent
+            if usage:
+                self._count(entry.mode, "wasted")
+                self._count(entry.mode, "wasted_tokens", usage.get("prompt_tokens", 0))
+            raise
+        except RateLimitError:
+            self._count(entry.mode, "skipped")
+        except Exception as e:
+            logger.debug(f"Prefetch failed: {str(e)}")
+            self._count(entry.mode, "failed")
+
+    async def take(
+            self,
+            session_id: str,
+            mode: str,
+            query: str,
+            conversation_history: List[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the prefetched answer for a query, discarding the session's other prefetches.
+
+        A prefetch still in flight is awaited, since it started earlier than
+        a new request would.
+        """
+        entries = self._sessions.pop(session_id, None)
+        if not entries:
+            return None
+
+        entry = entries.pop(query, None)
+        self._discard_entries(entries)
+        if entry is None:
+            return None
+
+        if entry.mode != mode or entry.turns != len(conversation_history):
+            self._discard_entries({query: entry})
+            return None
+
+        if not entry.task.done():
+            await asyncio.shield(entry.task)
+
+        if entry.result is None or entry.expires_at < time.monotonic():
+            self._discard_entries({query: entry})
+            return None
+
+        self._count(entry.mode, "hits")
+        self._count(entry.mode, "saved_tokens", entry.result["metadata"].get("tokens_used", 0))
+        result = dict(entry.result)
+        result["metadata"] = {**result["metadata"], "prefetched": True}
+        return result
+
+    def discard(self, session_id: str) -> None:
+        """Drop a session's prefetches, cancelling those in flight"""
+        self._discard_entries(self._sessions.pop(session_id, None) or {})
+
+    def _discard_entries(self, entries: Dict[str, _Prefetch]) -> None:
+        for entry in entries.values():
+            if not entry.task.done():
+                entry.task.cancel()
+            elif entry.result is not None:
+                self._count(entry.mode, "wasted")
+                self._count(entry.mode, "wasted_tokens", entry.result["metadata"].get("tokens_used", 0))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get prefetch counters and hit rate per mode"""
+        return {
+            mode: {
+                **counters,
+                "hit_rate": counters["hits"] / counters["completed"] if counters["completed"] else 0.0
+            }
+            for mode, counters in self._stats.items()
+        }
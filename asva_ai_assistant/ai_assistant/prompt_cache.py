@@ -0,0 +1,85 @@
+"""
+Prompt Cache
+Cached prompt token accounting and time-to-first-token per learning mode
+"""
+
+from typing import Optional, Dict, Any
+
+
+def cached_prompt_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """Get the prompt tokens served from the upstream prompt cache, 0 if not reported"""
+    if not usage:
+        return 0
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or 0)
+
+
+class _ModeStats:
+    __slots__ = (
+        "requests", "prefix_reused", "prompt_tokens", "cached_tokens",
+        "ttft_reused", "ttft_reused_count", "ttft_fresh", "ttft_fresh_count"
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.prefix_reused = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.ttft_reused = 0.0
+        self.ttft_reused_count = 0
+        self.ttft_fresh = 0.0
+        self.ttft_fresh_count = 0
+
+
+class PromptCacheStats:
+    """
+    Per-mode counters for prefix reuse and upstream prompt caching.
+
+    Time to first token is kept separately for requests that reused the
+    session's previous prefix and those that did not, so the effect of
+    the cache-friendly layout can be compared per mode.
+    """
+
+    def __init__(self):
+        self._modes: Dict[str, _ModeStats] = {}
+
+    def record(
+            self,
+            mode: str,
+            prefix_reused: bool,
+            prompt_tokens: int = 0,
+            cached_tokens: int = 0,
+            ttft: Optional[float] = None
+    ) -> None:
+        """Record one request, with its time to first token in seconds when streamed"""
+        stats = self._modes.get(mode)
+        if stats is None:
+            stats = self._modes[mode] = _ModeStats()
+
+        stats.requests += 1
+        stats.prefix_reused += prefix_reused
+        stats.prompt_tokens += prompt_tokens
+        stats.cached_tokens += cached_tokens
+
+        if ttft is not None:
+            if prefix_reused:
+                stats.ttft_reused += ttft
+                stats.ttft_reused_count += 1
+            else:
+                stats.ttft_fresh += ttft
+                stats.ttft_fresh_count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the counters per mode"""
+        return {
+            mode: {
+                "requests": s.requests,
+                "prefix_reused": s.prefix_reused,
+                "prompt_tokens": s.prompt_tokens,
+                "cached_tokens": s.cached_tokens,
+                "cached_ratio": s.cached_tokens / s.prompt_tokens if s.prompt_tokens else 0.0,
+                "ttft_reused_ms": 1000 * s.ttft_reused / s.ttft_reused_count if s.ttft_reused_count else None,
+                "ttft_fresh_ms": 1000 * s.ttft_fresh / s.ttft_fresh_count if s.ttft_fresh_count else None
+            }
+            for mode, s in self._modes.items()
+        }
@@ -0,0 +1,310 @@
+"""
+Rate Limiter
+Client-side request/token budgets and concurrency control for Groq calls
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Mapping
+
+from exceptions import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Window of each Groq `x-ratelimit-*` header family: requests per day, tokens per minute
+HEADER_WINDOWS = {"requests": 86400.0, "tokens": 60.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse Groq reset durations such as `7.66s`, `2m59.56s` or `150ms`"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """
+    Continuously refilling budget.
+
+    Attributes:
+        capacity: Maximum budget, also the amount refilled per period
+        period: Refill period in seconds
+        level: Currently available budget
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` is available, assuming a fresh refill"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+    def sync(self, remaining: float, reset: Optional[float], now: float) -> None:
+        """Align with the upstream view of the budget, never raising it"""
+        self.refill(now)
+        if remaining < self.level:
+            self.level = remaining
+        if reset is not None and remaining <= 0:
+            self.level = min(self.level, -reset * self.rate)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "deadline")
+
+    def __init__(self, tokens: int, deadline: float):
+        self.tokens = tokens
+        self.deadline = deadline
+
+
+class RateLimit:
+    """
+    Admission granted by the rate limiter.
+
+    Release it when the request finishes. Settling with the actual usage
+    returns unused reserved tokens to the budget.
+    """
+
+    def __init__(self, limiter: "RateLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.released = False
+
+    def settle(self, used_tokens: int) -> None:
+        """Refund the difference between reserved and used tokens, up to the bucket capacity"""
+        if used_tokens and used_tokens < self.tokens:
+            bucket = self.limiter.tokens
+            bucket.level = min(bucket.capacity, bucket.level + self.tokens - used_tokens)
+            self.tokens = used_tokens
+
+    async def release(self) -> None:
+        if not self.released:
+            self.released = True
+            await self.limiter._release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+
+
+class RateLimiter:
+    """
+    Proactive limiter for requests per minute, tokens per minute and concurrency.
+
+    Callers queue in FIFO order. A caller whose estimated admission time is
+    past its deadline fails fast with RateLimitError instead of waiting.
+
+    Attributes:
+        requests: Requests-per-minute bucket
+        tokens: Tokens-per-minute bucket
+        max_concurrency: Maximum number of requests in flight
+        max_wait: Default admission deadline in seconds
+        period: Budget window in seconds (one minute for Groq)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 30,
+        tokens_per_minute: int = 12000,
+        max_concurrency: int = 16,
+        max_wait: float = 30.0,
+        period: float = 60.0
+    ):
+        self.requests = TokenBucket(requests_per_minute, period)
+        self.tokens = TokenBucket(tokens_per_minute, period)
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.active = 0
+        self.blocked_until = 0.0
+        self._queue: "deque[_Waiter]" = deque()
+        self._changed = asyncio.Condition()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.idle_admitted = 0
+        self.idle_rejected = 0
+
+    async def acquire(self, tokens: int, deadline: Optional[float] = None) -> RateLimit:
+        """
+        Wait for a request slot and token budget.
+
+        Args:
+            tokens: Estimated tokens for the request (prompt + max output)
+            deadline: Monotonic time by which the request must be admitted
+
+        Returns:
+            RateLimit to release when the request finishes
+
+        Raises:
+            RateLimitError: If the request cannot be admitted before its deadline
+        """
+        start = time.monotonic()
+        waiter = _Waiter(tokens, deadline or start + self.max_wait)
+
+        async with self._changed:
+            self._queue.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+
+                    if self._queue[0] is waiter and self._admissible(waiter, now):
+                        self._queue.popleft()
+                        self.requests.consume(1)
+                        self.tokens.consume(waiter.tokens)
+                        self.active += 1
+                        self.admitted += 1
+                        self.total_wait += now - start
+                        self._changed.notify_all()
+                        return RateLimit(self, waiter.tokens)
+
+                    estimate = self._estimate_wait(waiter, now)
+                    if now + estimate > waiter.deadline:
+                        self.rejected += 1
+                        raise RateLimitError(
+                            f"Rate limit budget exhausted, estimated wait {estimate:.1f}s "
+                            f"exceeds the request deadline"
+                        )
+
+                    timeout = min(max(estimate, 0.01), waiter.deadline - now)
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    self._changed.notify_all()
+                raise
+
+    def try_acquire_idle(self, tokens: int, reserve: float = 0.5) -> Optional[RateLimit]:
+        """
+        Admit a low-priority request only from idle capacity, without waiting.
+
+        The request is admitted when nobody is queued and it leaves at least
+        `reserve` of the concurrency, request and token budgets free for
+        regular callers.
+
+        Returns:
+            RateLimit to release when the request finishes, or None
+        """
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+        if (
+            self._queue
+            or now < self.blocked_until
+            or self.active + 1 > self.max_concurrency * (1 - reserve)
+            or self.requests.level - 1 < self.requests.capacity * reserve
+            or self.tokens.level - tokens < self.tokens.capacity * reserve
+        ):
+            self.idle_rejected += 1
+            return None
+
+        # No await since the checks, so no other caller can interleave
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.active += 1
+        self.admitted += 1
+        self.idle_admitted += 1
+        return RateLimit(self, tokens)
+
+    def _admissible(self, waiter: _Waiter, now: float) -> bool:
+        return (
+            now >= self.blocked_until
+            and self.active < self.max_concurrency
+            and self.requests.level >= 1
+            and self.tokens.level >= min(waiter.tokens, self.tokens.capacity)
+        )
+
+    def _estimate_wait(self, waiter: _Waiter, now: float) -> float:
+        """Estimate seconds until `waiter` is admitted, given everyone queued ahead of it"""
+        position = 0
+        tokens_ahead = 0
+        for queued in self._queue:
+            position += 1
+            tokens_ahead += min(queued.tokens, self.tokens.capacity)
+            if queued is waiter:
+                break
+
+        return max(
+            self.blocked_until - now,
+            self.requests.time_until(position),
+            self.tokens.time_until(tokens_ahead),
+            0.0
+        )
+
+    async def _release(self) -> None:
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    def penalize(self, retry_after: float) -> None:
+        """Pause admissions after an upstream 429"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Synchronize budgets with Groq `x-ratelimit-*` response headers.
+
+        Groq reports requests per day and tokens per minute. A header family
+        only updates the bucket with the same window, so the daily request
+        budget never stands in for the per-minute one, and it is only used
+        to lower the local budget, never to raise it.
+        """
+        now = time.monotonic()
+        for family, bucket in (("tokens", self.tokens), ("requests", self.requests)):
+            remaining = headers.get(f"x-ratelimit-remaining-{family}")
+            if remaining is None or HEADER_WINDOWS[family] != bucket.period:
+                continue
+            try:
+                bucket.sync(
+                    float(remaining),
+                    parse_duration(headers.get(f"x-ratelimit-reset-{family}", "")),
+                    now
+                )
+            except ValueError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limiter counters and current budgets"""
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "active": self.active,
+            "queued": len(self._queue),
+            "avg_wait_s": self.total_wait / self.admitted if self.admitted else 0.0,
+            "idle_admitted": self.idle_admitted,
+            "idle_rejected": self.idle_rejected,
+            "requests_available": self.requests.level,
+            "tokens_available": self.tokens.level
+        }
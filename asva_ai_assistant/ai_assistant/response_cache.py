@@ -0,0 +1,317 @@
+"""
+Response Cache
+Opt-in cache for Groq chat completions with in-memory and SQLite backends
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    top_p: float
+) -> str:
+    """
+    Build a canonical hash for a completion request.
+
+    Message content is kept as sent, since spacing and line breaks carry
+    meaning in code and formatted text; only trailing whitespace is
+    dropped. Sampling parameters are rounded, so trivially different
+    payloads share a cache entry.
+    """
+    canonical = {
+        "model": model,
+        "messages": [
+            [(m.get("role") or "").lower(), (m.get("content") or "").rstrip()]
+            for m in messages
+        ],
+        "temperature": round(float(temperature), 3),
+        "max_tokens": int(max_tokens),
+        "top_p": round(float(top_p), 3),
+    }
+    return hashlib.sha256(json_codec.canonical_dumps(canonical)).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Storage interface for cached responses"""
+
+    # Whether calls block on I/O and should run in a worker thread
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a stored value, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store a value for `ttl` seconds"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a value"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every value"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Get backend counters"""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process cache with TTL and LRU eviction bounded by total bytes.
+
+    Attributes:
+        max_bytes: Maximum total size of cached values
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.time():
+            self.delete(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        self.delete(key)
+        self._entries[key] = (time.time() + ttl, value)
+        self.total_bytes += len(value)
+
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= len(entry[1])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.total_bytes}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    SQLite cache shared by every worker process on the host.
+
+    Uses WAL mode so readers in other workers are not blocked by writes.
+    Eviction removes expired rows first, then least recently used rows
+    until the total size is under `max_bytes`.
+
+    Attributes:
+        path: Database file path
+        max_bytes: Maximum total size of cached values
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed "
+            "ON response_cache (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "(key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        rows = self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY accessed_at"
+        )
+        doomed = []
+        for key, size in rows:
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        rows.close()
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", doomed)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+            ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Cache of completion responses keyed on the canonical request hash.
+
+    Attributes:
+        backend: Storage backend
+        ttl: Time to live for new entries in seconds
+        hits: Number of lookups served from the cache
+        misses: Number of lookups that went upstream
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = 3600):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response"""
+        try:
+            value = await self._call(self.backend.get, key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json_codec.loads(value)
+
+    async def set(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response"""
+        value = json_codec.dumps(response)
+        try:
+            await self._call(self.backend.set, key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and backend usage"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            **self.backend.stats()
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def create_response_cache(
+    backend: str = "memory",
+    path: Optional[str] = None,
+    ttl: float = 3600,
+    max_bytes: int = 64 * 1024 * 1024
+) -> ResponseCache:
+    """
+    Create a response cache.
+
+    Args:
+        backend: "memory" for an in-process cache or "sqlite" to share across workers
+        path: Database file for the SQLite backend
+        ttl: Time to live in seconds
+        max_bytes: Maximum total size of cached values
+
+    Returns:
+        Configured ResponseCache
+    """
+    if backend == "sqlite":
+        return ResponseCache(SQLiteCacheBackend(path or "response_cache.db", max_bytes), ttl)
+    if backend == "memory":
+        return ResponseCache(MemoryCacheBackend(max_bytes), ttl)
+    raise ValueError(f"Unknown response cache backend: {backend}")
@@ -0,0 +1,136 @@
+"""
+Retrieval
+Passages retrieved from a student's documents and their injection into prompts
+"""
+
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from tokenizer import TokenCounter
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class Passage(NamedTuple):
+    """
+    A document chunk returned by a retriever.
+
+    Attributes:
+        document_id: Document the chunk belongs to
+        chunk_index: Position of the chunk in the document
+        source: Display name of the document
+        text: Chunk text
+        score: Retrieval score, higher is better
+    """
+    document_id: str
+    chunk_index: int
+    source: str
+    text: str
+    score: float
+
+    @property
+    def label(self) -> str:
+        """Reference shown in ChatResponse.sources"""
+        return f"{self.source}#{self.chunk_index}"
+
+
+def collection_dirname(collection: str) -> str:
+    """
+    Directory name for a collection under an index root.
+
+    Collection names come from clients, so the name is reduced to a
+    readable prefix without dots or separators and suffixed with a digest
+    of the exact name: "..", "a/b" stay inside the root, and names that
+    reduce to the same prefix ("user 1", "user_1") get their own directory.
+    """
+    digest = hashlib.sha256(collection.encode("utf-8")).hexdigest()[:16]
+    return f"{_UNSAFE.sub('_', collection)[:48]}-{digest}"
+
+
+def select_passages(
+    passages: List[Passage],
+    max_tokens: int,
+    tokenizer: Optional[TokenCounter] = None
+) -> List[Passage]:
+    """Keep the best passages, in score order, that fit in `max_tokens`"""
+    tokenizer = tokenizer or TokenCounter()
+    selected = []
+    used = 0
+    for passage in passages:
+        tokens = tokenizer.count(passage.text) + 8
+        if used + tokens > max_tokens:
+            continue
+        selected.append(passage)
+        used += tokens
+    return selected
+
+
+def format_passages(passages: List[Passage]) -> str:
+    """Render passages as numbered excerpts for the system prompt"""
+    lines = [
+        "Excerpts from the student's documents that may be relevant. "
+        "Use them when they help and cite them by number, e.g. [1]."
+    ]
+    for number, passage in enumerate(passages, start=1):
+        lines.append(f"[{number}] {passage.source}:\n{passage.text}")
+    return "\n\n".join(lines)
+
+
+def fuse_rankings(rankings: List[List[Passage]], k: int, rrf_k: int = 60) -> List[Passage]:
+    """
+    Merge ranked passage lists with reciprocal rank fusion.
+
+    BM25 and cosine scores are on different scales, so passages are
+    scored by their ranks instead: sum of 1 / (rrf_k + rank) over lists.
+    """
+    fused: Dict[Tuple[str, int], List] = {}
+    for ranking in rankings:
+        for rank, passage in enumerate(ranking, start=1):
+            key = (passage.document_id, passage.chunk_index)
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = [passage, 0.0]
+            entry[1] += 1.0 / (rrf_k + rank)
+
+    best = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:k]
+    return [passage._replace(score=score) for passage, score in best]
+
+
+class HybridRetriever:
+    """
+    Keyword first-stage retrieval fused with embedding search.
+
+    Both retrievers expose `search(collection, query, k)`,
+    `add_document(...)` and `delete_document(...)`; either may be None.
+
+    Attributes:
+        keyword: BM25 store, queried first
+        semantic: Embedding store
+        candidates: Passages taken from each retriever before fusion
+    """
+
+    def __init__(self, keyword=None, semantic=None, candidates: int = 20):
+        self.keyword = keyword
+        self.semantic = semantic
+        self.candidates = candidates
+        self._retrievers = [r for r in (keyword, semantic) if r is not None]
+
+    def search(self, collection: str, query: str, k: int = 4) -> List[Passage]:
+        """Find the passages of a collection that best match a query"""
+        if len(self._retrievers) == 1:
+            return self._retrievers[0].search(collection, query, k)
+
+        candidates = max(k, self.candidates)
+        rankings = [r.search(collection, query, candidates) for r in self._retrievers]
+        return fuse_rankings(rankings, k)
+
+    def add_document(self, collection: str, document_id: str, source: str, texts: List[str]) -> int:
+        """Index a document in every retriever"""
+        counts = [r.add_document(collection, document_id, source, texts) for r in self._retrievers]
+        return max(counts, default=0)
+
+    def delete_document(self, collection: str, document_id: str) -> int:
+        """Remove a document from every retriever"""
+        counts = [r.delete_document(collection, document_id) for r in self._retrievers]
+        return max(counts, default=0)
@@ -0,0 +1,339 @@
+"""
+Semantic Cache
+Answers to paraphrased first-turn questions, found by nearest-neighbour search over cached queries
+"""
+
+import logging
+import random
+import re
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, FrozenSet, NamedTuple, Tuple
+
+import numpy as np
+
+from embedding_index import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+# (mode, complexity_level, project_type, requested model)
+Scope = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+_COUNTERS = ("lookups", "hits", "audited", "false_hits", "stores", "evictions", "saved_tokens")
+
+_WORD = re.compile(r"\w+")
+
+# Nearest cached queries checked for one that asks the same question
+_CANDIDATES = 8
+
+# Phrasing that does not change what is asked ("what is X" / "explain X");
+# question words like how and why do, so they stay
+_FILLER = frozenset((
+    "what", "whats", "is", "are", "the", "a", "an", "me", "explain", "describe",
+    "define", "tell", "about", "please", "can", "could", "you", "give"
+))
+
+
+# Words that carry no subject ("how do I sort a list in java" is about how, sort, list, java)
+_FUNCTION_WORDS = frozenset((
+    "i", "we", "my", "do", "does", "did", "in", "of", "to", "for", "on", "with",
+    "and", "or", "it", "its", "this", "that", "be", "by", "from", "at", "as", "into"
+))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and drop filler words"""
+    words = _WORD.findall(query.lower())
+    kept = [w for w in words if w not in _FILLER]
+    return " ".join(kept or words)
+
+
+def content_words(normalized: str) -> List[str]:
+    """Words of a normalized query that say what it is about, in order"""
+    return [w for w in normalized.split() if w not in _FUNCTION_WORDS]
+
+
+class SemanticHit(NamedTuple):
+    """
+    A cached answer matched to a query.
+
+    Attributes:
+        scope: Scope the answer was found in
+        query: The cached query that matched
+        result: process_query result for the cached query, marked as a semantic hit
+        similarity: Cosine similarity of the two queries
+        audit: Sampled for auditing: answer upstream anyway and compare
+    """
+    scope: Scope
+    query: str
+    result: Dict[str, Any]
+    similarity: float
+    audit: bool
+
+
+class _Scope:
+    """Cached queries of one scope: unit vectors in a matrix, entries in matching rows"""
+
+    __slots__ = ("vectors", "expires", "used", "queries", "words", "results", "size")
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.used = np.zeros(capacity, dtype=np.float64)
+        self.queries: List[str] = []
+        self.words: List[FrozenSet[str]] = []
+        self.results: List[Dict[str, Any]] = []
+        self.size = 0
+
+    def grow(self) -> None:
+        capacity = len(self.vectors) * 2
+        self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+        self.expires = np.resize(self.expires, capacity)
+        self.used = np.resize(self.used, capacity)
+
+    def remove(self, row: int) -> None:
+        """Drop a row by moving the last row into its place"""
+        last = self.size - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.expires[row] = self.expires[last]
+            self.used[row] = self.used[last]
+            self.queries[row] = self.queries[last]
+            self.words[row] = self.words[last]
+            self.results[row] = self.results[last]
+        self.queries.pop()
+        self.words.pop()
+        self.results.pop()
+        self.size = last
+
+
+class SemanticCache:
+    """
+    Serves answers to questions that paraphrase one answered before.
+
+    Only short, history-free questions are cached, since a follow-up means
+    something different in every conversation. Entries are scoped by mode,
+    complexity level, project type and requested model. A lookup embeds the
+    content words of the normalized query with the hashing vectorizer and scores it against
+    every live entry of its scope in one matrix-vector product. Hashed
+    n-grams cannot tell "sort a list in java" from "... in python", so the
+    nearest entries are then compared by content words as well: a hit
+    needs a cosine similarity of at least `threshold` and the same content
+    words, or content words that contain the other's plus at most
+    `max_extra_words` more. One added word usually narrows the question
+    ("recursion", "tail recursion"), so that only passes the threshold for
+    long queries. When each side has a word the other lacks, the queries
+    ask different things and never match. Entries expire after
+    `ttl` seconds and the least recently used entry is evicted once a
+    scope holds `max_entries`.
+
+    A share `audit_rate` of hits is sampled for auditing: the question is
+    answered upstream anyway and the fresh answer compared to the cached
+    one. Audited hits whose answers are less similar than
+    `audit_threshold` count as false hits and are kept as samples.
+
+    Attributes:
+        threshold: Query similarity needed for a hit
+        max_extra_words: Content words one query may add to the other's
+        ttl: Seconds an entry stays valid
+        max_entries: Entries kept per scope
+        max_query_chars: Longest query that is cached
+        audit_rate: Share of hits audited
+        audit_threshold: Answer similarity below which an audited hit is false
+    """
+
+    def __init__(
+            self,
+            vectorizer: Optional[HashingVectorizer] = None,
+            threshold: float = 0.9,
+            max_extra_words: int = 1,
+            ttl: float = 3600.0,
+            max_entries: int = 1024,
+            max_query_chars: int = 200,
+            audit_rate: float = 0.02,
+            audit_threshold: float = 0.5,
+            audit_samples: int = 50,
+            seed: Optional[int] = None
+    ):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.threshold = threshold
+        self.max_extra_words = max_extra_words
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_query_chars = max_query_chars
+        self.audit_rate = audit_rate
+        self.audit_threshold = audit_threshold
+        self._random = random.Random(seed)
+        self._scopes: Dict[Scope, _Scope] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._samples: "deque[Dict[str, Any]]" = deque(maxlen=audit_samples)
+
+    def _count(self, mode: str, counter: str, amount: int = 1) -> None:
+        stats = self._stats.get(mode)
+        if stats is None:
+            stats = self._stats[mode] = dict.fromkeys(_COUNTERS, 0)
+        stats[counter] += amount
+
+    def eligible(self, query: str, conversation_history: List[Dict[str, str]]) -> bool:
+        """Whether a query is short and starts its conversation (the history may hold the query itself)"""
+        if len(query) > self.max_query_chars or not query.strip():
+            return False
+        return not conversation_history or (
+            len(conversation_history) == 1 and conversation_history[0].get("content") == query
+        )
+
+    def _same_question(self, words: FrozenSet[str], cached: FrozenSet[str], similarity: float) -> bool:
+        if similarity < self.threshold:
+            return False
+        if words == cached:
+            return True
+        if not words or not cached or not (words < cached or cached < words):
+            return False
+        return len(words ^ cached) <= self.max_extra_words
+
+    def _match(self, scope: _Scope, query: str, now: float) -> Tuple[int, float, np.ndarray, FrozenSet[str]]:
+        """
+        Find the live row asking the same question as a query.
+
+        Returns:
+            (row, similarity, query vector, query content words), row -1 if there is none
+        """
+        normalized = normalize_query(query)
+        content = content_words(normalized)
+        vector = self.vectorizer.transform(" ".join(content) or normalized)
+        words = frozenset(content)
+        if not scope.size:
+            return -1, 0.0, vector, words
+
+        similarities = scope.vectors[:scope.size] @ vector
+        similarities[scope.expires[:scope.size] < now] = -1.0
+        k = min(_CANDIDATES, scope.size)
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        for row in nearest[np.argsort(-similarities[nearest])]:
+            similarity = float(similarities[row])
+            if similarity <= 0:
+                break
+            if self._same_question(words, scope.words[row], similarity):
+                return int(row), similarity, vector, words
+        return -1, 0.0, vector, words
+
+    def lookup(self, scope: Scope, query: str) -> Optional[SemanticHit]:
+        """
+        Find the cached answer to a paraphrase of a query.
+
+        Args:
+            scope: (mode, complexity_level, project_type, model) of the query
+            query: The student's question
+
+        Returns:
+            The hit, or None on a miss
+        """
+        self._count(scope[0], "lookups")
+        entries = self._scopes.get(scope)
+        if entries is None:
+            return None
+
+        now = time.monotonic()
+        row, similarity, _, _ = self._match(entries, query, now)
+        if row < 0:
+            return None
+
+        entries.used[row] = now
+        audit = self._random.random() < self.audit_rate
+        self._count(scope[0], "hits")
+        if audit:
+            self._count(scope[0], "audited")
+        else:
+            self._count(scope[0], "saved_tokens", entries.results[row]["metadata"].get("tokens_used", 0))
+
+        result = dict(entries.results[row])
+        result["metadata"] = {
+            **result["metadata"], "semantic_hit": True, "semantic_similarity": round(similarity, 4)
+        }
+        return SemanticHit(scope, entries.queries[row], result, similarity, audit)
+
+    def store(
+            self,
+            scope: Scope,
+            query: str,
+            result: Dict[str, Any],
+            audited: Optional[SemanticHit] = None
+    ) -> None:
+        """
+        Cache a fresh answer, replacing the entry of an equivalent query.
+
+        Args:
+            scope: (mode, complexity_level, project_type, model) of the query
+            query: The student's question
+            result: process_query result for it
+            audited: Hit sampled for auditing that this answer was generated for
+        """
+        mode = scope[0]
+        if audited is not None:
+            self._audit(audited, query, result["response"])
+
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = self._scopes[scope] = _Scope(self.vectorizer.dim, min(64, self.max_entries))
+
+        now = time.monotonic()
+        row, _, vector, words = self._match(entries, query, now)
+        if row < 0:
+            # Make room: expired entries first, then the least recently used one
+            expired = np.flatnonzero(entries.expires[:entries.size] < now)
+            for stale in expired[::-1]:
+                entries.remove(int(stale))
+            if entries.size >= self.max_entries:
+                entries.remove(int(np.argmin(entries.used[:entries.size])))
+                self._count(mode, "evictions")
+            if entries.size == len(entries.vectors):
+                entries.grow()
+            row = entries.size
+            entries.size += 1
+            entries.queries.append(query)
+            entries.words.append(words)
+            entries.results.append(result)
+
+        entries.vectors[row] = vector
+        entries.expires[row] = now + self.ttl
+        entries.used[row] = now
+        entries.queries[row] = query
+        entries.words[row] = words
+        entries.results[row] = result
+        self._count(mode, "stores")
+
+    def _audit(self, hit: SemanticHit, query: str, answer: str) -> None:
+        cached = self.vectorizer.transform(hit.result["response"])
+        agreement = float(cached @ self.vectorizer.transform(answer))
+        if agreement >= self.audit_threshold:
+            return
+
+        self._count(hit.scope[0], "false_hits")
+        self._samples.append({
+            "mode": hit.scope[0],
+            "query": query,
+            "cached_query": hit.query,
+            "similarity": round(hit.similarity, 4),
+            "answer_similarity": round(agreement, 4)
+        })
+        logger.info(
+            f"Semantic cache false hit in {hit.scope[0]} mode: {query!r} matched {hit.query!r} "
+            f"(similarity={hit.similarity:.3f}, answer similarity={agreement:.3f})"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get lookup counters, hit rate and audited false hit rate per mode, and recent false hits"""
+        return {
+            "modes": {
+                mode: {
+                    **counters,
+                    "hit_rate": counters["hits"] / counters["lookups"] if counters["lookups"] else 0.0,
+                    "false_hit_rate": (
+                        counters["false_hits"] / counters["audited"] if counters["audited"] else 0.0
+                    )
+                }
+                for mode, counters in self._stats.items()
+            },
+            "entries": sum(entries.size for entries in self._scopes.values()),
+            "false_hits": list(self._samples)
+        }
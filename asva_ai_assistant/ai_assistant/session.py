@@ -0,0 +1,129 @@
+"""
+Session Models
+Conversation messages and session metadata
+"""
+
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+import sys
+import time
+
+# Metadata values drawn from a small vocabulary, shared instead of copied per message
+_INTERNED_KEYS = frozenset({"mode", "model", "complexity_level", "project_type"})
+
+# Approximate fixed cost of a resident message: slots object, timestamp and list slot
+MESSAGE_OVERHEAD_BYTES = 120
+
+
+def compact_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Drop empty values and intern vocabulary strings; None when nothing is left"""
+    if not metadata:
+        return None
+    compact = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if key in _INTERNED_KEYS and isinstance(value, str):
+            value = sys.intern(value)
+        compact[sys.intern(key)] = value
+    return compact or None
+
+
+class Message:
+    """
+    A single conversation message.
+
+    Uses slots and interned role/model/mode strings, since every message of
+    every resident session is kept in memory.
+
+    Attributes:
+        role: Message author (user, assistant or system)
+        content: Message text
+        timestamp: Creation time (epoch seconds)
+        metadata: Extra information such as tokens used or model, None when empty
+    """
+
+    __slots__ = ("role", "content", "timestamp", "metadata")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        timestamp: Optional[float] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp or time.time()
+        self.metadata = compact_metadata(metadata)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Get the message in chat completion format"""
+        return {"role": self.role, "content": self.content}
+
+    def tokens_used(self) -> int:
+        """Tokens recorded in the metadata, counted towards the session total"""
+        return int(self.metadata.get("tokens_used", 0) or 0) if self.metadata else 0
+
+    def size(self) -> int:
+        """Approximate resident size in bytes"""
+        size = MESSAGE_OVERHEAD_BYTES + sys.getsizeof(self.content)
+        if self.metadata:
+            size += sys.getsizeof(self.metadata)
+        return size
+
+
+class Session:
+    """
+    Conversation session metadata.
+
+    Counters are updated as messages are added, so building SessionInfo
+    never touches the messages.
+
+    Attributes:
+        session_id: Session identifier
+        created_at: Creation time (epoch seconds)
+        last_active: Time of the last message (epoch seconds)
+        message_count: Number of messages in the session
+        total_tokens: Tokens used by the session
+        mode_history: Learning modes used, in order of first use
+    """
+
+    __slots__ = (
+        "session_id", "created_at", "last_active", "message_count",
+        "total_tokens", "mode_history"
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        created_at: Optional[float] = None,
+        last_active: Optional[float] = None,
+        message_count: int = 0,
+        total_tokens: int = 0,
+        mode_history: Optional[List[str]] = None
+    ):
+        self.session_id = session_id
+        self.created_at = created_at or time.time()
+        self.last_active = last_active or self.created_at
+        self.message_count = message_count
+        self.total_tokens = total_tokens
+        self.mode_history = [sys.intern(mode) for mode in mode_history or ()]
+
+    def add_mode(self, mode: str) -> bool:
+        """Record a learning mode; returns False if it was already used"""
+        if mode in self.mode_history:
+            return False
+        self.mode_history.append(sys.intern(mode))
+        return True
+
+    def to_info(self) -> Dict[str, Any]:
+        """Get session information in the SessionInfo response shape"""
+        return {
+            "session_id": self.session_id,
+            "created_at": datetime.fromtimestamp(self.created_at),
+            "last_active": datetime.fromtimestamp(self.last_active),
+            "message_count": self.message_count,
+            "total_tokens": self.total_tokens,
+            "mode_history": list(self.mode_history)
+        }
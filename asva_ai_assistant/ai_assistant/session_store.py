@@ -0,0 +1,460 @@
+"""
+Session Store
+Storage backends for conversation sessions: in-memory and SQLite (WAL)
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple, Any
+
+from session import Message, Session
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Storage interface used by ContextManager"""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """Get session metadata, or None if the session does not exist"""
+
+    @abstractmethod
+    def mark_dirty(self, session: Session) -> None:
+        """Schedule updated session metadata to be persisted"""
+
+    @abstractmethod
+    async def append_message(self, session: Session, message: Message) -> None:
+        """Append a message and persist the updated session metadata"""
+
+    @abstractmethod
+    async def get_messages(self, session_id: str, limit: int) -> List[Message]:
+        """Get the last `limit` messages of a session, oldest first"""
+
+    @abstractmethod
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session and its messages"""
+
+    async def flush(self) -> None:
+        """Persist pending writes"""
+        pass
+
+    async def close(self) -> None:
+        """Flush pending writes and release resources"""
+        await self.flush()
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store with a memory budget.
+
+    Sessions are kept in LRU order. When the resident messages exceed
+    `max_bytes`, or a session has been idle for longer than `idle_ttl`
+    seconds, whole sessions are evicted, least recently used first.
+    Evicted sessions are written to the `spill` store when one is given
+    and loaded back on their next message; without it they are dropped.
+    The spill store holds evicted sessions in memory only until its next
+    flush, so the budget also bounds what eviction leaves behind.
+
+    Attributes:
+        max_bytes: Approximate budget for resident messages (0 for unbounded)
+        idle_ttl: Seconds of inactivity before a session is evicted (0 to disable)
+        spill: Store receiving evicted sessions
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 0,
+        idle_ttl: float = 0,
+        spill: Optional[SessionStore] = None
+    ):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.spill = spill
+
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.messages: Dict[str, List[Message]] = {}
+        self.sizes: Dict[str, int] = {}
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.get(session_id)
+        if session is None and self.spill is not None:
+            return self.spill.get_session(session_id)
+        return session
+
+    def mark_dirty(self, session: Session) -> None:
+        if session.session_id in self.sessions:
+            self.sessions[session.session_id] = session
+        elif self.spill is not None:
+            self.spill.mark_dirty(session)
+
+    async def append_message(self, session: Session, message: Message) -> None:
+        session_id = session.session_id
+        if session_id not in self.sessions:
+            await self._load(session)
+
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        self.messages[session_id].append(message)
+
+        size = message.size()
+        self.sizes[session_id] += size
+        self.total_bytes += size
+
+        await self._evict(session_id)
+
+    async def get_messages(self, session_id: str, limit: int) -> List[Message]:
+        messages = self.messages.get(session_id)
+        if messages is None:
+            if self.spill is not None:
+                return await self.spill.get_messages(session_id, limit)
+            return []
+
+        self.sessions.move_to_end(session_id)
+        return messages[-limit:]
+
+    async def delete_session(self, session_id: str) -> bool:
+        deleted = self._drop(session_id) is not None
+        if self.spill is not None:
+            deleted = await self.spill.delete_session(session_id) or deleted
+        return deleted
+
+    async def _load(self, session: Session) -> None:
+        """Make a session resident, moving its messages back from the spill store"""
+        messages: List[Message] = []
+        if self.spill is not None and session.message_count > 1:
+            messages = await self.spill.get_messages(session.session_id, session.message_count)
+            if messages:
+                await self.spill.delete_session(session.session_id)
+
+        self.messages[session.session_id] = messages
+        size = sum(m.size() for m in messages)
+        self.sizes[session.session_id] = size
+        self.total_bytes += size
+
+    def _drop(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.pop(session_id, None)
+        self.messages.pop(session_id, None)
+        self.total_bytes -= self.sizes.pop(session_id, 0)
+        return session
+
+    async def _evict(self, keep: str) -> None:
+        """Evict idle sessions and least recently used ones until within budget"""
+        cutoff = time.time() - self.idle_ttl if self.idle_ttl else 0.0
+
+        while len(self.sessions) > 1:
+            session_id, session = next(iter(self.sessions.items()))
+            over_budget = self.max_bytes and self.total_bytes > self.max_bytes
+            if session_id == keep or not (over_budget or session.last_active < cutoff):
+                break
+
+            messages = self.messages[session_id]
+            self._drop(session_id)
+            self.evictions += 1
+
+            if self.spill is not None:
+                for message in messages:
+                    await self.spill.append_message(session, message)
+
+    async def flush(self) -> None:
+        if self.spill is not None:
+            await self.spill.flush()
+
+    async def close(self) -> None:
+        if self.spill is not None:
+            await self.spill.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get resident session counts and memory use"""
+        return {
+            "sessions": len(self.sessions),
+            "messages": sum(len(m) for m in self.messages.values()),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions
+        }
+
+
+class _SessionUpdate:
+    """Unflushed changes to one session: its latest state and the messages and tokens it gained"""
+
+    __slots__ = ("session", "messages", "tokens")
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.messages = 0
+        self.tokens = 0
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite store shared by every worker process on the host.
+
+    Messages are written behind: `append_message` only queues them, and the
+    queue is flushed in one transaction when it reaches `batch_size`, every
+    `flush_interval` seconds and on close. Reads merge queued messages, so
+    a session always sees its own writes.
+
+    Sessions are not cached: only sessions with unflushed changes are kept,
+    and everything else is read from the database, so a worker sees the
+    others' writes. Flushes add message and token counts to the stored row
+    and merge mode histories instead of overwriting them.
+
+    Attributes:
+        path: Database file path
+        batch_size: Queued messages that trigger a flush
+        flush_interval: Maximum seconds a message stays queued
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_active REAL NOT NULL,
+                message_count INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                mode_history TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                metadata TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+            """
+        )
+        self._conn.commit()
+
+        self._pending: List[Tuple[str, Message]] = []
+        self._flushing: List[Tuple[str, Message]] = []
+        self._dirty: Dict[str, _SessionUpdate] = {}
+        self._flushing_sessions: Dict[str, _SessionUpdate] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        update = self._dirty.get(session_id) or self._flushing_sessions.get(session_id)
+        if update is not None:
+            return update.session
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, last_active, message_count, total_tokens, mode_history "
+                "FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return Session(session_id, row[0], row[1], row[2], row[3], json.loads(row[4]))
+
+    def _update(self, session: Session) -> _SessionUpdate:
+        update = self._dirty.get(session.session_id)
+        if update is None:
+            update = self._dirty[session.session_id] = _SessionUpdate(session)
+        update.session = session
+        self._ensure_flusher()
+        return update
+
+    def mark_dirty(self, session: Session) -> None:
+        self._update(session)
+
+    async def append_message(self, session: Session, message: Message) -> None:
+        self._pending.append((session.session_id, message))
+        update = self._update(session)
+        update.messages += 1
+        update.tokens += message.tokens_used()
+
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def get_messages(self, session_id: str, limit: int) -> List[Message]:
+        # Holding the lock keeps the database and the in-flight batch consistent
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, timestamp, metadata FROM messages "
+                "WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+            queued = [m for sid, m in self._flushing if sid == session_id]
+
+        queued.extend(m for sid, m in self._pending if sid == session_id)
+
+        messages = [
+            Message(role, content, timestamp, json.loads(metadata) if metadata else None)
+            for role, content, timestamp, metadata in reversed(rows)
+        ]
+        messages.extend(queued)
+        return messages[-limit:]
+
+    async def delete_session(self, session_id: str) -> bool:
+        await self.flush()
+        self._dirty.pop(session_id, None)
+
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+            ).rowcount
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        return deleted > 0
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while self._pending or self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Session store flush failed: {str(e)}")
+
+    async def flush(self) -> None:
+        """Write queued messages and session updates in one transaction"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._pending and not self._dirty:
+                return
+
+            self._flushing, self._pending = self._pending, []
+            self._flushing_sessions, self._dirty = self._dirty, {}
+
+            write = asyncio.ensure_future(asyncio.to_thread(
+                self._write_batch, self._flushing, list(self._flushing_sessions.values())
+            ))
+            cancelled = False
+            while not write.done():
+                try:
+                    await asyncio.wait((write,))
+                except asyncio.CancelledError:
+                    # The thread commits the batch regardless: wait for the outcome,
+                    # so it is neither written twice nor overtaken by the next flush
+                    cancelled = True
+
+            if write.exception() is not None:
+                # Keep the batch and the session changes for the next attempt
+                self._pending[:0] = self._flushing
+                self._flushing = []
+                for session_id, update in self._flushing_sessions.items():
+                    newer = self._dirty.get(session_id)
+                    if newer is None:
+                        self._dirty[session_id] = update
+                    else:
+                        newer.messages += update.messages
+                        newer.tokens += update.tokens
+                self._flushing_sessions = {}
+                raise write.exception()
+            if cancelled:
+                raise asyncio.CancelledError
+
+    def _write_batch(
+        self,
+        messages: List[Tuple[str, Message]],
+        updates: List[_SessionUpdate]
+    ) -> None:
+        with self._lock:
+            with self._conn:
+                # Take the write lock up front: mode histories are read, merged and written back
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, timestamp, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            sid, m.role, m.content, m.timestamp,
+                            json.dumps(m.metadata) if m.metadata else None
+                        )
+                        for sid, m in messages
+                    ]
+                )
+                sessions = []
+                for update in updates:
+                    session = update.session
+                    row = self._conn.execute(
+                        "SELECT mode_history FROM sessions WHERE session_id = ?", (session.session_id,)
+                    ).fetchone()
+                    modes = json.loads(row[0]) if row else []
+                    modes.extend(mode for mode in session.mode_history if mode not in modes)
+                    sessions.append((
+                        session.session_id, session.created_at, session.last_active,
+                        update.messages, update.tokens, json.dumps(modes)
+                    ))
+                self._conn.executemany(
+                    "INSERT INTO sessions (session_id, created_at, last_active, "
+                    "message_count, total_tokens, mode_history) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET "
+                    "last_active = MAX(last_active, excluded.last_active), "
+                    "message_count = message_count + excluded.message_count, "
+                    "total_tokens = total_tokens + excluded.total_tokens, "
+                    "mode_history = excluded.mode_history",
+                    sessions
+                )
+            self._flushing = []
+            self._flushing_sessions = {}
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(
+    backend: str = "memory",
+    path: Optional[str] = None,
+    batch_size: int = 256,
+    flush_interval: float = 0.5,
+    max_bytes: int = 0,
+    idle_ttl: float = 0,
+    spill_path: Optional[str] = None
+) -> SessionStore:
+    """
+    Create a session store.
+
+    Args:
+        backend: "memory" for a process-local store or "sqlite" to persist and share sessions
+        path: Database file for the SQLite backend
+        batch_size: Queued messages that trigger a flush (SQLite)
+        flush_interval: Maximum seconds a message stays queued (SQLite)
+        max_bytes: Memory budget for resident messages (memory)
+        idle_ttl: Seconds before an idle session is evicted (memory)
+        spill_path: SQLite file receiving evicted sessions (memory)
+
+    Returns:
+        Configured SessionStore
+    """
+    if backend == "sqlite":
+        return SQLiteSessionStore(path or "sessions.db", batch_size, flush_interval)
+    if backend == "memory":
+        spill = SQLiteSessionStore(spill_path, batch_size, flush_interval) if spill_path else None
+        return InMemorySessionStore(max_bytes, idle_ttl, spill)
+    raise ValueError(f"Unknown session store backend: {backend}")
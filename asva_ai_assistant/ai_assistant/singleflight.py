@@ -0,0 +1,202 @@
+"""
+Request Coalescing
+Single-flight execution for identical in-flight Groq calls
+"""
+
+import asyncio
+import copy
+import hashlib
+import logging
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+def make_payload_key(payload: Dict[str, Any]) -> str:
+    """Hash a request payload so byte-identical requests share a key"""
+    return hashlib.sha256(json_codec.canonical_dumps(payload)).hexdigest()
+
+
+class _Call:
+    """An upstream call shared by every caller with the same key"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs one upstream call per key and shares its result with concurrent callers.
+
+    The upstream call runs in its own task, so a cancelled caller does not
+    fail the others. The task is cancelled once every caller has gone away.
+
+    Attributes:
+        leaders: Calls that went upstream
+        coalesced: Calls that awaited an existing upstream call
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn` unless a call with the same key is already in flight.
+
+        Args:
+            key: Canonical payload key
+            fn: Coroutine factory performing the upstream call
+
+        Returns:
+            Result of the shared call. Coalesced callers get their own copy.
+        """
+        call = self._calls.get(key)
+        leader = call is None
+
+        if leader:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Forget the key now: a caller arriving while the task
+                # unwinds must start a new call instead of joining this one
+                self._forget(key, call)
+                call.task.cancel()
+
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls)
+        }
+
+
+class _Broadcast:
+    """An upstream stream replayed to every subscriber"""
+
+    def __init__(self):
+        self.chunks: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamFanout:
+    """
+    Shares one upstream stream between subscribers of an identical request.
+
+    Chunks are buffered for the lifetime of the stream, so a subscriber that
+    joins late first replays what it missed and then follows live.
+
+    Attributes:
+        leaders: Streams that went upstream
+        coalesced: Subscribers attached to an existing stream
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, _Broadcast] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def subscribe(
+        self,
+        key: str,
+        source: Callable[[], AsyncIterator[Dict[str, Any]]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the chunks of the stream for `key`, starting it if needed.
+
+        Args:
+            key: Canonical payload key
+            source: Factory for the upstream chunk iterator
+        """
+        broadcast = self._streams.get(key)
+
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, source))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        broadcast.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(broadcast.chunks):
+                    yield broadcast.chunks[index]
+                    index += 1
+
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+
+                async with broadcast.changed:
+                    if index == len(broadcast.chunks) and not broadcast.done:
+                        await broadcast.changed.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Same as SingleFlight.do: new subscribers start a new stream
+                self._forget(key, broadcast)
+                broadcast.task.cancel()
+
+    async def _pump(
+        self,
+        key: str,
+        broadcast: _Broadcast,
+        source: Callable[[], AsyncIterator[Dict[str, Any]]]
+    ) -> None:
+        """Consume the upstream stream and wake subscribers on every chunk"""
+        try:
+            async for chunk in source():
+                broadcast.chunks.append(chunk)
+                async with broadcast.changed:
+                    broadcast.changed.notify_all()
+        except asyncio.CancelledError:
+            broadcast.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            broadcast.done = True
+            self._forget(key, broadcast)
+            async with broadcast.changed:
+                broadcast.changed.notify_all()
+
+    def _forget(self, key: str, broadcast: _Broadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._streams)
+        }
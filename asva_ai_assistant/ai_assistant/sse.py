@@ -0,0 +1,227 @@
+"""
+Server-Sent Events
+Byte-level SSE parsing and pre-serialized frames for the streaming relay
+"""
+
+import asyncio
+import time
+from json.decoder import scanstring
+from typing import Optional, List, AsyncIterator, Awaitable, Callable, Set
+
+import json_codec
+
+_DONE = b"[DONE]"
+
+# Same bytes as StreamChunk(type="token", content=...).model_dump_json()
+_TOKEN_FRAME = 'data: {"type":"token","content":%s,"session_id":null,"metadata":null}\n\n'
+
+
+async def iter_sse_data(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Yield the payload of every `data:` line in a raw SSE byte stream.
+
+    Stops at the `[DONE]` sentinel. Works on the raw bytes, so lines are
+    never decoded or copied more than once.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer = buffer + chunk if buffer else chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = buffer[start:end]
+            start = end + 1
+
+            if line.startswith(b"data:"):
+                data = line[5:].strip()
+                if data == _DONE:
+                    return
+                if data:
+                    yield data
+        buffer = buffer[start:]
+
+
+def extract_delta_content(data: str) -> Optional[str]:
+    """
+    Extract `choices[0].delta.content` from a completion chunk without parsing it.
+
+    Only the content string itself is decoded. Returns None when the chunk
+    carries no content (role-only, finish or usage chunks).
+    """
+    delta = data.find('"delta"')
+    if delta < 0:
+        return None
+
+    key = data.find('"content"', delta)
+    if key < 0 or data.find("}", delta, key) >= 0:
+        return None
+
+    position = key + 9
+    length = len(data)
+    while position < length and data[position] in ' :\t':
+        position += 1
+
+    if position >= length or data[position] != '"':
+        return None
+
+    content, _ = scanstring(data, position + 1)
+    return content
+
+
+def extract_usage(data: str) -> Optional[dict]:
+    """Get token usage from a completion chunk (OpenAI `usage` or Groq `x_groq.usage`)"""
+    if '"usage"' not in data:
+        return None
+    chunk = json_codec.loads(data)
+    return chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+
+
+def token_frame(content: str) -> str:
+    """Serialize a token event without building a StreamChunk"""
+    return _TOKEN_FRAME % json_codec.dumps_str(content)
+
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str],
+    max_chars: int = 32,
+    max_delay: float = 0.015
+) -> AsyncIterator[str]:
+    """
+    Merge tiny deltas into larger pieces.
+
+    The first delta is emitted at once, so coalescing never delays the
+    first token. After it, a piece is emitted once it reaches `max_chars`,
+    or `max_delay` seconds after its first delta arrived even if the
+    source has gone quiet. A reader task buffers deltas while a piece is
+    pending, so the timer costs one wait per piece rather than per delta.
+    """
+    parts: List[str] = []
+    size = 0
+    started = 0.0
+    arrived = asyncio.Event()
+    ready = asyncio.Event()
+    room = asyncio.Event()
+    room.set()
+
+    async def read() -> None:
+        nonlocal size, started
+        try:
+            async for delta in deltas:
+                if not room.is_set():
+                    await room.wait()
+                if not parts:
+                    started = time.monotonic()
+                    arrived.set()
+                parts.append(delta)
+                size += len(delta)
+                if size >= max_chars:
+                    room.clear()
+                    ready.set()
+        finally:
+            arrived.set()
+            ready.set()
+
+    reader = None
+    try:
+        try:
+            yield await deltas.__anext__()
+        except StopAsyncIteration:
+            return
+
+        reader = asyncio.ensure_future(read())
+        while True:
+            if not arrived.is_set():
+                await arrived.wait()
+            if not ready.is_set():
+                try:
+                    await asyncio.wait_for(ready.wait(), started + max_delay - time.monotonic())
+                except asyncio.TimeoutError:
+                    pass
+            done = reader.done()
+            if parts:
+                piece = "".join(parts)
+                parts.clear()
+                size = 0
+                arrived.clear()
+                ready.clear()
+                room.set()
+                yield piece
+            if done:
+                reader.result()
+                return
+    finally:
+        await _release(reader, deltas)
+
+
+async def until_disconnected(
+    frames: AsyncIterator[str],
+    receive: Callable[[], Awaitable[dict]]
+) -> AsyncIterator[str]:
+    """
+    Relay frames until the client disconnects, then cancel the source.
+
+    Starlette only notices a gone client when the next frame fails to send,
+    so a relay waiting on a slow upstream would keep it running. Here each
+    step of the source is raced against the ASGI `http.disconnect` message;
+    on disconnect the pending step is cancelled inside the source, which
+    closes its upstream request and runs its cleanup before this returns.
+
+    Args:
+        frames: Source of SSE frames
+        receive: ASGI receive callable of the request (body already read)
+    """
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    step = None
+    try:
+        while True:
+            step = asyncio.ensure_future(frames.__anext__())
+            await asyncio.wait((step, watcher), return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                step.cancel()
+                try:
+                    await step
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+                return
+            try:
+                frame = step.result()
+            except StopAsyncIteration:
+                return
+            yield frame
+    finally:
+        watcher.cancel()
+        await _release(step, frames)
+
+
+# Strong references to sources being closed in the background
+_closing: Set[asyncio.Future] = set()
+
+
+async def _release(step: Optional[asyncio.Future], source: AsyncIterator[str]) -> None:
+    """Close a source, cancelling its pending step first"""
+    if step is not None and not step.done():
+        # Closed or cancelled from outside mid-step, e.g. by Starlette's
+        # own disconnect listener on ASGI < 2.4. The source cannot be closed
+        # while that step runs, and this task may be cancelled again at
+        # every await, so cancel the step and close in a task of its own
+        step.cancel()
+        closing = asyncio.ensure_future(_close_after(step, source))
+        _closing.add(closing)
+        closing.add_done_callback(_closing.discard)
+    else:
+        await source.aclose()
+
+
+async def _close_after(step: asyncio.Future, source: AsyncIterator[str]) -> None:
+    """Wait for a cancelled step of a source, then close the source"""
+    try:
+        await step
+    except (Exception, asyncio.CancelledError):
+        pass
+    await source.aclose()
@@ -0,0 +1,188 @@
+"""
+Stand-alone test-suite for ModeHandler.process_batch and the batch chat endpoint.
+"""
+import asyncio
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from exceptions import GroqAPIError, RateLimitError
+from mode_handler import ModeHandler, LearningMode, MODE_SUGGESTIONS
+from prefetch import SuggestionPrefetcher
+from test_stubs import stub_client
+
+
+def make_client(delays):
+    """Client whose completions sleep per query, fail on 'boom' and are rate limited on 'busy'"""
+    async def respond(messages, **kwargs):
+        query = messages[-1]["content"]
+        await asyncio.sleep(delays.get(query, 0.01))
+        if query == "boom":
+            raise GroqAPIError("upstream failed")
+        if query == "busy":
+            raise RateLimitError("Rate limit exceeded after retries")
+        return query.upper()
+
+    return stub_client(respond)
+
+
+async def collect(handler, items, client, max_concurrency):
+    return [r async for r in handler.process_batch(items, groq_client=client, max_concurrency=max_concurrency)]
+
+
+class TestProcessBatch(unittest.TestCase):
+
+    def test_completion_order_and_errors(self):
+        client = make_client({"slow": 0.1, "fast": 0.0})
+        items = [{"query": q, "mode": LearningMode.DEFAULT} for q in ("slow", "boom", "fast")]
+        results = asyncio.run(collect(ModeHandler(), items, client, 3))
+
+        self.assertEqual([r["index"] for r in results], [2, 1, 0])
+        self.assertIsInstance(results[1]["error"], GroqAPIError)
+        self.assertEqual(results[2]["result"]["response"], "SLOW")
+
+    def test_bounded_concurrency(self):
+        client = make_client({})
+        items = [{"query": f"q{i}", "mode": LearningMode.DEFAULT} for i in range(20)]
+        results = asyncio.run(collect(ModeHandler(), items, client, 4))
+
+        self.assertEqual(sorted(r["index"] for r in results), list(range(20)))
+        self.assertEqual(client.peak, 4)
+
+    def test_closing_early_cancels_workers(self):
+        client = make_client({"q1": 10, "q2": 10})
+        items = [{"query": q, "mode": LearningMode.DEFAULT} for q in ("q0", "q1", "q2")]
+
+        async def first():
+            batch = ModeHandler().process_batch(items, groq_client=client, max_concurrency=3)
+            result = await batch.__anext__()
+            await batch.aclose()
+            return result
+
+        self.assertEqual(asyncio.run(first())["index"], 0)
+        self.assertEqual(client.in_flight, 0)
+
+
+def load_routes():
+    """
+    Import the chat routes and dependencies as part of the package.
+
+    The routes reach the package root with `....ai_assistant`, so it is
+    imported from two levels up, and the shared dependencies as the
+    top-level `api` package, so that name points at the package's own.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    root = os.path.dirname(os.path.dirname(here))
+    package = f"{os.path.basename(os.path.dirname(here))}.{os.path.basename(here)}"
+    sys.path.insert(0, root)
+    try:
+        dependencies = importlib.import_module(f"{package}.api.dependencies")
+        sys.modules.setdefault("api", importlib.import_module(f"{package}.api"))
+        sys.modules.setdefault("api.dependencies", dependencies)
+        chat = importlib.import_module(f"{package}.api.routes.chat")
+        mode_handler = importlib.import_module(f"{package}.mode_handler")
+        context_manager = importlib.import_module(f"{package}.context_manager")
+    finally:
+        sys.path.remove(root)
+    return chat, dependencies, mode_handler, context_manager
+
+
+class TestBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        chat, dependencies, mode_handler, context_manager = load_routes()
+        self.settings = chat.settings
+        self.mode_handler = mode_handler
+        self.dependencies = dependencies
+        self.app = app = FastAPI()
+        app.include_router(chat.router)
+        self.client = make_client({"slow": 0.1})
+        self.context_manager = context_manager.ContextManager()
+        app.dependency_overrides[dependencies.get_groq_client] = lambda: self.client
+        app.dependency_overrides[dependencies.get_mode_handler] = lambda: mode_handler.ModeHandler()
+        app.dependency_overrides[dependencies.get_context_manager] = lambda: self.context_manager
+        self.http = TestClient(app)
+
+    def test_streams_one_line_per_item(self):
+        response = self.http.post("/chat/batch", json={"items": [
+            {"id": "a", "message": "slow", "mode": "explainer", "complexity_level": "beginner"},
+            {"id": "b", "message": "boom"},
+            {"id": "c", "message": "fast", "mode": "nonsense"},
+            {"message": "fast", "max_tokens": 64},
+            {"message": "busy"},
+        ], "max_concurrency": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        by_index = {line["index"]: line for line in lines}
+        self.assertEqual(sorted(by_index), [0, 1, 2, 3, 4])
+        # Invalid items fail first, the slow item finishes last
+        self.assertEqual(lines[0]["index"], 2)
+        self.assertEqual(lines[-1]["index"], 0)
+
+        self.assertEqual(by_index[0]["status"], "ok")
+        self.assertEqual((by_index[0]["id"], by_index[0]["response"]), ("a", "SLOW"))
+        self.assertEqual(by_index[0]["metadata"]["complexity_level"], "beginner")
+        self.assertEqual(by_index[1]["error"]["code"], "PROCESSING_ERROR")
+        self.assertEqual(by_index[2]["error"]["code"], "INVALID_REQUEST")
+        self.assertNotIn("id", by_index[3])
+        self.assertEqual(by_index[3]["response"], "FAST")
+        self.assertEqual(by_index[4]["error"]["code"], "RATE_LIMITED")
+
+    def test_chat_request(self):
+        response = self.http.post("/chat", json={
+            "session_id": "s1", "message": "fast", "mode": "explainer",
+            "parameters": {"complexity_level": "intermediate", "max_tokens": 64}
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["session_id"], body["response"], body["mode"]), ("s1", "FAST", "explainer"))
+        self.assertEqual(self.context_manager.get_session("s1").message_count, 2)
+        self.assertEqual(self.http.post("/chat", json={"message": "fast"}).status_code, 422)
+
+    def test_chat_sends_each_turn_once(self):
+        for message in ("fast", "again"):
+            self.assertEqual(self.http.post("/chat", json={"session_id": "s1", "message": message}).status_code, 200)
+        messages, kwargs = self.client.calls[-1]
+        self.assertEqual([m["content"] for m in messages[1:]], ["fast", "FAST", "again"])
+        # Without a router the window is sized for the default model, not the smallest one
+        self.assertEqual(kwargs["model"], self.settings.GROQ_MODEL)
+
+    def test_prefetched_stream_is_recorded(self):
+        handler = self.mode_handler.ModeHandler(prefetcher=SuggestionPrefetcher())
+        handler.index_answer = AsyncMock()
+        self.app.dependency_overrides[self.dependencies.get_mode_handler] = lambda: handler
+        self.context_manager.record_mode = Mock(wraps=self.context_manager.record_mode)
+        suggestion = MODE_SUGGESTIONS[LearningMode.EXPLAINER][0]
+
+        # One client keeps one event loop, so the prefetches outlive the first request
+        with TestClient(self.app) as http:
+            http.post("/chat", json={"session_id": "s1", "message": "fast", "mode": "explainer"})
+            handler.index_answer.reset_mock()
+            self.context_manager.record_mode.reset_mock()
+            response = http.post("/chat/stream", json={"session_id": "s1", "message": suggestion, "mode": "explainer"})
+
+        self.assertIn(suggestion.upper(), response.text)
+        handler.index_answer.assert_awaited_once_with("s1", suggestion.upper())
+        self.context_manager.record_mode.assert_called_once_with("s1", "explainer")
+        messages = asyncio.run(self.context_manager.store.get_messages("s1", 10))
+        self.assertEqual(len(messages), 4)
+        self.assertTrue(messages[-1].metadata["prefetched"])
+
+    def test_rejects_invalid_batches(self):
+        self.assertEqual(self.http.post("/chat/batch", json={"items": []}).status_code, 422)
+        self.assertEqual(self.http.post("/chat/batch", json={"items": [{"message": ""}]}).status_code, 422)
+        self.assertEqual(self.http.post("/chat/batch", json={
+            "items": [{"message": "a"}], "max_concurrency": 0
+        }).status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Stand-alone test-suite for the BM25 index and hybrid retrieval.
+"""
+import os
+import tempfile
+import unittest
+
+from bm25_index import BM25Index, BM25Store, tokenize
+from embedding_index import EmbeddingStore
+from retrieval import HybridRetriever, Passage, fuse_rankings
+
+DOCS = {
+    "physics": [
+        "Quantum entanglement links the states of two particles.",
+        "Newton's second law relates force, mass and acceleration.",
+    ],
+    "biology": [
+        "Mitosis is cell division producing two identical cells.",
+        "DNA stores genetic information in a double helix.",
+    ],
+}
+
+
+class TestBM25Index(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "keywords.bm25")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_tokenize_drops_stopwords(self):
+        self.assertEqual(tokenize("What is the Force?"), ["force"])
+
+    def test_ranking_prefers_rare_terms(self):
+        index = BM25Index(self.path, snapshot_every=0)
+        index.add("a", "a", ["cell cell membrane", "cell wall", "mitochondria cell"])
+        hits = index.search("mitochondria cell", k=3)
+        self.assertEqual(hits[0][0], 2)
+        self.assertEqual(len(hits), 3)
+        self.assertEqual(index.search("photosynthesis"), [])
+
+    def test_snapshot_reopen_and_delta(self):
+        index = BM25Index(self.path, snapshot_every=0)
+        for document_id, texts in DOCS.items():
+            index.add(document_id, f"{document_id}.pdf", texts)
+        index.delete("physics")
+        index.snapshot()
+        self.assertEqual(index.count, 2)
+
+        reopened = BM25Index(self.path, snapshot_every=0)
+        self.assertEqual(reopened.postings, index.postings)
+        reopened.add("chemistry", "chemistry.pdf", ["Covalent bonds share electron pairs."])
+        passages = reopened.passages(reopened.search("genetic electron", k=4))
+        self.assertEqual({p.document_id for p in passages}, {"biology", "chemistry"})
+        self.assertNotIn("physics", {p.document_id for p in reopened.passages(reopened.search("quantum"))})
+
+    def test_automatic_snapshot(self):
+        index = BM25Index(self.path, snapshot_every=2)
+        index.add("a", "a", ["alpha"])
+        self.assertFalse(os.path.exists(self.path))
+        index.add("b", "b", ["beta"])
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(index._delta, {})
+        self.assertEqual(index.search("beta")[0][0], 1)
+
+    def test_unsnapshotted_chunks_survive_a_crash(self):
+        index = BM25Index(self.path, snapshot_every=0)
+        index.add("biology", "biology.pdf", DOCS["biology"])
+        # No snapshot and no close, as if the process died
+        reopened = BM25Index(self.path, snapshot_every=0)
+        self.assertEqual(reopened.passages(reopened.search("double helix", k=1))[0].document_id, "biology")
+
+    def test_writers_in_two_processes_merge(self):
+        first = BM25Index(self.path, snapshot_every=0)
+        second = BM25Index(self.path, snapshot_every=0)
+        first.add("physics", "physics.pdf", DOCS["physics"])
+        second.add("biology", "biology.pdf", DOCS["biology"])
+        second.snapshot()
+        first.delete("biology")
+        first.add("chemistry", "chemistry.pdf", ["Covalent bonds share electron pairs."])
+        first.snapshot()
+        second.snapshot()
+
+        for index in (first, second, BM25Index(self.path, snapshot_every=0)):
+            passages = index.passages(index.search("quantum mitosis electron", k=10))
+            self.assertEqual({p.document_id for p in passages}, {"physics", "chemistry"})
+            self.assertEqual(index.live, 3)
+
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"Covalent", f.read())
+
+
+class TestHybridRetriever(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.keyword = BM25Store(self.tmp.name)
+        self.semantic = EmbeddingStore(self.tmp.name)
+        self.retriever = HybridRetriever(self.keyword, self.semantic)
+        for document_id, texts in DOCS.items():
+            self.retriever.add_document("student-1", document_id, f"{document_id}.pdf", texts)
+
+    def tearDown(self):
+        self.keyword.close()
+        self.semantic.close()
+        self.tmp.cleanup()
+
+    def test_fused_search(self):
+        passages = self.retriever.search("student-1", "what is quantum entanglement", k=2)
+        self.assertEqual(passages[0].label, "physics.pdf#0")
+        self.assertEqual(self.retriever.search("student-2", "quantum"), [])
+
+    def test_delete_from_both(self):
+        self.assertEqual(self.retriever.delete_document("student-1", "biology"), 2)
+        passages = self.retriever.search("student-1", "DNA genetic information", k=4)
+        self.assertNotIn("biology", {p.document_id for p in passages})
+
+    def test_keyword_store_persists(self):
+        self.keyword.close()
+        passages = BM25Store(self.tmp.name).search("student-1", "double helix", k=1)
+        self.assertEqual(passages[0].label, "biology.pdf#1")
+
+    def test_collection_names_stay_inside_root(self):
+        for collection in ("..", ".", "../student-1", "a/b"):
+            self.retriever.add_document(collection, "physics", "physics.pdf", DOCS["physics"])
+        self.retriever.add_document("user 1", "biology", "biology.pdf", DOCS["biology"])
+        self.assertEqual(self.retriever.search("user_1", "DNA genetic information"), [])
+        self.assertEqual(self.retriever.search("user 1", "DNA genetic information")[0].document_id, "biology")
+
+        root = os.path.realpath(self.tmp.name)
+        for store in (self.keyword, self.semantic):
+            paths = {os.path.realpath(store._path(c)) for c in ("..", ".", "user 1", "user_1", "student-1")}
+            self.assertEqual(len(paths), 5)
+            self.assertTrue(all(path.startswith(root + os.sep) for path in paths))
+
+    def test_fuse_rankings(self):
+        a, b, c = (Passage("d", i, "d", str(i), 0.0) for i in range(3))
+        fused = fuse_rankings([[a, b], [b, c]], k=2)
+        self.assertEqual([p.chunk_index for p in fused], [1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
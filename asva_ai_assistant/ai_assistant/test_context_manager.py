@@ -0,0 +1,341 @@
+"""
+Stand-alone test-suite for the context manager and session stores.
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from context_manager import ContextManager
+from session import Message
+from session_store import InMemorySessionStore, SQLiteSessionStore, create_session_store
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestInMemoryContextManager(unittest.TestCase):
+
+    def test_add_and_get_conversation(self):
+        async def scenario():
+            manager = ContextManager()
+            await manager.add_message("s1", "user", "hi")
+            await manager.add_message("s1", "assistant", "hello", {"tokens_used": 12})
+            return manager, await manager.get_conversation("s1")
+
+        manager, conversation = run(scenario())
+        self.assertEqual(conversation, [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+        ])
+        session = manager.get_session("s1")
+        self.assertEqual(session.message_count, 2)
+        self.assertEqual(session.total_tokens, 12)
+
+    def test_get_conversation_returns_tail(self):
+        async def scenario():
+            manager = ContextManager(max_history=3)
+            for i in range(10):
+                await manager.add_message("s1", "user", str(i))
+            return await manager.get_conversation("s1")
+
+        conversation = run(scenario())
+        self.assertEqual([m["content"] for m in conversation], ["7", "8", "9"])
+
+    def test_record_mode_once(self):
+        async def scenario():
+            manager = ContextManager()
+            await manager.add_message("s1", "user", "hi")
+            manager.record_mode("s1", "socratic")
+            manager.record_mode("s1", "socratic")
+            return manager.get_session("s1")
+
+        self.assertEqual(run(scenario()).mode_history, ["socratic"])
+
+    def test_clear_session(self):
+        async def scenario():
+            manager = ContextManager()
+            await manager.add_message("s1", "user", "hi")
+            cleared = await manager.clear_session("s1")
+            missing = await manager.clear_session("s1")
+            return cleared, missing, manager.get_session("s1")
+
+        self.assertEqual(run(scenario()), (True, False, None))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_session_store("redis")
+
+
+class TestCompactMessage(unittest.TestCase):
+
+    def test_slots_and_interning(self):
+        a = Message("".join(["assis", "tant"]), "x", metadata={"model": "".join(["mix", "tral"])})
+        b = Message("assistant", "y", metadata={"model": "mixtral", "project_type": None})
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertIs(a.role, b.role)
+        self.assertIs(a.metadata["model"], b.metadata["model"])
+        self.assertNotIn("project_type", b.metadata)
+
+    def test_empty_metadata_is_none(self):
+        self.assertIsNone(Message("user", "hi", metadata={"complexity_level": None}).metadata)
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_lru_eviction_within_budget(self):
+        async def scenario():
+            store = InMemorySessionStore(max_bytes=3 * Message("user", "x" * 100).size())
+            manager = ContextManager(store)
+            for session_id in ("a", "b", "c"):
+                await manager.add_message(session_id, "user", "x" * 100)
+            await manager.get_conversation("a")
+            await manager.add_message("d", "user", "x" * 100)
+            return store
+
+        store = run(scenario())
+        self.assertEqual(list(store.sessions), ["c", "a", "d"])
+        self.assertEqual(store.evictions, 1)
+        self.assertLessEqual(store.total_bytes, store.max_bytes)
+
+    def test_idle_sessions_evicted(self):
+        async def scenario():
+            store = InMemorySessionStore(idle_ttl=60)
+            manager = ContextManager(store)
+            await manager.add_message("old", "user", "hi")
+            manager.get_session("old").last_active -= 120
+            await manager.add_message("new", "user", "hi")
+            return manager
+
+        manager = run(scenario())
+        self.assertIsNone(manager.get_session("old"))
+        self.assertIsNotNone(manager.get_session("new"))
+
+    def test_spill_and_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            async def scenario():
+                spill = SQLiteSessionStore(os.path.join(tmp, "spill.db"))
+                store = InMemorySessionStore(max_bytes=1, spill=spill)
+                manager = ContextManager(store)
+                await manager.add_message("a", "user", "one", {"tokens_used": 5})
+                await manager.add_message("b", "user", "two")
+                spilled = "a" not in store.sessions
+                history = await manager.get_conversation("a")
+                session = manager.get_session("a")
+                await manager.add_message("a", "assistant", "three")
+                reloaded = [m.content for m in store.messages["a"]]
+                await manager.close()
+                return spilled, history, session.total_tokens, reloaded
+
+            spilled, history, tokens, reloaded = run(scenario())
+
+        self.assertTrue(spilled)
+        self.assertEqual(history, [{"role": "user", "content": "one"}])
+        self.assertEqual(tokens, 5)
+        self.assertEqual(reloaded, ["one", "three"])
+
+    def test_spilled_sessions_leave_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            async def scenario():
+                spill = SQLiteSessionStore(os.path.join(tmp, "spill.db"), flush_interval=60)
+                store = InMemorySessionStore(max_bytes=1, spill=spill)
+                manager = ContextManager(store)
+                for i in range(100):
+                    await manager.add_message(f"s{i}", "user", "hi", {"tokens_used": 1})
+                await store.flush()
+                held = len(spill._dirty) + len(spill._flushing_sessions)
+                session = manager.get_session("s0")
+                await manager.close()
+                return len(store.sessions), held, session
+
+            resident, held, session = run(scenario())
+
+        self.assertEqual(resident, 1)
+        self.assertEqual(held, 0)
+        self.assertEqual((session.message_count, session.total_tokens), (1, 1))
+
+
+class TestSQLiteSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sessions.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reads_see_unflushed_writes(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path, batch_size=1000, flush_interval=60)
+            manager = ContextManager(store)
+            await manager.add_message("s1", "user", "a")
+            await manager.add_message("s1", "assistant", "b")
+            queued = len(store._pending)
+            conversation = await manager.get_conversation("s1")
+            await manager.close()
+            return queued, conversation
+
+        queued, conversation = run(scenario())
+        self.assertEqual(queued, 2)
+        self.assertEqual([m["content"] for m in conversation], ["a", "b"])
+
+    def test_batch_size_triggers_flush(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path, batch_size=4, flush_interval=60)
+            manager = ContextManager(store)
+            for i in range(5):
+                await manager.add_message("s1", "user", str(i))
+            pending = len(store._pending)
+            conversation = await manager.get_conversation("s1", max_messages=2)
+            await manager.close()
+            return pending, conversation
+
+        pending, conversation = run(scenario())
+        self.assertEqual(pending, 1)
+        self.assertEqual([m["content"] for m in conversation], ["3", "4"])
+
+    def test_interval_flush(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path, batch_size=1000, flush_interval=0.01)
+            await ContextManager(store).add_message("s1", "user", "a")
+            await asyncio.sleep(0.05)
+            pending = len(store._pending)
+            await store.close()
+            return pending
+
+        self.assertEqual(run(scenario()), 0)
+
+    def test_persists_across_reopen(self):
+        async def write():
+            manager = ContextManager(SQLiteSessionStore(self.path))
+            await manager.add_message("s1", "user", "hi")
+            await manager.add_message("s1", "assistant", "hello", {"tokens_used": 7})
+            manager.record_mode("s1", "explainer")
+            await manager.close()
+
+        async def read():
+            manager = ContextManager(SQLiteSessionStore(self.path))
+            session = manager.get_session("s1")
+            conversation = await manager.get_conversation("s1")
+            await manager.close()
+            return session, conversation
+
+        run(write())
+        session, conversation = run(read())
+        self.assertEqual(session.message_count, 2)
+        self.assertEqual(session.total_tokens, 7)
+        self.assertEqual(session.mode_history, ["explainer"])
+        self.assertEqual([m["content"] for m in conversation], ["hi", "hello"])
+
+    def test_workers_share_session_counters(self):
+        async def scenario():
+            first = ContextManager(SQLiteSessionStore(self.path))
+            second = ContextManager(SQLiteSessionStore(self.path))
+            await first.add_message("s1", "user", "hi")
+            await first.store.flush()
+            await second.add_message("s1", "assistant", "hello", {"tokens_used": 7})
+            await first.add_message("s1", "user", "more", {"tokens_used": 3})
+            first.record_mode("s1", "explainer")
+            second.record_mode("s1", "socratic")
+            await first.close()
+            await second.close()
+
+            reader = ContextManager(SQLiteSessionStore(self.path))
+            session = reader.get_session("s1")
+            await reader.close()
+            return session
+
+        session = run(scenario())
+        self.assertEqual(session.message_count, 3)
+        self.assertEqual(session.total_tokens, 10)
+        self.assertEqual(sorted(session.mode_history), ["explainer", "socratic"])
+
+    def test_sessions_are_reread_after_flush(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path)
+            other = SQLiteSessionStore(self.path)
+            await ContextManager(store).add_message("s1", "user", "hi")
+            await store.flush()
+            before = store.get_session("s1").message_count
+            await ContextManager(other).add_message("s1", "assistant", "hello")
+            await other.flush()
+            after = store.get_session("s1").message_count
+            await store.close()
+            await other.close()
+            return before, after, store._dirty
+
+        self.assertEqual(run(scenario()), (1, 2, {}))
+
+    def test_failed_flush_keeps_session_changes(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path, flush_interval=60)
+            manager = ContextManager(store)
+            await manager.add_message("s1", "user", "hi", {"tokens_used": 2})
+            write_batch = store._write_batch
+
+            def failing(*args):
+                raise sqlite3.OperationalError("database is locked")
+
+            store._write_batch = failing
+            with self.assertRaises(sqlite3.OperationalError):
+                await store.flush()
+            await manager.add_message("s1", "assistant", "hello", {"tokens_used": 3})
+            store._write_batch = write_batch
+            await manager.close()
+
+            reader = SQLiteSessionStore(self.path)
+            session = reader.get_session("s1")
+            messages = await reader.get_messages("s1", 10)
+            await reader.close()
+            return session, messages
+
+        session, messages = run(scenario())
+        self.assertEqual((session.message_count, session.total_tokens), (2, 5))
+        self.assertEqual([m.content for m in messages], ["hi", "hello"])
+
+    def test_cancelled_flush_writes_once(self):
+        async def scenario(batch_size):
+            store = SQLiteSessionStore(self.path, batch_size=batch_size, flush_interval=0.01)
+            write_batch = store._write_batch
+
+            def slow(*args):
+                time.sleep(0.1)
+                write_batch(*args)
+
+            store._write_batch = slow
+            manager = ContextManager(store)
+            adding = asyncio.ensure_future(manager.add_message("s1", "user", "hi", {"tokens_used": 2}))
+            await asyncio.sleep(0.03)
+            # With the write in its thread: a client disconnect during a full batch,
+            # or close() cancelling the periodic flusher
+            adding.cancel()
+            await manager.close()
+
+            reader = SQLiteSessionStore(self.path)
+            session = reader.get_session("s1")
+            messages = await reader.get_messages("s1", 10)
+            await reader.close()
+            os.remove(self.path)
+            return session.message_count, session.total_tokens, len(messages)
+
+        for batch_size in (1, 100):
+            self.assertEqual(run(scenario(batch_size)), (1, 2, 1), batch_size)
+
+    def test_delete_session(self):
+        async def scenario():
+            store = SQLiteSessionStore(self.path)
+            manager = ContextManager(store)
+            await manager.add_message("s1", "user", "hi")
+            cleared = await manager.clear_session("s1")
+            conversation = await manager.get_conversation("s1")
+            await manager.close()
+            return cleared, conversation
+
+        self.assertEqual(run(scenario()), (True, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Stand-alone test-suite for ContextWindowBuilder – no third-party packages required.
+"""
+import unittest
+
+from context_window import ContextWindowBuilder, SUMMARY_HEADER
+
+MODELS = [
+    {"id": "small", "context_window": 1000},
+    {"id": "large", "context_window": 100000},
+]
+
+
+def turns(n: int, size: int = 400):
+    """Build n alternating user/assistant messages of `size` characters each."""
+    roles = ("user", "assistant")
+    return [
+        {"role": roles[i % 2], "content": f"Turn {i}. " + "x" * size}
+        for i in range(n)
+    ]
+
+
+class TestContextWindowBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = ContextWindowBuilder(
+            MODELS, safety_margin=0, summary_max_tokens=100
+        )
+
+    def test_unknown_model_uses_smallest_window(self):
+        self.assertEqual(self.builder.get_context_window("nope"), 1000)
+        self.assertEqual(self.builder.get_context_window("large"), 100000)
+
+    def test_history_that_fits_is_untouched(self):
+        history = turns(4)
+        window = self.builder.build("sys", history, "q", model="large", max_tokens=100)
+        self.assertEqual(window["messages"][1:-1], history)
+        self.assertEqual(window["trimmed_turns"], 0)
+        self.assertEqual(window["trimmed_tokens"], 0)
+
+    def test_old_turns_replaced_by_summary(self):
+        history = turns(20)
+        window = self.builder.build("sys", history, "q", model="small", max_tokens=200)
+        messages = window["messages"]
+
+        self.assertGreater(window["trimmed_turns"], 0)
+        self.assertGreater(window["trimmed_tokens"], 0)
+        self.assertEqual(messages[0]["content"], "sys")
+        self.assertTrue(messages[1]["content"].startswith(SUMMARY_HEADER))
+        self.assertEqual(messages[-1], {"role": "user", "content": "q"})
+        # the most recent turns are kept verbatim
+        self.assertEqual(messages[-2], history[-1])
+        self.assertLessEqual(window["prompt_tokens"], 1000 - 200)
+
+    def test_summary_is_cached_and_rolled_forward(self):
+        history = turns(20)
+        first = self.builder.build("sys", history, "q", model="small",
+                                   max_tokens=200, session_id="s1")
+        cached = self.builder._summaries["s1"]
+        self.assertEqual(cached[0], first["trimmed_turns"])
+
+        # while the kept turns still fit, the summary stays frozen
+        history += turns(2)
+        second = self.builder.build("sys", history, "q", model="small",
+                                    max_tokens=200, session_id="s1")
+        self.assertEqual(second["trimmed_turns"], first["trimmed_turns"])
+        self.assertEqual(second["messages"][:2], first["messages"][:2])
+        self.assertTrue(second["prefix_reused"])
+
+        history += turns(4)
+        third = self.builder.build("sys", history, "q", model="small",
+                                   max_tokens=200, session_id="s1")
+        self.assertGreater(third["trimmed_turns"], first["trimmed_turns"])
+        self.assertEqual(self.builder._summaries["s1"][0], third["trimmed_turns"])
+        self.assertFalse(third["prefix_reused"])
+        self.assertLessEqual(third["prompt_tokens"], 1000 - 200)
+
+    def test_context_goes_after_history(self):
+        history = turns(4)
+        first = self.builder.build("sys", history, "q1", model="large", max_tokens=100,
+                                   session_id="s1", context="passage one")
+        second = self.builder.build("sys", history, "q2", model="large", max_tokens=100,
+                                    session_id="s1", context="passage two")
+        self.assertEqual(first["messages"][:-2], second["messages"][:-2])
+        self.assertEqual(second["messages"][-2], {"role": "system", "content": "passage two"})
+        self.assertEqual(first["prefix_hash"], second["prefix_hash"])
+        self.assertFalse(first["prefix_reused"])
+        self.assertTrue(second["prefix_reused"])
+
+    def test_clear_session(self):
+        self.builder.build("sys", turns(20), "q", model="small",
+                           max_tokens=200, session_id="s1")
+        self.builder.clear_session("s1")
+        self.assertNotIn("s1", self.builder._summaries)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
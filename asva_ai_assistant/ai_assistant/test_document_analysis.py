@@ -0,0 +1,156 @@
+"""
+Stand-alone test-suite for document extraction, chunking and map-reduce analysis.
+"""
+import asyncio
+import importlib
+import io
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from document_analysis import DocumentAnalyzer, chunk_pages, iter_pages
+from exceptions import DocumentError
+from tokenizer import TokenCounter
+from test_batch_chat import load_routes
+
+
+class FakeClient:
+    """Echoes the first line of the prompt and tracks concurrency."""
+
+    def __init__(self):
+        self.tokenizer = TokenCounter()
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def generate_completion(self, messages, **kwargs):
+        self.calls.append(messages)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        text = messages[-1]["content"]
+        return {
+            "choices": [{"message": {"content": f"summary of {text[:12]}"}}],
+            "usage": {"total_tokens": 10}
+        }
+
+
+def lecture(pages=3, paragraphs=4):
+    return "\f".join(
+        "\n\n".join(
+            f"Page {p} paragraph {i}. The lecture covers topic {p}.{i} in some detail."
+            for i in range(paragraphs)
+        )
+        for p in range(1, pages + 1)
+    ).encode("utf-8")
+
+
+class TestExtraction(unittest.TestCase):
+
+    def test_text_pages_from_bytes(self):
+        self.assertEqual(list(iter_pages(b"one\fr\xc3\xa9sum\xc3\xa9\ftwo")),
+                         ["one", "résumé", "two"])
+
+    def test_multibyte_split_across_blocks(self):
+        data = ("é" * 40000 + "\f" + "ü").encode("utf-8")
+        pages = list(iter_pages(io.BytesIO(data)))
+        self.assertEqual(pages, ["é" * 40000, "ü"])
+
+    def test_file_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "notes.txt")
+            with open(path, "wb") as f:
+                f.write(lecture())
+            self.assertEqual(len(list(iter_pages(path))), 3)
+
+    def test_missing_file(self):
+        with self.assertRaises(DocumentError):
+            list(iter_pages("/nonexistent/notes.pdf"))
+
+
+class TestChunking(unittest.TestCase):
+
+    def test_chunks_respect_budget_and_pages(self):
+        tokenizer = TokenCounter()
+        chunks = list(chunk_pages(iter_pages(lecture(pages=6)), tokenizer, max_tokens=60))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(chunk.tokens, 60)
+            self.assertLessEqual(chunk.first_page, chunk.last_page)
+        self.assertEqual([c.index for c in chunks], list(range(len(chunks))))
+        self.assertEqual(chunks[-1].last_page, 6)
+
+    def test_paragraph_boundaries_kept(self):
+        chunks = list(chunk_pages(["alpha beta.\n\ngamma delta."], max_tokens=1000))
+        self.assertEqual(chunks[0].text, "alpha beta.\n\ngamma delta.")
+
+    def test_oversized_text_is_split(self):
+        text = " ".join(["word"] * 500)
+        chunks = list(chunk_pages([text], max_tokens=50))
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(c.tokens <= 50 for c in chunks))
+        self.assertEqual(sum(len(c.text.split()) for c in chunks), 500)
+
+
+class TestDocumentAnalyzer(unittest.TestCase):
+
+    def test_map_reduce_and_reuse(self):
+        async def scenario():
+            client = FakeClient()
+            analyzer = DocumentAnalyzer(client, chunk_tokens=60, max_concurrency=2)
+            first = await analyzer.analyze(lecture(pages=6), "summarize")
+            calls = len(client.calls)
+            second = await analyzer.analyze(lecture(pages=6), "summarize")
+            return client, calls, first, second
+
+        client, calls, first, second = asyncio.run(scenario())
+        self.assertGreater(first["chunks"], 1)
+        self.assertEqual(first["pages"], 6)
+        self.assertGreater(first["calls"], first["chunks"])
+        self.assertLessEqual(client.peak, 2)
+        self.assertEqual(len(client.calls), calls)
+        self.assertEqual(second["calls"], 0)
+        self.assertEqual(second["result"], first["result"])
+
+    def test_single_chunk_skips_reduce(self):
+        async def scenario():
+            client = FakeClient()
+            result = await DocumentAnalyzer(client).analyze(b"Short notes.", "quiz")
+            return client, result
+
+        client, result = asyncio.run(scenario())
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(result["calls"], 1)
+
+    def test_unknown_action_and_empty_document(self):
+        analyzer = DocumentAnalyzer(FakeClient())
+        with self.assertRaises(DocumentError):
+            asyncio.run(analyzer.analyze(b"text", "translate"))
+        with self.assertRaises(DocumentError):
+            asyncio.run(analyzer.analyze(b"\f \f", "summarize"))
+
+
+class TestDocumentRoutes(unittest.TestCase):
+
+    def test_unreadable_document_is_rejected(self):
+        chat, dependencies, _, _ = load_routes()
+        documents = importlib.import_module(f"{chat.__package__}.documents")
+        app = FastAPI()
+        app.include_router(documents.router)
+        app.dependency_overrides[dependencies.get_document_analyzer] = lambda: DocumentAnalyzer(FakeClient())
+
+        response = TestClient(app).post(
+            "/documents/analyze",
+            files={"file": ("empty.txt", b"\f \f", "text/plain")},
+            data={"document_id": "d1", "session_id": "s1"}
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["detail"]["code"], "DOCUMENT_ERROR")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Stand-alone test-suite for the embedding index and retrieval injection.
+"""
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex, EmbeddingStore, HashingVectorizer
+from mode_handler import ModeHandler, LearningMode
+from retrieval import Passage, select_passages, format_passages
+
+DOCS = {
+    "physics": [
+        "Quantum entanglement links the states of two particles.",
+        "Newton's second law relates force, mass and acceleration.",
+    ],
+    "biology": [
+        "Mitosis is cell division producing two identical cells.",
+        "DNA stores genetic information in a double helix.",
+    ],
+}
+
+
+def clustered(n, dim=16, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.2 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+class TestHashingVectorizer(unittest.TestCase):
+
+    def test_unit_vectors_and_stability(self):
+        vectorizer = HashingVectorizer(64)
+        a = vectorizer.transform("Quantum entanglement")
+        self.assertEqual(a.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(a)), 1.0, places=5)
+        np.testing.assert_array_equal(a, HashingVectorizer(64).transform("quantum  ENTANGLEMENT"))
+
+    def test_empty_text(self):
+        self.assertFalse(HashingVectorizer(8).transform("  ").any())
+
+
+class TestEmbeddingStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = EmbeddingStore(self.tmp.name)
+        for document_id, texts in DOCS.items():
+            self.store.add_document("student-1", document_id, f"{document_id}.pdf", texts)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_search_ranks_matching_chunk_first(self):
+        passages = self.store.search("student-1", "what is quantum entanglement", k=2)
+        self.assertEqual(passages[0].document_id, "physics")
+        self.assertEqual(passages[0].label, "physics.pdf#0")
+
+    def test_collections_are_isolated(self):
+        self.assertEqual(self.store.search("student-2", "quantum entanglement"), [])
+
+    def test_delete_and_replace(self):
+        self.assertEqual(self.store.delete_document("student-1", "biology"), 2)
+        passages = self.store.search("student-1", "genetic information DNA", k=4)
+        self.assertNotIn("biology", {p.document_id for p in passages})
+
+        self.store.add_document("student-1", "physics", "physics.pdf", ["Thermodynamics and entropy."])
+        passages = self.store.search("student-1", "entropy", k=4)
+        self.assertEqual([p.text for p in passages], ["Thermodynamics and entropy."])
+
+    def test_persists_across_reopen(self):
+        self.store.delete_document("student-1", "physics")
+        self.store.close()
+        store = EmbeddingStore(self.tmp.name)
+        passages = store.search("student-1", "DNA double helix", k=4)
+        self.assertEqual({p.document_id for p in passages}, {"biology"})
+        self.store = store
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+
+    def test_exact_search_and_growth(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = EmbeddingIndex(tmp, dim=16)
+            vectors = clustered(3000)
+            index.add("doc", "doc", [str(i) for i in range(3000)], vectors)
+            self.assertGreaterEqual(index._capacity, 3000)
+            self.assertEqual(index.search(vectors[1234], 1)[0][0], 1234)
+            index.close()
+
+    def test_ivf_recall_and_incremental_add(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = EmbeddingIndex(tmp, dim=16, ivf_threshold=2000, nprobe=8, compact_ratio=0)
+            vectors = clustered(4000)
+            index.add("a", "a", ["x"] * 2500, vectors[:2500])
+            self.assertIsNotNone(index._centroids)
+            index.add("b", "b", ["x"] * 1500, vectors[2500:])
+
+            found = sum(index.search(vectors[i], 1)[0][0] == i for i in range(0, 4000, 40))
+            self.assertGreaterEqual(found, 90)
+
+            index.delete("a")
+            rows = [row for row, _ in index.search(vectors[10], 5)]
+            self.assertTrue(all(row >= 2500 for row in rows))
+            index.close()
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = EmbeddingIndex(tmp, dim=16)
+            vectors = clustered(20)
+            index.add("a", "a", ["a"] * 10, vectors[:10])
+            index.add("b", "b", [f"b{i}" for i in range(10)], vectors[10:])
+            index.delete("a")
+            index.compact()
+            self.assertEqual((index.count, index.deleted), (10, 0))
+            row, _ = index.search(vectors[15], 1)[0]
+            self.assertEqual(index.passages([(row, 1.0)])[0].text, "b5")
+            index.close()
+
+    def test_deletes_compact_on_their_own(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = EmbeddingIndex(tmp, dim=16, compact_ratio=0.25)
+            vectors = clustered(20)
+            index.add("a", "a", ["a"] * 4, vectors[:4])
+            index.add("b", "b", ["b"] * 16, vectors[4:])
+            index.delete("a")
+            self.assertEqual((index.count, index.deleted), (20, 4))
+            index.delete("b")
+            self.assertEqual((index.count, index.deleted), (0, 0))
+            index.close()
+
+    def test_writers_in_two_processes_share_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = EmbeddingIndex(tmp, dim=16)
+            second = EmbeddingIndex(tmp, dim=16)
+            vectors = clustered(3000)
+            first.add("a", "a", ["a"] * 10, vectors[:10])
+            second.add("b", "b", [f"b{i}" for i in range(2990)], vectors[10:])
+            self.assertEqual(second.search(vectors[5], 1)[0][0], 5)
+            self.assertEqual(first.search(vectors[2500], 1)[0][0], 2500)
+
+            first.delete("a")
+            second.add("c", "c", ["c"], vectors[:1])
+            second.delete("c")
+            second.compact()
+            row, _ = first.search(vectors[2500], 1)[0]
+            self.assertEqual(first.passages([(row, 1.0)])[0].text, "b2490")
+            self.assertEqual((first.count, first.deleted, second.count), (2990, 0, 2990))
+            first.close()
+            second.close()
+
+
+class TestRetrievalInjection(unittest.TestCase):
+
+    def test_select_respects_budget(self):
+        passages = [Passage("d", i, "d.pdf", "word " * 50, 1.0 - i / 10) for i in range(5)]
+        self.assertEqual(len(select_passages(passages, 130)), 2)
+
+    def test_process_query_injects_passages_and_sources(self):
+        retriever = Mock()
+        retriever.search.return_value = [Passage("physics", 0, "physics.pdf", "Entanglement.", 0.8)]
+        client = Mock()
+        client.tokenizer = None
+        client.get_available_models.return_value = [{"id": "m", "context_window": 8192}]
+        client.generate_completion = AsyncMock(return_value={
+            "choices": [{"message": {"content": "answer"}}],
+            "usage": {"total_tokens": 5, "prompt_tokens": 4,
+                      "prompt_tokens_details": {"cached_tokens": 3}},
+            "model": "m"
+        })
+
+        handler = ModeHandler(retriever=retriever)
+        result = asyncio.run(handler.process_query(
+            "entanglement?", LearningMode.DEFAULT, [], groq_client=client,
+            model="m", collection="student-1"
+        ))
+
+        self.assertEqual(result["sources"], ["physics.pdf#0"])
+        self.assertEqual(result["metadata"]["cached_tokens"], 3)
+        messages = client.generate_completion.call_args.kwargs["messages"]
+        # passages sit at the tail so the system prompt stays a stable prefix
+        self.assertEqual(messages[0]["content"], handler.get_prompt(LearningMode.DEFAULT).text)
+        self.assertEqual(messages[-2]["content"], format_passages(retriever.search.return_value))
+        self.assertEqual(handler.prompt_cache_stats.stats()["default"]["cached_tokens"], 3)
+
+    def test_no_collection_no_retrieval(self):
+        retriever = Mock()
+        passages = asyncio.run(ModeHandler(retriever=retriever).retrieve("q", None))
+        self.assertEqual(passages, [])
+        retriever.search.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
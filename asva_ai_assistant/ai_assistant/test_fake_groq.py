@@ -0,0 +1,121 @@
+"""
+Stand-alone test-suite for the fake Groq server and the load generator.
+"""
+import asyncio
+import json
+import time
+import unittest
+
+import httpx
+
+from benchmarks.fake_groq import FakeGroqServer
+from benchmarks.loadgen import run, percentiles, stream_once
+from exceptions import GroqAPIError, RateLimitError
+from groq_client import GroqClient
+from sse import token_frame
+from test_groq_client import _async
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_client(server, **kwargs):
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    return GroqClient(
+        "key", base_url="http://fake", coalesce=False, max_retries=1,
+        http_client=http_client, **kwargs
+    )
+
+
+class TestFakeGroqServer(unittest.TestCase):
+
+    @_async
+    async def test_json_completion(self):
+        server = FakeGroqServer(latency=0, completion_tokens=(5, 8), seed=1)
+        client = make_client(server)
+        result = await client.generate_completion(MESSAGES, model="m", max_tokens=6)
+        self.assertIn(result["usage"]["completion_tokens"], (5, 6))
+        self.assertEqual(result["model"], "m")
+        self.assertEqual(server.served, 1)
+        await client.client.aclose()
+
+    @_async
+    async def test_streaming_tokens_and_usage(self):
+        server = FakeGroqServer(latency=0, completion_tokens=4)
+        client = make_client(server)
+        usage = {}
+        text = [t async for t in client.generate_streaming_text(MESSAGES, usage=usage)]
+        self.assertEqual("".join(text), "ok " * 4)
+        self.assertEqual(usage["completion_tokens"], 4)
+        self.assertEqual(server.streamed, 1)
+        await client.client.aclose()
+
+    @_async
+    async def test_429_burst_has_retry_after(self):
+        server = FakeGroqServer(burst_every=60, burst_duration=30)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server)) as http:
+            response = await http.post("http://fake/chat/completions", json={"messages": MESSAGES})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["retry-after"]), 29)
+        self.assertEqual(server.rejected, 1)
+
+    @_async
+    async def test_random_5xx(self):
+        server = FakeGroqServer(error_rate=1.0, seed=0)
+        client = make_client(server)
+        with self.assertRaises(GroqAPIError) as ctx:
+            await client.generate_completion(MESSAGES)
+        self.assertNotIsInstance(ctx.exception, RateLimitError)
+        self.assertEqual(server.failed, 1)
+        await client.client.aclose()
+
+
+async def stub_api(scope, receive, send):
+    """Minimal stand-in for the chat endpoints"""
+    await receive()
+    if scope["path"].endswith("/stream"):
+        body = (
+            b'data: {"type":"start"}\n\n'
+            + token_frame("hello ").encode() + token_frame("world").encode()
+            + b'data: ' + json.dumps({"type": "end", "metadata": {"tokens_used": 40, "completion_tokens": 2}}).encode() + b'\n\n'
+        )
+        content_type = b"text/event-stream"
+    else:
+        body = json.dumps({"response": "hi", "metadata": {"tokens_used": 3}}).encode()
+        content_type = b"application/json"
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def test_percentiles(self):
+        stats = percentiles([i / 1000 for i in range(1, 101)])
+        self.assertAlmostEqual(stats["p50"], 51.0)
+        self.assertAlmostEqual(stats["p99"], 100.0)
+        self.assertIsNone(percentiles([]))
+
+    def test_report(self):
+        report = asyncio.run(run(
+            "http://api", rps=200, concurrency=8, duration=0.2, stream_ratio=0.5,
+            transport=httpx.ASGITransport(app=stub_api)
+        ))
+        endpoints = report["endpoints"]
+        self.assertEqual(endpoints["chat"]["requests"] + endpoints["stream"]["requests"], report["requests"])
+        self.assertEqual(endpoints["chat"]["error_rate"], 0.0)
+        self.assertIsNotNone(endpoints["stream"]["ttft_ms"])
+        self.assertIsNotNone(endpoints["chat"]["latency_ms"]["p95"])
+        json.dumps(report)
+
+    def test_stream_rate_counts_completion_tokens(self):
+        async def send():
+            async with httpx.AsyncClient(base_url="http://api", transport=httpx.ASGITransport(app=stub_api)) as client:
+                return await stream_once(client, {"message": "hi"}, time.monotonic())
+
+        result = asyncio.run(send())
+        self.assertEqual((result["tokens"], result["completion_tokens"], result["frames"]), (40, 2, 2))
+        generation = result["latency"] - result["ttft"]
+        self.assertAlmostEqual(result["tokens_per_sec"] * generation, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
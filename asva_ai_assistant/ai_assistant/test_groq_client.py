@@ -26,17 +26,24 @@ def resp(status: int, *, json_data=None, headers=None):
     m.status_code = status
     m.headers = headers or {}
     m.json.return_value = json_data or {}
+    m.content = json.dumps(json_data or {}).encode()
     m.raise_for_status = Mock()
     m.text = json.dumps(json_data) if json_data else ""
     return m
 
 
 class FakeStream:
-    """Mimics `async with client.stream(...) as response:` plus `aiter_lines`."""
+    """Mimics `async with client.stream(...) as response:` plus `aiter_lines`/`aiter_bytes`."""
+
+    status_code = 200
+    headers = {}
 
     def __init__(self, line_bytes):
         self._lines = line_bytes
 
+    def raise_for_status(self):
+        pass
+
     async def __aenter__(self):
         return self
 
@@ -47,6 +54,10 @@ class FakeStream:
         for b in self._lines:
             yield b.decode()
 
+    async def aiter_bytes(self):
+        for b in self._lines:
+            yield b
+
 
 # --------------------------------------------------------------------------- #
 # Tests
@@ -60,7 +71,7 @@ class TestGroqClient(unittest.TestCase):
         c = GroqClient("key")
         self.assertEqual(c.api_key, "key")
         self.assertEqual(c.timeout, 30)
-        self.assertEqual(c.max_retries, 5)
+        self.assertEqual(c.max_retries, 3)
         self.assertIn("https://api.groq.com/openai/v1", c.base_url)
 
     # ------------------------------------------------------------------ #
@@ -100,19 +111,45 @@ class TestGroqClient(unittest.TestCase):
     @_async
     async def test_stream_chunks(self):
         raw = [b"data: {\"chunk\":1}\n", b"data: {\"chunk\":2}\n", b"data: [DONE]\n"]
-        with patch("httpx.AsyncClient.stream", return_value=FakeStream(raw), new_callable=AsyncMock):
+        with patch("httpx.AsyncClient.stream", return_value=FakeStream(raw)):
             async with GroqClient("key") as c:
                 chunks = [c async for c in c.generate_streaming([{"role": "user", "content": "hi"}])]
             self.assertEqual(len(chunks), 2)
             self.assertEqual(chunks[0], {"chunk": 1})
 
+    @_async
+    async def test_stream_rate_limited(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+        http_client = httpx.AsyncClient(transport=transport)
+        async with GroqClient("key", base_url="http://fake", http_client=http_client) as c:
+            with self.assertRaises(RateLimitError):
+                async for _ in c.generate_streaming_text([{"role": "user", "content": "hi"}], model="m"):
+                    pass
+
     # ------------------------------------------------------------------ #
     # token counting
     # ------------------------------------------------------------------ #
-    @_async
-    async def test_count_tokens(self):
-        async with GroqClient("key") as c:
-            self.assertEqual(await c.count_tokens("abcd"), 1)
+    def test_count_tokens(self):
+        c = GroqClient("key")
+        self.assertEqual(c.count_tokens("abcd"), 1)
+
+    def test_count_messages_tokens_uses_cache(self):
+        c = GroqClient("key")
+        history = [{"role": "user", "content": "hello there"}] * 3
+        first = c.count_messages_tokens(history)
+        self.assertGreater(first, c.count_tokens("hello there") * 3)
+        self.assertEqual(c.count_messages_tokens(history), first)
+        self.assertEqual(c.tokenizer.cache_info()["misses"], 1)
+
+    def test_message_cache_tells_colliding_hashes_apart(self):
+        class Colliding(str):
+            def __hash__(self):
+                return 0
+
+        c = GroqClient("key")
+        short = c.count_messages_tokens([{"role": "user", "content": Colliding("hi")}])
+        long = c.count_messages_tokens([{"role": "user", "content": Colliding("hello " * 50)}])
+        self.assertGreater(long, short)
 
     # ------------------------------------------------------------------ #
     # model catalogue
@@ -0,0 +1,157 @@
+"""
+Stand-alone test-suite for hedged requests and the circuit breaker.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from exceptions import GroqAPIError, CircuitOpenError
+from groq_client import GroqClient
+from hedging import Hedger, CircuitBreaker
+from test_groq_client import _async
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+COMPLETION = {"choices": [{"message": {"content": "answer"}}], "usage": {"total_tokens": 5}}
+
+
+def warmed_hedger(**kwargs) -> Hedger:
+    hedger = Hedger(min_samples=5, min_delay=0.01, **kwargs)
+    for _ in range(5):
+        hedger.observe("m", 0.01)
+    return hedger
+
+
+class TestHedger(unittest.TestCase):
+
+    @_async
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        hedger = warmed_hedger(budget=1.0)
+        cancelled = []
+
+        async def call(backup):
+            try:
+                await asyncio.sleep(0.01 if backup else 5)
+            except asyncio.CancelledError:
+                cancelled.append(backup)
+                raise
+            return "backup" if backup else "primary"
+
+        self.assertEqual(await hedger.run("m", call), "backup")
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [False])
+        self.assertEqual((hedger.hedged, hedger.hedge_wins), (1, 1))
+
+    @_async
+    async def test_no_hedge_without_samples_or_on_fast_failure(self):
+        hedger = Hedger(budget=1.0)
+        calls = []
+
+        async def call(backup):
+            calls.append(backup)
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        self.assertEqual(await hedger.run("m", call), "ok")
+
+        async def failing(backup):
+            calls.append(backup)
+            raise GroqAPIError("boom")
+
+        with self.assertRaises(GroqAPIError):
+            await warmed_hedger(budget=1.0).run("m", failing)
+        self.assertEqual(calls, [False, False])
+
+    @_async
+    async def test_budget_caps_hedges(self):
+        hedger = warmed_hedger(budget=0.05)
+
+        async def call(backup):
+            await asyncio.sleep(0.02)
+            return backup
+
+        for _ in range(60):
+            await hedger.run("m", call)
+        self.assertLessEqual(hedger.hedged, 3)
+        self.assertGreater(hedger.skipped, 0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_probes_and_closes(self):
+        breaker = CircuitBreaker(failure_threshold=0.5, min_requests=4, cooldown=30.0)
+        for ok in (True, False, False, True):
+            breaker.record("m", 0.1, ok)
+        self.assertEqual(breaker.state("m"), "open")
+        self.assertFalse(breaker.allow("m"))
+        self.assertTrue(breaker.allow("other"))
+
+        with patch("hedging.time.monotonic", return_value=breaker._circuits["m"].opened_at + 31):
+            self.assertTrue(breaker.allow("m"))
+            self.assertFalse(breaker.allow("m"))
+        breaker.record("m", 0.1)
+        self.assertEqual(breaker.state("m"), "closed")
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker(slow_call=1.0, min_requests=2)
+        breaker.record("m", 2.0)
+        breaker.record("m", 3.0)
+        self.assertEqual(breaker.state("m"), "open")
+
+
+class TestClientIntegration(unittest.TestCase):
+
+    @_async
+    async def test_circuit_fails_fast_after_5xx(self):
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(503, json={"error": {"message": "down"}})
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = GroqClient(
+            "key", base_url="http://fake", coalesce=False, http_client=http_client,
+            circuit_breaker=CircuitBreaker(min_requests=3)
+        )
+        for _ in range(3):
+            with self.assertRaises(GroqAPIError):
+                await client.generate_completion(MESSAGES, model="m")
+        with self.assertRaises(CircuitOpenError):
+            await client.generate_completion(MESSAGES, model="m")
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(client.get_upstream_stats()["circuits"]["m"]["state"], "open")
+        await http_client.aclose()
+
+    @_async
+    async def test_completion_and_stream_are_hedged(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) % 2:
+                await asyncio.sleep(5)
+            if b'"stream":true' in request.content.replace(b" ", b""):
+                body = b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\ndata: [DONE]\n\n'
+                return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+            return httpx.Response(200, json=COMPLETION)
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = GroqClient(
+            "key", base_url="http://fake", coalesce=False, http_client=http_client,
+            hedger=warmed_hedger(budget=1.0)
+        )
+        client.rate_limiter = None
+
+        result = await asyncio.wait_for(client.generate_completion(MESSAGES, model="m"), 2)
+        self.assertEqual(result["choices"][0]["message"]["content"], "answer")
+
+        text = [t async for t in client.generate_streaming_text(MESSAGES, model="m")]
+        self.assertEqual(text, ["hi"])
+        self.assertEqual(client.hedger.hedge_wins, 2)
+        await http_client.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
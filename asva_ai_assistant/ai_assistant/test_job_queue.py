@@ -0,0 +1,237 @@
+"""
+Stand-alone test-suite for the background job queue.
+"""
+import asyncio
+import importlib
+import os
+import tempfile
+import unittest
+
+from document_analysis import DocumentAnalyzer
+from exceptions import JobError
+from job_queue import JobQueue, JobStatus, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from response_cache import ResponseCache
+from test_batch_chat import load_routes
+from test_document_analysis import FakeClient
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_queue(self, **kwargs):
+        kwargs.setdefault("retry_backoff", 0.01)
+        kwargs.setdefault("poll_interval", 0.01)
+        return JobQueue(self.path, ResponseCache(ttl=60), **kwargs)
+
+    async def wait(self, queue, job_id, timeout=2.0):
+        for _ in range(int(timeout / 0.01)):
+            status = await queue.status(job_id)
+            if status["status"] not in (JobStatus.QUEUED.value, JobStatus.RUNNING.value):
+                return status
+            await asyncio.sleep(0.01)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_priority_order(self):
+        async def run():
+            queue = self.make_queue(concurrency=1)
+            order = []
+
+            async def handler(job):
+                order.append(job.payload["name"])
+                return {}
+
+            queue.register("task", handler)
+            batch = [await queue.submit("task", {"name": f"b{i}"}, priority=PRIORITY_BATCH) for i in range(2)]
+            chat = await queue.submit("task", {"name": "chat"}, priority=PRIORITY_INTERACTIVE)
+            await queue.start()
+            for job_id in batch + [chat]:
+                await self.wait(queue, job_id)
+            await queue.close()
+            return order
+
+        self.assertEqual(asyncio.run(run()), ["chat", "b0", "b1"])
+
+    def test_unreadable_upload_fails_once(self):
+        chat, dependencies, _, _ = load_routes()
+        documents = importlib.import_module(f"{chat.__package__}.documents")
+        dependencies._document_analyzer = DocumentAnalyzer(FakeClient())
+        self.addCleanup(setattr, dependencies, "_document_analyzer", None)
+
+        async def run():
+            queue = self.make_queue()
+            queue.register("document_analysis", documents.run_analysis_job)
+            await queue.start()
+            job_id = await queue.submit("document_analysis", {
+                "document_id": "d1", "session_id": "s1", "action": "summarize", "model": None
+            }, attachment=b"\f \f")
+            status = await self.wait(queue, job_id)
+            await queue.close()
+            return status
+
+        status = asyncio.run(run())
+        self.assertEqual((status["status"], status["attempts"]), ("failed", 1))
+
+    def test_reserved_worker_runs_interactive_during_batch(self):
+        async def run():
+            queue = self.make_queue(concurrency=2, reserved=1)
+            release = asyncio.Event()
+
+            async def slow(job):
+                await release.wait()
+                return {}
+
+            async def fast(job):
+                return {"ok": True}
+
+            queue.register("slow", slow)
+            queue.register("fast", fast)
+            await queue.start()
+            for _ in range(3):
+                await queue.submit("slow", {}, priority=PRIORITY_BATCH)
+            chat = await queue.submit("fast", {}, priority=PRIORITY_INTERACTIVE)
+            status = await self.wait(queue, chat)
+            release.set()
+            await queue.close()
+            return status
+
+        self.assertEqual(asyncio.run(run())["status"], "succeeded")
+
+    def test_retry_result_and_progress(self):
+        async def run():
+            queue = self.make_queue(max_attempts=3)
+
+            async def flaky(job):
+                job.progress(0.5, "halfway")
+                if job.attempts < 3:
+                    raise RuntimeError("upstream failed")
+                return {"answer": 42}
+
+            queue.register("flaky", flaky)
+            await queue.start()
+            job_id = await queue.submit("flaky", {})
+            status = await self.wait(queue, job_id)
+            result = await queue.result(job_id)
+            await queue.close()
+            return status, result
+
+        status, result = asyncio.run(run())
+        self.assertEqual((status["status"], status["attempts"], status["progress"]), ("succeeded", 3, 1.0))
+        self.assertEqual(status["message"], "halfway")
+        self.assertEqual(result, {"answer": 42})
+
+    def test_permanent_and_exhausted_failures(self):
+        async def run():
+            queue = self.make_queue(max_attempts=2)
+
+            async def permanent(job):
+                raise JobError("bad document")
+
+            async def broken(job):
+                raise RuntimeError("always")
+
+            queue.register("permanent", permanent)
+            queue.register("broken", broken)
+            await queue.start()
+            a = await self.wait(queue, await queue.submit("permanent", {}))
+            b = await self.wait(queue, await queue.submit("broken", {}))
+            await queue.close()
+            return a, b
+
+        a, b = asyncio.run(run())
+        self.assertEqual((a["status"], a["attempts"], a["error"]), ("failed", 1, "bad document"))
+        self.assertEqual((b["status"], b["attempts"]), ("failed", 2))
+
+    def test_cancel_and_unknown_kind(self):
+        async def run():
+            queue = self.make_queue()
+            queue.register("task", lambda job: None)
+            job_id = await queue.submit("task", {})
+            cancelled = await queue.cancel(job_id)
+            status = await queue.status(job_id)
+            with self.assertRaises(JobError):
+                await queue.submit("missing", {})
+            await queue.close()
+            return cancelled, status
+
+        cancelled, status = asyncio.run(run())
+        self.assertTrue(cancelled)
+        self.assertEqual(status["status"], "cancelled")
+
+    def test_jobs_survive_restart(self):
+        async def submit():
+            queue = self.make_queue()
+            queue.register("task", None)
+            job_id = await queue.submit("task", {"n": 1}, attachment=b"%PDF")
+            await queue.close()
+            return job_id
+
+        async def resume(job_id):
+            queue = self.make_queue()
+
+            async def handler(job):
+                return {"n": job.payload["n"], "size": len(job.attachment)}
+
+            queue.register("task", handler)
+            await queue.start()
+            await self.wait(queue, job_id)
+            result = await queue.result(job_id)
+            await queue.close()
+            return result
+
+        job_id = asyncio.run(submit())
+        self.assertEqual(asyncio.run(resume(job_id)), {"n": 1, "size": 4})
+
+    def test_only_expired_leases_are_requeued(self):
+        async def run():
+            started = asyncio.Event()
+            release = asyncio.Event()
+
+            async def slow(job):
+                started.set()
+                await release.wait()
+                return {"by": "live"}
+
+            live = self.make_queue(concurrency=1, lease=0.15)
+            live.register("task", slow)
+            await live.start()
+            running = await live.submit("task", {})
+            await started.wait()
+
+            # Claimed by a process that then died without releasing it
+            crashed = self.make_queue(lease=0.05)
+            crashed.register("task", None)
+            orphan = await crashed.submit("task", {})
+            self.assertEqual((await asyncio.to_thread(crashed._claim, None)).id, orphan)
+            await asyncio.sleep(0.25)
+
+            async def fresh_handler(job):
+                return {"by": "fresh"}
+
+            fresh = self.make_queue()
+            fresh.register("task", fresh_handler)
+            await fresh.start()
+            orphan_status = await self.wait(fresh, orphan)
+            running_status = await fresh.status(running)
+
+            release.set()
+            await self.wait(live, running)
+            results = (await live.result(running), await fresh.result(orphan))
+            for queue in (live, crashed, fresh):
+                await queue.close()
+            return orphan_status, running_status, results
+
+        orphan_status, running_status, results = asyncio.run(run())
+        self.assertEqual(orphan_status["status"], "succeeded")
+        self.assertEqual(orphan_status["attempts"], 2)
+        self.assertEqual(running_status["status"], "running")
+        self.assertEqual(results, ({"by": "live"}, {"by": "fresh"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
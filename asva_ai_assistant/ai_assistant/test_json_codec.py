@@ -0,0 +1,111 @@
+"""
+Stand-alone test-suite for the JSON codec.
+"""
+import json
+import os
+import sys
+import unittest
+from datetime import datetime
+from enum import Enum
+
+import httpx
+
+import json_codec
+from groq_client import GroqClient
+from test_groq_client import _async
+
+PAYLOAD = {
+    "model": "m",
+    "messages": [{"role": "user", "content": 'a "quote" é\n  \x01 😀'}] * 3,
+    "temperature": 0.7,
+    "max_tokens": 100,
+    "stream": False,
+    "stop": None,
+}
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def tearDown(self):
+        json_codec.use()
+
+    def test_backends_produce_the_same_bytes(self):
+        outputs = {name: dumps(PAYLOAD) for name, (dumps, _) in json_codec.BACKENDS.items()}
+        self.assertEqual(len(set(outputs.values())), 1, outputs)
+        encoded = outputs["json"]
+        self.assertEqual(encoded, json.dumps(PAYLOAD, separators=(",", ":"), ensure_ascii=False).encode())
+        for name, (_, loads) in json_codec.BACKENDS.items():
+            self.assertEqual(loads(encoded), PAYLOAD, name)
+            self.assertEqual(loads(encoded.decode()), PAYLOAD, name)
+
+    def test_extra_types_and_sorted_keys(self):
+        value = {"b": datetime(2024, 1, 15, 10, 30), "a": Color.RED, 1: {"x", "x"}}
+        for name in json_codec.BACKENDS:
+            json_codec.use(name)
+            self.assertEqual(json_codec.dumps(value), b'{"b":"2024-01-15T10:30:00","a":"red","1":["x"]}')
+            self.assertEqual(json_codec.dumps({"b": 1, "a": 2}, sort_keys=True), b'{"a":2,"b":1}')
+            with self.assertRaises(TypeError):
+                json_codec.dumps({"x": object()})
+
+    def test_canonical_encoding_ignores_the_backend(self):
+        value = {"b": 1e16, "a": float("nan"), "c": 2 ** 64, "d": "é"}
+        expected = b'{"a":NaN,"b":1e+16,"c":18446744073709551616,"d":"\xc3\xa9"}'
+        for name in json_codec.BACKENDS:
+            json_codec.use(name)
+            self.assertEqual(json_codec.canonical_dumps(value), expected, name)
+
+    def test_decode_errors_share_one_type(self):
+        for name in json_codec.BACKENDS:
+            json_codec.use(name)
+            with self.assertRaises(json_codec.JSONDecodeError):
+                json_codec.loads(b"{not json")
+
+    def test_use(self):
+        self.assertEqual(json_codec.use(), next(iter(json_codec.BACKENDS)))
+        self.assertEqual(json_codec.use("json"), "json")
+        self.assertEqual(json_codec.backend, "json")
+        self.assertEqual(json_codec.dumps_str({"a": "é"}), '{"a":"é"}')
+        with self.assertRaises(ValueError):
+            json_codec.use("yaml")
+
+    @_async
+    async def test_client_round_trip(self):
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(request)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "é"}}]})
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with GroqClient("key", http_client=http_client, coalesce=False) as client:
+            reply = await client.generate_completion([{"role": "user", "content": "hi"}], model="m")
+        await http_client.aclose()
+        self.assertEqual(reply["choices"][0]["message"]["content"], "é")
+        self.assertEqual(sent[0].headers["content-type"], "application/json")
+        self.assertEqual(json.loads(sent[0].content)["messages"], [{"role": "user", "content": "hi"}])
+
+    def test_response_class(self):
+        # The API package uses relative imports, so load it as part of the package
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        try:
+            from ai_assistant.api.responses import CodecJSONResponse
+            from ai_assistant.api.models.responses import ChatResponse, ResponseMetadata
+        finally:
+            sys.path.pop(0)
+
+        response = ChatResponse.model_construct(
+            session_id="s", response="é", mode="default",
+            metadata=ResponseMetadata.model_construct(tokens_used=3, model="m"),
+            suggestions=[], sources=[]
+        )
+        self.assertEqual(CodecJSONResponse(response).body, response.model_dump_json().encode())
+        self.assertEqual(CodecJSONResponse({"a": "é"}).body, '{"a":"é"}'.encode())
+        self.assertEqual(CodecJSONResponse({}).headers["content-type"], "application/json")
+
+
+if __name__ == "__main__":
+    unittest.main()
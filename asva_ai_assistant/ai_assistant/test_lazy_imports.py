@@ -0,0 +1,68 @@
+"""
+Stand-alone test-suite for lazy package exports and deferred settings.
+
+Each check runs in a fresh interpreter so earlier imports cannot hide an eager one.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(code: str, cwd: str = HERE, **env) -> subprocess.CompletedProcess:
+    environ = {k: v for k, v in os.environ.items() if not k.startswith("GROQ_")}
+    environ.update(env)
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=environ, capture_output=True, text=True
+    )
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_modules_import_without_settings(self):
+        result = run(
+            "import sys\n"
+            "import groq_client, mode_handler, context_manager\n"
+            "from config import settings as s\n"
+            "assert s._settings is None\n"
+            "assert 'pydantic_settings' not in sys.modules\n"
+            "assert 'numpy' not in sys.modules\n"
+            "try:\n"
+            "    s.settings.GROQ_MODEL\n"
+            "except Exception as e:\n"
+            "    print(type(e).__name__)\n"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "ValidationError")
+
+    def test_settings_load_on_first_use(self):
+        result = run(
+            "from config.settings import settings, get_settings, Settings\n"
+            "print(settings.GROQ_MODEL, isinstance(get_settings(), Settings))\n",
+            GROQ_API_KEY="k", GROQ_MODEL="m"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "m True")
+
+    def test_package_exports_are_lazy(self):
+        result = run(
+            "import sys\n"
+            f"sys.path.insert(0, {HERE!r})\n"
+            "import ai_assistant\n"
+            "assert 'httpx' not in sys.modules\n"
+            "assert 'GroqClient' in dir(ai_assistant)\n"
+            "print(ai_assistant.LearningMode.DEFAULT.value, ai_assistant.GroqClient.__name__)\n"
+            "try:\n"
+            "    ai_assistant.Missing\n"
+            "except AttributeError:\n"
+            "    print('missing')\n",
+            cwd=os.path.dirname(HERE)
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ["default", "GroqClient", "missing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
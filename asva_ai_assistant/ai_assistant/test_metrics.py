@@ -0,0 +1,136 @@
+"""
+Stand-alone test-suite for the metrics registry and per-stage request timing.
+"""
+import asyncio
+import importlib
+import unittest
+from unittest.mock import Mock
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from groq_client import GroqClient
+from context_manager import ContextManager
+from metrics import MetricsRegistry, Histogram, StageTimer, STAGE_SECONDS, activate, current_timer, record_stage
+from mode_handler import ModeHandler, LearningMode
+from rate_limiter import RateLimiter
+from test_batch_chat import load_routes
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_histogram_text_format(self):
+        registry = MetricsRegistry()
+        h = registry.histogram("req_seconds", "Request time", ("route",), buckets=(0.1, 1.0))
+        h.observe(0.05, "/chat")
+        h.observe(0.5, "/chat")
+        h.observe(5.0, "/chat")
+
+        text = registry.render()
+        self.assertIn("# TYPE req_seconds histogram", text)
+        self.assertIn('req_seconds_bucket{route="/chat",le="0.1"} 1', text)
+        self.assertIn('req_seconds_bucket{route="/chat",le="1.0"} 2', text)
+        self.assertIn('req_seconds_bucket{route="/chat",le="+Inf"} 3', text)
+        self.assertIn('req_seconds_sum{route="/chat"} 5.55', text)
+        self.assertIn('req_seconds_count{route="/chat"} 3', text)
+
+    def test_gauge_and_escaping(self):
+        registry = MetricsRegistry()
+        g = registry.gauge("in_flight", "Open streams", ("mode",))
+        g.inc(1, 'a"b')
+        g.inc(1, 'a"b')
+        g.dec(1, 'a"b')
+        self.assertIn('in_flight{mode="a\\"b"} 1', registry.render())
+
+    def test_conflicting_registration(self):
+        registry = MetricsRegistry()
+        registry.counter("x", "x")
+        self.assertIs(registry.counter("x", "x"), registry.counter("x", "x"))
+        with self.assertRaises(ValueError):
+            registry.gauge("x", "x")
+
+
+def make_client():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={
+        "choices": [{"message": {"content": "answer"}}],
+        "usage": {"total_tokens": 5},
+        "model": "m"
+    }))
+    http_client = httpx.AsyncClient(transport=transport)
+    client = GroqClient(
+        "key", base_url="http://fake", coalesce=False, http_client=http_client,
+        rate_limiter=RateLimiter(requests_per_minute=100, tokens_per_minute=100000)
+    )
+    client.get_available_models = Mock(return_value=[{"id": "m", "context_window": 8192}])
+    return http_client, client
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def test_stages_are_labeled_at_finish(self):
+        h = Histogram("stages", "", ("stage", "mode", "model", "status"))
+        timer = StageTimer(mode="explainer", histogram=h)
+        with timer.stage("context_load"):
+            pass
+        with activate(timer):
+            record_stage("upstream", 0.2)
+        self.assertIsNone(current_timer())
+        record_stage("upstream", 1.0)
+
+        timer.model = "m"
+        timer.finish("ok")
+        timer.finish("error")
+        timer.add("late", 1.0)
+
+        self.assertEqual(h.snapshot("upstream", "explainer", "m", "ok"), {"count": 1, "sum": 0.2})
+        self.assertEqual(h.snapshot("context_load", "explainer", "m", "ok")["count"], 1)
+        self.assertIsNone(h.snapshot("upstream", "explainer", "m", "error"))
+
+    def test_process_query_and_client_stages(self):
+        http_client, client = make_client()
+        retriever = Mock()
+        retriever.search.return_value = []
+        h = Histogram("stages", "", ("stage", "mode", "model", "status"))
+        timer = StageTimer(mode="default", histogram=h)
+
+        async def run():
+            with activate(timer):
+                await ModeHandler(retriever=retriever).process_query(
+                    "q", LearningMode.DEFAULT, [], groq_client=client, model="m", collection="c"
+                )
+            await http_client.aclose()
+
+        asyncio.run(run())
+        timer.finish()
+        stages = {stage for stage, _ in timer.stages}
+        self.assertEqual(stages, {"retrieval", "prompt_build", "rate_limit_queue", "upstream"})
+        self.assertEqual(h.snapshot("upstream", "default", "m", "ok")["count"], 1)
+
+    def test_chat_route_stages_reach_the_scrape(self):
+        chat, dependencies, _, _ = load_routes()
+        routes = importlib.import_module(f"{chat.__package__}.metrics")
+        app = FastAPI()
+        app.include_router(chat.router)
+        app.include_router(routes.router)
+        _, client = make_client()
+        app.dependency_overrides[dependencies.get_groq_client] = lambda: client
+        app.dependency_overrides[dependencies.get_mode_handler] = lambda: ModeHandler()
+        app.dependency_overrides[dependencies.get_context_manager] = lambda: ContextManager()
+        stages = ("context_load", "retrieval", "prompt_build", "rate_limit_queue", "upstream", "persistence")
+        before = {stage: (STAGE_SECONDS.snapshot(stage, "socratic", "m", "ok") or {"count": 0})["count"]
+                  for stage in stages}
+
+        with TestClient(app) as http:
+            response = http.post("/chat", json={"session_id": "s1", "message": "q", "mode": "socratic"})
+            self.assertEqual(response.status_code, 200)
+            scrape = http.get("/metrics").text
+
+        for stage in stages:
+            self.assertEqual(STAGE_SECONDS.snapshot(stage, "socratic", "m", "ok")["count"], before[stage] + 1, stage)
+            self.assertIn(f'asva_stage_duration_seconds_count{{stage="{stage}",mode="socratic",model="m",status="ok"}}',
+                          scrape)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Stand-alone test-suite for the precomputed system prompt table.
+"""
+import unittest
+
+from mode_handler import (
+    ModeHandler,
+    LearningMode,
+    ComplexityLevel,
+    ProjectType,
+    build_prompt_table,
+    render_system_prompt,
+)
+from tokenizer import TokenCounter
+
+
+class TestPromptTable(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ModeHandler()
+
+    def test_covers_every_combination(self):
+        table = self.handler.prompt_table
+        self.assertEqual(len(table), 4 * 4 * 8)
+        for (mode, level, project), entry in table.items():
+            self.assertEqual(entry.text, render_system_prompt(mode, level, project))
+
+    def test_inapplicable_options_share_entry(self):
+        base = self.handler.get_prompt(LearningMode.SOCRATIC)
+        other = self.handler.get_prompt(LearningMode.SOCRATIC, ComplexityLevel.ADVANCE, ProjectType.WEB)
+        self.assertIs(base, other)
+
+    def test_options_change_prompt_id(self):
+        ids = {
+            self.handler.get_prompt(LearningMode.EXPLAINER, level).prompt_id
+            for level in (None, *ComplexityLevel)
+        }
+        self.assertEqual(len(ids), 4)
+
+    def test_prompt_id_is_stable(self):
+        a = build_prompt_table()[LearningMode.INVENTOR, None, ProjectType.DATA]
+        b = self.handler.get_prompt(LearningMode.INVENTOR, project_type=ProjectType.DATA)
+        self.assertEqual(a.prompt_id, b.prompt_id)
+        self.assertEqual(len(a.prompt_id), 16)
+
+    def test_token_count(self):
+        tokenizer = TokenCounter()
+        entry = ModeHandler(tokenizer=tokenizer).get_prompt(LearningMode.DEFAULT)
+        self.assertEqual(entry.tokens, tokenizer.count(entry.text))
+
+    def test_table_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.handler.prompt_table[LearningMode.DEFAULT, None, None] = None
+
+    def test_additional_context(self):
+        prompt = self.handler.get_system_prompt(
+            LearningMode.EXPLAINER, ComplexityLevel.BEGINNER, additional_context="Week 3"
+        )
+        self.assertTrue(prompt.startswith(
+            self.handler.get_prompt(LearningMode.EXPLAINER, ComplexityLevel.BEGINNER).text
+        ))
+        self.assertTrue(prompt.endswith("\n\nAdditional context: Week 3"))
+
+
+class TestModeTables(unittest.TestCase):
+
+    def test_suggestions_are_fresh_lists(self):
+        handler = ModeHandler()
+        first = handler._generate_suggestions(LearningMode.INVENTOR, "q", "r")
+        first.append("mutated")
+        self.assertEqual(len(handler._generate_suggestions(LearningMode.INVENTOR, "q", "r")), 3)
+
+    def test_description_copy(self):
+        handler = ModeHandler()
+        handler.get_mode_description(LearningMode.SOCRATIC)["name"] = "x"
+        self.assertEqual(handler.get_mode_description(LearningMode.SOCRATIC)["name"], "Socratic Mode")
+
+
+if __name__ == "__main__":
+    unittest.main()
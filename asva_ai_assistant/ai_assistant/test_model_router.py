@@ -0,0 +1,140 @@
+"""
+Stand-alone test-suite for adaptive model routing and failover.
+"""
+import asyncio
+import unittest
+
+from exceptions import GroqAPIError
+from mode_handler import ModeHandler, LearningMode, ComplexityLevel
+from model_router import ModelRouter
+from test_stubs import stub_client
+
+# A route served by the small tier
+BEGINNER = (LearningMode.DEFAULT, ComplexityLevel.BEGINNER)
+
+MODELS = [
+    {"id": "big", "context_window": 32768},
+    {"id": "big-short", "context_window": 8192},
+    {"id": "small", "context_window": 8192},
+    {"id": "small-2", "context_window": 8192},
+]
+
+
+def make_router(**kwargs):
+    return ModelRouter(MODELS, ["small", "small-2"], ["big", "big-short"], **kwargs)
+
+
+def make_client(failing=(), slow=()):
+    async def respond(messages, model=None, **kwargs):
+        if model in failing:
+            raise GroqAPIError("API request failed: 503")
+        if model in slow:
+            await asyncio.wait_for(asyncio.sleep(1), kwargs["attempt_timeout"])
+        return "answer"
+
+    return stub_client(respond, MODELS)
+
+
+def models_called(client):
+    return [kwargs.get("model") for _, kwargs in client.calls]
+
+
+class TestModelRouter(unittest.TestCase):
+
+    def test_tiers_by_mode_and_complexity(self):
+        router = make_router()
+        self.assertEqual(router.route(LearningMode.DEFAULT, ComplexityLevel.BEGINNER)[0], "small")
+        self.assertEqual(router.route(LearningMode.DEFAULT)[0], "big")
+        self.assertEqual(router.route(LearningMode.EXPLAINER, ComplexityLevel.BEGINNER)[0], "small")
+        self.assertEqual(router.route(LearningMode.EXPLAINER, ComplexityLevel.ADVANCE)[0], "big")
+        self.assertEqual(router.route(LearningMode.SOCRATIC)[0], "big")
+
+    def test_long_prompt_escalates_to_larger_window(self):
+        router = make_router()
+        self.assertEqual(router.route(*BEGINNER, prompt_tokens=10000, max_tokens=2048),
+                         ["big", "small"])
+        # nothing fits: the largest window trims least
+        self.assertEqual(router.route(*BEGINNER, prompt_tokens=40000)[0], "big")
+
+    def test_requested_model_goes_first(self):
+        self.assertEqual(make_router().route(*BEGINNER, model="big-short"),
+                         ["big-short", "small"])
+
+    def test_errors_and_slow_models_are_demoted(self):
+        router = make_router(alpha=0.5, latency_slo=1.0)
+        router.record("small", ok=False)
+        router.record("small", ok=False)
+        self.assertFalse(router.healthy("small"))
+        self.assertEqual(router.route(*BEGINNER), ["small-2", "big"])
+
+        router.record("big", latency=3.0)
+        self.assertEqual(router.route(LearningMode.INVENTOR)[0], "big-short")
+
+        # A whole unhealthy tier falls behind the healthy models of the other
+        router.record("small-2", ok=False)
+        router.record("small-2", ok=False)
+        self.assertEqual(router.route(*BEGINNER), ["big-short", "small"])
+        self.assertEqual(router.route(LearningMode.INVENTOR), ["big-short", "big"])
+
+        # after probe_after without samples an unhealthy model gets traffic again
+        router.probe_after = 0.0
+        self.assertTrue(router.healthy("small"))
+
+    def test_latency_ewma_orders_tier(self):
+        router = make_router(alpha=0.5)
+        router.record("small", latency=0.8)
+        router.record("small-2", latency=0.2)
+        self.assertEqual(router.route(*BEGINNER)[0], "small-2")
+        router.record("small-2", latency=2.0)
+        self.assertAlmostEqual(router.stats()["small-2"]["latency_ewma_ms"], 1100.0)
+        self.assertEqual(router.route(*BEGINNER)[0], "small")
+
+
+class TestRoutedQueries(unittest.TestCase):
+
+    def test_process_query_fails_over_and_reports_model(self):
+        router = make_router()
+        client = make_client(failing={"small"})
+        result = asyncio.run(ModeHandler(router=router).process_query(
+            "hi", LearningMode.DEFAULT, [], complexity_level=ComplexityLevel.BEGINNER, groq_client=client
+        ))
+        self.assertEqual(models_called(client), ["small", "small-2"])
+        self.assertEqual(result["metadata"]["model"], "small-2")
+        self.assertEqual(router.stats()["small"]["errors"], 1)
+
+    def test_last_failure_is_raised(self):
+        client = make_client(failing={"big", "big-short"})
+        with self.assertRaises(GroqAPIError):
+            asyncio.run(ModeHandler(router=make_router()).process_query(
+                "hi", LearningMode.SOCRATIC, [], groq_client=client
+            ))
+        self.assertEqual(models_called(client), ["big", "big-short"])
+
+    def test_timeout_fails_over(self):
+        client = make_client(slow={"big"})
+        result = asyncio.run(ModeHandler(router=make_router(attempt_timeout=0.01)).process_query(
+            "hi", LearningMode.INVENTOR, [], groq_client=client
+        ))
+        self.assertEqual(result["metadata"]["model"], "big-short")
+
+    def test_stream_fails_over_before_first_token(self):
+        handler = ModeHandler(router=make_router())
+
+        async def open_stream(model):
+            if model == "small":
+                raise GroqAPIError("API request failed: 503")
+            for token in ("a", "b"):
+                yield token
+
+        async def run():
+            used = {}
+            tokens = [t async for t in handler.stream_with_failover(["small", "small-2"], open_stream, used)]
+            return tokens, used
+
+        tokens, used = asyncio.run(run())
+        self.assertEqual(tokens, ["a", "b"])
+        self.assertEqual(used["model"], "small-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
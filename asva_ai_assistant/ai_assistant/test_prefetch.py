@@ -0,0 +1,91 @@
+"""
+Stand-alone test-suite for speculative suggestion prefetch.
+"""
+import asyncio
+import unittest
+
+from exceptions import RateLimitError
+from mode_handler import ModeHandler, LearningMode, MODE_SUGGESTIONS
+from prefetch import SuggestionPrefetcher
+from test_stubs import stub_client, echo
+
+
+def make_client(idle=True, delay=0):
+    async def respond(messages, **kwargs):
+        if kwargs.get("idle_only") and not idle:
+            raise RateLimitError("No idle rate limit capacity")
+        await asyncio.sleep(delay if kwargs.get("idle_only") else 0)
+        return await echo(messages)
+
+    return stub_client(respond)
+
+
+def idle_flags(client):
+    return [kwargs.get("idle_only", False) for _, kwargs in client.calls]
+
+
+class TestSuggestionPrefetch(unittest.TestCase):
+
+    def run_session(self, client, follow_up, mode=LearningMode.EXPLAINER):
+        async def run():
+            handler = ModeHandler(prefetcher=SuggestionPrefetcher(top_n=2))
+            first = await handler.process_query(
+                "what is entropy", mode, [], groq_client=client, session_id="s1"
+            )
+            await asyncio.sleep(0.01)
+
+            history = [{"role": "user", "content": "what is entropy"},
+                       {"role": "assistant", "content": first["response"]}]
+            second = await handler.process_query(
+                follow_up, mode, history, groq_client=client, session_id="s1"
+            )
+            handler.prefetcher.discard("s1")
+            return second, handler.prefetcher.stats()
+
+        return asyncio.run(run())
+
+    def test_clicked_suggestion_is_served_from_prefetch(self):
+        client = make_client()
+        suggestion = MODE_SUGGESTIONS[LearningMode.EXPLAINER][0]
+        result, stats = self.run_session(client, suggestion)
+
+        self.assertTrue(result["metadata"]["prefetched"])
+        self.assertEqual(result["response"], f"answer to {suggestion}")
+        # one real call and two prefetches; the hit schedules two more, cancelled by discard
+        self.assertEqual(idle_flags(client), [False, True, True])
+        self.assertEqual(stats["explainer"]["scheduled"], 4)
+        self.assertEqual(stats["explainer"]["hits"], 1)
+        self.assertEqual(stats["explainer"]["wasted"], 1)
+        self.assertEqual(stats["explainer"]["wasted_tokens"], 10)
+
+    def test_other_query_wastes_prefetches(self):
+        client = make_client()
+        result, stats = self.run_session(client, "something else")
+        self.assertNotIn("prefetched", result["metadata"])
+        self.assertEqual(stats["explainer"]["hits"], 0)
+        self.assertEqual(stats["explainer"]["hit_rate"], 0.0)
+
+    def test_cancelled_prefetches_count_sent_tokens(self):
+        client = make_client(delay=10)
+        result, stats = self.run_session(client, "something else")
+        self.assertEqual(idle_flags(client), [False, True, True, False])
+        self.assertEqual(stats["explainer"]["completed"], 0)
+        self.assertEqual(stats["explainer"]["wasted"], 2)
+        self.assertGreater(stats["explainer"]["wasted_tokens"], 0)
+
+    def test_no_idle_capacity_skips(self):
+        client = make_client(idle=False)
+        suggestion = MODE_SUGGESTIONS[LearningMode.EXPLAINER][0]
+        result, stats = self.run_session(client, suggestion)
+        self.assertNotIn("prefetched", result["metadata"])
+        self.assertEqual(idle_flags(client), [False, True, True, False])
+        self.assertEqual(stats["explainer"]["skipped"], 2)
+
+    def test_socratic_not_prefetched(self):
+        client = make_client()
+        self.run_session(client, "anything", mode=LearningMode.SOCRATIC)
+        self.assertEqual(idle_flags(client), [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
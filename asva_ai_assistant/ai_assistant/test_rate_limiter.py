@@ -0,0 +1,177 @@
+"""
+Stand-alone test-suite for the client-side rate limiter.
+"""
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from groq_client import GroqClient
+from rate_limiter import RateLimiter, parse_duration
+from exceptions import RateLimitError
+from test_groq_client import _async
+
+
+class TestParseDuration(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertAlmostEqual(parse_duration("7.66s"), 7.66)
+        self.assertAlmostEqual(parse_duration("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_duration("150ms"), 0.15)
+        self.assertAlmostEqual(parse_duration("3"), 3.0)
+        self.assertIsNone(parse_duration(""))
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    @_async
+    async def test_admits_within_budget(self):
+        limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000)
+        async with await limiter.acquire(100):
+            self.assertEqual(limiter.active, 1)
+        self.assertEqual(limiter.active, 0)
+        self.assertEqual(limiter.stats()["admitted"], 1)
+
+    @_async
+    async def test_idle_admission_keeps_reserve(self):
+        limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000, max_concurrency=4)
+        first = limiter.try_acquire_idle(100, reserve=0.5)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(limiter.try_acquire_idle(100, reserve=0.5))
+        # a third would leave fewer than half of the concurrency slots free
+        self.assertIsNone(limiter.try_acquire_idle(100, reserve=0.5))
+        await first.release()
+        self.assertIsNone(limiter.try_acquire_idle(400, reserve=0.5))
+        self.assertEqual(limiter.stats()["idle_rejected"], 2)
+
+    @_async
+    async def test_client_idle_only_fails_without_capacity(self):
+        limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000, max_concurrency=1)
+        http_client = httpx.AsyncClient()
+        client = GroqClient("key", rate_limiter=limiter, coalesce=False, http_client=http_client)
+        with self.assertRaises(RateLimitError):
+            await client.generate_completion(
+                [{"role": "user", "content": "hi"}], max_tokens=10, idle_only=True
+            )
+        await http_client.aclose()
+
+    @_async
+    async def test_fails_fast_past_deadline(self):
+        limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=1000)
+        await (await limiter.acquire(10)).release()
+        started = time.monotonic()
+        with self.assertRaises(RateLimitError):
+            await limiter.acquire(10, deadline=time.monotonic() + 1)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+    @_async
+    async def test_concurrency_is_bounded_and_fifo(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=100000,
+                              max_concurrency=2)
+        order = []
+        peak = 0
+
+        async def worker(i):
+            nonlocal peak
+            async with await limiter.acquire(10):
+                order.append(i)
+                peak = max(peak, limiter.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[worker(i) for i in range(6)])
+        self.assertEqual(peak, 2)
+        self.assertEqual(order, list(range(6)))
+
+    @_async
+    async def test_headers_lower_the_budget(self):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=6000)
+        limiter.update_from_headers({
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "30s",
+        })
+        with self.assertRaises(RateLimitError):
+            await limiter.acquire(100, deadline=time.monotonic() + 5)
+
+    @_async
+    async def test_daily_request_headers_leave_the_minute_budget(self):
+        limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=6000)
+        limiter.update_from_headers({
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2m59.56s",
+            "x-ratelimit-remaining-tokens": "5000",
+        })
+        self.assertEqual(limiter.requests.level, 30)
+        self.assertEqual(limiter.tokens.level, 5000)
+
+        daily = RateLimiter(requests_per_minute=14400, period=86400.0)
+        daily.update_from_headers({"x-ratelimit-remaining-requests": "100"})
+        self.assertEqual(daily.requests.level, 100)
+
+    @_async
+    async def test_settle_refunds_unused_tokens(self):
+        limiter = RateLimiter(tokens_per_minute=1000)
+        lease = await limiter.acquire(500)
+        lease.settle(100)
+        self.assertAlmostEqual(limiter.tokens.level, 900, delta=1)
+        await lease.release()
+
+    @_async
+    async def test_settle_stops_at_capacity(self):
+        limiter = RateLimiter(tokens_per_minute=1000)
+        lease = await limiter.acquire(500)
+        limiter.tokens.level = 800
+        lease.settle(100)
+        self.assertEqual(limiter.tokens.level, 1000)
+        await lease.release()
+
+    @_async
+    async def test_stream_settles_with_final_usage(self):
+        body = (
+            b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\n'
+            b'data: {"choices":[{"delta":{}}],"x_groq":{"usage":{"total_tokens":50}}}\n\n'
+            b'data: [DONE]\n\n'
+        )
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+        limiter = RateLimiter(tokens_per_minute=10000)
+        client = GroqClient(
+            "key", base_url="http://fake", coalesce=False,
+            http_client=httpx.AsyncClient(transport=transport), rate_limiter=limiter
+        )
+        async with client:
+            text = [t async for t in client.generate_streaming_text(
+                [{"role": "user", "content": "hi"}], model="m", max_tokens=2048
+            )]
+        self.assertEqual(text, ["hi"])
+        self.assertAlmostEqual(limiter.tokens.level, 10000 - 50, delta=1)
+
+    @_async
+    async def test_attempt_timeout_starts_after_admission(self):
+        delay = 0.0
+
+        async def handler(request):
+            await asyncio.sleep(delay)
+            return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 5}})
+
+        limiter = RateLimiter(tokens_per_minute=100000, max_concurrency=1)
+        client = GroqClient(
+            "key", base_url="http://fake", coalesce=False,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), rate_limiter=limiter
+        )
+        messages = [{"role": "user", "content": "hi"}]
+        async with client:
+            # Queued behind another request for longer than the timeout
+            lease = await limiter.acquire(10)
+            asyncio.get_running_loop().call_later(0.1, lambda: asyncio.ensure_future(lease.release()))
+            result = await client.generate_completion(messages, model="m", attempt_timeout=0.05)
+            self.assertEqual(result["usage"]["total_tokens"], 5)
+
+            delay = 0.2
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.generate_completion(messages, model="m", attempt_timeout=0.05)
+        self.assertEqual(limiter.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+"""
+Stand-alone test-suite for the response cache.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, AsyncMock
+
+from response_cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    ResponseCache,
+    make_cache_key,
+)
+from groq_client import GroqClient
+from test_groq_client import resp, _async
+
+MESSAGES = [{"role": "user", "content": "What is  entanglement?"}]
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_only_trailing_whitespace_is_ignored(self):
+        def key(content):
+            return make_cache_key("m", [{"role": "user", "content": content}], 0.7, 100, 1.0)
+
+        self.assertEqual(make_cache_key("m", MESSAGES, 0.7, 100, 1.0), key("What is  entanglement?\n"))
+        self.assertNotEqual(key("What is  entanglement?"), key("What is entanglement?"))
+        self.assertNotEqual(key("if x:\n    y()"), key("if x:\n y()"))
+        self.assertNotEqual(key("a\nb"), key("a b"))
+
+    def test_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CacheBackend()
+
+    def test_parameters_change_key(self):
+        a = make_cache_key("m", MESSAGES, 0.7, 100, 1.0)
+        self.assertNotEqual(a, make_cache_key("m", MESSAGES, 0.6, 100, 1.0))
+        self.assertNotEqual(a, make_cache_key("other", MESSAGES, 0.7, 100, 1.0))
+
+
+class TestMemoryBackend(unittest.TestCase):
+
+    def test_lru_by_bytes(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+        backend.set("a", b"12345", 60)
+        backend.set("b", b"12345", 60)
+        backend.get("a")
+        backend.set("c", b"12345", 60)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), b"12345")
+        self.assertEqual(backend.stats()["bytes"], 10)
+
+    def test_ttl_expiry(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", b"x", 60)
+        with patch("response_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.stats()["entries"], 0)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteCacheBackend(os.path.join(self.tmp.name, "c.db"), max_bytes=10)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def test_round_trip_and_eviction(self):
+        self.backend.set("a", b"12345", 60)
+        self.assertEqual(self.backend.get("a"), b"12345")
+        self.backend.set("b", b"12345", 60)
+        self.backend.set("c", b"12345", 60)
+        self.assertEqual(self.backend.stats()["entries"], 2)
+        self.assertLessEqual(self.backend.stats()["bytes"], 10)
+
+
+class TestClientCache(unittest.TestCase):
+
+    @_async
+    async def test_second_call_served_from_cache(self):
+        cache = ResponseCache()
+        body = {"choices": [{"message": {"content": "hi"}}]}
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock:
+            mock.return_value = resp(200, json_data=body)
+            async with GroqClient("key", response_cache=cache) as c:
+                first = await c.generate_completion(MESSAGES)
+                second = await c.generate_completion(MESSAGES)
+            self.assertEqual(mock.call_count, 1)
+        self.assertNotIn("cached", first)
+        self.assertTrue(second["cached"])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,184 @@
+"""
+Stand-alone test-suite for the semantic response cache.
+"""
+import asyncio
+import time
+import unittest
+
+from mode_handler import ModeHandler, LearningMode, ComplexityLevel
+from semantic_cache import SemanticCache, content_words, normalize_query
+from test_stubs import stub_client
+
+SCOPE = ("explainer", None, None, None)
+
+
+def result(answer: str, tokens: int = 10) -> dict:
+    return {
+        "response": answer,
+        "mode": "explainer",
+        "suggestions": [],
+        "sources": [],
+        "metadata": {"tokens_used": tokens, "model": "m"}
+    }
+
+
+class TestSemanticCache(unittest.TestCase):
+
+    def test_paraphrase_hits_within_its_scope(self):
+        cache = SemanticCache(audit_rate=0)
+        cache.store(SCOPE, "What is quantum entanglement?", result("Entangled particles..."))
+
+        hit = cache.lookup(SCOPE, "explain quantum entanglement")
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit.query, "What is quantum entanglement?")
+        self.assertGreaterEqual(hit.similarity, 0.85)
+        self.assertTrue(hit.result["metadata"]["semantic_hit"])
+        self.assertEqual(hit.result["response"], "Entangled particles...")
+
+        self.assertIsNone(cache.lookup(SCOPE, "what is photosynthesis"))
+        self.assertIsNone(cache.lookup(("explainer", "beginner", None, None), "explain quantum entanglement"))
+        self.assertIsNone(cache.lookup(("socratic", None, None, None), "explain quantum entanglement"))
+
+        stats = cache.stats()["modes"]
+        self.assertEqual(stats["explainer"]["hits"], 1)
+        self.assertEqual(stats["explainer"]["lookups"], 3)
+        self.assertEqual(stats["explainer"]["saved_tokens"], 10)
+        self.assertAlmostEqual(stats["explainer"]["hit_rate"], 1 / 3)
+
+    def test_paraphrases_hit(self):
+        cache = SemanticCache(audit_rate=0)
+        cache.store(SCOPE, "what is entanglement", result("entanglement"))
+        cache.store(SCOPE, "how do I sort a list in python", result("sorted()"))
+        for query, answer in (
+            ("Entanglement?", "entanglement"),
+            ("how do I sort a list in Python?", "sorted()"),
+            ("can you explain how to sort a list in python", "sorted()"),
+        ):
+            hit = cache.lookup(SCOPE, query)
+            self.assertIsNotNone(hit, query)
+            self.assertEqual(hit.result["response"], answer, query)
+
+    def test_near_misses_are_rejected(self):
+        cache = SemanticCache(audit_rate=0)
+        cache.store(SCOPE, "how do I sort a list in python", result("sorted()"))
+        cache.store(SCOPE, "what is entropy in chemistry", result("disorder"))
+        cache.store(SCOPE, "what is quantum entanglement", result("entanglement"))
+        cache.store(SCOPE, "what is binary search", result("halving"))
+        cache.store(SCOPE, "explain recursion", result("calls itself"))
+        cache.store(SCOPE, "what is a linked list", result("nodes"))
+        vectorizer = cache.vectorizer
+        java = vectorizer.transform(normalize_query("how do I sort a list in java"))
+        python = vectorizer.transform(normalize_query("how do I sort a list in python"))
+        self.assertGreater(float(java @ python), 0.85)
+
+        for query in (
+            "how do I sort a list in java",
+            "how do I reverse a list in python",
+            "what is entropy in physics",
+            "what is quantum entanglement used for in cryptography",
+            "how do I sort",
+            # One added word narrows the question
+            "what is a binary search tree",
+            "explain tail recursion",
+            "what is a doubly linked list",
+            "explain quantum entanglement in detail",
+        ):
+            self.assertIsNone(cache.lookup(SCOPE, query), query)
+
+    def test_equivalent_query_replaces_entry(self):
+        cache = SemanticCache(audit_rate=0)
+        cache.store(SCOPE, "what is entropy", result("old"))
+        cache.store(SCOPE, "explain entropy", result("new"))
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.lookup(SCOPE, "define entropy").result["response"], "new")
+
+    def test_eligibility(self):
+        cache = SemanticCache(max_query_chars=50)
+        self.assertTrue(cache.eligible("what is entropy", []))
+        self.assertTrue(cache.eligible("what is entropy", [{"role": "user", "content": "what is entropy"}]))
+        self.assertFalse(cache.eligible("what is entropy", [
+            {"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "what is entropy"}
+        ]))
+        self.assertFalse(cache.eligible("why " * 20, []))
+        self.assertFalse(cache.eligible("  ", []))
+
+    def test_ttl_and_lru_eviction(self):
+        cache = SemanticCache(max_entries=2, audit_rate=0, ttl=60)
+        cache.store(SCOPE, "entropy", result("a"))
+        cache.store(SCOPE, "enthalpy", result("b"))
+        cache.lookup(SCOPE, "entropy")
+        cache.store(SCOPE, "osmosis", result("c"))
+        self.assertIsNotNone(cache.lookup(SCOPE, "entropy"))
+        self.assertIsNone(cache.lookup(SCOPE, "enthalpy"))
+        self.assertEqual(cache.stats()["modes"]["explainer"]["evictions"], 1)
+
+        cache._scopes[SCOPE].expires[:] = time.monotonic() - 1
+        self.assertIsNone(cache.lookup(SCOPE, "osmosis"))
+        cache.store(SCOPE, "diffusion", result("d"))
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_audited_false_hit_is_sampled(self):
+        cache = SemanticCache(audit_rate=1.0, seed=0)
+        cache.store(SCOPE, "what is a cell", result("A cell is the basic unit of life in biology."))
+        hit = cache.lookup(SCOPE, "explain a cell")
+        self.assertTrue(hit.audit)
+
+        fresh = result("A battery cell stores chemical energy and releases it as electricity.")
+        cache.store(SCOPE, "explain a cell", fresh, audited=hit)
+        stats = cache.stats()
+        self.assertEqual(stats["modes"]["explainer"]["audited"], 1)
+        self.assertEqual(stats["modes"]["explainer"]["false_hits"], 1)
+        self.assertEqual(stats["modes"]["explainer"]["false_hit_rate"], 1.0)
+        self.assertEqual(stats["false_hits"][0]["cached_query"], "what is a cell")
+        # The fresh answer replaces the one that was wrong for this question
+        self.assertEqual(cache.lookup(SCOPE, "what is a cell").result["response"], fresh["response"])
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("Can you explain Quantum Entanglement?"), "quantum entanglement")
+        self.assertEqual(normalize_query("how does it work"), "how does it work")
+        self.assertEqual(normalize_query("what is"), "what is")
+        self.assertEqual(
+            content_words(normalize_query("How do I sort a list in Java?")), ["how", "sort", "list", "java"]
+        )
+
+
+class TestModeHandlerSemanticCache(unittest.TestCase):
+
+    def test_paraphrased_first_question_skips_upstream(self):
+        async def run():
+            client = stub_client()
+            handler = ModeHandler(semantic_cache=SemanticCache(audit_rate=0))
+            first = await handler.process_query(
+                "What is entropy?", LearningMode.EXPLAINER,
+                [{"role": "user", "content": "What is entropy?"}], groq_client=client
+            )
+            second = await handler.process_query(
+                "explain entropy", LearningMode.EXPLAINER,
+                [{"role": "user", "content": "explain entropy"}], groq_client=client
+            )
+            other_level = await handler.process_query(
+                "explain entropy", LearningMode.EXPLAINER, [],
+                complexity_level=ComplexityLevel.BEGINNER, groq_client=client
+            )
+            follow_up = await handler.process_query(
+                "explain entropy", LearningMode.EXPLAINER, [
+                    {"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"},
+                    {"role": "user", "content": "explain entropy"}
+                ], groq_client=client
+            )
+            return len(client.calls), first, second, other_level, follow_up, handler.semantic_cache.stats()
+
+        calls, first, second, other_level, follow_up, stats = asyncio.run(run())
+        self.assertEqual(calls, 3)
+        self.assertNotIn("semantic_hit", first["metadata"])
+        self.assertTrue(second["metadata"]["semantic_hit"])
+        self.assertEqual(second["response"], first["response"])
+        self.assertNotIn("semantic_hit", other_level["metadata"])
+        self.assertNotIn("semantic_hit", follow_up["metadata"])
+        self.assertEqual(stats["modes"]["explainer"]["lookups"], 3)
+        self.assertEqual(stats["modes"]["explainer"]["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Stand-alone test-suite for request coalescing.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch, AsyncMock
+
+from singleflight import SingleFlight, StreamFanout, make_payload_key
+from groq_client import GroqClient
+from test_groq_client import resp, _async
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    @_async
+    async def test_concurrent_calls_share_one_upstream(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": 1}
+
+        results = await asyncio.gather(*[flights.do("k", upstream) for _ in range(10)])
+        self.assertEqual(calls, 1)
+        self.assertEqual(flights.stats()["coalesced"], 9)
+        self.assertTrue(all(r == {"value": 1} for r in results))
+        # coalesced callers get their own copy
+        self.assertEqual(len({id(r) for r in results}), 10)
+
+    @_async
+    async def test_errors_reach_every_caller(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[flights.do("k", upstream) for _ in range(3)], return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flights.stats()["in_flight"], 0)
+
+    @_async
+    async def test_cancelled_caller_does_not_fail_others(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        first = asyncio.ensure_future(flights.do("k", upstream))
+        second = asyncio.ensure_future(flights.do("k", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        self.assertEqual(await second, "ok")
+
+    @_async
+    async def test_caller_after_last_cancel_starts_a_new_call(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            try:
+                await asyncio.sleep(0.05)
+                return calls
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.02)  # slow cleanup
+                raise
+
+        first = asyncio.ensure_future(flights.do("k", upstream))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.do("k", upstream))
+        await asyncio.sleep(0.03)  # the first call has unwound by now
+        self.assertEqual(flights.stats()["in_flight"], 1)
+        self.assertEqual(await second, 2)
+
+
+class TestStreamFanout(unittest.TestCase):
+
+    @_async
+    async def test_subscribers_receive_all_chunks(self):
+        fanout = StreamFanout()
+        starts = 0
+
+        async def source():
+            nonlocal starts
+            starts += 1
+            for i in range(5):
+                await asyncio.sleep(0.005)
+                yield {"i": i}
+
+        async def consume():
+            return [c["i"] async for c in fanout.subscribe("k", source)]
+
+        first = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.012)  # join after the stream has started
+        second = await consume()
+
+        self.assertEqual(await first, [0, 1, 2, 3, 4])
+        self.assertEqual(second, [0, 1, 2, 3, 4])
+        self.assertEqual(starts, 1)
+        self.assertEqual(fanout.stats()["coalesced"], 1)
+
+    @_async
+    async def test_subscriber_after_last_cancel_starts_a_new_stream(self):
+        fanout = StreamFanout()
+        starts = 0
+
+        async def source():
+            nonlocal starts
+            starts += 1
+            try:
+                for i in range(3):
+                    await asyncio.sleep(0.01)
+                    yield {"i": i}
+            finally:
+                await asyncio.sleep(0.02)  # slow cleanup
+
+        async def consume():
+            return [c["i"] async for c in fanout.subscribe("k", source)]
+
+        first = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.015)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(await consume(), [0, 1, 2])
+        self.assertEqual(starts, 2)
+        self.assertEqual(fanout.stats()["in_flight"], 0)
+
+
+class TestClientCoalescing(unittest.TestCase):
+
+    def test_payload_key_is_order_independent(self):
+        self.assertEqual(make_payload_key({"a": 1, "b": 2}), make_payload_key({"b": 2, "a": 1}))
+
+    @_async
+    async def test_identical_completions_are_coalesced(self):
+        async def slow_post(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return resp(200, json_data={"choices": [{"message": {"content": "hi"}}]})
+
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock:
+            mock.side_effect = slow_post
+            async with GroqClient("key", coalesce=True) as c:
+                messages = [{"role": "user", "content": "explain X"}]
+                await asyncio.gather(*[c.generate_completion(messages) for _ in range(5)])
+                stats = c.get_coalescing_stats()["completions"]
+            self.assertEqual(mock.call_count, 1)
+            self.assertEqual(stats["coalesced"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
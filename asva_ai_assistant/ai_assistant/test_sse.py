@@ -0,0 +1,239 @@
+"""
+Stand-alone test-suite for the SSE relay helpers.
+"""
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+from starlette.responses import StreamingResponse
+
+from sse import (
+    iter_sse_data,
+    extract_delta_content,
+    extract_usage,
+    token_frame,
+    coalesce_deltas,
+    until_disconnected,
+)
+from groq_client import GroqClient
+from hedging import Hedger
+from test_groq_client import FakeStream, _async
+
+
+async def aiter(items):
+    for item in items:
+        yield item
+
+
+def chunk(content=None, **extra):
+    delta = {} if content is None else {"content": content}
+    return json.dumps({"choices": [{"index": 0, "delta": delta}], **extra})
+
+
+class TestSSEParsing(unittest.TestCase):
+
+    @_async
+    async def test_split_across_reads(self):
+        raw = [b'data: {"a":', b'1}\n\ndata: {"b":2}\r\n', b"data: [DONE]\n", b"data: {}\n"]
+        events = [e async for e in iter_sse_data(aiter(raw))]
+        self.assertEqual(events, [b'{"a":1}', b'{"b":2}'])
+
+    def test_extract_delta_content(self):
+        self.assertEqual(extract_delta_content(chunk("hi")), "hi")
+        self.assertEqual(extract_delta_content(chunk('say "x"\né')), 'say "x"\né')
+        self.assertIsNone(extract_delta_content(chunk()))
+        self.assertIsNone(extract_delta_content(
+            '{"choices":[{"delta":{"content":null}}]}'
+        ))
+
+    def test_extract_usage(self):
+        self.assertIsNone(extract_usage(chunk("hi")))
+        self.assertEqual(
+            extract_usage(chunk(x_groq={"usage": {"total_tokens": 7}})),
+            {"total_tokens": 7}
+        )
+
+    def test_token_frame_matches_stream_chunk(self):
+        frame = token_frame('a "quote" é')
+        self.assertTrue(frame.startswith("data: ") and frame.endswith("\n\n"))
+        self.assertEqual(json.loads(frame[6:]), {
+            "type": "token", "content": 'a "quote" é', "session_id": None, "metadata": None
+        })
+
+    @_async
+    async def test_coalesce_deltas(self):
+        pieces = [p async for p in coalesce_deltas(aiter(["a"] * 10), max_chars=4, max_delay=60)]
+        self.assertEqual(pieces, ["a", "aaaa", "aaaa", "a"])
+        self.assertEqual([p async for p in coalesce_deltas(aiter([]))], [])
+
+    @_async
+    async def test_coalesce_flushes_on_timer(self):
+        async def source():
+            yield "a"
+            yield "b"
+            yield "c"
+            await asyncio.sleep(0.2)
+            yield "d"
+
+        start = asyncio.get_running_loop().time()
+        timed = [
+            (p, asyncio.get_running_loop().time() - start)
+            async for p in coalesce_deltas(source(), max_chars=100, max_delay=0.02)
+        ]
+        self.assertEqual([p for p, _ in timed], ["a", "bc", "d"])
+        self.assertLess(timed[0][1], 0.01)
+        # Flushed by the timer, not by "d" arriving
+        self.assertLess(timed[1][1], 0.1)
+
+
+class TestClientTextStream(unittest.TestCase):
+
+    @_async
+    async def test_generate_streaming_text(self):
+        raw = [
+            f"data: {chunk('Hel')}\n".encode(),
+            f"data: {chunk('lo')}\n".encode(),
+            f"data: {chunk(x_groq={'usage': {'total_tokens': 3}})}\n".encode(),
+            b"data: [DONE]\n",
+        ]
+        usage = {}
+        with patch("httpx.AsyncClient.stream", return_value=FakeStream(raw)):
+            async with GroqClient("key") as c:
+                text = [t async for t in c.generate_streaming_text(
+                    [{"role": "user", "content": "hi"}], usage=usage
+                )]
+        self.assertEqual(text, ["Hel", "lo"])
+        self.assertEqual(usage["total_tokens"], 3)
+
+
+
+class SlowUpstream(httpx.AsyncByteStream):
+    """Upstream SSE body producing one delta every 10 ms, recording when it is closed"""
+
+    def __init__(self, closed: list):
+        self.closed = closed
+
+    async def __aiter__(self):
+        for _ in range(1000):
+            await asyncio.sleep(0.01)
+            yield f"data: {chunk('x')}\n\n".encode()
+
+    async def aclose(self):
+        self.closed.append(True)
+
+
+class TestDisconnect(unittest.TestCase):
+
+    @_async
+    async def test_source_cancelled_on_disconnect(self):
+        cleaned_up = []
+
+        async def source():
+            try:
+                yield "first"
+                await asyncio.sleep(60)
+                yield "never"
+            except asyncio.CancelledError:
+                cleaned_up.append(True)
+                raise
+
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        frames = [f async for f in until_disconnected(source(), receive)]
+        self.assertEqual(frames, ["first"])
+        self.assertEqual(cleaned_up, [True])
+
+    @_async
+    async def test_relays_everything_while_connected(self):
+        async def receive():
+            await asyncio.sleep(60)
+
+        frames = [f async for f in until_disconnected(aiter(["a", "b"]), receive)]
+        self.assertEqual(frames, ["a", "b"])
+
+    async def _drive_response(self, spec_version):
+        """Serve a slow source through Starlette's StreamingResponse until the client leaves"""
+        cleaned_up = []
+
+        async def source():
+            try:
+                yield "first"
+                await asyncio.sleep(60)
+                yield "never"
+            except asyncio.CancelledError:
+                # Like the relay saving the truncated transcript
+                await asyncio.sleep(0.01)
+                cleaned_up.append(True)
+                raise
+
+        listeners = []
+
+        async def receive():
+            # Only the first listener hears the disconnect: on spec < 2.4
+            # that is Starlette's own listener, which cancels from outside
+            listeners.append(True)
+            await asyncio.sleep(0.05 if len(listeners) == 1 else 60)
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        response = StreamingResponse(until_disconnected(source(), receive), media_type="text/event-stream")
+        scope = {"type": "http", "asgi": {"spec_version": spec_version}}
+        await asyncio.wait_for(response(scope, receive, send), 1)
+        await asyncio.sleep(0.05)
+        bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+        return bodies, cleaned_up
+
+    @_async
+    async def test_streaming_response_disconnect(self):
+        for spec_version in ("2.3", "2.4"):
+            bodies, cleaned_up = await self._drive_response(spec_version)
+            self.assertEqual(bodies[0], b"first", spec_version)
+            self.assertNotIn(b"never", bodies, spec_version)
+            self.assertEqual(cleaned_up, [True], spec_version)
+
+    def _client(self, closed, **kwargs):
+        transport = httpx.MockTransport(lambda request: httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, stream=SlowUpstream(closed)
+        ))
+        client = GroqClient("key", base_url="http://fake", http_client=httpx.AsyncClient(transport=transport), **kwargs)
+        client.rate_limiter = None
+        return client
+
+    async def _read_then_cancel(self, client, readers=1):
+        async def read():
+            async for _ in client.generate_streaming_text([{"role": "user", "content": "hi"}], model="m"):
+                pass
+
+        tasks = [asyncio.ensure_future(read()) for _ in range(readers)]
+        await asyncio.sleep(0.05)
+        tasks[0].cancel()
+        await asyncio.sleep(0.02)
+        return tasks
+
+    @_async
+    async def test_cancel_closes_upstream(self):
+        for kwargs in ({"coalesce": False}, {"coalesce": True}, {"coalesce": False, "hedger": Hedger()}):
+            closed = []
+            await self._read_then_cancel(self._client(closed, **kwargs))
+            self.assertEqual(closed, [True], kwargs)
+
+    @_async
+    async def test_coalesced_stream_outlives_one_reader(self):
+        closed = []
+        tasks = await self._read_then_cancel(self._client(closed, coalesce=True), readers=2)
+        self.assertEqual(closed, [])
+        tasks[1].cancel()
+        await asyncio.sleep(0.02)
+        self.assertEqual(closed, [True])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+"""
+Shared stand-ins for the tests that drive ModeHandler without a Groq API.
+"""
+import asyncio
+import inspect
+from unittest.mock import Mock
+
+MODELS = [{"id": "m", "context_window": 8192}]
+
+
+async def echo(messages, **kwargs):
+    await asyncio.sleep(0)
+    return f"answer to {messages[-1]['content']}"
+
+
+def stub_client(respond=echo, models=MODELS):
+    """
+    Mock GroqClient whose completions are answered by `respond`.
+
+    `respond(messages, **kwargs)` returns the answer text, or a coroutine for
+    it, and raises to fail the call. Calls are recorded in `client.calls` as
+    (messages, kwargs) and the most completions in flight at once in
+    `client.peak`.
+    """
+    client = Mock()
+    client.tokenizer = None
+    client.get_available_models.return_value = models
+    client.calls = []
+    client.in_flight = client.peak = 0
+
+    async def generate_completion(messages, **kwargs):
+        client.calls.append((messages, kwargs))
+        client.in_flight += 1
+        client.peak = max(client.peak, client.in_flight)
+        try:
+            content = respond(messages, **kwargs)
+            if inspect.isawaitable(content):
+                content = await content
+        finally:
+            client.in_flight -= 1
+        return {
+            "choices": [{"message": {"content": content}}],
+            "usage": {"total_tokens": 10},
+            "model": kwargs.get("model") or "m"
+        }
+
+    client.generate_completion = generate_completion
+    return client
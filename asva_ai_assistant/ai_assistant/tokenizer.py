@@ -0,0 +1,162 @@
+"""
+Token Counting
+Offline token counting for chat messages with a per-message LRU cache
+"""
+
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Callable, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Tokens spent by the chat format on every message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tokens priming the assistant reply at the end of a chat prompt
+REPLY_OVERHEAD_TOKENS = 3
+
+# Pre-tokenizer close to the split pattern used by tiktoken-style BPE vocabularies
+_PRETOKENIZE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)"
+    r"| ?[^\W\d_]+"
+    r"| ?\d{1,3}"
+    r"| ?[^\s\w]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+    r"|_+",
+    re.IGNORECASE
+)
+
+# First code point of the CJK blocks, where BPE vocabularies spend ~1 token per character
+_CJK_START = 0x2E80
+
+
+def _count_word(piece: str) -> int:
+    """Estimate BPE tokens for a single pre-tokenized word"""
+    word = piece.lstrip()
+    if word.isascii():
+        # Common words up to six letters are single tokens in large vocabularies
+        return 1 if len(word) <= 6 else (len(word) + 2) // 4
+
+    wide = sum(1 for char in word if ord(char) >= _CJK_START)
+    return max(1, wide + (len(word) - wide + 2) // 3)
+
+
+def count_regex(text: str) -> int:
+    """
+    Count tokens with the built-in pre-tokenizer.
+
+    Splits text the way byte-level BPE tokenizers do and charges each piece
+    by its length and script. Needs no vocabulary file.
+    """
+    total = 0
+    for piece in _PRETOKENIZE.findall(text):
+        first = piece.lstrip()[:1]
+        if not first:
+            total += 1
+        elif first.isalpha():
+            total += _count_word(piece)
+        elif first.isdigit():
+            total += 1
+        else:
+            total += (len(piece.strip()) + 1) // 2
+    return total
+
+
+def load_engine(tokenizer_path: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Load the best available token counting engine.
+
+    Args:
+        tokenizer_path: Path to a local HuggingFace `tokenizer.json` for the model
+
+    Returns:
+        Callable returning the token count of a text
+    """
+    if tokenizer_path:
+        try:
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+            logger.info(f"Using tokenizer from {tokenizer_path}")
+            return lambda text: len(
+                tokenizer.encode(text, add_special_tokens=False).ids
+            )
+        except ImportError:
+            logger.warning("tokenizers is not installed, falling back to regex token counting")
+        except Exception as e:
+            logger.warning(f"Failed to load tokenizer {tokenizer_path}: {str(e)}")
+
+    return count_regex
+
+
+class TokenCounter:
+    """
+    Counts tokens for text and chat messages.
+
+    Message counts are memoized in an LRU keyed by the role and content,
+    so re-counting a long history only pays for the new turns.
+
+    Attributes:
+        engine: Callable returning the token count of a text
+        cache_size: Maximum number of cached message counts
+    """
+
+    def __init__(
+        self,
+        engine: Optional[Callable[[str], int]] = None,
+        cache_size: int = 8192
+    ):
+        self.engine = engine or count_regex
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        """Count tokens in a text"""
+        if not text:
+            return 0
+        return self.engine(text)
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Count tokens in a chat message including the chat-format overhead"""
+        content = message.get("content") or ""
+        # str hashes are cached by the interpreter, so lookups are O(1) for seen
+        # strings; equal hashes are still told apart by comparing the strings
+        key = (message.get("role", ""), content)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        tokens = self.count(content) + MESSAGE_OVERHEAD_TOKENS
+        self._cache[key] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """Count tokens for a full chat prompt"""
+        if not messages:
+            return 0
+        return sum(self.count_message(m) for m in messages) + REPLY_OVERHEAD_TOKENS
+
+    def cache_info(self) -> Dict[str, int]:
+        """Get cache statistics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "max_size": self.cache_size
+        }
+
+    def clear_cache(self) -> None:
+        """Drop all cached message counts"""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
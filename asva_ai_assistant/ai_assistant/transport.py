@@ -0,0 +1,76 @@
+"""
+HTTP Transport
+Connection pooling, timeouts and HTTP/2 for the Groq client
+"""
+
+from typing import Optional, Dict
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def http2_available() -> bool:
+    """Check whether the optional `h2` package needed for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client(
+    headers: Optional[Dict[str, str]] = None,
+    http2: bool = True,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 30.0,
+    write_timeout: float = 10.0,
+    pool_timeout: float = 5.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> httpx.AsyncClient:
+    """
+    Create the pooled async HTTP client used for Groq calls.
+
+    With HTTP/2 concurrent requests are multiplexed over a few connections
+    instead of waiting for a free HTTP/1.1 connection. HTTP/2 needs the
+    `h2` package and falls back to HTTP/1.1 without it.
+
+    Args:
+        headers: Default request headers
+        http2: Enable HTTP/2 multiplexing
+        max_connections: Maximum number of open connections
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept open
+        connect_timeout: Seconds to establish a connection (incl. TLS)
+        read_timeout: Seconds to wait for response data
+        write_timeout: Seconds to send the request body
+        pool_timeout: Seconds to wait for a free connection from the pool
+        transport: Custom transport (tests and benchmarks)
+
+    Returns:
+        Configured httpx.AsyncClient
+    """
+    if http2 and not http2_available():
+        logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        headers=headers,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(
+            read_timeout,
+            connect=connect_timeout,
+            write=write_timeout,
+            pool=pool_timeout
+        ),
+        transport=transport
+    )